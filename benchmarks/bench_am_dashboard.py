@@ -0,0 +1,206 @@
+# SOCIALAI-OPTIMIZER/benchmarks/bench_am_dashboard.py
+# Account manager dashboard: eski ~9 ardışık sorgu ile tek CTE sorgusunun gecikme karşılaştırması.
+# Yerel Postgres'e (targetly-backend/.env veya DB_* ortam değişkenleri) sahte bir hesap tohumlar, ölçer ve siler.
+#   python benchmarks/bench_am_dashboard.py --posts 5000 --iterations 200 --rtt-ms 2
+# --rtt-ms her sorguya yapay ağ gecikmesi ekler (uzak bir veritabanını taklit eder).
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(PROJECT_ROOT_DIR, "targetly-app", "targetly-backend")
+for path in (PROJECT_ROOT_DIR, BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from psycopg2.extras import execute_values
+
+from common.daily_rollups import backfill_account_daily_stats
+from db import get_db_connection
+from migrate import ensure_schema
+from routes.account_manager_routes import fetch_am_dashboard_payload
+
+BENCH_ACCOUNT_ID = "bench_am_dashboard_account"
+DEMOGRAPHICS = {
+    "follower_demographics_country": ["TR", "US", "DE", "GB", "FR", "NL"],
+    "follower_demographics_gender": ["F", "M", "U"],
+    "follower_demographics_age": ["13-17", "18-24", "25-34", "35-44", "45-54", "55-64"],
+}
+
+
+class RoundTripCounter:
+    """Bağlantıyı sarar; her execute bir round trip sayılır ve isteğe bağlı gecikme eklenir."""
+
+    def __init__(self, conn, rtt_seconds=0.0):
+        self.conn = conn
+        self.rtt_seconds = rtt_seconds
+        self.round_trips = 0
+
+    def cursor(self):
+        return _CountingCursor(self, self.conn.cursor())
+
+
+class _CountingCursor:
+    def __init__(self, counter, cursor):
+        self._counter = counter
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        self._counter.round_trips += 1
+        if self._counter.rtt_seconds:
+            time.sleep(self._counter.rtt_seconds)
+        return self._cursor.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def legacy_am_dashboard_payload(conn, instagram_account_id):
+    """Önceki uygulama: her agrega için ayrı sorgu (round trip)."""
+    cursor = conn.cursor()
+    try:
+        account_name = f"TCS Yazılım (ID: {instagram_account_id[:5]}...)"
+        cursor.execute("""
+            SELECT value FROM follower_insights
+            WHERE instagram_user_id = %s AND metric_name = 'followers_count'
+            ORDER BY data_date DESC, fetched_at DESC LIMIT 1
+        """, (instagram_account_id,))
+        tf_tuple = cursor.fetchone()
+        total_followers = tf_tuple[0] if tf_tuple and tf_tuple[0] is not None else 0
+        seven_days_ago = (datetime.now() - timedelta(days=7)).date()
+        cursor.execute("SELECT COUNT(*) FROM instagram_posts WHERE instagram_user_id = %s AND DATE(timestamp) >= %s", (instagram_account_id, seven_days_ago))
+        recent_posts_count = cursor.fetchone()[0] or 0
+        cursor.execute("""
+            SELECT SUM(like_count), SUM(comments_count) FROM instagram_posts
+            WHERE instagram_user_id = %s AND DATE(timestamp) >= %s
+        """, (instagram_account_id, seven_days_ago))
+        interactions = cursor.fetchone()
+        total_likes_7d = interactions[0] or 0
+        total_comments_7d = interactions[1] or 0
+        cursor.execute("SELECT SUM(value) FROM daily_insights WHERE instagram_user_id = %s AND metric_name = 'reach' AND date >= %s", (instagram_account_id, seven_days_ago))
+        reach_tuple = cursor.fetchone()
+        cursor.execute("SELECT SUM(value) FROM daily_insights WHERE instagram_user_id = %s AND metric_name = 'impressions' AND date >= %s", (instagram_account_id, seven_days_ago))
+        imp_tuple = cursor.fetchone()
+        cursor.execute("""
+            SELECT instagram_post_id as id, caption_cleaned, timestamp, media_type, like_count, comments_count
+            FROM instagram_posts WHERE instagram_user_id = %s ORDER BY timestamp DESC LIMIT 5
+        """, (instagram_account_id,))
+        cols_posts = [col[0] for col in cursor.description]
+        latest_posts = [dict(zip(cols_posts, row)) for row in cursor.fetchall()]
+        for post in latest_posts:
+            post["timestamp"] = post["timestamp"].isoformat()
+        demographics_result = {}
+        for key, metric in (("topCountries", "follower_demographics_country"), ("genderDistribution", "follower_demographics_gender"), ("ageGroups", "follower_demographics_age")):
+            cursor.execute("SELECT dimension_key, value FROM follower_insights WHERE instagram_user_id = %s AND metric_name = %s AND period = 'lifetime' ORDER BY value DESC LIMIT 3", (instagram_account_id, metric))
+            demographics_result[key] = [{"dimension": r[0], "value": r[1]} for r in cursor.fetchall()]
+        return {
+            "accountName": account_name,
+            "totalFollowers": total_followers,
+            "recentPostsCount": recent_posts_count,
+            "avgLikesPerPost": round(total_likes_7d / recent_posts_count, 1) if recent_posts_count else 0,
+            "avgCommentsPerPost": round(total_comments_7d / recent_posts_count, 1) if recent_posts_count else 0,
+            "recentReach": int(reach_tuple[0] or 0),
+            "recentImpressions": int(imp_tuple[0] or 0),
+            "latestPosts": latest_posts,
+            "demographics": demographics_result,
+        }
+    finally:
+        cursor.close()
+
+
+def seed(conn, post_count, days):
+    rng = random.Random(11)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    cursor = conn.cursor()
+    try:
+        cleanup(conn)
+        posts = [(BENCH_ACCOUNT_ID, f"bench_am_{i}", "bench", "bench", "IMAGE", now - timedelta(minutes=37 * i),
+                  rng.randint(0, 500), rng.randint(0, 50)) for i in range(post_count)]
+        execute_values(cursor, """INSERT INTO instagram_posts (instagram_user_id, instagram_post_id, caption_original, caption_cleaned,
+                                  media_type, timestamp, like_count, comments_count) VALUES %s""", posts, page_size=1000)
+        insights = [(BENCH_ACCOUNT_ID, metric, (now - timedelta(days=d)).date(), rng.randint(100, 5000))
+                    for metric in ("reach", "impressions", "accounts_engaged") for d in range(days)]
+        execute_values(cursor, "INSERT INTO daily_insights (instagram_user_id, metric_name, date, value) VALUES %s", insights, page_size=1000)
+        followers = [(BENCH_ACCOUNT_ID, "followers_count", None, 1000 + d, "day", (now - timedelta(days=d)).date()) for d in range(days)]
+        followers += [(BENCH_ACCOUNT_ID, metric, key, rng.randint(10, 900), "lifetime", now.date())
+                      for metric, keys in DEMOGRAPHICS.items() for key in keys]
+        execute_values(cursor, """INSERT INTO follower_insights (instagram_user_id, metric_name, dimension_key, value, period, data_date)
+                                  VALUES %s""", followers, page_size=1000)
+        conn.commit()
+    finally:
+        cursor.close()
+    ensure_schema(conn)
+    backfill_account_daily_stats(conn, BENCH_ACCOUNT_ID)
+
+
+def cleanup(conn):
+    cursor = conn.cursor()
+    try:
+        for table in ("instagram_posts", "daily_insights", "follower_insights", "account_daily_stats"):
+            cursor.execute(f"DELETE FROM {table} WHERE instagram_user_id = %s", (BENCH_ACCOUNT_ID,))
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def normalize(payload):
+    """Sayısal tipler (Decimal/int/float) ve eski 'country' anahtarı farkını yok sayar."""
+    demographics = {key: [{"dimension": item["dimension"], "value": float(item["value"])} for item in payload["demographics"][key]]
+                    for key in ("topCountries", "genderDistribution", "ageGroups")}
+    scalars = {key: float(value) if isinstance(value, (int, float, Decimal)) else value
+               for key, value in payload.items() if key not in ("demographics", "latestPosts")}
+    latest = [(post["id"], datetime.fromisoformat(post["timestamp"]), post["like_count"]) for post in payload["latestPosts"]]
+    return scalars, demographics, latest
+
+
+def measure(label, func, conn, iterations, rtt_seconds):
+    counter = RoundTripCounter(conn, rtt_seconds)
+    func(counter, BENCH_ACCOUNT_ID)  # ısınma
+    counter.round_trips = 0
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func(counter, BENCH_ACCOUNT_ID)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<24} {counter.round_trips / iterations:>6.1f} sorgu/istek  p50 {statistics.median(samples):8.2f} ms  p95 {p95:8.2f} ms")
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AM dashboard sorgu gecikmesi karşılaştırması")
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Sorgu başına eklenecek yapay ağ gecikmesi")
+    parser.add_argument("--keep", action="store_true", help="Tohumlanan verileri silme")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    if conn is None:
+        print("❌ DB bağlantısı kurulamadı (targetly-backend/.env veya DB_* değişkenlerini kontrol edin).")
+        sys.exit(1)
+    try:
+        seed(conn, args.posts, args.days)
+        print(f"🧪 {args.posts} gönderi, {args.days} günlük insight tohumlandı; {args.iterations} tekrar, RTT {args.rtt_ms} ms")
+        legacy = legacy_am_dashboard_payload(conn, BENCH_ACCOUNT_ID)
+        current = fetch_am_dashboard_payload(conn, BENCH_ACCOUNT_ID)
+        assert normalize(legacy) == normalize(current), "Tek sorgu eski yanıtla aynı olmalı"
+        rtt_seconds = args.rtt_ms / 1000.0
+        legacy_ms = measure("eski: ardışık sorgular", legacy_am_dashboard_payload, conn, args.iterations, rtt_seconds)
+        current_ms = measure("yeni: tek CTE sorgusu", fetch_am_dashboard_payload, conn, args.iterations, rtt_seconds)
+        print(f"p50 hızlanma: {legacy_ms / current_ms:.1f}x")
+    finally:
+        if not args.keep:
+            cleanup(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
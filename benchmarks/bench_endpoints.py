@@ -0,0 +1,424 @@
+# SOCIALAI-OPTIMIZER/benchmarks/bench_endpoints.py
+# Uç nokta benchmark'ı: seed_data.py ile yerel Postgres'e sentetik veri yazılır, Flask uygulamasının (create_app)
+# tüm blueprint route'ları süreç içi test istemcisiyle çağrılır ve run_pipeline yerel Graph API stub'ına
+# (common/graph_stub_server.py) karşı çalıştırılır. Route başına p50 / p90 / p99 / max gecikme ve istek/sn, pipeline
+# için süre ve gönderi/sn bir JSON dosyasına yazılır; sonraki çalıştırmalar bu baseline ile karşılaştırılır.
+#   python benchmarks/bench_endpoints.py --posts 100000 --save-baseline
+#   python benchmarks/bench_endpoints.py --posts 100000            # baseline'a göre gerileme varsa çıkış kodu 1
+#   python benchmarks/bench_endpoints.py --reuse --keep --routes dashboard reporting
+# Gemini sahte modelle, yayın işçileri kapalı çalışır (schedule-ig-post yalnızca kuyruğa yazar); SMTP'ye giden
+# send-reset-email yalnızca eşleşmeyen kullanıcıyla (404) ölçülür. Baseline makineye özgüdür, repoya eklenmez.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(PROJECT_ROOT_DIR, "targetly-app", "targetly-backend")
+DEFAULT_BASELINE_PATH = os.path.join(PROJECT_ROOT_DIR, "benchmarks", "baseline_endpoints.json")
+BENCH_PASSWORD = "bench-password" # seed_data.py kullanıcılarının parolası
+PIPELINE_ACCOUNT_SUFFIX = "pipeline"
+STUB_POST_ID_BASE = 19500000000000000 # tohum gönderileriyle çakışmayan IG media id aralığı
+
+# Uygulama içe aktarılmadan önce: işçiler / ısınma kapalı, Gemini çevrimdışı
+os.environ.setdefault("PUBLISH_WORKERS_ENABLED", "false")
+os.environ.setdefault("APP_WARMUP", "off")
+os.environ.setdefault("GEMINI_FAKE_MODEL", "true")
+os.environ.setdefault("IG_APP_ACCESS_TOKEN", "bench")
+for path in (PROJECT_ROOT_DIR, BACKEND_DIR, os.path.join(PROJECT_ROOT_DIR, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))] * 1000, 2)
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p90_ms": percentile(latencies, 0.90),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+        "mean_ms": round(sum(latencies) * 1000 / len(latencies), 2) if latencies else None,
+    }
+
+
+class BenchContext:
+    """Route tanımlarının paylaştığı durum: tohum hesapları, oluşturulan kullanıcılar / yayın işleri, sayfa imleci."""
+
+    def __init__(self, seed_summary, run_tag):
+        ids, counts = seed_summary["account_ids"], seed_summary["post_counts"]
+        self.main_account = ids[counts.index(max(counts))] # en büyük hesap (en pahalı sorgular)
+        self.small_account = ids[counts.index(min(counts))]
+        self.accounts = ids
+        self.user_count = seed_summary["users"]
+        self.run_tag = run_tag
+        self.created_users = []
+        self.publish_job_ids = []
+        self.posts_cursor = None
+
+    def user_email(self, i):
+        from seed_data import SEED_USER_EMAIL_DOMAIN
+        return f"user{i % self.user_count}{SEED_USER_EMAIL_DOMAIN}"
+
+    def new_user_email(self, i):
+        from seed_data import SEED_USER_EMAIL_DOMAIN
+        return f"created_{self.run_tag}_{i}{SEED_USER_EMAIL_DOMAIN}"
+
+
+def _remember(target):
+    def hook(ctx, response):
+        value = (response.get_json(silent=True) or {}).get("user_id" if target == "created_users" else "job_id")
+        if value is not None:
+            getattr(ctx, target).append(value)
+    return hook
+
+
+def _remember_cursor(ctx, response):
+    page = (response.get_json(silent=True) or {}).get("allPostsPage") or {}
+    ctx.posts_cursor = page.get("nextCursor") or ctx.posts_cursor
+
+
+def build_routes():
+    """
+    (grup, ad, metot, yol(ctx, i), gövde(ctx, i), kabul edilen durumlar, yanıt kancası) listesi. Gövde
+    ("json", dict) ya da ("form", dict) döner. Gruplar blueprint'lere karşılık gelir ve --routes ile seçilir.
+    """
+    now = int(time.time())
+    return [
+        ("root", "index", "GET", lambda c, i: "/", None, (200,), None),
+        ("root", "db_test", "GET", lambda c, i: "/db-test", None, (200,), None),
+        ("auth", "login", "POST", lambda c, i: "/login",
+         lambda c, i: ("json", {"email": c.user_email(i), "password": BENCH_PASSWORD}), (200,), None),
+        ("auth", "send_reset_email_unknown", "POST", lambda c, i: "/api/auth/send-reset-email",
+         lambda c, i: ("json", {"email": f"missing_{i}@bench-seed.local", "role": "admin"}), (404,), None),
+        ("users", "list_users", "GET", lambda c, i: "/api/users/users", None, (200,), None),
+        ("users", "list_users_admin", "GET", lambda c, i: "/api/users/users?role=admin", None, (200,), None),
+        ("users", "create_user", "POST", lambda c, i: "/api/users/users",
+         lambda c, i: ("json", {"full_name": f"Bench Yeni {i}", "email": c.new_user_email(i),
+                                "password": BENCH_PASSWORD, "role": "content_creator"}), (201,), _remember("created_users")),
+        ("users", "get_user", "GET", lambda c, i: f"/api/users/users/{c.created_users[i % len(c.created_users)]}", None, (200,), None),
+        ("users", "update_user", "PUT", lambda c, i: f"/api/users/users/{c.created_users[i % len(c.created_users)]}",
+         lambda c, i: ("json", {"full_name": f"Bench Güncel {i}"}), (200,), None),
+        ("profile", "profile", "GET", lambda c, i: f"/api/profile/user/{c.created_users[i % len(c.created_users)]}", None, (200,), None),
+        ("users", "delete_user", "DELETE", lambda c, i: f"/api/users/users/{c.created_users.pop()}", None, (200,), None),
+        ("dashboard", "dashboard_summary", "GET", lambda c, i: "/api/dashboard/summary", None, (200,), None),
+        ("dashboard", "dashboard_content_calendar", "GET", lambda c, i: "/api/dashboard/content-calendar", None, (200,), None),
+        ("dashboard", "dashboard_insights_overview", "GET", lambda c, i: "/api/dashboard/insights-overview", None, (200,), None),
+        ("reporting", "reporting_accounts", "GET", lambda c, i: "/api/reporting/accounts", None, (200,), None),
+        ("reporting", "reporting_account_summary", "GET", lambda c, i: f"/api/reporting/account-summary/{c.main_account}", None, (200,), None),
+        ("reporting", "reporting_demographics", "GET", lambda c, i: f"/api/reporting/follower-demographics/{c.main_account}", None, (200,), None),
+        ("reporting", "reporting_hashtags_usage", "GET", lambda c, i: f"/api/reporting/hashtags/{c.main_account}", None, (200,), None),
+        ("reporting", "reporting_hashtags_trend", "GET", lambda c, i: f"/api/reporting/hashtags/{c.main_account}?sort=trend&limit=50", None, (200,), None),
+        ("accounts", "managed_instagram_accounts", "GET", lambda c, i: "/api/managed-instagram-accounts", None, (200,), None),
+        ("account_manager", "account_manager_dashboard", "GET",
+         lambda c, i: f"/api/account-manager/dashboard-data/{c.accounts[i % len(c.accounts)]}", None, (200,), None),
+        ("content_creator", "content_creator_dashboard", "GET",
+         lambda c, i: f"/api/content-creator/dashboard-data/{c.main_account}", None, (200,), _remember_cursor),
+        ("content_creator", "content_creator_posts_page", "GET",
+         lambda c, i: f"/api/content-creator/posts/{c.main_account}" + (f"?cursor={c.posts_cursor}" if c.posts_cursor else ""),
+         None, (200,), None),
+        ("content_creator", "content_creator_similar_posts", "POST",
+         lambda c, i: f"/api/content-creator/similar-posts/{c.main_account}",
+         lambda c, i: ("json", {"caption": f"göl kenarında kamp ve yürüyüş sabah kahve {i}", "limit": 10}), (200,), None),
+        ("ml", "optimal_posting_info", "GET", lambda c, i: "/api/optimal-posting-info", None, (200, 503), None),
+        ("ml", "predict_engagement", "POST", lambda c, i: "/api/predict-engagement",
+         lambda c, i: ("json", {"posts": [{"caption": f"kamp günü #camp #summer {i}", "planned_time": now + 3600 * k}
+                                          for k in range(10)]}), (200, 503), None),
+        ("suggestions", "post_suggestions", "POST", lambda c, i: "/api/generate-post-suggestions",
+         lambda c, i: ("json", {"subject": f"bench konu {c.run_tag} {i}", "media_type": "IMAGE"}), (200,), None),
+        ("suggestions", "post_suggestions_bulk", "POST", lambda c, i: "/api/generate-post-suggestions/bulk",
+         lambda c, i: ("json", {"posts": [{"subject": f"bench toplu {c.run_tag} {i} {k}", "media_type": "VIDEO"}
+                                          for k in range(5)]}), (200,), None),
+        ("suggestions", "hashtag_recommendations", "POST", lambda c, i: "/api/hashtag-recommendations",
+         lambda c, i: ("json", {"caption": f"göl kenarında kamp ve yürüyüş {i}", "hashtags": ["#camp"], "limit": 10}),
+         (200,), None),
+        ("publish", "schedule_ig_post", "POST", lambda c, i: "/api/schedule-ig-post",
+         lambda c, i: ("form", {"ig_account_id": c.small_account, "caption": f"bench {i}", "hashtags": "#camp",
+                                "scheduled_publish_time": str(now + 86400), "media_url": "https://example.com/bench.jpg"}),
+         (202,), _remember("publish_job_ids")),
+        ("publish", "publish_job_status", "GET", lambda c, i: f"/api/publish-jobs/{c.publish_job_ids[i % len(c.publish_job_ids)]}",
+         None, (200,), None),
+        ("stats", "publish_queue_stats", "GET", lambda c, i: "/publish-queue-stats", None, (200,), None),
+        ("stats", "db_pool_stats", "GET", lambda c, i: "/db-pool-stats", None, (200,), None),
+        ("stats", "response_cache_stats", "GET", lambda c, i: "/response-cache-stats", None, (200,), None),
+        ("stats", "suggestion_cache_stats", "GET", lambda c, i: "/suggestion-cache-stats", None, (200,), None),
+        ("stats", "s3_upload_stats", "GET", lambda c, i: "/s3-upload-stats", None, (200,), None),
+    ]
+
+
+def call_route(client, ctx, route, i):
+    _, _, method, path, body, accepted, hook = route
+    kwargs = {}
+    if body is not None:
+        kind, payload = body(ctx, i)
+        kwargs["json" if kind == "json" else "data"] = payload
+    started = time.perf_counter()
+    response = client.open(path(ctx, i), method=method, **kwargs)
+    elapsed = time.perf_counter() - started
+    if hook is not None:
+        hook(ctx, response)
+    return elapsed, response.status_code in accepted, response.status_code
+
+
+def bench_route(client, ctx, route, iterations, warmup, concurrency):
+    for i in range(warmup):
+        call_route(client, ctx, route, i)
+    latencies, statuses = [], {}
+    errors = 0
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(lambda i: call_route(client, ctx, route, warmup + i), range(iterations)))
+    else:
+        results = [call_route(client, ctx, route, warmup + i) for i in range(iterations)]
+    elapsed = time.perf_counter() - started
+    for latency, ok, status in results:
+        latencies.append(latency)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if not ok:
+            errors += 1
+    return dict(summarize(latencies, errors, elapsed), group=route[0], method=route[2], statuses=statuses)
+
+
+def bench_pipeline(runs, stub_posts, stub_latency_ms):
+    """run_pipeline'ı stub Graph API'ye karşı çalıştırır: ilk çalıştırma tam çekim, sonrakiler artımlı senkron."""
+    from common.graph_stub_server import start_in_background
+    from seed_data import SEED_ACCOUNT_PREFIX
+
+    server, base_url = start_in_background(port=0, posts=stub_posts, latency_ms=stub_latency_ms, post_id_base=STUB_POST_ID_BASE)
+    os.environ["IG_GRAPH_URL"] = base_url # instagram_data_fetcher GRAPH_URL'i import anında okur
+    try:
+        from common.instagram_data_fetcher import run_pipeline
+
+        account_id = SEED_ACCOUNT_PREFIX + PIPELINE_ACCOUNT_SUFFIX
+        rows = []
+        for run in range(runs):
+            with contextlib.redirect_stdout(io.StringIO()):
+                summary = run_pipeline(account_id=account_id, access_token="bench")
+            rows.append({
+                "run": "full" if run == 0 else "incremental",
+                "ok": summary["ok"],
+                "elapsed_ms": round(summary["elapsed_seconds"] * 1000, 1),
+                "posts_fetched": summary["posts_fetched"],
+                "posts_written": summary["posts_written"],
+                "posts_per_second": round(summary["posts_fetched"] / summary["elapsed_seconds"], 1) if summary["elapsed_seconds"] else 0.0,
+                "api_calls": summary["api_calls"],
+            })
+        return {"stub_posts": stub_posts, "stub_latency_ms": stub_latency_ms, "runs": rows}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT_DIR, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def cleanup_bench_rows(conn):
+    from seed_data import SEED_ACCOUNT_PREFIX, cleanup
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM publish_jobs WHERE ig_account_id LIKE %s", (SEED_ACCOUNT_PREFIX + "%",))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    cleanup(conn)
+
+
+def load_seed_summary(conn):
+    """--reuse: önceki tohum verisinin hesaplarını ve gönderi sayılarını okur (tohum verisi yoksa None)."""
+    from seed_data import SEED_ACCOUNT_PREFIX, SEED_USER_EMAIL_DOMAIN
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""SELECT a.ig_user_id, (SELECT COUNT(*) FROM instagram_posts p WHERE p.instagram_user_id = a.ig_user_id)
+                          FROM instagram_accounts a WHERE a.ig_user_id LIKE %s AND a.ig_user_id <> %s ORDER BY a.ig_user_id""",
+                       (SEED_ACCOUNT_PREFIX + "%", SEED_ACCOUNT_PREFIX + PIPELINE_ACCOUNT_SUFFIX))
+        accounts = cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) FROM users WHERE email ~ %s", (r"^user\d+" + SEED_USER_EMAIL_DOMAIN.replace(".", r"\.") + "$",))
+        users = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if not accounts or not users:
+        return None
+    return {"account_ids": [row[0] for row in accounts], "post_counts": [row[1] for row in accounts],
+            "posts": sum(row[1] for row in accounts), "accounts": len(accounts), "users": users}
+
+
+def compare_with_baseline(result, baseline, max_regression, min_delta_ms):
+    """Baseline'a göre gerileyen ölçümlerin listesini döndürür (oran ve mutlak eşik birlikte aşılmalı)."""
+    regressions = []
+    if baseline.get("scale") != result["scale"]:
+        print(f"⚠️ Baseline farklı ölçekte alınmış ({baseline.get('scale')} != {result['scale']}); karşılaştırma yaklaşıktır.")
+
+    def check(name, metric, current, previous):
+        if current is None or previous is None:
+            return
+        if current > previous * (1 + max_regression) and current - previous > min_delta_ms:
+            regressions.append(f"{name} {metric}: {previous} -> {current} ms (+{(current / previous - 1) * 100 if previous else 0:.0f}%)")
+
+    for name, row in result["routes"].items():
+        previous = baseline.get("routes", {}).get(name)
+        if previous is None:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            check(name, metric, row[metric], previous.get(metric))
+        if row["errors"] > previous.get("errors", 0):
+            regressions.append(f"{name} errors: {previous.get('errors', 0)} -> {row['errors']}")
+    previous_runs = {run["run"]: run for run in (baseline.get("pipeline") or {}).get("runs", [])}
+    for run in (result.get("pipeline") or {}).get("runs", []):
+        if run["run"] in previous_runs:
+            check(f"pipeline {run['run']}", "elapsed", run["elapsed_ms"], previous_runs[run["run"]]["elapsed_ms"])
+    return regressions
+
+
+def print_table(result, baseline):
+    base_routes = (baseline or {}).get("routes", {})
+    print(f"\n{'route':34} {'istek':>6} {'hata':>5} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9} {'istek/sn':>9} {'p50 Δ':>8}")
+    for name, row in result["routes"].items():
+        previous = base_routes.get(name, {}).get("p50_ms")
+        delta = f"{(row['p50_ms'] / previous - 1) * 100:+.0f}%" if previous and row["p50_ms"] is not None else "-"
+        print(f"{name:34} {row['requests']:6} {row['errors']:5} {row['p50_ms']:9} {row['p90_ms']:9} {row['p99_ms']:9} "
+              f"{row['max_ms']:9} {row['rps']:9} {delta:>8}")
+    for run in (result.get("pipeline") or {}).get("runs", []):
+        print(f"🧪 run_pipeline {run['run']:11} {run['elapsed_ms']:9} ms  {run['posts_fetched']:6} gönderi  "
+              f"{run['posts_per_second']:9} gönderi/sn  {run['api_calls']} API çağrısı  {'ok' if run['ok'] else 'HATA'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed veri + tüm route'lar ve run_pipeline için gecikme benchmark'ı")
+    parser.add_argument("--posts", type=int, default=10000, help="Tohum gönderi sayısı (1k - 10M)")
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--reuse", action="store_true", help="Mevcut tohum verisini kullan (yoksa üret)")
+    parser.add_argument("--keep", action="store_true", help="Bitince tohum verisini silme")
+    parser.add_argument("--iterations", type=int, default=50, help="Route başına ölçülen istek")
+    parser.add_argument("--warmup", type=int, default=3, help="Route başına ölçülmeyen ısınma isteği")
+    parser.add_argument("--concurrency", type=int, default=1, help="Route başına eşzamanlı istek (iş parçacığı)")
+    parser.add_argument("--routes", nargs="+", help="Yalnızca bu gruplar / route adları")
+    parser.add_argument("--cache", action="store_true", help="Yanıt önbelleği açık ölç (varsayılan: kapalı, her istek DB'ye)")
+    parser.add_argument("--pipeline-runs", type=int, default=3, help="0: run_pipeline ölçülmez")
+    parser.add_argument("--stub-posts", type=int, default=2000, help="Graph API stub'ının döndürdüğü gönderi sayısı")
+    parser.add_argument("--stub-latency-ms", type=int, default=0)
+    parser.add_argument("--output", help="Sonuçları JSON olarak bu dosyaya yaz")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Karşılaştırılacak / yazılacak baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Sonuçları baseline olarak kaydet")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="p50/p99 için izin verilen oran (0.25 = %%25)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Bundan küçük mutlak farklar gerileme sayılmaz")
+    parser.add_argument("--verbose", action="store_true", help="Uygulama çıktısını gizleme")
+    args = parser.parse_args()
+    os.environ.setdefault("RESPONSE_CACHE_ENABLED", "true" if args.cache else "false")
+
+    import psycopg2
+    import db
+    import seed_data
+
+    try:
+        conn = db._connect()
+    except psycopg2.Error as e:
+        print(f"❌ DB bağlantısı kurulamadı (targetly-backend/.env veya DB_* değişkenlerini kontrol edin): {e}")
+        sys.exit(1)
+
+    exit_code = 0
+    try:
+        seed_summary = load_seed_summary(conn) if args.reuse else None
+        if seed_summary is None:
+            print(f"ℹ️ Tohum verisi yazılıyor: {args.posts} gönderi, {args.accounts} hesap...")
+            seed_summary = seed_data.seed(conn, posts=args.posts, accounts=args.accounts, users=args.users,
+                                          seed_value=args.seed, progress=False)
+            print(f"✅ Tohum verisi hazır ({seed_summary['seconds']} sn, {seed_summary['posts_per_second']} gönderi/sn).")
+        else:
+            print(f"ℹ️ Mevcut tohum verisi kullanılıyor: {seed_summary['posts']} gönderi, {seed_summary['accounts']} hesap.")
+
+        from settings import get_settings
+        from app import create_app
+
+        run_tag = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        ctx = BenchContext(seed_summary, run_tag)
+        get_settings().ig_account_id = ctx.main_account # dashboard route'ları ana hesabı ayarlardan okur
+        with contextlib.redirect_stdout(io.StringIO()):
+            client = create_app().test_client()
+
+        routes = [route for route in build_routes()
+                  if not args.routes or route[0] in args.routes or route[1] in args.routes]
+        result = {
+            "scale": {"posts": seed_summary["posts"], "accounts": seed_summary["accounts"], "users": seed_summary["users"]},
+            "settings": {"iterations": args.iterations, "warmup": args.warmup, "concurrency": args.concurrency,
+                         "response_cache": args.cache},
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "routes": {},
+            "pipeline": None,
+        }
+        for route in routes:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                row = bench_route(client, ctx, route, args.iterations, args.warmup, args.concurrency)
+            result["routes"][route[1]] = row
+            marker = "❌" if row["errors"] else "🧪"
+            print(f"{marker} {route[1]:34} p50 {row['p50_ms']} ms  p99 {row['p99_ms']} ms  hata {row['errors']}  {row['statuses']}")
+        if args.pipeline_runs > 0 and (not args.routes or "pipeline" in args.routes):
+            result["pipeline"] = bench_pipeline(args.pipeline_runs, args.stub_posts, args.stub_latency_ms)
+
+        baseline = None
+        if os.path.exists(args.baseline) and not args.save_baseline:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        print_table(result, baseline)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            print(f"✅ Sonuçlar yazıldı: {args.output}")
+        if args.save_baseline:
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+            print(f"✅ Baseline kaydedildi: {args.baseline}")
+        elif baseline is not None:
+            regressions = compare_with_baseline(result, baseline, args.max_regression, args.min_delta_ms)
+            if regressions:
+                print(f"\n❌ Baseline'a göre {len(regressions)} gerileme (commit {baseline.get('git_commit')}):")
+                for line in regressions:
+                    print(f"   {line}")
+                exit_code = 1
+            else:
+                print(f"\n✅ Baseline'a göre gerileme yok (commit {baseline.get('git_commit')}).")
+        else:
+            print(f"ℹ️ Baseline bulunamadı ({args.baseline}); --save-baseline ile oluşturun.")
+        if any(row["errors"] for row in result["routes"].values()) or \
+                any(not run["ok"] for run in (result["pipeline"] or {}).get("runs", [])):
+            exit_code = 1
+    finally:
+        if not args.keep:
+            cleanup_bench_rows(conn)
+        conn.close()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
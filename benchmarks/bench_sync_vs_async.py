@@ -0,0 +1,210 @@
+# SOCIALAI-OPTIMIZER/benchmarks/bench_sync_vs_async.py
+# WSGI (app.py, werkzeug threaded sunucu: `app.run` ile aynı) ve ASGI (async_app.py, uvicorn) modlarının yük
+# karşılaştırması. Her mod ayrı bir süreçte başlatılır; keep-alive bağlantılı asyncio HTTP istemcileri 50 / 200 /
+# 1000 eşzamanlı kullanıcıyla sabit süre istek gönderir ve istek/sn, p50 / p99 gecikme ve hata sayısı raporlanır.
+#   python benchmarks/bench_sync_vs_async.py [--concurrency 50 200 1000] [--duration 10] [--scenario dashboard suggestions]
+# Senaryolar:
+#   dashboard   -> GET /api/dashboard/summary (yanıt önbelleği kapalı; her istek Postgres'e gider)
+#   suggestions -> POST /api/generate-post-suggestions (GEMINI_FAKE_MODEL, GEMINI_FAKE_LATENCY_MS kadar upstream
+#                  gecikmesi; öneri önbelleği kapalı, her istek farklı konu)
+# Yerel Postgres (DB_* ortam değişkenleri) ve IG_ACCOUNT_ID gerekir. Yük üreteci aynı makinede çalıştığı için
+# sonuçlar mutlak kapasite değil, iki modun göreli karşılaştırmasıdır.
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(PROJECT_ROOT_DIR, "targetly-app", "targetly-backend")
+REQUEST_TIMEOUT_SECONDS = 30 # bu süreyi aşan istek hata sayılır
+
+SYNC_SERVER_CODE = """
+import sys
+from werkzeug.serving import make_server
+from app import create_app
+app = create_app()
+make_server('127.0.0.1', int(sys.argv[1]), app, threaded=True).serve_forever()
+"""
+
+SCENARIOS = {
+    "dashboard": {"method": "GET", "path": "/api/dashboard/summary"},
+    "suggestions": {"method": "POST", "path": "/api/generate-post-suggestions"},
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_env(args):
+    # İki mod aynı havuz boyutu ve aynı sahte Gemini gecikmesiyle çalışır
+    return dict(os.environ, PUBLISH_WORKERS_ENABLED="false", APP_WARMUP="off", RESPONSE_CACHE_ENABLED="false",
+                SUGGESTION_CACHE_ENABLED="false", GEMINI_FAKE_MODEL="true", GEMINI_FAKE_LATENCY_MS=str(args.gemini_latency_ms),
+                DB_POOL_MAX_SIZE=str(args.db_pool_size), ASYNC_DB_POOL_MAX_SIZE=str(args.db_pool_size),
+                DB_POOL_CHECKOUT_TIMEOUT="30", ASYNC_DB_CHECKOUT_TIMEOUT="30", PYTHONDONTWRITEBYTECODE="1")
+
+
+def start_server(mode, port, args):
+    if mode == "sync":
+        command = [sys.executable, "-c", SYNC_SERVER_CODE, str(port)]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "async_app:app", "--port", str(port),
+                   "--log-level", "warning", "--no-access-log", "--backlog", "4096"]
+    # Sunucu çıktısı dosyaya yazılır: okunmayan bir pipe dolunca (werkzeug her isteği loglar) sunucu bloklanır
+    log_file = tempfile.TemporaryFile(mode="w+")
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=server_env(args),
+                               stdout=log_file, stderr=subprocess.STDOUT, text=True)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log_file.seek(0)
+            raise RuntimeError(f"{mode} sunucusu başlamadı:\n{log_file.read()[-2000:]}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{mode} sunucusu 30 sn içinde port açmadı")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def build_request(scenario, port, sequence):
+    spec = SCENARIOS[scenario]
+    body = b""
+    headers = [f"{spec['method']} {spec['path']} HTTP/1.1", f"Host: 127.0.0.1:{port}", "Connection: keep-alive"]
+    if spec["method"] == "POST":
+        body = json.dumps({"subject": f"bench konu {sequence}", "media_type": "IMAGE"}).encode()
+        headers += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+    return ("\r\n".join(headers) + "\r\n\r\n").encode() + body
+
+
+async def read_response(reader):
+    """Durum kodunu ve bağlantının açık kalıp kalmadığını döndürür (Content-Length ve chunked gövde)."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip().lower()
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    keep_alive = headers.get("connection") != "close" and lines[0].startswith("HTTP/1.1")
+    return status, keep_alive
+
+
+async def client(port, scenario, deadline, results, counter):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        counter[0] += 1
+        request = build_request(scenario, port, counter[0])
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 20)
+            writer.write(request)
+            status, keep_alive = await asyncio.wait_for(read_response(reader), timeout=REQUEST_TIMEOUT_SECONDS)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            results["errors"] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+            continue
+        results["latencies"].append(time.perf_counter() - started)
+        if status != 200:
+            results["errors"] += 1
+        if not keep_alive:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(port, scenario, concurrency, duration):
+    results = {"latencies": [], "errors": 0}
+    counter = [0]
+    # Isınma: bağlantılar / havuzlar dolsun, ilk istek maliyeti ölçüme girmesin
+    await asyncio.gather(*(client(port, scenario, time.monotonic() + 1, {"latencies": [], "errors": 0}, counter)
+                           for _ in range(min(concurrency, 20))))
+    started = time.monotonic()
+    await asyncio.gather(*(client(port, scenario, started + duration, results, counter) for _ in range(concurrency)))
+    elapsed = time.monotonic() - started
+    latencies = sorted(results["latencies"])
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1) if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "errors": results["errors"],
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WSGI vs ASGI yük karşılaştırması")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--duration", type=float, default=10, help="Her seviye için ölçüm süresi (sn)")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=["dashboard", "suggestions"])
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    parser.add_argument("--gemini-latency-ms", type=float, default=300, help="Sahte Gemini upstream gecikmesi")
+    parser.add_argument("--db-pool-size", type=int, default=20)
+    parser.add_argument("--output", help="Sonuçları JSON olarak bu dosyaya yaz")
+    args = parser.parse_args()
+
+    rows = []
+    for mode in args.modes:
+        port = free_port()
+        process = start_server(mode, port, args)
+        try:
+            for scenario in args.scenario:
+                for concurrency in args.concurrency:
+                    result = asyncio.run(run_load(port, scenario, concurrency, args.duration))
+                    rows.append(dict(result, mode=mode, scenario=scenario, concurrency=concurrency))
+                    print(f"🧪 {mode:5} {scenario:11} c={concurrency:<5} {result['rps']:8.1f} istek/sn  "
+                          f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  hata {result['errors']}")
+        finally:
+            stop_server(process)
+
+    print(f"\n{'senaryo':11} {'eşzamanlı':>9} | {'sync rps':>9} {'sync p99':>9} | {'async rps':>9} {'async p99':>9}")
+    for scenario in args.scenario:
+        for concurrency in args.concurrency:
+            by_mode = {row["mode"]: row for row in rows if row["scenario"] == scenario and row["concurrency"] == concurrency}
+            cells = []
+            for mode in ("sync", "async"):
+                row = by_mode.get(mode)
+                cells.append(f"{row['rps']:9.1f} {str(row['p99_ms']):>9}" if row else f"{'-':>9} {'-':>9}")
+            print(f"{scenario:11} {concurrency:9} | {cells[0]} | {cells[1]}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"✅ Sonuçlar yazıldı: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
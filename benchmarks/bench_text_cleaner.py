@@ -0,0 +1,94 @@
+# SOCIALAI-OPTIMIZER/benchmarks/bench_text_cleaner.py
+# text_cleaner için açıklama başına çağrı ile toplu (batch / DataFrame) yolun karşılaştırması.
+#   python benchmarks/bench_text_cleaner.py --captions 200000 --unique-ratio 0.3
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+
+PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT_DIR)
+
+from common import text_cleaner
+
+WORDS = ["kamp", "doğa", "yaz", "göl", "orman", "etkinlik", "çocuklar", "macera", "İstanbul", "ﬁnal", "summer", "retreat"]
+EXTRAS = ["😀", "🏕️", "🇹🇷", "https://example.com/p/abc123", "@clearwater", "#camp", "#yaz2024", "\n", "  "]
+
+
+def legacy_clean_caption(text):
+    """Önceki uygulama: her çağrıda emoji regex'i yeniden kurulur, beş ayrı geçiş yapılır."""
+    if not isinstance(text, str): return ""
+    text = unicodedata.normalize("NFKC", text)
+    emoji_pattern = re.compile("["
+        u"\U0001F600-\U0001F64F"
+        u"\U0001F300-\U0001F5FF"
+        u"\U0001F680-\U0001F6FF"
+        u"\U0001F1E0-\U0001F1FF"
+        "]+", flags=re.UNICODE)
+    text = emoji_pattern.sub(r'', text)
+    text = re.sub(r"http\S+", "", text)
+    text = re.sub(r"@\w+", "", text)
+    text = text.replace("\n", " ")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def legacy_extract_hashtags(text):
+    if not isinstance(text, str): return []
+    return re.findall(r"#(\w+)", text)
+
+
+def make_corpus(size, unique_ratio, seed=7):
+    rng = random.Random(seed)
+    unique = max(1, int(size * unique_ratio))
+    base = [" ".join(rng.choice(WORDS + EXTRAS) for _ in range(rng.randint(8, 40))) for _ in range(unique)]
+    return [base[rng.randrange(unique)] for _ in range(size)]
+
+
+def timed(label, size, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<38} {elapsed:8.3f} sn  {size / elapsed:12,.0f} açıklama/sn")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="text_cleaner verim karşılaştırması")
+    parser.add_argument("--captions", type=int, default=200000)
+    parser.add_argument("--unique-ratio", type=float, default=0.3, help="Benzersiz açıklama oranı (yeniden alımı taklit eder)")
+    parser.add_argument("--skip-pandas", action="store_true")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.captions, args.unique_ratio)
+    print(f"🧪 {len(corpus):,} açıklama, benzersiz oranı {args.unique_ratio}")
+
+    legacy, legacy_elapsed = timed("eski: çağrı başına (clean+extract)", len(corpus),
+                                   lambda: [(legacy_clean_caption(c), legacy_extract_hashtags(c)) for c in corpus])
+    text_cleaner.clear_caption_cache()
+    per_call, _ = timed("yeni: çağrı başına (önbelleksiz ilk tur)", len(corpus),
+                        lambda: [text_cleaner._clean_single_pass(c) for c in corpus])
+    text_cleaner.clear_caption_cache()
+    batch, batch_elapsed = timed("yeni: clean_captions_batch (soğuk)", len(corpus),
+                                 lambda: text_cleaner.clean_captions_batch(corpus))
+    timed("yeni: clean_captions_batch (sıcak)", len(corpus), lambda: text_cleaner.clean_captions_batch(corpus))
+    assert legacy == per_call == batch, "Sonuçlar eski uygulama ile aynı olmalı"
+
+    if not args.skip_pandas:
+        try:
+            import pandas as pd
+        except ImportError:
+            print("pandas kurulu değil, DataFrame yolu atlandı.")
+        else:
+            frame = pd.DataFrame({"caption": corpus})
+            text_cleaner.clear_caption_cache()
+            result, _ = timed("yeni: clean_captions_frame (soğuk)", len(corpus), lambda: text_cleaner.clean_captions_frame(frame))
+            assert result["caption_cleaned"].tolist() == [c for c, _ in legacy]
+    print(f"Soğuk batch hızlanması: {legacy_elapsed / batch_elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# SOCIALAI-OPTIMIZER/benchmarks/check_import_time.py
+# Backend soğuk başlangıç bütçesi: targetly-backend/app.py'yi ayrı bir süreçte `python -X importtime` ile
+# içe aktarır, kümülatif import süresini ölçer ve bütçeyi aşarsa ya da ağır bir bağımlılık (sklearn, pandas,
+# numpy, boto3, google.generativeai...) modül importunda yüklenirse sıfırdan farklı kodla çıkar.
+#   python benchmarks/check_import_time.py [--budget-ms 600] [--runs 3] [--top 15]
+# app importu uygulama oluşturmaz ve işçi / ısınma iş parçacığı başlatmaz (bunlar create_app() ile giriş noktasında
+# çalışır); ölçüm bunu ortam değişkenleriyle kapatmadan doğrular.
+# Süre makineye bağlıdır; en iyi (en kısa) koşu bütçeyle karşılaştırılır. Bütçe IMPORT_TIME_BUDGET_MS ile de verilebilir.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(PROJECT_ROOT_DIR, "targetly-app", "targetly-backend")
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", 600))
+# Isınmada / ilk kullanımda yüklenmesi gereken modüller (ölçülen yaklaşık import süreleri)
+FORBIDDEN_MODULES = [
+    "sklearn",                # ~1.6 sn, joblib.load ile gelir
+    "joblib",
+    "pandas",                 # ~0.4 sn
+    "numpy",                  # ml_scoring
+    "scipy",
+    "boto3",                  # ~0.25 sn, s3_storage
+    "botocore",
+    "google.generativeai",
+    "requests",               # publish_jobs._graph_post
+]
+
+
+def measure_import(module_name="app"):
+    """Ayrı süreçte import eder; (toplam µs, {modül: kümülatif µs}) döndürür."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"'{module_name}' import edilemedi:\n{result.stderr[-2000:]}")
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package" (iç içe importlar girintili)
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue # başlık satırı
+        cumulative[fields[2].strip()] = int(fields[1])
+    if module_name not in cumulative:
+        raise RuntimeError(f"importtime çıktısında '{module_name}' bulunamadı")
+    return cumulative[module_name], cumulative
+
+
+def forbidden_imports(cumulative):
+    """Import sırasında yüklenen FORBIDDEN_MODULES paketleri."""
+    return [forbidden for forbidden in FORBIDDEN_MODULES
+            if any(name == forbidden or name.startswith(forbidden + ".") for name in cumulative)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="app.py import süresi bütçe kontrolü (python -X importtime)")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="Ölçüm sayısı (en kısa süre kullanılır)")
+    parser.add_argument("--top", type=int, default=15, help="En yavaş N paketi yazdır")
+    parser.add_argument("--module", default="app")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(max(1, args.runs)):
+        try:
+            runs.append(measure_import(args.module))
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    total_us, cumulative = min(runs, key=lambda run: run[0])
+
+    print(f"🧪 {args.module} import süreleri (ms): {', '.join(f'{run[0] / 1000:.0f}' for run in runs)}")
+    top_level = sorted(((us, name) for name, us in cumulative.items() if "." not in name and name != args.module), reverse=True)
+    for us, name in top_level[:args.top]:
+        print(f"   {us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    total_ms = total_us / 1000
+    if total_ms > args.budget_ms:
+        failures.append(f"import süresi {total_ms:.0f} ms, bütçe {args.budget_ms:.0f} ms")
+    heavy = forbidden_imports(cumulative)
+    if heavy:
+        failures.append(f"import sırasında yüklenen ağır modüller: {', '.join(heavy)}")
+
+    print(json.dumps({"module": args.module, "import_ms": round(total_ms, 1), "budget_ms": args.budget_ms,
+                      "modules_imported": len(cumulative), "forbidden": heavy}))
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print(f"✅ Soğuk başlangıç bütçe içinde ({total_ms:.0f} ms <= {args.budget_ms:.0f} ms).")
+
+
+if __name__ == "__main__":
+    main()
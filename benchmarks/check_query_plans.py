@@ -0,0 +1,278 @@
+# SOCIALAI-OPTIMIZER/benchmarks/check_query_plans.py
+# Sorgu planı regresyon kontrolü: migration'ları uygular, yerel Postgres'e birkaç sahte hesap tohumlar,
+# dashboard / raporlama route'larını Flask test istemcisiyle çağırıp çalıştırdıkları her sorguyu yakalar
+# ve her birine EXPLAIN uygular. Sıcak tablolardan birinde Seq Scan (veya koşulsuz tam indeks taraması)
+# görülürse sıfırdan farklı kodla çıkar.
+#   python benchmarks/check_query_plans.py [--posts 3000] [--accounts 4] [--keep]
+# enable_seqscan=off ile çalışılır: planlayıcı kullanılabilir bir indeks varsa onu seçer, yoksa Seq Scan'e
+# düşer; böylece küçük tohum verisinde bile eksik/uyumsuz bir indeks (veya DATE(timestamp) gibi sargable
+# olmayan bir filtre) planda görünür.
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(PROJECT_ROOT_DIR, "targetly-app", "targetly-backend")
+for path in (PROJECT_ROOT_DIR, BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"  # her istek gerçekten veritabanına gitsin
+
+import psycopg2
+from flask import Flask
+from psycopg2 import extensions
+from psycopg2.extras import execute_values
+
+import db
+from common.daily_rollups import backfill_account_daily_stats, refresh_account_daily_stats
+from common.hashtag_stats import backfill_account_hashtag_stats, hashtags_of_posts, refresh_account_hashtag_stats
+from caption_index import rebuild_account_index, remove_account_indexes
+from migrate import apply_migrations
+
+CHECKED_TABLES = {"instagram_posts", "post_hashtags", "daily_insights", "follower_insights", "account_daily_stats",
+                  "account_hashtag_stats", "account_hashtag_count_stats", "users"}
+# Hesap başına büyüyen tablolar: bunlarda koşulsuz tam indeks taraması da hata sayılır. users küçük kalır;
+# orada planlayıcının "PK sırasıyla gez + filtrele + LIMIT 1" seçimi meşrudur.
+GROWING_TABLES = CHECKED_TABLES - {"users"}
+PLAN_ACCOUNT_PREFIX = "plan_check_account_"
+PLAN_USER_EMAIL_DOMAIN = "@plan-check.local"
+
+_recording = {"enabled": False, "queries": []}
+
+
+class RecordingCursor(extensions.cursor):
+    """Çalıştırılan her sorguyu parametreleri yerleştirilmiş (mogrify) haliyle kaydeder."""
+
+    def execute(self, query, vars=None):
+        if _recording["enabled"]:
+            _recording["queries"].append(self.mogrify(query, vars).decode("utf-8"))
+        return super().execute(query, vars)
+
+
+def _recording_connect():
+    conn = db._connect()
+    conn.cursor_factory = RecordingCursor
+    return conn
+
+
+def seed(conn, account_ids, post_count, days):
+    rng = random.Random(13)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    cursor = conn.cursor()
+    try:
+        cleanup(conn)
+        for account_id in account_ids:
+            posts = [(account_id, f"{account_id}_{i}", "plan", "plan", "IMAGE", now - timedelta(minutes=41 * i),
+                      rng.randint(0, 500), rng.randint(0, 50)) for i in range(post_count)]
+            execute_values(cursor, """INSERT INTO instagram_posts (instagram_user_id, instagram_post_id, caption_original,
+                                      caption_cleaned, media_type, timestamp, like_count, comments_count) VALUES %s""",
+                           posts, page_size=1000)
+            cursor.execute("""INSERT INTO post_hashtags (post_table_id, hashtag)
+                              SELECT id, 'plan' || (id %% tags.n) FROM instagram_posts, (VALUES (25), (7)) AS tags(n)
+                              WHERE instagram_user_id = %s ON CONFLICT DO NOTHING""", (account_id,))
+            insights = [(account_id, metric, (now - timedelta(days=d)).date(), rng.randint(100, 5000))
+                        for metric in ("reach", "impressions", "accounts_engaged", "profile_views") for d in range(days)]
+            execute_values(cursor, "INSERT INTO daily_insights (instagram_user_id, metric_name, date, value) VALUES %s",
+                           insights, page_size=1000)
+            followers = [(account_id, "followers_count", None, 1000 + d, "day", (now - timedelta(days=d)).date()) for d in range(days)]
+            followers += [(account_id, metric, f"{metric[-3:]}_{k}", rng.randint(10, 900), "lifetime", now.date())
+                          for metric in ("follower_demographics_country", "follower_demographics_gender",
+                                         "follower_demographics_age", "follower_demographics_city")
+                          for k in range(12)]
+            execute_values(cursor, """INSERT INTO follower_insights (instagram_user_id, metric_name, dimension_key, value,
+                                      period, data_date) VALUES %s""", followers, page_size=1000)
+        users = [(f"Plan {role} {i}", f"{role}{i}{PLAN_USER_EMAIL_DOMAIN}", "x", role)
+                 for role in ("account_manager", "content_creator", "admin") for i in range(50)]
+        execute_values(cursor, "INSERT INTO users (full_name, email, password, role) VALUES %s", users)
+        conn.commit()
+        for account_id in account_ids:
+            backfill_account_daily_stats(conn, account_id)
+            backfill_account_hashtag_stats(conn, account_id)
+            rebuild_account_index(conn, account_id)
+        cursor.execute("ANALYZE instagram_posts; ANALYZE post_hashtags; ANALYZE daily_insights; ANALYZE follower_insights; "
+                       "ANALYZE account_daily_stats; ANALYZE account_hashtag_stats; ANALYZE account_hashtag_count_stats; "
+                       "ANALYZE users;")
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def cleanup(conn):
+    cursor = conn.cursor()
+    try:
+        for table in ("instagram_posts", "daily_insights", "follower_insights", "account_daily_stats", "account_hashtag_stats",
+                      "account_hashtag_count_stats"):
+            cursor.execute(f"DELETE FROM {table} WHERE instagram_user_id LIKE %s", (PLAN_ACCOUNT_PREFIX + "%",))
+        cursor.execute("DELETE FROM users WHERE email LIKE %s", ("%" + PLAN_USER_EMAIL_DOMAIN,))
+        conn.commit()
+        remove_account_indexes(PLAN_ACCOUNT_PREFIX)
+    finally:
+        cursor.close()
+
+
+def build_app(account_id):
+    from routes.account_info_routes import account_info_routes
+    from routes.account_manager_routes import account_manager_routes
+    from routes.content_creator_routes import content_creator_routes
+    from routes.dashboard_routes import dashboard_routes
+    from routes.report_routes import report_routes
+    from settings import get_settings
+
+    # Sabit hesaplı route'lar ana hesabı ayarlardan (common/.env) okur; kontrol tohumlanan hesaba yönlendirilir
+    get_settings().ig_account_id = account_id
+
+    app = Flask(__name__)
+    app.register_blueprint(dashboard_routes, url_prefix='/api/dashboard')
+    app.register_blueprint(report_routes, url_prefix='/api/reporting')
+    app.register_blueprint(account_info_routes)
+    app.register_blueprint(account_manager_routes)
+    app.register_blueprint(content_creator_routes)
+    return app
+
+
+def route_requests(client, account_id):
+    """(etiket, yanıt) üreten istek listesi; sayfalama ikinci sayfayı da kapsar."""
+    yield "dashboard.summary", client.get("/api/dashboard/summary")
+    yield "dashboard.content_calendar", client.get("/api/dashboard/content-calendar")
+    yield "dashboard.insights_overview", client.get("/api/dashboard/insights-overview")
+    yield "reporting.account_summary", client.get(f"/api/reporting/account-summary/{account_id}")
+    yield "reporting.follower_demographics", client.get(f"/api/reporting/follower-demographics/{account_id}")
+    for sort in ("usage", "engagement", "trend"):
+        yield f"reporting.hashtags_{sort}", client.get(f"/api/reporting/hashtags/{account_id}?sort={sort}")
+    # Dışa aktarım akışı tamamen tüketilir (buffered); böylece bağlantı havuza döner
+    for dataset in ("posts", "daily_insights"):
+        yield f"reporting.export_{dataset}", client.get(f"/api/reporting/export/{account_id}?dataset={dataset}",
+                                                         buffered=True)
+    yield "account_info.managed_accounts", client.get("/api/managed-instagram-accounts")
+    yield "account_manager.dashboard", client.get(f"/api/account-manager/dashboard-data/{account_id}")
+    first_page = client.get(f"/api/content-creator/dashboard-data/{account_id}")
+    yield "content_creator.dashboard", first_page
+    next_cursor = first_page.get_json()["allPostsPage"]["nextCursor"]
+    yield "content_creator.posts_next_page", client.get(f"/api/content-creator/posts/{account_id}?cursor={next_cursor}")
+    # Açıklama indeksi seed() içinde kurulur (veri alımı gibi); istek kaynak gönderi + detay sorgularını yapar
+    yield "content_creator.similar_posts", client.post(f"/api/content-creator/similar-posts/{account_id}",
+                                                       json={"post_id": f"{account_id}_0"})
+
+
+def explain(conn, query):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + query)
+        return cursor.fetchone()[0][0]["Plan"]
+    finally:
+        cursor.close()
+
+
+def seq_scans(plan):
+    """
+    Planda CHECKED_TABLES üzerindeki tam taramalar: Seq Scan düğümleri ve Index Cond içermeyen
+    (indeksi yalnızca sıralı okumak için baştan sona gezen) Index / Index Only Scan düğümleri.
+    enable_seqscan=off iken eksik bir indeks çoğu zaman ikinci biçimde görünür.
+    """
+    found = []
+    if plan.get("Relation Name") in CHECKED_TABLES:
+        if plan.get("Node Type") == "Seq Scan":
+            found.append(f"Seq Scan({plan['Relation Name']})")
+        elif (plan.get("Node Type") in ("Index Scan", "Index Only Scan") and "Index Cond" not in plan
+              and plan["Relation Name"] in GROWING_TABLES):
+            found.append(f"Full {plan['Node Type']}({plan['Index Name']})")
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def scan_summary(plan):
+    nodes = []
+    if "Relation Name" in plan:
+        nodes.append(f"{plan['Node Type']}({plan.get('Index Name') or plan['Relation Name']})")
+    for child in plan.get("Plans", []):
+        nodes.extend(scan_summary(child))
+    return nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Route sorguları için EXPLAIN tabanlı Seq Scan regresyon kontrolü")
+    parser.add_argument("--posts", type=int, default=3000, help="Hesap başına gönderi")
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--accounts", type=int, default=4)
+    parser.add_argument("--keep", action="store_true", help="Tohumlanan verileri silme")
+    parser.add_argument("--verbose", action="store_true", help="Her sorgunun tarama düğümlerini yazdır")
+    args = parser.parse_args()
+
+    try:
+        conn = db._connect()
+    except psycopg2.Error as e:
+        print(f"❌ DB bağlantısı kurulamadı (targetly-backend/.env veya DB_* değişkenlerini kontrol edin): {e}")
+        sys.exit(1)
+
+    account_ids = [f"{PLAN_ACCOUNT_PREFIX}{i}" for i in range(args.accounts)]
+    failures = []
+    checked = 0
+    try:
+        apply_migrations(conn)
+        seed(conn, account_ids, args.posts, args.days)
+        print(f"🧪 {args.accounts} hesap x {args.posts} gönderi, {args.days} günlük insight tohumlandı.")
+
+        db._pool = db.ConnectionPool(min_size=0, max_size=2, connect=_recording_connect)
+        client = build_app(account_ids[0]).test_client()
+
+        labelled_queries = []
+        _recording["enabled"] = True
+        for label, response in route_requests(client, account_ids[0]):
+            if response.status_code != 200:
+                failures.append((label, f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}"))
+            labelled_queries.extend((label, query) for query in _recording["queries"])
+            _recording["queries"] = []
+        # Veri alım akışının günlük özet yenilemesi (INSERT ... SELECT) de aynı indeksleri kullanmalı
+        recording_conn = _recording_connect()
+        now = datetime.now(timezone.utc)
+        refresh_account_daily_stats(recording_conn, account_ids[0], now - timedelta(days=3), now)
+        labelled_queries.extend(("pipeline.refresh_daily_stats", query) for query in _recording["queries"])
+        _recording["queries"] = []
+        touched = hashtags_of_posts(recording_conn, [f"{account_ids[0]}_{i}" for i in range(5)])
+        refresh_account_hashtag_stats(recording_conn, account_ids[0], touched)
+        labelled_queries.extend(("pipeline.refresh_hashtag_stats", query) for query in _recording["queries"])
+        _recording["queries"] = []
+        rebuild_account_index(recording_conn, account_ids[-1]) # ACCOUNT_HAS_POSTS_QUERY + ACCOUNT_POSTS_AFTER_QUERY
+        recording_conn.close()
+        labelled_queries.extend(("pipeline.caption_index_build", query) for query in _recording["queries"])
+        _recording["queries"] = []
+        # /api/optimal-posting-info (api_routes ML modeli ister; yalnızca hashtag sayısı okuması kontrol edilir)
+        from routes.report_routes import load_ideal_hashtag_count
+        load_ideal_hashtag_count(account_ids[0])
+        labelled_queries.extend(("ml.ideal_hashtag_count", query) for query in _recording["queries"])
+        _recording["enabled"] = False
+
+        cursor = conn.cursor()
+        cursor.execute("SET enable_seqscan = off")
+        cursor.close()
+        for label, query in labelled_queries:
+            if query.lstrip().split(None, 1)[0].upper() not in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+                continue
+            plan = explain(conn, query)
+            checked += 1
+            scans = seq_scans(plan)
+            if scans or (args.verbose and scan_summary(plan)):
+                print(f"{'❌' if scans else '✅'} {label:<36} {', '.join(scan_summary(plan))}")
+            if scans:
+                failures.append((label, f"Tam tarama: {', '.join(scans)}\n    {' '.join(query.split())[:300]}"))
+        conn.rollback()
+    finally:
+        if not args.keep:
+            cleanup(conn)
+        conn.close()
+
+    print(json.dumps({"checked_queries": checked, "failures": len(failures)}))
+    if failures:
+        for label, reason in failures:
+            print(f"❌ {label}: {reason}")
+        sys.exit(1)
+    print("✅ Tüm route sorguları indeks kullanıyor.")
+
+
+if __name__ == "__main__":
+    main()
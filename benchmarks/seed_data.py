@@ -0,0 +1,271 @@
+# SOCIALAI-OPTIMIZER/benchmarks/seed_data.py
+# Benchmark'lar için gerçekçi sentetik veri üreteci: hesaplar, gönderiler (açıklama + hashtag), günlük insight'lar,
+# takipçi sayısı / demografiler ve panel kullanıcıları yerel Postgres'e COPY ile yazılır (1k - 10M gönderi).
+#   python benchmarks/seed_data.py --posts 100000 --accounts 20
+#   python benchmarks/seed_data.py --cleanup
+# Dağılımlar: gönderiler hesaplara Zipf benzeri dağılır (birkaç büyük hesap, çok sayıda küçük hesap), paylaşım
+# saatleri öğlen / akşam yoğunlaşır, beğeniler hesap büyüklüğü x saat etkisi x log-normal gürültüdür, hashtag
+# popülerliği Zipf'tir. Aynı --seed ile aynı veri üretilir. Satırlar akış halinde üretilir; bellek kullanımı
+# gönderi sayısından bağımsızdır. Tüm tohum verisi SEED_ACCOUNT_PREFIX / SEED_USER_EMAIL_DOMAIN ile işaretlenir
+# ve --cleanup (veya cleanup()) ile silinir.
+import argparse
+import bisect
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(PROJECT_ROOT_DIR, "targetly-app", "targetly-backend")
+for path in (PROJECT_ROOT_DIR, BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import psycopg2
+
+import db
+from common.daily_rollups import backfill_account_daily_stats
+from common.hashtag_stats import backfill_account_hashtag_stats
+from common.graph_stub_server import SAMPLE_TAGS, SAMPLE_WORDS
+from common.pg_copy import copy_rows
+from caption_index import rebuild_account_index, remove_account_indexes
+from migrate import apply_migrations
+
+SEED_ACCOUNT_PREFIX = "bench_seed_account_"
+SEED_USER_EMAIL_DOMAIN = "@bench-seed.local"
+
+CAPTION_WORDS = SAMPLE_WORDS + ["sabah", "akşam", "hafta", "sonu", "arkadaşlar", "aile", "deniz", "dağ", "çadır",
+                                "kahve", "fotoğraf", "anı", "yeni", "sezon", "kayıt", "program", "eğitim", "oyun"]
+TAG_MODIFIERS = ["", "life", "vibes", "gram", "tr", "turkey", "daily", "lovers", "time", "photography", "2024", "2025"]
+MEDIA_TYPES = [("IMAGE", 0.55), ("CAROUSEL_ALBUM", 0.25), ("VIDEO", 0.20)]
+# Saat başına paylaşım olasılığı ve beğeni çarpanı (UTC; öğlen ve akşam zirveleri)
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 6, 6, 7, 8, 9, 9, 8, 7, 7, 8, 10, 12, 12, 10, 6, 3]
+DAILY_METRICS = ("reach", "impressions", "accounts_engaged", "profile_views")
+DEMOGRAPHICS = {
+    "follower_demographics_country": ["TR", "US", "DE", "GB", "NL", "FR", "AZ", "RU", "IT", "ES"],
+    "follower_demographics_city": ["Istanbul", "Ankara", "Izmir", "Bursa", "Antalya", "Berlin", "London", "Baku"],
+    "follower_demographics_gender": ["F", "M", "U"],
+    "follower_demographics_age": ["13-17", "18-24", "25-34", "35-44", "45-54", "55-64", "65+"],
+}
+USER_ROLES = [("content_creator", 0.6), ("account_manager", 0.3), ("admin", 0.1)]
+EXTRACT_HASHTAGS_QUERY = """
+    INSERT INTO post_hashtags (post_table_id, hashtag)
+    SELECT DISTINCT p.id, m[1] FROM instagram_posts p, regexp_matches(p.caption_original, '#(\\w+)', 'g') AS m
+    WHERE p.instagram_user_id = %s
+"""
+
+
+def build_hashtag_vocabulary(size):
+    """Taban etiketler x ekler; boyut aşılırsa numaralı etiketlerle tamamlanır."""
+    bases = SAMPLE_TAGS + ["travel", "food", "sunset", "friends", "family", "sea", "mountain", "tent", "coffee",
+                           "photo", "weekend", "sport", "kampçadırı", "doğa", "yaz", "istanbul", "türkiye"]
+    vocabulary = [f"{base}{modifier}" for modifier in TAG_MODIFIERS for base in bases]
+    vocabulary += [f"{bases[i % len(bases)]}{i}" for i in range(max(0, size - len(vocabulary)))]
+    return vocabulary[:size]
+
+
+def zipf_weights(count, exponent):
+    return [1.0 / (rank + 1) ** exponent for rank in range(count)]
+
+
+def split_posts(total_posts, accounts, rng):
+    """Toplam gönderiyi hesaplara Zipf benzeri (s=0.9) paylaştırır; her hesaba en az bir gönderi düşer."""
+    weights = zipf_weights(accounts, 0.9)
+    rng.shuffle(weights)
+    weight_sum = sum(weights)
+    counts = [max(1, int(total_posts * weight / weight_sum)) for weight in weights]
+    counts[counts.index(max(counts))] += total_posts - sum(counts)
+    return counts
+
+
+def account_ids(accounts):
+    return [f"{SEED_ACCOUNT_PREFIX}{i}" for i in range(accounts)]
+
+
+class PostGenerator:
+    """Hesap gönderilerini üretir; hashtag'ler açıklamaya yazılır ve post_hashtags'e veritabanında çıkarılır."""
+
+    def __init__(self, rng, vocabulary, history_days):
+        self.rng = rng
+        self.vocabulary = vocabulary
+        self.tag_cumulative = self._cumulative(zipf_weights(len(vocabulary), 1.05))
+        self.hour_cumulative = self._cumulative(HOUR_WEIGHTS)
+        self.media_cumulative = self._cumulative([weight for _, weight in MEDIA_TYPES])
+        self.history_days = history_days
+
+    @staticmethod
+    def _cumulative(weights):
+        total, cumulative = 0.0, []
+        for weight in weights:
+            total += weight
+            cumulative.append(total)
+        return cumulative
+
+    def _pick(self, cumulative):
+        return bisect.bisect_left(cumulative, self.rng.random() * cumulative[-1])
+
+    def posts(self, account_id, count, audience, now):
+        rng = self.rng
+        step_seconds = self.history_days * 86400 / max(count, 1)
+        for i in range(count):
+            post_time = now - timedelta(seconds=step_seconds * i + rng.random() * step_seconds)
+            hour = self._pick(self.hour_cumulative)
+            post_time = post_time.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+            if post_time > now:
+                post_time -= timedelta(days=1)
+            words = " ".join(rng.choice(CAPTION_WORDS) for _ in range(int(rng.triangular(3, 40, 12))))
+            tags = list(dict.fromkeys(self.vocabulary[self._pick(self.tag_cumulative)] for _ in range(rng.choice((0, 1, 2, 3, 3, 5, 8)))))
+            caption = f"{words} {' '.join('#' + tag for tag in tags)}".strip()
+            hour_factor = HOUR_WEIGHTS[hour] / 8.0
+            likes = int(audience * 0.04 * hour_factor * rng.lognormvariate(0, 0.6))
+            comments = int(likes * rng.uniform(0.02, 0.12))
+            yield (account_id, f"{account_id}_p{i}", caption, words, MEDIA_TYPES[self._pick(self.media_cumulative)][0],
+                   post_time.isoformat(), likes, comments)
+
+
+def _daily_insight_rows(account_id, audience, days, today, rng):
+    for d in range(days):
+        day = today - timedelta(days=d)
+        weekly = 1.15 if day.weekday() >= 5 else 1.0 # hafta sonu erişimi daha yüksek
+        reach = int(audience * 0.3 * weekly * rng.lognormvariate(0, 0.25))
+        yield (account_id, "reach", day, reach)
+        yield (account_id, "impressions", day, int(reach * rng.uniform(1.3, 2.2)))
+        yield (account_id, "accounts_engaged", day, int(reach * rng.uniform(0.03, 0.1)))
+        yield (account_id, "profile_views", day, int(reach * rng.uniform(0.01, 0.05)))
+
+
+def _follower_rows(account_id, audience, days, today, rng):
+    growth = rng.uniform(0.0005, 0.003) # günlük büyüme
+    for d in range(days):
+        yield (account_id, "followers_count", None, int(audience / (1 + growth) ** d), "day", today - timedelta(days=d))
+    for metric, dimensions in DEMOGRAPHICS.items():
+        shares = [rng.random() ** 2 for _ in dimensions]
+        for dimension, share in zip(dimensions, shares):
+            yield (account_id, metric, dimension, int(audience * share / sum(shares)), "lifetime", today)
+
+
+def seed(conn, posts=10000, accounts=10, days=120, history_days=730, hashtags=5000, users=200, seed_value=7, progress=True):
+    """
+    Tohum verisini yazar ve özet döndürür. Önceki tohum verisi önce silinir. account_daily_stats ve
+    account_hashtag_stats gönderilerden ve insight'lardan yeniden hesaplanır; tablolar ANALYZE edilir ve hesapların
+    açıklama indeksleri (caption_index.py) kurulur.
+    """
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    today = now.date()
+    ids = account_ids(accounts)
+    counts = split_posts(posts, accounts, rng)
+    vocabulary = build_hashtag_vocabulary(hashtags)
+    started = time.perf_counter()
+    summary = {"accounts": accounts, "posts": 0, "post_hashtags": 0, "daily_insights": 0, "follower_insights": 0, "users": 0}
+    cursor = conn.cursor()
+    try:
+        apply_migrations(conn) # cleanup yeni migration'ların tablolarına da dokunur
+        cleanup(conn)
+        generator = PostGenerator(rng, vocabulary, history_days)
+        for account_id, count in zip(ids, counts):
+            # Kitle büyüklüğü gönderi sayısıyla kabaca orantılı: büyük hesaplar hem çok paylaşır hem çok beğeni alır
+            audience = int(rng.uniform(800, 1500) * math.sqrt(count))
+            copy_rows(cursor, "instagram_posts", ["instagram_user_id", "instagram_post_id", "caption_original",
+                                                  "caption_cleaned", "media_type", "timestamp", "like_count", "comments_count"],
+                      generator.posts(account_id, count, audience, now))
+            # Veri alım akışı gibi hashtag'ler açıklamadan çıkarılır (text_cleaner.HASHTAG_PATTERN ile aynı desen)
+            cursor.execute(EXTRACT_HASHTAGS_QUERY, (account_id,))
+            summary["post_hashtags"] += cursor.rowcount
+            copy_rows(cursor, "daily_insights", ["instagram_user_id", "metric_name", "date", "value"],
+                      _daily_insight_rows(account_id, audience, days, today, rng))
+            copy_rows(cursor, "follower_insights", ["instagram_user_id", "metric_name", "dimension_key", "value", "period", "data_date"],
+                      _follower_rows(account_id, audience, days, today, rng))
+            cursor.execute("""INSERT INTO instagram_accounts (ig_user_id, account_display_name, access_token, is_active)
+                              VALUES (%s, %s, %s, FALSE) ON CONFLICT (ig_user_id) DO NOTHING""",
+                           (account_id, f"Bench {account_id[len(SEED_ACCOUNT_PREFIX):]}", "bench-token"))
+            conn.commit()
+            summary["posts"] += count
+            summary["daily_insights"] += days * len(DAILY_METRICS)
+            summary["follower_insights"] += days + sum(len(dimensions) for dimensions in DEMOGRAPHICS.values())
+            if progress:
+                print(f"ℹ️ {account_id}: {count} gönderi ({summary['posts']}/{posts}, {time.perf_counter() - started:.1f} sn)")
+
+        roles = [role for role, _ in USER_ROLES]
+        role_weights = [weight for _, weight in USER_ROLES]
+        copy_rows(cursor, "users", ["full_name", "email", "password", "role"],
+                  ((f"Bench Kullanıcı {i}", f"user{i}{SEED_USER_EMAIL_DOMAIN}", "bench-password",
+                    rng.choices(roles, role_weights)[0]) for i in range(users)))
+        summary["users"] = users
+        conn.commit()
+        for account_id in ids:
+            backfill_account_daily_stats(conn, account_id)
+            backfill_account_hashtag_stats(conn, account_id)
+        cursor.execute("ANALYZE instagram_posts; ANALYZE post_hashtags; ANALYZE daily_insights; "
+                       "ANALYZE follower_insights; ANALYZE account_daily_stats; ANALYZE account_hashtag_stats; "
+                       "ANALYZE account_hashtag_count_stats; ANALYZE users;")
+        conn.commit()
+        for account_id in ids:
+            rebuild_account_index(conn, account_id)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    summary["posts_per_second"] = round(summary["posts"] / summary["seconds"], 1) if summary["seconds"] else 0.0
+    summary["account_ids"] = ids
+    summary["post_counts"] = counts
+    return summary
+
+
+def cleanup(conn, prefix=SEED_ACCOUNT_PREFIX, email_domain=SEED_USER_EMAIL_DOMAIN):
+    """Tohum hesaplarına ait tüm satırları (hashtag'ler dahil), açıklama indekslerini ve tohum kullanıcılarını siler."""
+    cursor = conn.cursor()
+    pattern = prefix + "%"
+    try:
+        cursor.execute("""DELETE FROM post_hashtags WHERE post_table_id IN
+                          (SELECT id FROM instagram_posts WHERE instagram_user_id LIKE %s)""", (pattern,))
+        for table in ("instagram_posts", "daily_insights", "follower_insights", "account_daily_stats", "account_hashtag_stats",
+                      "account_hashtag_count_stats", "ingestion_sync_state"):
+            cursor.execute(f"DELETE FROM {table} WHERE instagram_user_id LIKE %s", (pattern,))
+        cursor.execute("DELETE FROM instagram_accounts WHERE ig_user_id LIKE %s", (pattern,))
+        cursor.execute("DELETE FROM users WHERE email LIKE %s", ("%" + email_domain,))
+        conn.commit()
+        remove_account_indexes(prefix)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark'lar için sentetik veri üreteci (COPY)")
+    parser.add_argument("--posts", type=int, default=10000, help="Toplam gönderi (1k - 10M)")
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--days", type=int, default=120, help="Günlük insight / takipçi geçmişi")
+    parser.add_argument("--history-days", type=int, default=730, help="Gönderilerin yayıldığı gün sayısı")
+    parser.add_argument("--hashtags", type=int, default=5000, help="Hashtag sözlüğü boyutu")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cleanup", action="store_true", help="Yalnızca tohum verisini sil")
+    args = parser.parse_args()
+
+    try:
+        conn = db._connect()
+    except psycopg2.Error as e:
+        print(f"❌ DB bağlantısı kurulamadı (targetly-backend/.env veya DB_* değişkenlerini kontrol edin): {e}")
+        sys.exit(1)
+    try:
+        if args.cleanup:
+            cleanup(conn)
+            print("✅ Tohum verisi silindi.")
+            return
+        summary = seed(conn, args.posts, args.accounts, args.days, args.history_days, args.hashtags, args.users, args.seed)
+    finally:
+        conn.close()
+    print(f"✅ {summary['posts']} gönderi, {summary['post_hashtags']} hashtag, {summary['daily_insights']} günlük insight, "
+          f"{summary['follower_insights']} takipçi satırı, {summary['users']} kullanıcı yazıldı "
+          f"({summary['seconds']} sn, {summary['posts_per_second']} gönderi/sn).")
+
+
+if __name__ == "__main__":
+    main()
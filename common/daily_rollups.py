@@ -0,0 +1,147 @@
+# SOCIALAI-OPTIMIZER/common/daily_rollups.py
+# Hesap + gün bazında önceden toplanmış istatistikler (account_daily_stats).
+# Dashboard'lar 7 gün / 30 gün / tüm zamanlar rakamlarını ham instagram_posts / daily_insights satırlarını
+# taramak yerine bu tablodan (gün sayısı kadar satır) okur. run_pipeline her çalıştırmada yalnızca
+# dokunulan günleri yeniden hesaplar. Tablo targetly-backend/migrations altında tanımlıdır; sıfırdan kurmak için:
+#   python common/daily_rollups.py --backfill [--account <instagram_user_id>]
+#
+# Zaman damgası olmayan gönderiler hesabın stat_date = '-infinity' satırında toplanır: tarih aralıklı sorgular
+# (stat_date >= ...) bu satırı görmez, tüm zamanlar toplamları (SUM(post_count)) COUNT(*) ile aynı kalır.
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Gün bazında gönderi ve insight agregaları; {post_filter} / {insight_filter} hangi satırların toplanacağını belirler.
+# Gönderi günü DATE(timestamp) ile aynı kuralla (oturum saat dilimi) hesaplanır, böylece eski filtrelerle birebir uyuşur.
+_ROLLUP_SELECT = """
+    WITH post_days AS (
+        SELECT instagram_user_id, COALESCE(timestamp::date, '-infinity'::date) AS stat_date,
+               COUNT(*) AS post_count, COALESCE(SUM(like_count), 0) AS like_sum, COALESCE(SUM(comments_count), 0) AS comment_sum
+        FROM instagram_posts
+        WHERE TRUE {post_filter}
+        GROUP BY 1, 2
+    ),
+    insight_days AS (
+        SELECT instagram_user_id, date AS stat_date,
+               SUM(value) FILTER (WHERE metric_name = 'reach') AS reach,
+               SUM(value) FILTER (WHERE metric_name = 'impressions') AS impressions,
+               SUM(value) FILTER (WHERE metric_name = 'accounts_engaged') AS accounts_engaged,
+               SUM(value) FILTER (WHERE metric_name = 'profile_views') AS profile_views
+        FROM daily_insights
+        WHERE metric_name IN ('reach', 'impressions', 'accounts_engaged', 'profile_views') {insight_filter}
+        GROUP BY 1, 2
+    )
+    SELECT COALESCE(p.instagram_user_id, i.instagram_user_id), COALESCE(p.stat_date, i.stat_date),
+           COALESCE(p.post_count, 0), COALESCE(p.like_sum, 0), COALESCE(p.comment_sum, 0),
+           i.reach, i.impressions, i.accounts_engaged, i.profile_views
+    FROM post_days p
+    FULL OUTER JOIN insight_days i ON i.instagram_user_id = p.instagram_user_id AND i.stat_date = p.stat_date
+"""
+
+_UPSERT_PREFIX = """
+    INSERT INTO account_daily_stats (instagram_user_id, stat_date, post_count, like_sum, comment_sum,
+                                     reach, impressions, accounts_engaged, profile_views)
+"""
+
+_UPSERT_SUFFIX = """
+    ON CONFLICT (instagram_user_id, stat_date) DO UPDATE SET
+        post_count = EXCLUDED.post_count, like_sum = EXCLUDED.like_sum, comment_sum = EXCLUDED.comment_sum,
+        reach = EXCLUDED.reach, impressions = EXCLUDED.impressions,
+        accounts_engaged = EXCLUDED.accounts_engaged, profile_views = EXCLUDED.profile_views,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def refresh_account_daily_stats(conn, instagram_user_id_param, start=None, end=None):
+    """
+    [start, end] (dahil) aralığındaki günleri ve hesabın tarihsiz gönderi satırını ham tablolardan yeniden
+    hesaplar; start None ise (yalnızca tarihsiz gönderiler yazıldıysa) yalnızca tarihsiz satır. Aralık saat dilimi
+    farkları için her iki uçtan bir gün genişletilir. Artık verisi kalmayan günler silinir.
+    Yazılan (upsert edilen) gün sayısını döndürür.
+    """
+    params = {"account_id": instagram_user_id_param, "start_day": None, "end_day": None}
+    post_filter = "AND instagram_user_id = %(account_id)s AND (timestamp IS NULL"
+    insight_filter = "AND FALSE"
+    if start is not None:
+        params["start_day"] = _as_date(start) - timedelta(days=1)
+        params["end_day"] = _as_date(end) + timedelta(days=1)
+        post_filter += " OR timestamp >= %(start_day)s AND timestamp < %(end_day)s::date + 1"
+        insight_filter = "AND instagram_user_id = %(account_id)s AND date BETWEEN %(start_day)s AND %(end_day)s"
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        select = _ROLLUP_SELECT.format(post_filter=post_filter + ")", insight_filter=insight_filter)
+        cursor.execute(_UPSERT_PREFIX + select + _UPSERT_SUFFIX, params)
+        written = cursor.rowcount
+        cursor.execute("""
+            DELETE FROM account_daily_stats s
+            WHERE s.instagram_user_id = %(account_id)s
+              AND (s.stat_date = '-infinity' OR s.stat_date BETWEEN %(start_day)s AND %(end_day)s)
+              AND s.updated_at < CURRENT_TIMESTAMP
+        """, params) # bu işlemde güncellenmeyen (artık kaynağı olmayan) günler
+        conn.commit()
+        return written
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"account_daily_stats güncellenirken hata ({instagram_user_id_param}): {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+
+
+def backfill_account_daily_stats(conn, instagram_user_id_param=None):
+    """Tabloyu (veya tek bir hesabın satırlarını) ham tablolardan sıfırdan kurar; yazılan satır sayısını döndürür."""
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        if instagram_user_id_param:
+            params = {"account_id": instagram_user_id_param}
+            cursor.execute("DELETE FROM account_daily_stats WHERE instagram_user_id = %(account_id)s", params)
+            select = _ROLLUP_SELECT.format(post_filter="AND instagram_user_id = %(account_id)s",
+                                           insight_filter="AND instagram_user_id = %(account_id)s")
+        else:
+            params = {}
+            cursor.execute("TRUNCATE account_daily_stats")
+            select = _ROLLUP_SELECT.format(post_filter="", insight_filter="")
+        cursor.execute(_UPSERT_PREFIX + select + _UPSERT_SUFFIX, params)
+        written = cursor.rowcount
+        conn.commit()
+        return written
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"account_daily_stats yeniden kurulurken hata: {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="account_daily_stats özet tablosu")
+    parser.add_argument("--backfill", action="store_true", help="Tabloyu ham verilerden sıfırdan kur")
+    parser.add_argument("--account", help="Yalnızca bu instagram_user_id için")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+        sys.exit(0)
+
+    backend_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "targetly-app", "targetly-backend")
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    from db import get_db_connection
+    from migrate import ensure_schema
+
+    connection = get_db_connection()
+    if connection is None:
+        print("❌ DB bağlantısı kurulamadı (db.py). Durduruldu.")
+        sys.exit(1)
+    try:
+        ensure_schema(connection)
+        rows = backfill_account_daily_stats(connection, args.account)
+        print(f"✅ account_daily_stats yeniden kuruldu: {rows} hesap-gün satırı ({args.account or 'tüm hesaplar'}).")
+    finally:
+        connection.close()
@@ -0,0 +1,188 @@
+# SOCIALAI-OPTIMIZER/common/graph_stub_server.py
+# Instagram Graph API'nin yerel, bağımlılıksız bir taklidi.
+# instagram_data_fetcher'ı gerçek API'ye gitmeden çalıştırmak/ölçmek için:
+#   python common/graph_stub_server.py --port 8765 --posts 2500 --latency-ms 40
+#   IG_GRAPH_URL=http://127.0.0.1:8765 IG_ACCOUNT_ID=stub IG_ACCESS_TOKEN=stub python common/instagram_data_fetcher.py
+# --throttle-account ile belirtilen hesabın ilk N isteği hız sınırı hatası (kod 80002) ile döner.
+# POST /{hesap}/media ve /{hesap}/media_publish yayın işçilerini denemek içindir; --publish-failures N
+# ilk N POST isteğini geçici 500 hatasıyla döndürür (yeniden deneme yolu).
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+SAMPLE_WORDS = ["kamp", "doğa", "yaz", "göl", "orman", "etkinlik", "çocuklar", "macera", "gün", "ateş", "yürüyüş", "kano"]
+SAMPLE_TAGS = ["camp", "summer", "nature", "lake", "forest", "kids", "adventure", "retreat", "outdoors", "campfire"]
+
+
+def generate_posts(count, seed=42, id_base=17800000000000000):
+    """
+    En yeniden en eskiye sıralı sahte gönderiler üretir (Graph API /media sırası). instagram_post_id
+    tabloda tekil olduğundan aynı veritabanında ikinci bir stub hesabı için farklı id_base verilir.
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    posts = []
+    for i in range(count):
+        words = " ".join(rng.choice(SAMPLE_WORDS) for _ in range(rng.randint(4, 18)))
+        tags = " ".join(f"#{t}" for t in rng.sample(SAMPLE_TAGS, rng.randint(0, 4)))
+        timestamp = now - timedelta(hours=12 * i + rng.randint(0, 11))
+        posts.append({
+            "id": str(id_base + count - i),
+            "caption": f"{words} {tags}".strip(),
+            "media_type": rng.choice(["IMAGE", "VIDEO", "CAROUSEL_ALBUM"]),
+            "timestamp": timestamp.strftime("%Y-%m-%dT%H:%M:%S+0000"),
+            "like_count": rng.randint(0, 400),
+            "comments_count": rng.randint(0, 40),
+            "permalink": f"https://www.instagram.com/p/stub{i}/",
+        })
+    return posts
+
+
+class GraphStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_throttled(self, account_id):
+        usage = {account_id: [{"type": "instagram", "call_count": 100, "total_cputime": 40, "total_time": 60, "estimated_time_to_regain_access": 0}]}
+        body = json.dumps({"error": {"message": "Application request limit reached", "code": 80002}}).encode("utf-8")
+        self.send_response(400)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Business-Use-Case-Usage", json.dumps(usage))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def end_headers(self):
+        self.send_header("X-App-Usage", json.dumps({"call_count": 5, "total_cputime": 2, "total_time": 3}))
+        super().end_headers()
+
+    def do_GET(self):
+        if self.server.latency_seconds:
+            time.sleep(self.server.latency_seconds)
+        parsed = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        parts = [p for p in parsed.path.split("/") if p]
+        with self.server.stats_lock:
+            self.server.request_count += 1
+            account_id = parts[0] if parts else ""
+            throttle = account_id == self.server.throttle_account and self.server.throttle_remaining > 0
+            if throttle:
+                self.server.throttle_remaining -= 1
+        if throttle:
+            return self._send_throttled(account_id)
+        if not params.get("access_token"):
+            return self._send_json({"error": {"message": "An access token is required.", "code": 190}}, status=400)
+        if len(parts) == 2 and parts[1] == "media":
+            return self._media(parts[0], params)
+        if len(parts) == 2 and parts[1] == "insights":
+            return self._insights(params)
+        if len(parts) == 1 and "followers_count" in params.get("fields", ""):
+            return self._send_json({"followers_count": self.server.followers_count, "id": parts[0]})
+        return self._send_json({"error": {"message": f"Unknown path {parsed.path}", "code": 100}}, status=404)
+
+    def do_POST(self):
+        if self.server.latency_seconds:
+            time.sleep(self.server.latency_seconds)
+        parsed = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        params = {k: v[-1] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        parts = [p for p in parsed.path.split("/") if p]
+        with self.server.stats_lock:
+            self.server.request_count += 1
+            self.server.publish_sequence += 1
+            sequence = self.server.publish_sequence
+            fail = self.server.publish_failures_remaining > 0
+            if fail:
+                self.server.publish_failures_remaining -= 1
+        if fail:
+            return self._send_json({"error": {"message": "An unexpected error has occurred.", "code": 2, "is_transient": True}}, status=500)
+        if not params.get("access_token"):
+            return self._send_json({"error": {"message": "An access token is required.", "code": 190}}, status=400)
+        if len(parts) == 2 and parts[1] == "media" and params.get("image_url"):
+            return self._send_json({"id": f"{17900000000000000 + sequence}"})
+        if len(parts) == 2 and parts[1] == "media_publish" and params.get("creation_id"):
+            return self._send_json({"id": f"{18000000000000000 + sequence}"})
+        return self._send_json({"error": {"message": f"Invalid parameters for {parsed.path}", "code": 100}}, status=400)
+
+    def _media(self, account_id, params):
+        limit = min(int(params.get("limit", 25)), 100)
+        offset = int(params.get("after", 0))
+        page = self.server.posts[offset:offset + limit]
+        payload = {"data": page, "paging": {"cursors": {"before": str(offset), "after": str(offset + len(page))}}}
+        if offset + limit < len(self.server.posts):
+            next_params = dict(params, after=str(offset + limit))
+            payload["paging"]["next"] = f"http://{self.headers.get('Host')}/{account_id}/media?{urlencode(next_params)}"
+        self._send_json(payload)
+
+    def _insights(self, params):
+        metric = params.get("metric")
+        if params.get("breakdown"):
+            breakdown = params["breakdown"]
+            dimensions = {"country": ["TR", "US", "DE", "GB"], "gender": ["F", "M", "U"], "age": ["18-24", "25-34", "35-44", "45-54"]}.get(breakdown, ["unknown"])
+            results = [{"dimension_values": [d], "value": 1000 // (i + 1)} for i, d in enumerate(dimensions)]
+            return self._send_json({"data": [{"name": metric, "period": "lifetime", "total_value": {"breakdowns": [{"dimension_keys": [breakdown], "results": results}]}}]})
+        today = datetime.now(timezone.utc).replace(hour=7, minute=0, second=0, microsecond=0)
+        values = [{"value": random.randint(50, 500), "end_time": (today - timedelta(days=d)).strftime("%Y-%m-%dT%H:%M:%S+0000")} for d in (1, 0)]
+        self._send_json({"data": [{"name": metric, "period": params.get("period", "day"), "values": values}]})
+
+
+def make_server(host="127.0.0.1", port=8765, posts=500, latency_ms=0, followers_count=1234, verbose=False,
+                throttle_account=None, throttle_requests=0, publish_failures=0, post_id_base=17800000000000000):
+    server = ThreadingHTTPServer((host, port), GraphStubHandler)
+    server.daemon_threads = True
+    server.posts = generate_posts(posts, id_base=post_id_base)
+    server.latency_seconds = latency_ms / 1000.0
+    server.followers_count = followers_count
+    server.verbose = verbose
+    server.request_count = 0
+    server.throttle_account = throttle_account
+    server.throttle_remaining = throttle_requests
+    server.publish_sequence = 0
+    server.publish_failures_remaining = publish_failures
+    server.stats_lock = threading.Lock()
+    return server
+
+
+def start_in_background(**kwargs):
+    """Sunucuyu arka plan iş parçacığında başlatır; (server, base_url) döndürür."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Yerel Instagram Graph API stub sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--posts", type=int, default=500, help="Üretilecek sahte gönderi sayısı")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Her yanıta eklenecek yapay gecikme")
+    parser.add_argument("--throttle-account", help="Hız sınırına takılacak hesap ID'si")
+    parser.add_argument("--throttle-requests", type=int, default=5, help="Kısıtlanacak istek sayısı")
+    parser.add_argument("--publish-failures", type=int, default=0, help="İlk N POST (yayın) isteği 500 döner")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    stub = make_server(args.host, args.port, args.posts, args.latency_ms, verbose=args.verbose,
+                       throttle_account=args.throttle_account, throttle_requests=args.throttle_requests,
+                       publish_failures=args.publish_failures)
+    print(f"🧪 Graph API stub http://{args.host}:{args.port} adresinde ({args.posts} gönderi). Durdurmak için Ctrl+C.")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
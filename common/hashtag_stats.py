@@ -0,0 +1,195 @@
+# SOCIALAI-OPTIMIZER/common/hashtag_stats.py
+# Hesap + hashtag bazında önceden toplanmış istatistikler (account_hashtag_stats).
+# Kullanım sayısı, beğeni / yorum toplamları ve medyanları, ortalama etkileşim ve zamana göre ağırlıklı (üstel
+# azalmalı) kullanım / etkileşim toplamları tutulur. Raporlama endpoint'i top-N sorgularını ham post_hashtags /
+# instagram_posts satırlarını gruplamadan bu tablonun indekslerinden okur. Veri alımı (run_pipeline, post_importer)
+# yalnızca dokunulan gönderilerin hashtag'lerini yeniden hesaplar. Tablolar targetly-backend/migrations altında
+# tanımlıdır; sıfırdan kurmak için:
+#   python common/hashtag_stats.py --backfill [--account <instagram_user_id>]
+#
+# Zaman ağırlığı: w = exp(-λ * (last_used_at - timestamp)), λ = ln 2 / yarı ömür. Toplamlar hashtag'in son
+# kullanımına göre saklanır, böylece zaman geçtikçe satırların yeniden yazılması gerekmez; bugünkü değer
+# recency_uses * exp(-λ * (now - last_used_at)) olur. trend_key = λ * epoch(last_used_at) + ln(recency_uses) bu
+# değerin logaritmasıyla aynı sırayı verir (zamandan bağımsız), bu yüzden indekslenebilir.
+# HASHTAG_TREND_HALF_LIFE_DAYS değiştirilirse tablo --backfill ile yeniden kurulmalıdır.
+#
+# account_hashtag_count_stats: hesabın gönderileri gönderi başına hashtag sayısına göre gruplanır (0, 1, 2, ...);
+# /api/optimal-posting-info en yüksek ortalama etkileşimli grubu "ideal hashtag sayısı" olarak buradan okur.
+# Bir gönderinin hashtag sayısı değiştiğinde eski grubunu bilmek gerekeceği için artımlı değil, hesap bazında
+# yeniden hesaplanır (gönderi başına post_hashtags birincil anahtar indeksinden sayılır) ve
+# refresh_account_hashtag_stats ile aynı transaction'da yazılır.
+import argparse
+import math
+import os
+import sys
+
+HASHTAG_TREND_HALF_LIFE_DAYS = float(os.getenv("HASHTAG_TREND_HALF_LIFE_DAYS", 30))
+TREND_DECAY_PER_SECOND = math.log(2) / (HASHTAG_TREND_HALF_LIFE_DAYS * 86400)
+
+# {post_filter}: hangi (hesap, hashtag) gönderilerinin toplanacağı. Zaman damgası olmayan gönderiler sayılır ama
+# zaman ağırlıklı toplamlara girmez. Üs -700'de kırpılır: PostgreSQL EXP alttan taşmada hata verir.
+_STATS_SELECT = """
+    WITH tagged AS (
+        SELECT p.instagram_user_id, h.hashtag, COALESCE(p.like_count, 0) AS likes,
+               COALESCE(p.comments_count, 0) AS comments, p.timestamp,
+               EXP(GREATEST(-%(decay)s * EXTRACT(EPOCH FROM MAX(p.timestamp) OVER tag - p.timestamp), -700)) AS weight
+        FROM post_hashtags h
+        JOIN instagram_posts p ON p.id = h.post_table_id
+        WHERE {post_filter}
+        WINDOW tag AS (PARTITION BY p.instagram_user_id, h.hashtag)
+    ),
+    grouped AS (
+        SELECT instagram_user_id, hashtag, COUNT(*) AS post_count, SUM(likes) AS like_sum, SUM(comments) AS comment_sum,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY likes) AS median_likes,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY comments) AS median_comments,
+               MIN(timestamp) AS first_used_at, MAX(timestamp) AS last_used_at,
+               COALESCE(SUM(weight), 0) AS recency_uses, COALESCE(SUM(weight * (likes + comments)), 0) AS recency_engagement
+        FROM tagged
+        GROUP BY 1, 2
+    )
+    SELECT instagram_user_id, hashtag, post_count, like_sum, comment_sum,
+           (like_sum + comment_sum)::float8 / post_count, median_likes, median_comments, first_used_at, last_used_at,
+           recency_uses, recency_engagement,
+           %(decay)s * EXTRACT(EPOCH FROM last_used_at) + LN(NULLIF(recency_uses, 0))
+    FROM grouped
+"""
+
+_UPSERT_PREFIX = """
+    INSERT INTO account_hashtag_stats (instagram_user_id, hashtag, post_count, like_sum, comment_sum, avg_engagement,
+                                       median_likes, median_comments, first_used_at, last_used_at,
+                                       recency_uses, recency_engagement, trend_key)
+"""
+
+_UPSERT_SUFFIX = """
+    ON CONFLICT (instagram_user_id, hashtag) DO UPDATE SET
+        post_count = EXCLUDED.post_count, like_sum = EXCLUDED.like_sum, comment_sum = EXCLUDED.comment_sum,
+        avg_engagement = EXCLUDED.avg_engagement, median_likes = EXCLUDED.median_likes,
+        median_comments = EXCLUDED.median_comments, first_used_at = EXCLUDED.first_used_at,
+        last_used_at = EXCLUDED.last_used_at, recency_uses = EXCLUDED.recency_uses,
+        recency_engagement = EXCLUDED.recency_engagement, trend_key = EXCLUDED.trend_key,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# {post_filter}: hangi hesapların gönderilerinin gruplanacağı
+_COUNT_STATS_INSERT = """
+    INSERT INTO account_hashtag_count_stats (instagram_user_id, hashtag_count, post_count, engagement_sum, avg_engagement)
+    SELECT instagram_user_id, hashtag_count, COUNT(*), SUM(engagement), SUM(engagement)::float8 / COUNT(*)
+    FROM (
+        SELECT p.instagram_user_id, COALESCE(p.like_count, 0) + COALESCE(p.comments_count, 0) AS engagement,
+               (SELECT COUNT(*) FROM post_hashtags h WHERE h.post_table_id = p.id) AS hashtag_count
+        FROM instagram_posts p
+        WHERE {post_filter}
+    ) posts
+    GROUP BY 1, 2
+"""
+
+# Gönderileri bu çalıştırmada yazılan / güncellenen hashtag'ler (yazımdan sonra, aynı gönderilerin eski hashtag'leri dahil)
+HASHTAGS_OF_POSTS_QUERY = """
+    SELECT DISTINCT h.hashtag
+    FROM instagram_posts p
+    JOIN post_hashtags h ON h.post_table_id = p.id
+    WHERE p.instagram_post_id = ANY(%s)
+"""
+
+
+def hashtags_of_posts(conn, instagram_post_ids):
+    """instagram_post_id listesindeki gönderilerin post_hashtags'teki tüm hashtag'leri."""
+    if not instagram_post_ids:
+        return []
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(HASHTAGS_OF_POSTS_QUERY, (list(instagram_post_ids),))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        if cursor: cursor.close()
+
+
+def refresh_account_hashtag_stats(conn, instagram_user_id_param, hashtags):
+    """
+    Hesabın verilen hashtag'lerini ham tablolardan yeniden hesaplar. Artık hiçbir gönderide geçmeyen hashtag'lerin
+    satırları silinir. Hesabın hashtag sayısı grupları (account_hashtag_count_stats) her çağrıda yeniden kurulur;
+    hashtag'i olmayan yeni gönderiler de 0 grubunu değiştirir. Yazılan (upsert edilen) hashtag satırı sayısını döndürür.
+    """
+    hashtags = sorted(set(hashtags))
+    params = {"account_id": instagram_user_id_param, "hashtags": hashtags, "decay": TREND_DECAY_PER_SECOND}
+    written = 0
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        if hashtags:
+            select = _STATS_SELECT.format(post_filter="h.hashtag = ANY(%(hashtags)s) AND p.instagram_user_id = %(account_id)s")
+            cursor.execute(_UPSERT_PREFIX + select + _UPSERT_SUFFIX, params)
+            written = cursor.rowcount
+            cursor.execute("""
+                DELETE FROM account_hashtag_stats s
+                WHERE s.instagram_user_id = %(account_id)s AND s.hashtag = ANY(%(hashtags)s)
+                  AND s.updated_at < CURRENT_TIMESTAMP
+            """, params) # bu işlemde güncellenmeyen (artık gönderisi olmayan) hashtag'ler
+        cursor.execute("DELETE FROM account_hashtag_count_stats WHERE instagram_user_id = %(account_id)s", params)
+        cursor.execute(_COUNT_STATS_INSERT.format(post_filter="p.instagram_user_id = %(account_id)s"), params)
+        conn.commit()
+        return written
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"account_hashtag_stats güncellenirken hata ({instagram_user_id_param}): {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+
+
+def backfill_account_hashtag_stats(conn, instagram_user_id_param=None):
+    """
+    Tabloyu (veya tek bir hesabın satırlarını) ve hashtag sayısı gruplarını ham tablolardan sıfırdan kurar;
+    yazılan hashtag satırı sayısını döndürür.
+    """
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        params = {"decay": TREND_DECAY_PER_SECOND}
+        if instagram_user_id_param:
+            params["account_id"] = instagram_user_id_param
+            cursor.execute("DELETE FROM account_hashtag_stats WHERE instagram_user_id = %(account_id)s", params)
+            cursor.execute("DELETE FROM account_hashtag_count_stats WHERE instagram_user_id = %(account_id)s", params)
+            post_filter = "p.instagram_user_id = %(account_id)s"
+        else:
+            cursor.execute("TRUNCATE account_hashtag_stats, account_hashtag_count_stats")
+            post_filter = "TRUE"
+        cursor.execute(_UPSERT_PREFIX + _STATS_SELECT.format(post_filter=post_filter) + _UPSERT_SUFFIX, params)
+        written = cursor.rowcount
+        cursor.execute(_COUNT_STATS_INSERT.format(post_filter=post_filter), params)
+        conn.commit()
+        return written
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"account_hashtag_stats yeniden kurulurken hata: {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="account_hashtag_stats özet tablosu")
+    parser.add_argument("--backfill", action="store_true", help="Tabloyu ham verilerden sıfırdan kur")
+    parser.add_argument("--account", help="Yalnızca bu instagram_user_id için")
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.print_help()
+        sys.exit(0)
+
+    backend_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "targetly-app", "targetly-backend")
+    if backend_dir not in sys.path:
+        sys.path.insert(0, backend_dir)
+    from db import get_db_connection
+    from migrate import ensure_schema
+
+    connection = get_db_connection()
+    if connection is None:
+        print("❌ DB bağlantısı kurulamadı (db.py). Durduruldu.")
+        sys.exit(1)
+    try:
+        ensure_schema(connection)
+        rows = backfill_account_hashtag_stats(connection, args.account)
+        print(f"✅ account_hashtag_stats yeniden kuruldu: {rows} hesap-hashtag satırı ({args.account or 'tüm hesaplar'}).")
+    finally:
+        connection.close()
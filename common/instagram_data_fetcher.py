@@ -1,9 +1,14 @@
 # SOCIALAI-OPTIMIZER/common/instagram_data_fetcher.py
 import os
 import sys
-from datetime import datetime
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 import requests
-from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+from requests.adapters import HTTPAdapter
 
 # Mevcut dosyanın (instagram_data_fetcher.py) bulunduğu dizin (common)
 CURRENT_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -26,67 +31,176 @@ if TARGETLY_APP_BACKEND_PATH not in sys.path:
 if CURRENT_SCRIPT_DIR not in sys.path:
     sys.path.insert(0, CURRENT_SCRIPT_DIR) # Eğer doğrudan "from text_cleaner" kullanacaksak
 
-print(f"--- SYS.PATH KONTROLÜ (YENİ YOL İLE) ---")
-for p_idx, p_val in enumerate(sys.path):
-    print(f"{p_idx}: {p_val}")
-print(f"--- SYS.PATH SONU (YENİ YOL İLE) ---")
-
-try:
-    # text_cleaner.py, common klasöründe olduğu için ve common sys.path'te olduğu için
-    # veya PROJECT_ROOT_DIR sys.path'te olduğu için "from common.text_cleaner" çalışmalı
-    from common.text_cleaner import clean_caption, extract_hashtags
-    print("common.text_cleaner başarıyla import edildi.")
-    
-    # db modülünü doğrudan import etmeyi dene (çünkü TARGETLY_APP_BACKEND_PATH sys.path'te)
-    import db # Bu satır db.py'yi modül olarak yükler
-    print("db modülü başarıyla import edildi.")
-    from db import get_db_connection # Şimdi db modülünden fonksiyonu import et
-    print("get_db_connection başarıyla import edildi.")
-
-except ImportError as e:
-    print(f"Import hatası: {e}.")
-    print("Lütfen __init__.py dosyalarının ilgili klasörlerde (common, ve belirttiğiniz yoldaki targetly-app/targetly-backend) olduğundan emin olun.")
-    sys.exit(1)
-except Exception as e_general:
-    print(f"Beklenmedik bir hata oluştu import sırasında: {e_general}")
-    sys.exit(1)
+# Import hataları (eksik __init__.py / yanlış yol) olduğu gibi yükselir; modülü içe aktaran süreci sonlandırmaz.
+from common.text_cleaner import clean_captions_batch
+from common.sync_state import POSTS_STATE_KEY, load_sync_state, update_sync_state, to_unix, utc_now
+from common.rate_limiter import GraphRateLimiter, is_throttle_response
+from common.daily_rollups import refresh_account_daily_stats
+from common.hashtag_stats import hashtags_of_posts, refresh_account_hashtag_stats
+from migrate import ensure_schema # tablolar yalnızca targetly-backend/migrations ile oluşturulur
+from db import get_db_connection # targetly-backend/db.py (TARGETLY_APP_BACKEND_PATH sys.path'te); backend/.env + common/.env'i yükler
+from metrics import time_dependency # Graph API çağrı süreleri /metrics'te (dependency="graph")
+from response_cache import invalidate_account # yeni veri commit edilince dashboard/rapor önbelleğini düşürmek için
+from caption_index import sync_account_index # benzer gönderi araması için açıklama indeksi (targetly-backend/caption_index.py)
 
 
 # --- Instagram API'den Veri Çekme Fonksiyonları ---
-ENV_PATH_COMMON = os.path.join(CURRENT_SCRIPT_DIR, ".env")
-if os.path.exists(ENV_PATH_COMMON):
-    print(f"Yükleniyor: {ENV_PATH_COMMON}")
-    load_dotenv(dotenv_path=ENV_PATH_COMMON)
-else:
-    print(f"Uyarı: {ENV_PATH_COMMON} bulunamadı. Ortam değişkenlerinin (IG_ACCESS_TOKEN, IG_ACCOUNT_ID) ayarlandığından emin olun.")
+ENV_PATH_COMMON = os.path.join(CURRENT_SCRIPT_DIR, ".env") # db importunda settings.load_env_files() ile yüklenir
 
 ACCESS_TOKEN = os.getenv("IG_ACCESS_TOKEN")
 ACCOUNT_ID = os.getenv("IG_ACCOUNT_ID")
-GRAPH_URL = os.getenv("IG_GRAPH_URL", "https://graph.facebook.com/v20.0") # Güncel bir API versiyonu kullanın
+GRAPH_URL = os.getenv("IG_GRAPH_URL", "https://graph.facebook.com/v20.0") # Güncel bir API versiyonu kullanın (yerel stub için http://127.0.0.1:8765)
 POST_FIELDS = "caption,media_type,timestamp,like_count,comments_count,id,permalink"
+POSTS_PAGE_SIZE = int(os.getenv("IG_POSTS_PAGE_SIZE", 100)) # /media sayfa boyutu (limit)
+POSTS_MAX_PAGES = int(os.getenv("IG_POSTS_MAX_PAGES", 0)) # 0 = tüm geçmiş
+FETCH_MAX_WORKERS = int(os.getenv("IG_FETCH_MAX_WORKERS", 4)) # hesap başına eşzamanlı Graph API çağrısı sayısı
+INGEST_MAX_PARALLEL_ACCOUNTS = int(os.getenv("INGEST_MAX_PARALLEL_ACCOUNTS", 4)) # işçi modunda aynı anda işlenen hesap sayısı
+REQUEST_TIMEOUT = float(os.getenv("IG_REQUEST_TIMEOUT", 30)) # saniye
+GRAPH_MAX_RETRIES = int(os.getenv("IG_GRAPH_MAX_RETRIES", 4)) # hız sınırı / 5xx yanıtlarında tekrar deneme
+BULK_PAGE_SIZE = int(os.getenv("DB_BULK_PAGE_SIZE", 1000)) # execute_values başına satır (tek round trip)
+POST_REFRESH_LOOKBACK_DAYS = int(os.getenv("IG_POST_REFRESH_LOOKBACK_DAYS", 7)) # beğeni/yorum sayıları tazelenecek son gün sayısı
+INSIGHT_OVERLAP_DAYS = 1 # son günün değeri henüz kesinleşmemiş olabilir, tekrar çekilir
+INSIGHT_MAX_WINDOW_DAYS = 30 # Graph API period=day için since-until aralığı en fazla 30 gün
 
-def fetch_instagram_posts():
-    if not ACCOUNT_ID or not ACCESS_TOKEN:
-        print("❌ IG_ACCOUNT_ID veya IG_ACCESS_TOKEN .env dosyasında (common klasörü) bulunamadı veya yüklenemedi.")
-        return []
-    url = f"{GRAPH_URL}/{ACCOUNT_ID}/media?fields={POST_FIELDS}&access_token={ACCESS_TOKEN}"
+DAILY_METRICS = {"reach": "reach", "profile_views": "profile_views", "accounts_engaged": "accounts_engaged", "impressions": "impressions"}
+DEMOGRAPHIC_BREAKDOWNS = {"country": "follower_demographics_country", "gender": "follower_demographics_gender", "age": "follower_demographics_age"}
+
+# Tüm çağrılar tek bir keep-alive oturumu paylaşır (her istekte yeni TCP/TLS handshake yok)
+_session = requests.Session()
+_http_adapter = HTTPAdapter(pool_connections=FETCH_MAX_WORKERS, pool_maxsize=FETCH_MAX_WORKERS * INGEST_MAX_PARALLEL_ACCOUNTS)
+_session.mount("https://", _http_adapter)
+_session.mount("http://", _http_adapter)
+
+# Tüm hesaplar için ortak, X-App-Usage / X-Business-Use-Case-Usage başlıklarına göre ayarlanan zamanlayıcı
+rate_limiter = GraphRateLimiter()
+
+# Çağrı başına gecikme ölçümleri: hesap -> etiket -> [saniye, ...]
+_call_latencies = defaultdict(lambda: defaultdict(list))
+_latency_lock = threading.Lock()
+
+def _record_latency(account_id, label, elapsed_seconds):
+    with _latency_lock:
+        _call_latencies[account_id][label].append(elapsed_seconds)
+
+def get_call_latencies(account_id=None):
+    account_id = account_id or ACCOUNT_ID
+    with _latency_lock:
+        return {label: list(values) for label, values in _call_latencies.get(account_id, {}).items()}
+
+def reset_call_latencies(account_id=None):
+    with _latency_lock:
+        _call_latencies.pop(account_id or ACCOUNT_ID, None)
+
+def print_latency_report(account_id=None):
+    latencies = get_call_latencies(account_id)
+    if not latencies: print("Graph API çağrısı yapılmadı."); return
+    print(f"\n--- Graph API Çağrı Gecikmeleri ({account_id or ACCOUNT_ID}) ---")
+    for label, values in sorted(latencies.items()):
+        total_ms = sum(values) * 1000
+        print(f"{label:<45} çağrı={len(values):<4} toplam={total_ms:9.1f} ms  ort={total_ms / len(values):8.1f} ms  max={max(values) * 1000:8.1f} ms")
+
+def _print_api_error(e):
+    if hasattr(e, 'response') and e.response is not None:
+        try: print(f"API Hata Detayı: {e.response.json()}")
+        except ValueError: print(f"API Hata Detayı (Raw): {e.response.text}")
+
+def _graph_get(url, params=None, label="graph", account_id=None):
+    """
+    Paylaşılan oturum üzerinden GET yapar ve JSON döndürür. Her denemeden önce hız sınırlayıcıdan
+    token alır, yanıt başlıklarıyla sınırlayıcıyı besler; hız sınırı ve 5xx yanıtlarında üstel
+    geri çekilme ile tekrar dener. Gecikme (bekleme dahil) hesap ve etiket bazında kaydedilir.
+    """
+    account_id = account_id or ACCOUNT_ID
+    started = time.perf_counter()
     try:
-        response = requests.get(url)
+        for attempt in range(GRAPH_MAX_RETRIES + 1):
+            rate_limiter.acquire(account_id)
+            with time_dependency("graph", label) as call:
+                response = _session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+                call.set_status(response.status_code)
+            rate_limiter.observe(account_id, response.headers)
+            retryable = is_throttle_response(response) or response.status_code >= 500
+            if not retryable or attempt == GRAPH_MAX_RETRIES:
+                break
+            delay = rate_limiter.throttled(account_id, attempt)
+            print(f"⏳ {account_id} {label}: HTTP {response.status_code}, {delay:.1f} sn sonra tekrar denenecek (deneme {attempt + 1}/{GRAPH_MAX_RETRIES}).")
         response.raise_for_status()
-        return response.json().get("data", [])
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Gönderiler alınamadı: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            try: print(f"API Hata Detayı: {e.response.json()}")
-            except ValueError: print(f"API Hata Detayı (Raw): {e.response.text}")
-        return []
+        return response.json()
+    finally:
+        _record_latency(account_id, label, time.perf_counter() - started)
+
+def _fetch_post_pages(page_size=POSTS_PAGE_SIZE, max_pages=POSTS_MAX_PAGES, since=None, account_id=None, access_token=None):
+    """
+    /media kenarını paging.next imleçlerini izleyerek sayfa sayfa çeker.
+    (gönderiler, tamamlandı_mı) döndürür; sayfalama hata ile yarıda kalırsa tamamlandı_mı False olur.
+    since verilirse (datetime) daha eski gönderilere ulaşıldığında sayfalama durur.
+    """
+    account_id, access_token = account_id or ACCOUNT_ID, access_token or ACCESS_TOKEN
+    if not account_id or not access_token:
+        print("❌ IG_ACCOUNT_ID veya IG_ACCESS_TOKEN .env dosyasında (common klasörü) bulunamadı veya yüklenemedi.")
+        return [], False
+    url = f"{GRAPH_URL}/{account_id}/media"
+    params = {"fields": POST_FIELDS, "limit": page_size, "access_token": access_token}
+    if since is not None:
+        params["since"] = to_unix(since)
+    posts = []
+    page_count = 0
+    while url:
+        try:
+            payload = _graph_get(url, params=params, label="media", account_id=account_id)
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Gönderiler alınamadı ({account_id}, sayfa {page_count + 1}): {e}")
+            _print_api_error(e)
+            if posts: print(f"⚠️ Sayfalama yarıda kesildi, {len(posts)} gönderi ile devam ediliyor.")
+            return posts, False
+        page = payload.get("data", [])
+        page_count += 1
+        if since is not None:
+            # /media en yeniden eskiye sıralıdır; pencere dışına taşan ilk gönderide dur
+            in_window = [p for p in page if not p.get("timestamp") or _parse_graph_datetime(p["timestamp"]) >= since]
+            posts.extend(in_window)
+            if len(in_window) < len(page):
+                break
+        else:
+            posts.extend(page)
+        if max_pages and page_count >= max_pages:
+            break
+        # paging.next tam URL'dir (imleç, fields ve token dahil), ek parametre gerekmez
+        url = payload.get("paging", {}).get("next")
+        params = None
+    print(f"{account_id}: {page_count} sayfada {len(posts)} gönderi çekildi" + (f" (since {since.isoformat()})." if since else "."))
+    return posts, True
+
+def fetch_instagram_posts(page_size=POSTS_PAGE_SIZE, max_pages=POSTS_MAX_PAGES, since=None, account_id=None, access_token=None):
+    return _fetch_post_pages(page_size, max_pages, since, account_id, access_token)[0]
 
-def fetch_insights(metric, period=None, breakdown=None):
-    if not ACCOUNT_ID or not ACCESS_TOKEN:
+def fetch_insights(metric, period=None, breakdown=None, since=None, until=None, account_id=None, access_token=None):
+    """
+    since/until (datetime) verilirse günlük metrikler en fazla INSIGHT_MAX_WINDOW_DAYS günlük
+    pencerelerle çekilir ve 'values' listeleri tek bir veri öğesinde birleştirilir.
+    """
+    if since is not None and not breakdown:
+        until = until or utc_now()
+        merged = None
+        window_start = since
+        while window_start < until:
+            window_end = min(window_start + timedelta(days=INSIGHT_MAX_WINDOW_DAYS), until)
+            data = _fetch_insights_once(metric, period=period, since=window_start, until=window_end, account_id=account_id, access_token=access_token)
+            if not data: break # hatalı/boş pencereden sonrasını atla ki high-water mark boşluk bırakmasın
+            for data_item in data:
+                if merged is None: merged = dict(data_item, values=list(data_item.get("values", [])))
+                else: merged["values"].extend(data_item.get("values", []))
+            window_start = window_end
+        return [merged] if merged else []
+    return _fetch_insights_once(metric, period, breakdown, account_id=account_id, access_token=access_token)
+
+def _fetch_insights_once(metric, period=None, breakdown=None, since=None, until=None, account_id=None, access_token=None):
+    account_id, access_token = account_id or ACCOUNT_ID, access_token or ACCESS_TOKEN
+    if not account_id or not access_token:
         print("❌ IG_ACCOUNT_ID veya IG_ACCESS_TOKEN .env dosyasında (common) bulunamadı veya yüklenemedi.")
         return []
-    url = f"{GRAPH_URL}/{ACCOUNT_ID}/insights"
-    params = {"metric": metric, "access_token": ACCESS_TOKEN}
+    url = f"{GRAPH_URL}/{account_id}/insights"
+    params = {"metric": metric, "access_token": access_token}
     if breakdown:
         params["breakdown"] = breakdown
         params["metric_type"] = "total_value"
@@ -95,33 +209,72 @@ def fetch_insights(metric, period=None, breakdown=None):
         params["period"] = "day"
     elif period:
         params["period"] = period
+    if since is not None: params["since"] = to_unix(since)
+    if until is not None: params["until"] = to_unix(until)
+    label = f"insights:{metric}" + (f":{breakdown}" if breakdown else "")
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json().get("data", [])
+        return _graph_get(url, params=params, label=label, account_id=account_id).get("data", [])
     except requests.exceptions.RequestException as e:
-        print(f"❌ {metric} alınamadı: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            try: print(f"API Hata Detayı: {e.response.json()}")
-            except ValueError: print(f"API Hata Detayı (Raw): {e.response.text}")
+        print(f"❌ {metric} alınamadı ({account_id}): {e}")
+        _print_api_error(e)
         return []
 
-def fetch_follower_count_direct():
-    if not ACCOUNT_ID or not ACCESS_TOKEN:
+def fetch_follower_count_direct(account_id=None, access_token=None):
+    account_id, access_token = account_id or ACCOUNT_ID, access_token or ACCESS_TOKEN
+    if not account_id or not access_token:
         print("❌ IG_ACCOUNT_ID veya IG_ACCESS_TOKEN .env dosyasında (common) bulunamadı veya yüklenemedi.")
         return None
-    url = f"{GRAPH_URL}/{ACCOUNT_ID}?fields=followers_count&access_token={ACCESS_TOKEN}"
+    url = f"{GRAPH_URL}/{account_id}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json().get("followers_count")
+        return _graph_get(url, params={"fields": "followers_count", "access_token": access_token}, label="followers_count", account_id=account_id).get("followers_count")
     except requests.exceptions.RequestException as e:
-        print(f"❌ Takipçi sayısı alınamadı: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            try: print(f"API Hata Detayı: {e.response.json()}")
-            except ValueError: print(f"API Hata Detayı (Raw): {e.response.text}")
+        print(f"❌ Takipçi sayısı alınamadı ({account_id}): {e}")
+        _print_api_error(e)
         return None
 
+def fetch_demographics(breakdown_key, account_id=None, access_token=None):
+    # Facebook API'sinde demografi için doğru metrik adı "audience_city", "audience_country", "audience_gender_age" olabilir.
+    # Veya bazen hepsi tek bir "page_fans_demographics" veya benzeri bir metrik altında toplanır.
+    # Kullandığınız API versiyonu ve izinlere göre bu metrik adını doğrulamanız önemlidir.
+    demographics_data = fetch_insights("audience_demographics", breakdown=breakdown_key, account_id=account_id, access_token=access_token)
+    if not demographics_data: # Eğer audience_demographics boş dönerse follower_demographics'i dene
+        print(f"audience_demographics ile {breakdown_key} verisi alınamadı, follower_demographics deneniyor...")
+        demographics_data = fetch_insights("follower_demographics", breakdown=breakdown_key, account_id=account_id, access_token=access_token)
+    return demographics_data
+
+def compute_fetch_windows(sync_state):
+    """Senkronizasyon durumundan gönderi ve günlük metrikler için 'since' başlangıçlarını hesaplar."""
+    windows = {}
+    last_post_timestamp = sync_state.get(POSTS_STATE_KEY, {}).get("last_post_timestamp")
+    # Eski gönderilerin beğeni/yorum sayıları değişmeye devam ettiği için son N gün yeniden çekilir
+    windows[POSTS_STATE_KEY] = last_post_timestamp - timedelta(days=POST_REFRESH_LOOKBACK_DAYS) if last_post_timestamp else None
+    for db_metric in DAILY_METRICS.values():
+        last_end_time = sync_state.get(db_metric, {}).get("last_insight_end_time")
+        windows[db_metric] = last_end_time - timedelta(days=INSIGHT_OVERLAP_DAYS) if last_end_time else None
+    return windows
+
+def fetch_account_data_concurrently(max_workers=FETCH_MAX_WORKERS, sync_state=None, account_id=None, access_token=None):
+    """
+    Birbirinden bağımsız Graph API çağrılarını (gönderi sayfalaması, günlük insight'lar,
+    takipçi sayısı ve üç demografi kırılımı) sınırlı bir iş parçacığı havuzunda paralel çalıştırır.
+    sync_state verilirse yalnızca son senkronizasyondan sonraki pencere çekilir.
+    """
+    windows = compute_fetch_windows(sync_state or {})
+    account = {"account_id": account_id, "access_token": access_token}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ig-fetch") as executor:
+        posts_future = executor.submit(_fetch_post_pages, since=windows[POSTS_STATE_KEY], **account)
+        daily_futures = {db_metric: executor.submit(fetch_insights, api_metric, since=windows[db_metric], **account) for api_metric, db_metric in DAILY_METRICS.items()}
+        follower_future = executor.submit(fetch_follower_count_direct, **account)
+        demographic_futures = {db_metric: executor.submit(fetch_demographics, key, **account) for key, db_metric in DEMOGRAPHIC_BREAKDOWNS.items()}
+        posts, posts_complete = posts_future.result()
+        return {
+            "posts": posts,
+            "posts_complete": posts_complete,
+            "daily_insights": {metric: future.result() for metric, future in daily_futures.items()},
+            "follower_count": follower_future.result(),
+            "demographics": {metric: future.result() for metric, future in demographic_futures.items()},
+        }
+
 # --- Veritabanı İşlemleri ---
 def clear_existing_data(conn, instagram_user_id_param):
     cursor = None
@@ -141,53 +294,127 @@ def clear_existing_data(conn, instagram_user_id_param):
     finally:
         if cursor: cursor.close()
 
-def save_posts_to_db(conn, posts_data, instagram_user_id_param):
+def _parse_graph_datetime(value):
+    # Graph API "+0000" biçiminde döndürür; fromisoformat "+00:00" bekler
+    return datetime.fromisoformat(value.replace("+0000", "+00:00"))
+
+def _latest_timestamp(items, key):
+    latest = None
+    for item in items:
+        value = item.get(key)
+        if not value: continue
+        try: parsed = _parse_graph_datetime(value)
+        except ValueError: continue
+        if latest is None or parsed > latest: latest = parsed
+    return latest
+
+def latest_post_timestamp(posts_data):
+    return _latest_timestamp(posts_data, "timestamp")
+
+def latest_insight_end_time(insights_data):
+    return _latest_timestamp((v for data_item in insights_data or [] for v in data_item.get("values", [])), "end_time")
+
+def touched_day_range(posts_data, daily_insights):
+    """Bu çalıştırmada yazılan gönderi/insight'ların kapsadığı (ilk, son) zaman; hiç yoksa None."""
+    values = [post.get("timestamp") for post in posts_data or []]
+    values += [v.get("end_time") for data in (daily_insights or {}).values() for data_item in data or [] for v in data_item.get("values", [])]
+    parsed = []
+    for value in values:
+        if not value: continue
+        try: parsed.append(_parse_graph_datetime(value))
+        except ValueError: continue
+    return (min(parsed), max(parsed)) if parsed else None
+
+def _drop_unchanged_posts(cursor, post_rows):
+    """like_count ve comments_count'u veritabanındakiyle aynı olan gönderileri upsert listesinden çıkarır."""
+    cursor.execute(
+        "SELECT instagram_post_id, like_count, comments_count FROM instagram_posts WHERE instagram_post_id = ANY(%s)",
+        (list(post_rows.keys()),)
+    )
+    for instagram_post_id, like_count, comments_count in cursor.fetchall():
+        row = post_rows[instagram_post_id]
+        if (row[6] or 0) == like_count and (row[7] or 0) == comments_count:
+            del post_rows[instagram_post_id]
+
+def sync_caption_index(conn, instagram_user_id_param):
+    """Yeni gönderileri açıklama indeksine ekler. İndeks türetilmiş veridir: hata veri alımını durdurmaz, bir sonraki çalıştırma telafi eder."""
+    try:
+        added = sync_account_index(conn, instagram_user_id_param)
+        if added: print(f"Açıklama indeksi: {added} gönderi eklendi.")
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"⚠️ Açıklama indeksi güncellenemedi ({instagram_user_id_param}): {e}")
+
+def save_posts_to_db(conn, posts_data, instagram_user_id_param, skip_unchanged=True):
+    """
+    Gönderileri çok satırlı VALUES (execute_values) ile toplu upsert eder, dönen id'leri
+    instagram_post_id üzerinden gönderilere eşler ve tüm hashtag'leri tek seferde yazar.
+    skip_unchanged=True ise beğeni/yorum sayısı değişmemiş gönderiler hiç yazılmaz.
+    """
     cursor = None
     try:
         cursor = conn.cursor()
         print(f"{len(posts_data)} gönderi veritabanına kaydediliyor...")
-        for post_api_data in posts_data:
+        post_rows = {} # instagram_post_id -> satır (aynı gönderi iki kez gelirse sonuncusu geçerli; ON CONFLICT aynı satırı iki kez güncelleyemez)
+        hashtags_by_post = {}
+        cleaned_captions = clean_captions_batch(post_api_data.get("caption", "") for post_api_data in posts_data)
+        for post_api_data, (caption_cleaned, hashtags) in zip(posts_data, cleaned_captions):
             caption_original = post_api_data.get("caption", "")
-            caption_cleaned = clean_caption(caption_original)
-            hashtags = extract_hashtags(caption_original)
             post_timestamp_str = post_api_data.get("timestamp")
             post_timestamp = None
             if post_timestamp_str:
                 try:
-                    post_timestamp = datetime.fromisoformat(post_timestamp_str.replace("+0000", "+00:00"))
+                    post_timestamp = _parse_graph_datetime(post_timestamp_str)
                 except ValueError:
                     print(f"Geçersiz tarih formatı: {post_timestamp_str} (Post ID: {post_api_data.get('id')}). Tarih None.")
             instagram_native_post_id = post_api_data.get("id")
             if not instagram_native_post_id:
                 print(f"Uyarı: Gönderi ID'si alınamadı, atlanıyor: {post_api_data}")
                 continue
-            cursor.execute(
-                """
-                INSERT INTO instagram_posts (instagram_user_id, instagram_post_id, caption_original, caption_cleaned, media_type, timestamp, like_count, comments_count)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (instagram_post_id) DO UPDATE SET
-                    caption_original = EXCLUDED.caption_original, caption_cleaned = EXCLUDED.caption_cleaned,
-                    media_type = EXCLUDED.media_type, timestamp = EXCLUDED.timestamp,
-                    like_count = EXCLUDED.like_count, comments_count = EXCLUDED.comments_count,
-                    fetched_at = CURRENT_TIMESTAMP
-                RETURNING id;
-                """,
-                (instagram_user_id_param, instagram_native_post_id, caption_original, caption_cleaned,
-                 post_api_data.get("media_type"), post_timestamp, post_api_data.get("like_count", 0),
-                 post_api_data.get("comments_count", 0))
+            post_rows[instagram_native_post_id] = (
+                instagram_user_id_param, instagram_native_post_id, caption_original, caption_cleaned,
+                post_api_data.get("media_type"), post_timestamp, post_api_data.get("like_count", 0),
+                post_api_data.get("comments_count", 0)
             )
-            post_table_db_id_tuple = cursor.fetchone()
-            if not post_table_db_id_tuple:
+            hashtags_by_post[instagram_native_post_id] = hashtags
+        if skip_unchanged and post_rows:
+            fetched_count = len(post_rows)
+            _drop_unchanged_posts(cursor, post_rows)
+            print(f"{fetched_count - len(post_rows)} gönderi değişmemiş, atlanıyor.")
+        if not post_rows:
+            print("Kaydedilecek yeni/değişmiş gönderi yok."); return 0
+        returned_ids = execute_values(
+            cursor,
+            """
+            INSERT INTO instagram_posts (instagram_user_id, instagram_post_id, caption_original, caption_cleaned, media_type, timestamp, like_count, comments_count)
+            VALUES %s
+            ON CONFLICT (instagram_post_id) DO UPDATE SET
+                caption_original = EXCLUDED.caption_original, caption_cleaned = EXCLUDED.caption_cleaned,
+                media_type = EXCLUDED.media_type, timestamp = EXCLUDED.timestamp,
+                like_count = EXCLUDED.like_count, comments_count = EXCLUDED.comments_count,
+                fetched_at = CURRENT_TIMESTAMP
+            RETURNING id, instagram_post_id;
+            """,
+            list(post_rows.values()), page_size=BULK_PAGE_SIZE, fetch=True
+        )
+        post_table_ids = {instagram_post_id: post_table_db_id for post_table_db_id, instagram_post_id in returned_ids}
+        hashtag_rows = []
+        for instagram_native_post_id in post_rows: # değişmediği için atlanan gönderilerin hashtag'leri zaten kayıtlı
+            post_table_db_id = post_table_ids.get(instagram_native_post_id)
+            if post_table_db_id is None:
                 print(f"Uyarı: Gönderi kaydedilemedi/ID alınamadı (Insta ID: {instagram_native_post_id}). Hashtag'ler atlanıyor.")
                 continue
-            post_table_db_id = post_table_db_id_tuple[0]
-            for hashtag in hashtags:
-                cursor.execute(
-                    "INSERT INTO post_hashtags (post_table_id, hashtag) VALUES (%s, %s) ON CONFLICT (post_table_id, hashtag) DO NOTHING;",
-                    (post_table_db_id, hashtag)
-                )
+            hashtag_rows.extend((post_table_db_id, hashtag) for hashtag in dict.fromkeys(hashtags_by_post[instagram_native_post_id]))
+        if hashtag_rows:
+            execute_values(
+                cursor,
+                "INSERT INTO post_hashtags (post_table_id, hashtag) VALUES %s ON CONFLICT (post_table_id, hashtag) DO NOTHING;",
+                hashtag_rows, page_size=BULK_PAGE_SIZE
+            )
         conn.commit()
-        print("Gönderiler ve hashtag'ler başarıyla kaydedildi/güncellendi.")
+        print(f"{len(post_table_ids)} gönderi ve {len(hashtag_rows)} hashtag başarıyla kaydedildi/güncellendi.")
+        sync_caption_index(conn, instagram_user_id_param)
+        return len(post_table_ids)
     except Exception as e:
         if conn: conn.rollback()
         print(f"Gönderileri kaydederken hata oluştu: {e}")
@@ -201,22 +428,24 @@ def save_daily_insights_to_db(conn, insights_data, metric_name_param, instagram_
         cursor = conn.cursor()
         if not insights_data: print(f"{metric_name_param} için API'den veri bulunamadı."); return
         print(f"{metric_name_param} insight verileri kaydediliyor...")
-        saved_count = 0
+        insight_rows = {} # tarih -> satır (ON CONFLICT anahtarına göre tekilleştirilmiş)
         if isinstance(insights_data, list) and len(insights_data) > 0:
             for data_item in insights_data:
                 metric_values = data_item.get('values', [])
                 for value_entry in metric_values:
                     insight_date_str = value_entry.get('end_time'); insight_date = None
                     if insight_date_str:
-                        try: insight_date = datetime.fromisoformat(insight_date_str.replace("+0000", "+00:00")).date()
+                        try: insight_date = _parse_graph_datetime(insight_date_str).date()
                         except ValueError: print(f"Geçersiz insight tarihi: {insight_date_str}"); continue
                     value = value_entry.get('value')
                     if insight_date is not None and value is not None:
-                        cursor.execute("""INSERT INTO daily_insights (instagram_user_id, metric_name, date, value)
-                                          VALUES (%s, %s, %s, %s) ON CONFLICT (instagram_user_id, metric_name, date)
-                                          DO UPDATE SET value = EXCLUDED.value, fetched_at = CURRENT_TIMESTAMP;""",
-                                       (instagram_user_id_param, metric_name_param, insight_date, value)); saved_count += 1
-        if saved_count > 0: conn.commit(); print(f"{saved_count} {metric_name_param} insight kaydedildi/güncellendi.")
+                        insight_rows[insight_date] = (instagram_user_id_param, metric_name_param, insight_date, value)
+        if insight_rows:
+            execute_values(cursor, """INSERT INTO daily_insights (instagram_user_id, metric_name, date, value)
+                                      VALUES %s ON CONFLICT (instagram_user_id, metric_name, date)
+                                      DO UPDATE SET value = EXCLUDED.value, fetched_at = CURRENT_TIMESTAMP;""",
+                           list(insight_rows.values()), page_size=BULK_PAGE_SIZE)
+            conn.commit(); print(f"{len(insight_rows)} {metric_name_param} insight kaydedildi/güncellendi.")
         else: print(f"{metric_name_param} için kaydedilecek 'values' bulunamadı. Veri: {insights_data}")
     except Exception as e:
         if conn: conn.rollback(); print(f"{metric_name_param} insight kaydederken hata: {e}"); raise
@@ -229,7 +458,7 @@ def save_follower_insights_to_db(conn, insights_data_list, metric_name_param, in
         cursor = conn.cursor()
         if not insights_data_list: print(f"{metric_name_param} için API'den veri bulunamadı."); return
         print(f"{metric_name_param} (period: {period_param}) insight verileri kaydediliyor...")
-        saved_count = 0
+        insight_rows = {} # dimension_key -> satır
         if isinstance(insights_data_list, list) and len(insights_data_list) > 0:
             for data_item in insights_data_list:
                 if "total_value" in data_item and "breakdowns" in data_item["total_value"] and data_item["total_value"]["breakdowns"]:
@@ -237,12 +466,14 @@ def save_follower_insights_to_db(conn, insights_data_list, metric_name_param, in
                         for result in breakdown_group.get("results", []):
                             dimension_values = result.get("dimension_values", []); dimension_key = dimension_values[0] if dimension_values else "unknown"; value = result.get("value")
                             if value is not None:
-                                cursor.execute("""INSERT INTO follower_insights (instagram_user_id, metric_name, dimension_key, value, period, data_date)
-                                                  VALUES (%s, %s, %s, %s, %s, %s) ON CONFLICT (instagram_user_id, metric_name, dimension_key, period, data_date)
-                                                  DO UPDATE SET value = EXCLUDED.value, fetched_at = CURRENT_TIMESTAMP;""",
-                                               (instagram_user_id_param, metric_name_param, dimension_key, value, period_param, data_date_param)); saved_count +=1
+                                insight_rows[dimension_key] = (instagram_user_id_param, metric_name_param, dimension_key, value, period_param, data_date_param)
                 else: print(f"{metric_name_param} için beklenmedik veri yapısı (breakdown yok): {data_item}")
-        if saved_count > 0: conn.commit(); print(f"{saved_count} {metric_name_param} insight kaydedildi/güncellendi.")
+        if insight_rows:
+            execute_values(cursor, """INSERT INTO follower_insights (instagram_user_id, metric_name, dimension_key, value, period, data_date)
+                                      VALUES %s ON CONFLICT (instagram_user_id, metric_name, dimension_key, period, data_date)
+                                      DO UPDATE SET value = EXCLUDED.value, fetched_at = CURRENT_TIMESTAMP;""",
+                           list(insight_rows.values()), page_size=BULK_PAGE_SIZE)
+            conn.commit(); print(f"{len(insight_rows)} {metric_name_param} insight kaydedildi/güncellendi.")
         else: print(f"{metric_name_param} için kaydedilecek 'breakdown' bulunamadı. Veri: {insights_data_list}")
     except Exception as e:
         if conn: conn.rollback(); print(f"{metric_name_param} ({period_param}) insight kaydederken hata: {e}"); raise
@@ -265,54 +496,150 @@ def save_single_value_follower_insight(conn, value_param, metric_name_param, ins
     finally:
         if cursor: cursor.close()
 
+# --- Yönetilen Hesaplar ---
+def load_managed_accounts(conn):
+    """Aktif hesapları ve token'larını [(ig_user_id, access_token), ...] olarak döndürür."""
+    cursor = None
+    try:
+        ensure_schema(conn)
+        cursor = conn.cursor()
+        cursor.execute("SELECT ig_user_id, access_token FROM instagram_accounts WHERE is_active ORDER BY id")
+        return cursor.fetchall()
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"Yönetilen hesaplar okunurken hata: {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+
 # --- Ana İş Akışı ---
-def run_pipeline():
+def run_pipeline(account_id=None, access_token=None):
+    """
+    Tek bir hesap için veri çekme + kaydetme akışı. account_id/access_token verilmezse common/.env'deki
+    hesap kullanılır. Hesap bazında özet (süre, yazılan satırlar, API çağrıları) döndürür.
+    """
+    account_id, access_token = account_id or ACCOUNT_ID, access_token or ACCESS_TOKEN
+    started = time.perf_counter()
+    summary = {"account_id": account_id, "ok": False, "posts_fetched": 0, "posts_written": 0, "insight_values": 0}
     print(f"Veri işleme başlatılıyor... Zaman: {datetime.now()}")
-    if not ACCOUNT_ID: print("❌ IG Hesap ID (ACCOUNT_ID) common/.env'de bulunamadı."); return
+    if not account_id: print("❌ IG Hesap ID (ACCOUNT_ID) common/.env'de bulunamadı."); return summary
     conn = None
     try:
         conn = get_db_connection()
-        if conn is None: print("❌ DB bağlantısı kurulamadı (db.py). Durduruldu."); return
+        if conn is None: print("❌ DB bağlantısı kurulamadı (db.py). Durduruldu."); return summary
         
-        print(f"Instagram Hesabı ID: {ACCOUNT_ID} için işlem yapılıyor.")
-        # clear_existing_data(conn, ACCOUNT_ID) # Verileri her seferinde silmek yerine ON CONFLICT ile güncelle
+        print(f"Instagram Hesabı ID: {account_id} için işlem yapılıyor.")
+        # clear_existing_data(conn, account_id) # Verileri her seferinde silmek yerine ON CONFLICT ile güncelle
+
+        ensure_schema(conn)
+        sync_state = load_sync_state(conn, account_id)
+
+        print("\n--- Instagram Verileri Çekiliyor (eşzamanlı) ---"); reset_call_latencies(account_id)
+        fetched = fetch_account_data_concurrently(sync_state=sync_state, account_id=account_id, access_token=access_token)
 
-        print("\n--- Gönderiler Çekiliyor ---"); posts = fetch_instagram_posts()
-        if posts: save_posts_to_db(conn, posts, ACCOUNT_ID)
-        else: print("Gönderi bulunamadı/çekilemedi.")
+        print("\n--- Gönderiler Kaydediliyor ---"); posts = fetched["posts"]
+        summary["posts_fetched"] = len(posts)
+        if posts: summary["posts_written"] = save_posts_to_db(conn, posts, account_id)
+        else: print("Yeni gönderi bulunamadı/çekilemedi.")
+        if fetched["posts_complete"] and posts:
+            # Sayfalama yarıda kaldıysa high-water mark ilerletilmez, bir sonraki çalıştırma boşluğu doldurur
+            update_sync_state(conn, account_id, POSTS_STATE_KEY, last_post_timestamp=latest_post_timestamp(posts))
         
-        print("\n--- Günlük Insight'lar Çekiliyor ---"); daily_metrics = {"reach": "reach", "profile_views": "profile_views", "accounts_engaged": "accounts_engaged", "impressions": "impressions"}
-        for api_metric, db_metric in daily_metrics.items(): print(f"Çekiliyor: Günlük {db_metric}..."); data = fetch_insights(api_metric); save_daily_insights_to_db(conn, data, db_metric, ACCOUNT_ID); print("-" * 30)
+        print("\n--- Günlük Insight'lar Kaydediliyor ---")
+        for db_metric, data in fetched["daily_insights"].items():
+            save_daily_insights_to_db(conn, data, db_metric, account_id)
+            summary["insight_values"] += sum(len(data_item.get("values", [])) for data_item in data or [])
+            last_end_time = latest_insight_end_time(data)
+            if last_end_time: update_sync_state(conn, account_id, db_metric, last_insight_end_time=last_end_time)
+            print("-" * 30)
         
-        print("\n--- Takipçi ve Demografi ---"); print("Çekiliyor: Takipçi Sayısı..."); follower_count = fetch_follower_count_direct()
-        save_single_value_follower_insight(conn, follower_count, "followers_count", ACCOUNT_ID, period_param='day', data_date_param=datetime.now().date()); print("-" * 30)
+        day_range = touched_day_range(posts, fetched["daily_insights"])
+        if day_range or summary["posts_written"]:
+            # Yalnızca bu çalıştırmanın dokunduğu günler (+ tarihsiz gönderi satırı) yeniden toplanır (dashboard'lar buradan okur)
+            rollup_days = refresh_account_daily_stats(conn, account_id, *(day_range or ()))
+            span = f"{day_range[0].date()} - {day_range[1].date()}" if day_range else "tarihsiz gönderiler"
+            print(f"account_daily_stats: {rollup_days} gün güncellendi ({span}).")
+        if summary["posts_written"]:
+            # Yazılan gönderilerin hashtag'leri (beğeni/yorum değişimi dahil) hesap bazında yeniden toplanır
+            touched_hashtags = hashtags_of_posts(conn, [post["id"] for post in posts if post.get("id")])
+            hashtag_rows = refresh_account_hashtag_stats(conn, account_id, touched_hashtags)
+            print(f"account_hashtag_stats: {hashtag_rows} hashtag güncellendi.")
+
+        print("\n--- Takipçi ve Demografi ---"); follower_count = fetched["follower_count"]
+        save_single_value_follower_insight(conn, follower_count, "followers_count", account_id, period_param='day', data_date_param=datetime.now().date()); print("-" * 30)
         
-        demographics = {"country": "follower_demographics_country", "gender": "follower_demographics_gender", "age": "follower_demographics_age"}
-        # Facebook API'sinde demografi için doğru metrik adı "audience_city", "audience_country", "audience_gender_age" olabilir.
-        # Veya bazen hepsi tek bir "page_fans_demographics" veya benzeri bir metrik altında toplanır.
-        # Kullandığınız API versiyonu ve izinlere göre bu metrik adını doğrulamanız önemlidir.
-        # Şimdilik "audience_demographics" kullanıyorum, bu genellikle daha genel bir demografi metriğidir.
-        for breakdown_key, db_metric_name in demographics.items():
-            print(f"Çekiliyor: Demografi - {breakdown_key}...");
-            # demographics_data = fetch_insights("follower_demographics", breakdown=breakdown_key) # Eski deneme
-            demographics_data = fetch_insights("audience_demographics", breakdown=breakdown_key) # Yeni deneme
-            if not demographics_data: # Eğer audience_demographics boş dönerse follower_demographics'i dene
-                print(f"audience_demographics ile {breakdown_key} verisi alınamadı, follower_demographics deneniyor...")
-                demographics_data = fetch_insights("follower_demographics", breakdown=breakdown_key)
-
-            save_follower_insights_to_db(conn, demographics_data, db_metric_name, ACCOUNT_ID, period_param='lifetime')
+        for db_metric_name, demographics_data in fetched["demographics"].items():
+            save_follower_insights_to_db(conn, demographics_data, db_metric_name, account_id, period_param='lifetime')
             print("-" * 30)
         
-        print(f"\n✅ Veri işleme tamamlandı. Zaman: {datetime.now()}")
+        print_latency_report(account_id)
+        summary["ok"] = True
+        print(f"\n✅ Veri işleme tamamlandı ({account_id}). Zaman: {datetime.now()}")
     except Exception as e:
-        print(f"❌ İşleme sırasında genel hata: {e}")
+        print(f"❌ İşleme sırasında genel hata ({account_id}): {e}")
+    finally:
+        if conn:
+            conn.close(); print("DB bağlantısı kapatıldı.")
+            # Kısmi başarıda da commit edilmiş veri olabilir; hesabın önbelleğe alınmış yanıtları geçersiz kılınır
+            invalidate_account(account_id)
+        summary["elapsed_seconds"] = time.perf_counter() - started
+        latencies = [v for values in get_call_latencies(account_id).values() for v in values]
+        summary["api_calls"] = len(latencies)
+        summary["api_latency_avg_ms"] = (sum(latencies) / len(latencies) * 1000) if latencies else 0.0
+        summary["api_latency_max_ms"] = max(latencies) * 1000 if latencies else 0.0
+    return summary
+
+# --- Çoklu Hesap İşçisi ---
+def print_worker_report(summaries, elapsed_seconds):
+    print("\n--- Hesap Bazında Alım Raporu ---")
+    print(f"{'hesap':<22}{'durum':<7}{'süre(sn)':>9}{'gönderi':>9}{'yazılan':>9}{'insight':>9}{'çağrı':>7}{'ort ms':>9}{'max ms':>9}{'gönderi/sn':>12}")
+    for summary in summaries:
+        elapsed = summary.get("elapsed_seconds") or 0
+        throughput = summary["posts_fetched"] / elapsed if elapsed else 0
+        print(f"{summary['account_id']:<22}{'OK' if summary['ok'] else 'HATA':<7}{elapsed:>9.2f}{summary['posts_fetched']:>9}"
+              f"{summary['posts_written']:>9}{summary['insight_values']:>9}{summary.get('api_calls', 0):>7}"
+              f"{summary.get('api_latency_avg_ms', 0):>9.1f}{summary.get('api_latency_max_ms', 0):>9.1f}{throughput:>12.1f}")
+    total_posts = sum(summary["posts_fetched"] for summary in summaries)
+    print(f"Toplam: {len(summaries)} hesap, {total_posts} gönderi, {elapsed_seconds:.2f} sn ({total_posts / elapsed_seconds if elapsed_seconds else 0:.1f} gönderi/sn)")
+
+def run_worker(max_parallel_accounts=INGEST_MAX_PARALLEL_ACCOUNTS):
+    """
+    instagram_accounts tablosundaki tüm aktif hesapları paralel olarak işler. Her hesap kendi iş
+    parçacığında ve kendi hız kovasıyla çalışır; kısıtlanan/yavaş bir hesap yalnızca kendini bekletir.
+    """
+    started = time.perf_counter()
+    conn = get_db_connection()
+    if conn is None: print("❌ DB bağlantısı kurulamadı (db.py). Durduruldu."); return []
+    try:
+        accounts = load_managed_accounts(conn)
     finally:
-        if conn: conn.close(); print("DB bağlantısı kapatıldı.")
+        conn.close()
+    if not accounts and ACCOUNT_ID and ACCESS_TOKEN:
+        print("instagram_accounts tablosu boş, common/.env'deki hesap kullanılacak.")
+        accounts = [(ACCOUNT_ID, ACCESS_TOKEN)]
+    if not accounts: print("❌ İşlenecek hesap bulunamadı."); return []
+    print(f"🚚 {len(accounts)} hesap, en fazla {max_parallel_accounts} paralel olarak işlenecek.")
+    summaries = []
+    with ThreadPoolExecutor(max_workers=max_parallel_accounts, thread_name_prefix="ig-account") as executor:
+        futures = {executor.submit(run_pipeline, account_id, access_token): account_id for account_id, access_token in accounts}
+        for future in as_completed(futures):
+            try:
+                summaries.append(future.result())
+            except Exception as e:
+                print(f"❌ {futures[future]} işlenirken beklenmedik hata: {e}")
+                summaries.append({"account_id": futures[future], "ok": False, "posts_fetched": 0, "posts_written": 0, "insight_values": 0})
+    print_worker_report(sorted(summaries, key=lambda summary: summary["account_id"]), time.perf_counter() - started)
+    return summaries
 
 if __name__ == "__main__":
-    if not ACCOUNT_ID or not ACCESS_TOKEN:
+    if not os.path.exists(ENV_PATH_COMMON):
+        print(f"Uyarı: {ENV_PATH_COMMON} bulunamadı. Ortam değişkenlerinin (IG_ACCESS_TOKEN, IG_ACCOUNT_ID) ayarlandığından emin olun.")
+    if "--worker" in sys.argv:
+        print("Çoklu hesap işçi modu: hesaplar ve token'lar instagram_accounts tablosundan okunacak.")
+        run_worker()
+    elif not ACCOUNT_ID or not ACCESS_TOKEN:
          print("Lütfen common/.env dosyasında IG_ACCOUNT_ID ve IG_ACCESS_TOKEN'ı ayarlayın ve script'i yeniden çalıştırın.")
     else:
         print(f"Başlatılıyor: common/.env dosyasından Hesap ID: {ACCOUNT_ID}, Token (ilk 10 krk): {ACCESS_TOKEN[:10]}...")
         print("Veritabanı bilgileri targetly-backend/.env dosyasından (db.py tarafından) okunacak.")
-        run_pipeline()
\ No newline at end of file
+        run_pipeline()
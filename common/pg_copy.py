@@ -0,0 +1,50 @@
+# SOCIALAI-OPTIMIZER/common/pg_copy.py
+# Satır üreteçlerini PostgreSQL COPY FROM STDIN (text biçimi) ile akış halinde yazar. Satırlar dosya gibi okunan
+# bir akıştan parça parça gönderilir; bellekte en fazla COPY_BUFFER_BYTES + bir grup satır tutulur.
+# Kullananlar: common/post_importer.py (CSV/JSONL içe aktarma), benchmarks/seed_data.py (sentetik veri).
+import io
+
+COPY_BUFFER_BYTES = 1 << 20
+_LINES_PER_READ = 2000
+
+
+class RowStream(io.TextIOBase):
+    """COPY FROM STDIN için satır üretecini dosya gibi okutur; üretilen satırlar belleğe toplanmaz."""
+
+    def __init__(self, lines):
+        self._lines = lines
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = "".join(line for _, line in zip(range(_LINES_PER_READ), self._lines))
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, ""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def copy_value(value):
+    if value is None:
+        return r"\N"
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return str(value) # sayı / tarih: kaçış gerektirmez
+
+
+def array_literal(values):
+    """Metin dizisi için PostgreSQL dizi literali; öğeler tırnaklanır (ör. 'null' etiketi NULL sayılmasın)."""
+    return "{" + ",".join('"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in values) + "}"
+
+
+def copy_rows(cursor, table, columns, rows):
+    """rows: tuple üreteci. COPY text biçiminde tek akışla yazar."""
+    lines = ("\t".join(copy_value(value) for value in row) + "\n" for row in rows)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", RowStream(lines), size=COPY_BUFFER_BYTES)
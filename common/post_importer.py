@@ -0,0 +1,333 @@
+# SOCIALAI-OPTIMIZER/common/post_importer.py
+# CSV / JSONL gönderi dışa aktarımlarını (ör. repo kökündeki posts.csv: id, caption, media_type, media_url, timestamp,
+# permalink, like_count, comments_count) toplu içe aktarır. Dosya satır satır okunur, açıklamalar text_cleaner ile
+# gruplar halinde temizlenir ve satırlar COPY ile geçici bir staging tablosuna akıtılır; ardından tek bir
+# transaction'da instagram_posts'a upsert ve post_hashtags'e ekleme yapılır. Bellek kullanımı dosya boyutundan
+# bağımsızdır (bir grup satır + COPY tamponu).
+#   python common/post_importer.py posts.csv --account <instagram_user_id>
+#   python common/post_importer.py export.jsonl.gz --account <instagram_user_id> --batch-size 20000
+# .gz uzantılı dosyalar açılarak okunur. Upsert kuralları save_posts_to_db ile aynıdır (aynı gönderi tekrar gelirse
+# son satır geçerli, değişmemiş gönderiler yeniden yazılmaz); ardından dokunulan günler account_daily_stats'ta,
+# dokunulan hashtag'ler account_hashtag_stats'ta yeniden hesaplanır, yeni gönderiler açıklama benzerlik indeksine
+# (targetly-backend/caption_index.py) eklenir ve hesabın dashboard önbelleği düşürülür.
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+CURRENT_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT_DIR = os.path.dirname(CURRENT_SCRIPT_DIR)
+TARGETLY_APP_BACKEND_PATH = os.path.join(PROJECT_ROOT_DIR, 'targetly-app', 'targetly-backend')
+for path in (PROJECT_ROOT_DIR, TARGETLY_APP_BACKEND_PATH):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from common.daily_rollups import refresh_account_daily_stats
+from common.hashtag_stats import refresh_account_hashtag_stats
+from common.pg_copy import array_literal, copy_rows
+from common.text_cleaner import clean_captions_batch
+
+IMPORT_BATCH_SIZE = int(os.getenv("POST_IMPORT_BATCH_SIZE", 5000)) # text_cleaner'a bir seferde verilen satır
+IMPORT_MAX_REPORTED_ERRORS = 10
+HASHTAG_MAX_LENGTH = 255 # post_hashtags.hashtag VARCHAR(255)
+STAGING_TABLE = "post_import_staging"
+MERGED_TABLE = "post_import_merged" # bu içe aktarmada eklenen / güncellenen gönderiler (hashtag'ler yalnızca bunlara)
+STAGING_COLUMNS = ["seq", "instagram_post_id", "caption_original", "caption_cleaned", "media_type", "timestamp",
+                   "like_count", "comments_count", "hashtags"]
+
+STAGING_TABLE_DDL = f"""
+CREATE TEMP TABLE {STAGING_TABLE} (
+    seq BIGINT NOT NULL,
+    instagram_post_id VARCHAR(64) NOT NULL,
+    caption_original TEXT,
+    caption_cleaned TEXT,
+    media_type VARCHAR(32),
+    timestamp TIMESTAMPTZ,
+    like_count INTEGER,
+    comments_count INTEGER,
+    hashtags TEXT[] NOT NULL
+) ON COMMIT DROP;
+CREATE TEMP TABLE {MERGED_TABLE} (post_table_id INTEGER NOT NULL, instagram_post_id VARCHAR(64) NOT NULL) ON COMMIT DROP;
+"""
+
+# Aynı gönderi dosyada birden çok kez geçerse son satır (en büyük seq) geçerlidir; değişmemiş satırlar güncellenmez
+MERGE_POSTS_QUERY = f"""
+WITH merged AS (
+    INSERT INTO instagram_posts (instagram_user_id, instagram_post_id, caption_original, caption_cleaned, media_type,
+                                 timestamp, like_count, comments_count)
+    SELECT DISTINCT ON (instagram_post_id) %(account_id)s, instagram_post_id, caption_original, caption_cleaned,
+           media_type, timestamp, like_count, comments_count
+    FROM {STAGING_TABLE}
+    ORDER BY instagram_post_id, seq DESC
+    ON CONFLICT (instagram_post_id) DO UPDATE SET
+        caption_original = EXCLUDED.caption_original, caption_cleaned = EXCLUDED.caption_cleaned,
+        media_type = EXCLUDED.media_type, timestamp = EXCLUDED.timestamp,
+        like_count = EXCLUDED.like_count, comments_count = EXCLUDED.comments_count,
+        fetched_at = CURRENT_TIMESTAMP
+    WHERE (instagram_posts.caption_original, instagram_posts.media_type, instagram_posts.timestamp,
+           instagram_posts.like_count, instagram_posts.comments_count)
+          IS DISTINCT FROM (EXCLUDED.caption_original, EXCLUDED.media_type, EXCLUDED.timestamp,
+                            EXCLUDED.like_count, EXCLUDED.comments_count)
+    RETURNING id, instagram_post_id, (xmax = 0) AS inserted
+), saved AS (
+    INSERT INTO {MERGED_TABLE} (post_table_id, instagram_post_id) SELECT id, instagram_post_id FROM merged
+)
+SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged
+"""
+
+# Değişmemiş gönderilerin hashtag'leri zaten yazılı olduğu için yalnızca eklenen / güncellenen gönderiler birleştirilir.
+# Dosyada tekrar eden gönderi varsa son satırın hashtag'leri alınır (DISTINCT ON yalnızca bu durumda gerekir).
+MERGE_HASHTAGS_QUERY = f"""
+INSERT INTO post_hashtags (post_table_id, hashtag)
+SELECT m.post_table_id, left(t.hashtag, {HASHTAG_MAX_LENGTH})
+FROM {{source}} s
+JOIN {MERGED_TABLE} m ON m.instagram_post_id = s.instagram_post_id
+CROSS JOIN LATERAL unnest(s.hashtags) AS t(hashtag)
+ON CONFLICT (post_table_id, hashtag) DO NOTHING
+"""
+LATEST_STAGED_ROWS = f"(SELECT DISTINCT ON (instagram_post_id) instagram_post_id, hashtags FROM {STAGING_TABLE} ORDER BY instagram_post_id, seq DESC)"
+
+STAGED_RANGE_QUERY = f"SELECT MIN(timestamp), MAX(timestamp), COUNT(DISTINCT instagram_post_id) FROM {STAGING_TABLE}"
+# Eklenen / güncellenen gönderilerin (eski hashtag'leri dahil) hashtag'leri; geçici tablolar commit'te silindiği
+# için hashtag_stats yenilemesinden önce okunur
+MERGED_HASHTAGS_QUERY = f"""
+SELECT DISTINCT h.hashtag FROM post_hashtags h JOIN {MERGED_TABLE} m ON m.post_table_id = h.post_table_id
+"""
+
+
+class ImportRecordError(ValueError):
+    """Dosyadaki bir satır gönderiye çevrilemedi (satır atlanır ve raporlanır)."""
+
+
+def detect_format(path):
+    name = path[:-3] if path.endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    raise ValueError(f"Dosya biçimi uzantıdan anlaşılamadı ({path}); --format csv|jsonl verin.")
+
+
+def open_export(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8-sig", newline="")
+    return open(path, "r", encoding="utf-8-sig", newline="")
+
+
+def read_records(file_obj, file_format):
+    """(satır no, kayıt sözlüğü veya ImportRecordError) üretir; dosya akış halinde okunur."""
+    if file_format == "csv":
+        reader = csv.DictReader(file_obj)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_no, line in enumerate(file_obj, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, ImportRecordError(f"geçersiz JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield line_no, ImportRecordError("satır bir JSON nesnesi değil")
+            continue
+        yield line_no, record
+
+
+def parse_export_timestamp(value):
+    """Graph API biçimi (2023-01-30T17:54:04+0000), ISO 8601 ('Z' dahil) veya unix saniye."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)) or str(value).isdigit():
+        return datetime.fromtimestamp(int(value), tz=timezone.utc)
+    text = str(value).strip().replace("Z", "+00:00")
+    if len(text) > 5 and text[-5] in "+-" and text[-4:].isdigit():
+        text = f"{text[:-2]}:{text[-2:]}" # +0000 -> +00:00
+    parsed = datetime.fromisoformat(text)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _count_value(value):
+    if value in (None, ""):
+        return 0
+    return int(float(value))
+
+
+def parse_record(record):
+    """Kaydı (instagram_post_id, caption, media_type, timestamp, like_count, comments_count) tuple'ına çevirir."""
+    post_id = str(record.get("id") or "").strip()
+    if not post_id:
+        raise ImportRecordError("'id' alanı boş")
+    if len(post_id) > 64:
+        raise ImportRecordError(f"'id' 64 karakterden uzun: {post_id[:20]}...")
+    caption = record.get("caption")
+    try:
+        timestamp = parse_export_timestamp(record.get("timestamp"))
+    except (ValueError, OverflowError, OSError):
+        raise ImportRecordError(f"geçersiz timestamp: {record.get('timestamp')!r}")
+    try:
+        like_count = _count_value(record.get("like_count"))
+        comments_count = _count_value(record.get("comments_count"))
+    except (TypeError, ValueError):
+        raise ImportRecordError("like_count / comments_count sayı değil")
+    media_type = record.get("media_type") or None
+    return post_id, caption if isinstance(caption, str) else "", media_type and str(media_type)[:32], timestamp, like_count, comments_count
+
+
+class _ImportProgress:
+    def __init__(self, progress):
+        self.progress = progress
+        self.started = time.perf_counter()
+        self.rows_read = 0
+        self.rows_staged = 0
+        self.rows_skipped = 0
+        self.errors = []
+
+    def skip(self, line_no, error):
+        self.rows_skipped += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append(f"satır {line_no}: {error}")
+
+    def report(self):
+        if self.progress:
+            elapsed = time.perf_counter() - self.started
+            print(f"ℹ️ {self.rows_staged} satır staging'e yazıldı ({self.rows_staged / elapsed:.0f} satır/sn, "
+                  f"{self.rows_skipped} atlandı).")
+
+
+def staged_rows(records, batch_size, progress):
+    """Kayıtları batch_size'lık gruplar halinde temizleyip staging (COPY) satırlarına çevirir."""
+    batch = []
+
+    def flush():
+        cleaned = clean_captions_batch(row[1] for row in batch)
+        for (post_id, caption, media_type, timestamp, like_count, comments_count), (caption_cleaned, hashtags) in zip(batch, cleaned):
+            progress.rows_staged += 1
+            yield (progress.rows_staged, post_id, caption, caption_cleaned, media_type, timestamp, like_count,
+                   comments_count, array_literal(dict.fromkeys(hashtags)))
+        batch.clear()
+        progress.report()
+
+    for line_no, record in records:
+        progress.rows_read += 1
+        if isinstance(record, ImportRecordError):
+            progress.skip(line_no, record)
+            continue
+        try:
+            batch.append(parse_record(record))
+        except ImportRecordError as e:
+            progress.skip(line_no, e)
+            continue
+        if len(batch) >= batch_size:
+            yield from flush()
+    if batch:
+        yield from flush()
+
+
+def import_posts(conn, records, account_id, batch_size=IMPORT_BATCH_SIZE, progress=True):
+    """
+    (satır no, kayıt) üretecini tek transaction'da içe aktarır ve özet döndürür. Hata olursa hiçbir satır yazılmaz.
+    records: read_records() çıktısı veya Graph API biçiminde sözlükler üreten (satır no, kayıt) çiftleri.
+    """
+    from migrate import ensure_schema # targetly-backend/migrate.py; özet tablolar migration'larla oluşturulur
+
+    state = _ImportProgress(progress)
+    summary = {"account_id": account_id, "posts_inserted": 0, "posts_updated": 0, "hashtags_inserted": 0}
+    day_range = None
+    touched_hashtags = []
+    cursor = None
+    try:
+        ensure_schema(conn)
+        cursor = conn.cursor()
+        cursor.execute(STAGING_TABLE_DDL)
+        copy_rows(cursor, STAGING_TABLE, STAGING_COLUMNS, staged_rows(records, batch_size, state))
+        copy_seconds = time.perf_counter() - state.started
+        cursor.execute(f"ANALYZE {STAGING_TABLE}")
+        cursor.execute(STAGED_RANGE_QUERY)
+        first_timestamp, last_timestamp, distinct_posts = cursor.fetchone()
+        if first_timestamp is not None:
+            day_range = (first_timestamp, last_timestamp)
+        cursor.execute(MERGE_POSTS_QUERY, {"account_id": account_id})
+        summary["posts_inserted"], summary["posts_updated"] = cursor.fetchone()
+        cursor.execute(f"ANALYZE {MERGED_TABLE}")
+        source = STAGING_TABLE if distinct_posts == state.rows_staged else LATEST_STAGED_ROWS
+        cursor.execute(MERGE_HASHTAGS_QUERY.format(source=source))
+        summary["hashtags_inserted"] = cursor.rowcount
+        cursor.execute(MERGED_HASHTAGS_QUERY)
+        touched_hashtags = [row[0] for row in cursor.fetchall()]
+        conn.commit() # geçici tablolar ON COMMIT DROP ile silinir
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"❌ Gönderi içe aktarma başarısız ({account_id}): {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+
+    if summary["posts_inserted"] or summary["posts_updated"]:
+        # day_range yoksa (yalnızca tarihsiz gönderiler) sadece hesabın tarihsiz satırı yeniden toplanır
+        summary["rollup_days"] = refresh_account_daily_stats(conn, account_id, *(day_range or ()))
+        summary["hashtag_stats_rows"] = refresh_account_hashtag_stats(conn, account_id, touched_hashtags)
+        from caption_index import sync_account_index
+        from response_cache import invalidate_account
+
+        summary["caption_index_posts"] = sync_account_index(conn, account_id) # yalnızca yeni eklenen gönderiler
+
+        invalidate_account(account_id)
+    elapsed = time.perf_counter() - state.started
+    summary.update({
+        "rows_read": state.rows_read,
+        "rows_staged": state.rows_staged,
+        "rows_skipped": state.rows_skipped,
+        "distinct_posts": distinct_posts,
+        "posts_unchanged": distinct_posts - summary["posts_inserted"] - summary["posts_updated"],
+        "errors": state.errors,
+        "copy_seconds": round(copy_seconds, 3),
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(state.rows_read / elapsed, 1) if elapsed else 0.0,
+    })
+    return summary
+
+
+def import_file(conn, path, account_id, file_format=None, batch_size=IMPORT_BATCH_SIZE, progress=True):
+    file_format = file_format or detect_format(path)
+    with open_export(path) as file_obj:
+        return import_posts(conn, read_records(file_obj, file_format), account_id, batch_size, progress)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV / JSONL gönderi dışa aktarımlarını COPY ile içe aktar")
+    parser.add_argument("path", help="CSV veya JSONL dosyası (.gz olabilir)")
+    parser.add_argument("--account", help="Gönderilerin ait olduğu instagram_user_id (varsayılan: IG_ACCOUNT_ID)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Varsayılan: dosya uzantısından")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--quiet", action="store_true", help="Grup bazında ilerleme yazma")
+    args = parser.parse_args()
+
+    from db import get_db_connection # backend/.env + common/.env'i yükler
+
+    account = args.account or os.getenv("IG_ACCOUNT_ID")
+    if not account:
+        print("❌ Hesap belirtilmedi: --account verin veya IG_ACCOUNT_ID ayarlayın.")
+        sys.exit(1)
+    connection = get_db_connection()
+    if connection is None:
+        print("❌ DB bağlantısı kurulamadı (db.py). Durduruldu.")
+        sys.exit(1)
+    try:
+        result = import_file(connection, args.path, account, args.format, args.batch_size, progress=not args.quiet)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
+    for error in result["errors"]:
+        print(f"⚠️ Atlanan {error}")
+    print(f"✅ {result['rows_read']} satır okundu ({result['rows_skipped']} atlandı): {result['posts_inserted']} yeni, "
+          f"{result['posts_updated']} güncellenen, {result['posts_unchanged']} değişmemiş gönderi, "
+          f"{result['hashtags_inserted']} hashtag. {result['seconds']} sn ({result['rows_per_second']} satır/sn).")
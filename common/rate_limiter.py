@@ -0,0 +1,164 @@
+# SOCIALAI-OPTIMIZER/common/rate_limiter.py
+# Graph API kullanım başlıklarına (X-App-Usage, X-Business-Use-Case-Usage) göre kendini ayarlayan
+# token-bucket zamanlayıcı ve üstel geri çekilme (exponential backoff) yardımcıları.
+import json
+import os
+import random
+import threading
+import time
+
+APP_CALLS_PER_SECOND = float(os.getenv("IG_APP_CALLS_PER_SECOND", 20)) # uygulama geneli taban hız
+ACCOUNT_CALLS_PER_SECOND = float(os.getenv("IG_ACCOUNT_CALLS_PER_SECOND", 5)) # hesap başına taban hız
+USAGE_SLOWDOWN_THRESHOLD = float(os.getenv("IG_USAGE_SLOWDOWN_THRESHOLD", 75)) # % kullanımda yavaşlamaya başla
+USAGE_PAUSE_THRESHOLD = float(os.getenv("IG_USAGE_PAUSE_THRESHOLD", 95)) # % kullanımda beklemeye geç
+USAGE_PAUSE_SECONDS = float(os.getenv("IG_USAGE_PAUSE_SECONDS", 60))
+BACKOFF_BASE_SECONDS = float(os.getenv("IG_BACKOFF_BASE_SECONDS", 1))
+BACKOFF_MAX_SECONDS = float(os.getenv("IG_BACKOFF_MAX_SECONDS", 60))
+
+# Graph API hız sınırı hata kodları (uygulama, kullanıcı, sayfa ve iş kullanım durumu sınırları)
+THROTTLE_ERROR_CODES = {4, 17, 32, 613} | set(range(80001, 80015))
+
+
+class TokenBucket:
+    """rate token/saniye dolan, en fazla capacity token tutan thread-safe kova."""
+
+    def __init__(self, rate, capacity=None):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Bir token alınana kadar bekler; beklenen süreyi (saniye) döndürür."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def set_usage(self, usage_percent):
+        """Kullanım yüzdesi eşiği aştıkça hızı doğrusal olarak düşürür."""
+        with self._lock:
+            if usage_percent <= USAGE_SLOWDOWN_THRESHOLD:
+                self.rate = self.base_rate
+            else:
+                headroom = max(0.0, 100.0 - usage_percent) / (100.0 - USAGE_SLOWDOWN_THRESHOLD)
+                self.rate = max(self.base_rate * headroom, self.base_rate * 0.05)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _max_usage_percent(usage):
+    values = [usage.get(key, 0) or 0 for key in ("call_count", "total_cputime", "total_time")]
+    return max(values) if values else 0
+
+
+def parse_app_usage(headers):
+    """X-App-Usage: {"call_count": 28, "total_time": 25, "total_cputime": 25} -> en yüksek yüzde."""
+    raw = headers.get("X-App-Usage")
+    if not raw:
+        return None
+    try:
+        return _max_usage_percent(json.loads(raw))
+    except (ValueError, AttributeError):
+        return None
+
+
+def parse_business_usage(headers):
+    """
+    X-Business-Use-Case-Usage: {"<business_id>": [{"type": "instagram", "call_count": 95, ...,
+    "estimated_time_to_regain_access": 2}]} -> (en yüksek yüzde, erişimin geri gelmesi için dakika).
+    """
+    raw = headers.get("X-Business-Use-Case-Usage")
+    if not raw:
+        return None, 0
+    try:
+        usage_by_business = json.loads(raw)
+    except ValueError:
+        return None, 0
+    highest, regain_minutes = 0, 0
+    for entries in usage_by_business.values():
+        for entry in entries if isinstance(entries, list) else [entries]:
+            highest = max(highest, _max_usage_percent(entry))
+            regain_minutes = max(regain_minutes, entry.get("estimated_time_to_regain_access", 0) or 0)
+    return highest, regain_minutes
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, maximum=BACKOFF_MAX_SECONDS):
+    """attempt (0'dan başlar) için 'full jitter' üstel geri çekilme süresi."""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+def is_throttle_response(response):
+    if response.status_code == 429:
+        return True
+    if response.status_code not in (400, 403):
+        return False
+    try:
+        return response.json().get("error", {}).get("code") in THROTTLE_ERROR_CODES
+    except ValueError:
+        return False
+
+
+class GraphRateLimiter:
+    """
+    Uygulama geneli bir kova ve hesap başına ayrı kovalar tutar. Bir hesabın kısıtlanması
+    yalnızca o hesabın kovasını yavaşlatır/durdurur; diğer hesaplar çalışmaya devam eder.
+    """
+
+    def __init__(self, app_rate=APP_CALLS_PER_SECOND, account_rate=ACCOUNT_CALLS_PER_SECOND):
+        self.app_bucket = TokenBucket(app_rate)
+        self.account_rate = account_rate
+        self._account_buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, account_id):
+        with self._lock:
+            bucket = self._account_buckets.get(account_id)
+            if bucket is None:
+                bucket = self._account_buckets[account_id] = TokenBucket(self.account_rate)
+            return bucket
+
+    def acquire(self, account_id):
+        # Önce hesabın kendi kovası: kısıtlanmış bir hesap uygulama kovasından token harcamadan bekler
+        waited = self.bucket_for(account_id).acquire()
+        return waited + self.app_bucket.acquire()
+
+    def observe(self, account_id, headers):
+        app_usage = parse_app_usage(headers)
+        if app_usage is not None:
+            self.app_bucket.set_usage(app_usage)
+            if app_usage >= USAGE_PAUSE_THRESHOLD:
+                self.app_bucket.pause(USAGE_PAUSE_SECONDS)
+        business_usage, regain_minutes = parse_business_usage(headers)
+        if business_usage is not None:
+            bucket = self.bucket_for(account_id)
+            bucket.set_usage(business_usage)
+            if regain_minutes:
+                bucket.pause(regain_minutes * 60)
+            elif business_usage >= USAGE_PAUSE_THRESHOLD:
+                bucket.pause(USAGE_PAUSE_SECONDS)
+
+    def throttled(self, account_id, attempt):
+        """Hız sınırı yanıtından sonra hesabın kovasını geri çekilme süresi kadar durdurur."""
+        delay = backoff_delay(attempt)
+        self.bucket_for(account_id).pause(delay)
+        return delay
@@ -0,0 +1,143 @@
+# SOCIALAI-OPTIMIZER/common/redis_stub_server.py
+# Yanıt önbelleğinin redis arka ucunu gerçek bir Redis kurmadan denemek için küçük, bağımlılıksız
+# bir RESP2 sunucusu. Yalnızca önbelleğin kullandığı komutları destekler (GET/SET EX/INCRBY/DEL/SCAN...).
+#   python common/redis_stub_server.py --port 6390
+#   RESPONSE_CACHE_BACKEND=redis RESPONSE_CACHE_REDIS_URL=redis://127.0.0.1:6390/0 python targetly-app/targetly-backend/app.py
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+
+
+class RedisStubStore:
+    def __init__(self):
+        self.data = {}  # key -> (value bytes, expires_at veya None)
+        self.lock = threading.Lock()
+
+    def _alive(self, key, now):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, command, args):
+        now = time.monotonic()
+        with self.lock:
+            if command == "PING":
+                return "+PONG" if not args else args[0]
+            if command in ("CLIENT", "SELECT"):
+                return "+OK"
+            if command == "GET":
+                entry = self._alive(args[0], now)
+                return entry[0] if entry else None
+            if command == "SET":
+                expires_at, options = None, [a.decode().upper() for a in args[2:]]
+                if "EX" in options:
+                    expires_at = now + int(args[2 + options.index("EX") + 1])
+                elif "PX" in options:
+                    expires_at = now + int(args[2 + options.index("PX") + 1]) / 1000.0
+                if "NX" in options and self._alive(args[0], now):
+                    return None
+                self.data[args[0]] = (args[1], expires_at)
+                return "+OK"
+            if command in ("INCR", "INCRBY"):
+                entry = self._alive(args[0], now)
+                amount = int(args[1]) if command == "INCRBY" else 1
+                value = (int(entry[0]) if entry else 0) + amount
+                self.data[args[0]] = (str(value).encode(), entry[1] if entry else None)
+                return value
+            if command == "DEL":
+                return sum(1 for key in args if self.data.pop(key, None) is not None)
+            if command == "EXISTS":
+                return sum(1 for key in args if self._alive(key, now))
+            if command == "EXPIRE":
+                entry = self._alive(args[0], now)
+                if not entry:
+                    return 0
+                self.data[args[0]] = (entry[0], now + int(args[1]))
+                return 1
+            if command == "SCAN":
+                options = [a.decode().upper() for a in args[1:]]
+                pattern = args[1 + options.index("MATCH") + 1].decode() if "MATCH" in options else "*"
+                keys = [key for key in list(self.data) if self._alive(key, now) and fnmatch.fnmatchcase(key.decode(), pattern)]
+                return [b"0", keys]  # tek seferde tüm anahtarlar
+            if command == "DBSIZE":
+                return sum(1 for key in list(self.data) if self._alive(key, now))
+            if command == "FLUSHDB":
+                self.data.clear()
+                return "+OK"
+        return Exception(f"ERR unknown command '{command}'")
+
+
+def encode(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, Exception):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, str):
+        return f"{value}\r\n".encode()  # +OK gibi basit yanıtlar
+    if isinstance(value, int):
+        return f":{value}\r\n".encode()
+    if isinstance(value, bytes):
+        return b"$" + str(len(value)).encode() + b"\r\n" + value + b"\r\n"
+    return b"*" + str(len(value)).encode() + b"\r\n" + b"".join(encode(item) for item in value)
+
+
+class RedisStubHandler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.strip().split()  # inline komut (ör. telnet)
+        parts = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            parts.append(self.rfile.read(length + 2)[:-2])
+        return parts
+
+    def handle(self):
+        while True:
+            parts = self._read_command()
+            if parts is None:
+                return
+            if not parts:
+                continue
+            command = parts[0].decode().upper()
+            self.wfile.write(encode(self.server.store.execute(command, parts[1:])))
+
+
+class RedisStubServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def make_server(host="127.0.0.1", port=6390):
+    server = RedisStubServer((host, port), RedisStubHandler)
+    server.store = RedisStubStore()
+    return server
+
+
+def start_in_background(**kwargs):
+    """Sunucuyu arka plan iş parçacığında başlatır; (server, redis_url) döndürür."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"redis://{host}:{port}/0"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Yerel, bellek içi Redis (RESP2) stub sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    stub = make_server(args.host, args.port)
+    print(f"🧪 Redis stub redis://{args.host}:{args.port}/0 adresinde. Durdurmak için Ctrl+C.")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
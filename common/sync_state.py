@@ -0,0 +1,56 @@
+# SOCIALAI-OPTIMIZER/common/sync_state.py
+# Hesap ve metrik bazında "en son nereye kadar veri alındı" bilgisini (high-water mark) tutar.
+# run_pipeline bu bilgiyle Graph API çağrılarını since/until pencereleriyle sınırlar.
+# Tablo (ingestion_sync_state) targetly-backend/migrations/0002 ile oluşturulur.
+from datetime import datetime, timezone
+
+POSTS_STATE_KEY = "posts" # gönderiler için metric_name değeri
+
+
+def load_sync_state(conn, instagram_user_id_param):
+    """metric_name -> {"last_post_timestamp": ..., "last_insight_end_time": ...} döndürür."""
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT metric_name, last_post_timestamp, last_insight_end_time FROM ingestion_sync_state WHERE instagram_user_id = %s",
+            (instagram_user_id_param,)
+        )
+        return {row[0]: {"last_post_timestamp": row[1], "last_insight_end_time": row[2]} for row in cursor.fetchall()}
+    finally:
+        if cursor: cursor.close()
+
+
+def update_sync_state(conn, instagram_user_id_param, metric_name_param, last_post_timestamp=None, last_insight_end_time=None):
+    """High-water mark'ı yalnızca ileri taşır (GREATEST); None değerler mevcut değeri korur."""
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO ingestion_sync_state (instagram_user_id, metric_name, last_post_timestamp, last_insight_end_time, last_synced_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (instagram_user_id, metric_name) DO UPDATE SET
+                last_post_timestamp = GREATEST(ingestion_sync_state.last_post_timestamp, EXCLUDED.last_post_timestamp),
+                last_insight_end_time = GREATEST(ingestion_sync_state.last_insight_end_time, EXCLUDED.last_insight_end_time),
+                last_synced_at = CURRENT_TIMESTAMP;
+        """, (instagram_user_id_param, metric_name_param, last_post_timestamp, last_insight_end_time))
+        conn.commit()
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"{metric_name_param} için senkronizasyon durumu güncellenirken hata: {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+
+
+def to_unix(value):
+    """datetime -> Graph API'nin since/until için beklediği unix zaman damgası."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
@@ -1,36 +1,139 @@
+import hashlib
 import re
+import threading
 import unicodedata
+from collections import OrderedDict
+
+# Desenler modül yüklenirken bir kez derlenir (her çağrıda yeniden oluşturulmaz)
+EMOJI_PATTERN = re.compile("["
+    u"\U0001F600-\U0001F64F"  # yüz ifadeleri
+    u"\U0001F300-\U0001F5FF"  # semboller
+    u"\U0001F680-\U0001F6FF"  # taşıtlar
+    u"\U0001F1E0-\U0001F1FF"  # bayraklar
+    "]+", flags=re.UNICODE)
+LINK_PATTERN = re.compile(r"http\S+")
+MENTION_PATTERN = re.compile(r"@\w+")
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+# Tek geçişlik birleşik desen:
+#   drop : art arda silinecek parçalar (emoji, link, mention) ve ardlarındaki boşluklar
+#   space: tek bir " " dışındaki boşluk dizileri (satır sonu, sekme, çoklu boşluk) -> " "
+#   tag  : hashtag'ler metinde kalır ve toplanır
+# Baştaki ileri bakış eşleşebilecek ilk karakter kümesidir; re motoru diğer konumları hızlıca atlar.
+# Mention ve hashtag bir linkin başladığı yerde biter ("#kamphttp://..." -> "#kamp"); ayrı geçişlerde link önce silinirdi.
+_WORD_BEFORE_LINK = r"(?:(?!http\S)\w)+"
+_TOKEN_PATTERN = re.compile(
+    f"(?=[\\s@#h{EMOJI_PATTERN.pattern[1:-2]}])(?:"
+    f"(?P<drop>(?:(?:{EMOJI_PATTERN.pattern}|{LINK_PATTERN.pattern}|@{_WORD_BEFORE_LINK})\\s*)+)"
+    r"|(?P<space>\s{2,}|[^\S ])"
+    f"|#(?P<tag>{_WORD_BEFORE_LINK}))",
+    flags=re.UNICODE)
+
+CAPTION_CACHE_SIZE = 50000  # yeniden çekilen açıklamaların çoğu değişmediği için sonuçlar hatırlanır
 
 def normalize_unicode(text):
     return unicodedata.normalize("NFKC", text)
 
 def remove_emojis(text):
-    emoji_pattern = re.compile("["
-        u"\U0001F600-\U0001F64F"  # yüz ifadeleri
-        u"\U0001F300-\U0001F5FF"  # semboller
-        u"\U0001F680-\U0001F6FF"  # taşıtlar
-        u"\U0001F1E0-\U0001F1FF"  # bayraklar
-        "]+", flags=re.UNICODE)
-    return emoji_pattern.sub(r'', text)
+    return EMOJI_PATTERN.sub(r'', text)
 
 def clean_specials(text):
-    text = re.sub(r"http\S+", "", text)         # linkler
-    text = re.sub(r"@\w+", "", text)            # mentionlar
+    text = LINK_PATTERN.sub("", text)           # linkler
+    text = MENTION_PATTERN.sub("", text)        # mentionlar
     return text
 
 def clean_whitespace(text):
-    text = text.replace("\n", " ")              # satır sonları
-    text = re.sub(r"\s+", " ", text).strip()    # fazla boşluk
-    return text
+    return " ".join(text.split())  # satır sonları ve fazla boşluk (\s+ ile aynı karakter kümesi)
+
+def _clean_single_pass(text):
+    """
+    NFKC'den sonra tek re.sub geçişi: (temizlenmiş metin, hashtag listesi). Silinen parçalar ayrı geçişlerdeki
+    gibi boşlukla ayrılmışlarsa tek boşluk bırakır ("a 😀 b" -> "a b"), bitişiklerse bırakmaz ("a😀b" -> "ab").
+    """
+    hashtags = []
+
+    def replace(match):
+        kind = match.lastgroup
+        if kind == "tag":
+            hashtags.append(match.group("tag"))
+            return match.group(0)
+        if kind == "space":
+            return " "
+        start = match.start()
+        if start == 0 or match.string[start - 1].isspace(): # önündeki boşluk zaten yazıldı (veya metin başı)
+            return ""
+        dropped = match.group(0)
+        return "" if dropped.split() == [dropped] else " "
+
+    return _TOKEN_PATTERN.sub(replace, normalize_unicode(text)).strip(), hashtags
+
+def _caption_key(text):
+    # Anahtar açıklamanın özeti: önbellek ham açıklama metinlerini tutmaz
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+_caption_cache = OrderedDict() # özet -> (temizlenmiş metin, hashtag demeti); en eski kullanılan atılır
+_caption_cache_lock = threading.Lock()
+
+
+def _clean_and_extract(text):
+    key = _caption_key(text)
+    with _caption_cache_lock:
+        result = _caption_cache.get(key)
+        if result is not None:
+            _caption_cache.move_to_end(key)
+            return result
+    cleaned, hashtags = _clean_single_pass(text)
+    result = (cleaned, tuple(hashtags))
+    with _caption_cache_lock:
+        _caption_cache[key] = result
+        if len(_caption_cache) > CAPTION_CACHE_SIZE:
+            _caption_cache.popitem(last=False)
+    return result
 
 def clean_caption(text):
     if not isinstance(text, str): return ""
-    text = normalize_unicode(text)
-    text = remove_emojis(text)
-    text = clean_specials(text)
-    text = clean_whitespace(text)
-    return text
+    return _clean_and_extract(text)[0]
 
 def extract_hashtags(text):
     if not isinstance(text, str): return []
-    return re.findall(r"#(\w+)", text)
+    return list(_clean_and_extract(text)[1])
+
+def clean_captions_batch(captions):
+    """
+    Her açıklama için (temizlenmiş metin, hashtag listesi) döndürür.
+    Aynı açıklama için clean_caption + extract_hashtags çağırmaktan farklı olarak metin
+    bir kez işlenir; daha önce görülmüş açıklamalar önbellekten gelir.
+    """
+    results = []
+    for text in captions:
+        if not isinstance(text, str):
+            results.append(("", []))
+            continue
+        cleaned, hashtags = _clean_and_extract(text)
+        results.append((cleaned, list(hashtags)))
+    return results
+
+def clean_captions_frame(df, column="caption", cleaned_column="caption_cleaned", hashtags_column="hashtags"):
+    """
+    Bir pandas DataFrame'in açıklama sütununu temizler; temizlenmiş metin ve hashtag listelerini
+    yeni sütunlar olarak ekler (kopya döndürür). Sütun önce pd.factorize ile benzersiz değerlere
+    indirgenir, her benzersiz açıklama bir kez işlenir ve sonuçlar kodlarla NumPy take ile dağıtılır.
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+    pairs = clean_captions_batch(uniques)
+    # Son eleman eksik değerler (-1 kodu) içindir
+    cleaned_values = np.array([cleaned for cleaned, _ in pairs] + [""], dtype=object)
+    hashtag_values = np.empty(len(pairs) + 1, dtype=object)
+    hashtag_values[:] = [hashtags for _, hashtags in pairs] + [[]]
+    result = df.copy()
+    result[cleaned_column] = cleaned_values.take(codes)
+    # Aynı açıklamaya sahip satırlar aynı liste nesnesini paylaşmasın
+    result[hashtags_column] = [list(hashtags) for hashtags in hashtag_values.take(codes)]
+    return result
+
+def clear_caption_cache():
+    with _caption_cache_lock:
+        _caption_cache.clear()
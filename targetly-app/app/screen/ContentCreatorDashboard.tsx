@@ -15,6 +15,8 @@ const ContentCreatorDashboard = ({ onLogout }) => {
   const [dashboardData, setDashboardData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [managedIgUserId, setManagedIgUserId] = useState(null); // Yönetilen IG hesabının ID'si
+  const [postsCursor, setPostsCursor] = useState(null); // Sonraki gönderi sayfası (allPostsPage.nextCursor)
+  const [loadingMorePosts, setLoadingMorePosts] = useState(false);
 
   // 1. Yönetilen Instagram Hesabının ID'sini Al
   useEffect(() => {
@@ -69,9 +71,11 @@ const ContentCreatorDashboard = ({ onLogout }) => {
     }
     setLoading(true);
     setDashboardData(null); 
+    setPostsCursor(null);
     try {
       const response = await axios.get(`${API_BASE_URL}/api/content-creator/dashboard-data/${igAccountId}`);
       setDashboardData(response.data);
+      setPostsCursor(response.data.allPostsPage?.nextCursor || null); // allPosts yalnızca ilk sayfa
       console.log("[CC Dashboard] Dashboard verisi başarıyla çekildi:", response.data);
     } catch (error) {
       console.error(`[CC Dashboard] Dashboard verilerini çekerken hata (IG ID: ${igAccountId}):`, error);
@@ -82,6 +86,29 @@ const ContentCreatorDashboard = ({ onLogout }) => {
     }
   }, []); 
 
+  // 2b. Sonraki Gönderi Sayfasını Çekip Listeye Ekleme ("Load More")
+  const loadMorePosts = useCallback(async () => {
+    if (!managedIgUserId || !postsCursor || loadingMorePosts) return;
+    setLoadingMorePosts(true);
+    try {
+      const response = await axios.get(`${API_BASE_URL}/api/content-creator/posts/${managedIgUserId}`, {
+        params: { cursor: postsCursor, limit: dashboardData?.allPostsPage?.limit },
+      });
+      const { posts = [], nextCursor = null } = response.data;
+      setDashboardData(prev => {
+        if (!prev) return prev;
+        const seenIds = new Set((prev.allPosts || []).map(post => post.id));
+        return { ...prev, allPosts: [...(prev.allPosts || []), ...posts.filter(post => !seenIds.has(post.id))] };
+      });
+      setPostsCursor(nextCursor);
+    } catch (error) {
+      console.error(`[CC Dashboard] Sonraki gönderi sayfası çekilirken hata (IG ID: ${managedIgUserId}):`, error);
+      window.alert("Daha fazla gönderi yüklenirken bir sorun oluştu.");
+    } finally {
+      setLoadingMorePosts(false);
+    }
+  }, [managedIgUserId, postsCursor, loadingMorePosts, dashboardData]);
+
   // 3. managedIgUserId Değiştiğinde Dashboard Verilerini Çek
   useEffect(() => {
     console.log('[CC Dashboard] useEffect[managedIgUserId] tetiklendi. IG ID:', managedIgUserId);
@@ -201,6 +228,17 @@ const ContentCreatorDashboard = ({ onLogout }) => {
               <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
                 {dashboardData.allPosts.map(renderPostCard)}
               </div>
+              {postsCursor && (
+                <div className="flex justify-center mt-8">
+                  <button
+                    onClick={loadMorePosts}
+                    disabled={loadingMorePosts}
+                    className="bg-indigo-600 hover:bg-indigo-700 disabled:opacity-60 text-white font-semibold py-2 px-6 rounded-lg shadow flex items-center gap-2"
+                  >
+                    {loadingMorePosts ? <><FaSpinner className="animate-spin" /> Loading...</> : 'Load More Posts'}
+                  </button>
+                </div>
+              )}
             </section>
           ) : (
             !loading && // Sadece yükleme bittiyse ve post yoksa göster
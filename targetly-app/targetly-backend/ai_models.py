@@ -0,0 +1,152 @@
+# targetly-backend/ai_models.py
+# ML modeli (+ optimal paylaşım tablosu) ve Gemini istemcisi; WSGI (app.py) ve ASGI (async_app.py) modları paylaşır.
+# joblib/sklearn, numpy (ml_scoring) ve google.generativeai modül importunda yüklenmez; warm_up() ile arka planda
+# veya ilk kullanımda içe aktarılır.
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from settings import get_settings
+from suggestions import (FakeGeminiModel, GEMINI_GENERATION_CONFIG, GEMINI_MODEL_NAME, GEMINI_SAFETY_SETTINGS)
+
+settings = get_settings()
+
+model = None
+gemini_model = None
+_gemini_configured = False
+_model_grid_cache = None
+_hashtag_recommender = None
+_caption_index = None
+_model_lock = threading.Lock()
+_gemini_lock = threading.Lock()
+
+
+def load_trained_ml_model():
+    global model
+    model_filename = os.path.basename(settings.model_path)
+    try:
+        if os.path.exists(settings.model_path):
+            import joblib # sklearn'i de içe aktarır (~1.5 sn); yalnızca ısınmada / ilk tahminde
+            model = joblib.load(settings.model_path)
+            print(f"✅ INFO: ML Modeli '{model_filename}' başarıyla yüklendi: {settings.model_path}")
+        else:
+            print(f"❌ HATA: ML Model dosyası bulunamadı: {settings.model_path}")
+            model = None
+    except Exception as e:
+        print(f"❌ HATA: ML Model yüklenirken hata oluştu: {e}")
+        model = None
+    return model
+
+
+def get_model_grid_cache():
+    # Model dosyası değişirse (yeni joblib dağıtımı) model yeniden yüklenir ve optimal tablo yeniden hesaplanır
+    global _model_grid_cache
+    if _model_grid_cache is None:
+        with _model_lock:
+            if _model_grid_cache is None:
+                from ml_scoring import ModelGridCache
+                _model_grid_cache = ModelGridCache(settings.model_path, load_trained_ml_model, settings.model_features_order)
+    return _model_grid_cache
+
+
+def get_hashtag_recommender():
+    # numpy/scipy ilk kullanımda yüklenir; indeks ısınmada veya ilk öneri isteğinde kurulur
+    global _hashtag_recommender
+    if _hashtag_recommender is None:
+        with _model_lock:
+            if _hashtag_recommender is None:
+                from db import get_db_connection
+                from hashtag_recommender import HashtagRecommender
+                _hashtag_recommender = HashtagRecommender(get_db_connection)
+    return _hashtag_recommender
+
+
+def get_hashtag_recommender_stats():
+    # /metrics scrape'i indeksi (ve scipy'yi) tetiklemesin
+    return _hashtag_recommender.stats() if _hashtag_recommender is not None else {"ready": 0}
+
+
+def get_caption_index():
+    # numpy/scipy ilk benzer gönderi isteğinde yüklenir; indeks dosyaları veri alımında yazılır, burada yalnızca
+    # eşlenir (indeksi hiç olmayan hesaplar arka planda kurulur)
+    global _caption_index
+    if _caption_index is None:
+        with _model_lock:
+            if _caption_index is None:
+                from db import get_db_connection
+                from caption_index import CaptionIndex
+                _caption_index = CaptionIndex(connect=get_db_connection)
+    return _caption_index
+
+
+def get_caption_index_stats():
+    return _caption_index.stats() if _caption_index is not None else {"accounts_mapped": 0}
+
+
+def get_ml_model():
+    return get_model_grid_cache().get_model()
+
+
+def apply_optimal_hour(scheduled_publish_time_unix):
+    """Zamanlanan günün saatini modelin önerdiği saate çeker; model yoksa / hata olursa zamanı olduğu gibi döndürür."""
+    try:
+        optimal_info = get_model_grid_cache().get_grid() # süreç içi önbellek, kendine HTTP isteği yok
+        if optimal_info is None: raise ValueError("ML Model not loaded.")
+        optimal_hour = optimal_info['best_time_prediction']['hour']
+        dt_object = datetime.fromtimestamp(scheduled_publish_time_unix, tz=timezone.utc)
+        dt_object_with_optimal_hour = dt_object.replace(hour=optimal_hour, minute=0, second=0, microsecond=0)
+        final_publish_time = int(dt_object_with_optimal_hour.timestamp())
+        print(f"ℹ️ Optimal saat ({optimal_hour}) kullanıldı: {final_publish_time}")
+        return final_publish_time
+    except Exception as e:
+        print(f"⚠️ Optimal saat alınamadı/işlenemedi: {e}. Manuel zaman kullanılacak.")
+        return scheduled_publish_time_unix
+
+
+def configure_gemini_model():
+    global gemini_model
+    if settings.gemini_fake_model:
+        gemini_model = FakeGeminiModel()
+        print("⚠️ INFO: GEMINI_FAKE_MODEL=true, öneriler sahte (çevrimdışı) modelden üretilecek.")
+        return
+    if not settings.gemini_api_key:
+        print("❌ UYARI: GEMINI_API_KEY .env dosyasında bulunamadı! Öneri endpoint'i çalışmayacak.")
+        return
+    try:
+        import google.generativeai as genai
+        genai.configure(api_key=settings.gemini_api_key)
+        gemini_model = genai.GenerativeModel(model_name=GEMINI_MODEL_NAME,
+                                            generation_config=GEMINI_GENERATION_CONFIG,
+                                            safety_settings=GEMINI_SAFETY_SETTINGS)
+        print(f"✅ INFO: Gemini modeli '{gemini_model.model_name}' başarıyla yapılandırıldı.")
+    except Exception as e:
+        print(f"❌ HATA: Gemini modeli yapılandırılırken hata oluştu: {e}")
+        gemini_model = None
+
+
+def get_gemini_model():
+    # Isınma bitmeden gelen ilk istek yapılandırmayı kendisi yapar (kilit sayesinde yalnızca bir kez)
+    global _gemini_configured
+    if not _gemini_configured:
+        with _gemini_lock:
+            if not _gemini_configured:
+                configure_gemini_model()
+                _gemini_configured = True
+    return gemini_model
+
+
+def warm_up(gemini=True):
+    """
+    Modeli yükleyip optimal tabloyu önceden hesaplar, hashtag öneri indeksini kurar ve (gemini=True ise) Gemini
+    istemcisini yapılandırır.
+    """
+    started = time.perf_counter()
+    get_model_grid_cache().refresh(force=True)
+    try:
+        get_hashtag_recommender().refresh()
+    except Exception:
+        pass # hata loglandı; ilk öneri isteği yeniden dener
+    if gemini:
+        get_gemini_model()
+    print(f"✅ INFO: Isınma tamamlandı ({time.perf_counter() - started:.2f} sn).")
@@ -1,297 +1,295 @@
 # targetly-backend/app.py
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from db import get_db_connection
-
-import joblib
-import pandas as pd
-import numpy as np
+# Uygulama fabrikası: create_app() blueprint'leri kaydeder; yayın işçileri ve ısınma (ML modeli + optimal
+# tablo, Gemini istemcisi) port açılırken arka plan iş parçacığında başlar. joblib/sklearn, numpy (ml_scoring),
+# google.generativeai ve boto3 modül importunda yüklenmez; ısınmada veya ilk kullanımda içe aktarılır.
+# APP_WARMUP=background (varsayılan) | eager (create_app içinde, eski davranış) | off (ilk istekte).
+# Modül importunun yan etkisi yoktur (uygulama nesnesi, işçi ya da iş parçacığı oluşturulmaz); giriş noktaları
+# fabrikayı çağırır:
+#   python app.py                      (geliştirme sunucusu, debug reloader)
+#   gunicorn wsgi:app                  (wsgi.py: app = create_app())
+#   flask --app app:create_app run
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-import json # Gemini yanıtını parse etmek için
-import re   # Gemini yanıtından JSON bloğunu ayıklamak için
-import requests # Instagram API çağrıları için
-import boto3    # AWS S3 için
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError # boto3 hataları için
-from datetime import datetime, timezone # Zaman damgaları ve zaman dilimi işlemleri için
-import unicodedata # Dosya adı sanitization için
-
-app = Flask(__name__)
-CORS(app)
-
-# --- Ortam Değişkenleri ve Sabitler ---
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-load_dotenv(dotenv_path=os.path.join(BASE_DIR, '.env'))
-
-MODEL_FILENAME = 'best_instagram_model_gradientboosting.joblib'
-MODEL_PATH = os.path.join(BASE_DIR, MODEL_FILENAME)
-model = None
-MODEL_FEATURES_ORDER = ['caption_length', 'post_hour', 'post_dayofweek', 'Month', 'Year']
-
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-gemini_model = None
-
-AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
-AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
-AWS_S3_BUCKET_NAME = os.getenv("AWS_S3_BUCKET_NAME")
-AWS_S3_REGION = os.getenv("AWS_S3_REGION")
-
-IG_APP_ACCESS_TOKEN = os.getenv("IG_APP_ACCESS_TOKEN")
-GRAPH_API_VERSION = os.getenv("REACT_APP_GRAPH_API_VERSION", "v20.0")
-
-
-# --- Helper Fonksiyonlar ---
-def load_trained_ml_model():
-    global model
-    try:
-        if os.path.exists(MODEL_PATH):
-            model = joblib.load(MODEL_PATH)
-            print(f"✅ INFO: ML Modeli '{MODEL_FILENAME}' başarıyla yüklendi: {MODEL_PATH}")
-        else:
-            print(f"❌ HATA: ML Model dosyası bulunamadı: {MODEL_PATH}")
-            model = None
-    except Exception as e:
-        print(f"❌ HATA: ML Model yüklenirken hata oluştu: {e}")
-        model = None
-
-def configure_gemini_model():
-    global gemini_model
-    if not GEMINI_API_KEY:
-        print("❌ UYARI: GEMINI_API_KEY .env dosyasında bulunamadı! Öneri endpoint'i çalışmayacak.")
-        return
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        generation_config = {
-          "temperature": 0.7, "top_p": 1, "top_k": 1, "max_output_tokens": 2048,
-        }
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        ]
-        gemini_model = genai.GenerativeModel(model_name="gemini-1.5-flash-latest",
-                                            generation_config=generation_config,
-                                            safety_settings=safety_settings)
-        print(f"✅ INFO: Gemini modeli '{gemini_model.model_name}' başarıyla yapılandırıldı.")
-    except Exception as e:
-        print(f"❌ HATA: Gemini modeli yapılandırılırken hata oluştu: {e}")
-        gemini_model = None
+import threading
 
-def sanitize_filename(filename):
+from flask import Blueprint, Flask, Response, request, jsonify
+from flask_cors import CORS
+from ai_models import (apply_optimal_hour, get_caption_index_stats, get_gemini_model, get_hashtag_recommender,
+                       get_hashtag_recommender_stats, get_ml_model, get_model_grid_cache, warm_up)
+from db import get_db_connection, get_pool_stats
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, install_flask_metrics, register_gauge_collector, render_metrics
+from response_cache import get_cache_stats
+from settings import get_settings
+from suggestions import SuggestionService, SuggestionValidationError, parse_bulk_request
+from s3_storage import build_s3_object_name, get_upload_stats, s3_configured, upload_stream, upload_to_s3
+from publish_jobs import (PublishJobRunner, PublishWorkerPool, PUBLISH_WORKERS_ENABLED, ScheduleRequestError,
+                          enqueue_publish_job, get_publish_job, get_publish_queue_stats, parse_schedule_form, spool_media)
+
+settings = get_settings() # .env dosyaları burada bir kez yüklenir
+api_routes = Blueprint('api_routes', __name__)
+
+# Öneriler konu + medya tipine göre önbelleklenir, eşzamanlı aynı istekler tek Gemini çağrısına birleştirilir
+suggestion_service = SuggestionService(get_gemini_model)
+
+# Yayın işçileri: spool'daki medyayı S3'e yükler, IG container'ı oluşturur ve media_publish çağırır
+publish_worker_pool = PublishWorkerPool(PublishJobRunner(
+    upload_media=lambda media, object_name, content_type: upload_to_s3(media, settings.aws_s3_bucket_name, object_name, content_type),
+    graph_base_url=settings.graph_api_base_url,
+    access_token=settings.ig_app_access_token,
+))
+
+# /metrics: mevcut *-stats çıktıları scrape anında gauge olarak yayınlanır
+register_gauge_collector("targetly_db_pool", "Bağlantı havuzu", get_pool_stats)
+register_gauge_collector("targetly_publish_workers", "Yayın işçisi sayaçları", publish_worker_pool.stats)
+register_gauge_collector("targetly_suggestion_cache", "Gemini öneri önbelleği", suggestion_service.stats)
+register_gauge_collector("targetly_response_cache", "Yanıt önbelleği", get_cache_stats)
+register_gauge_collector("targetly_s3_uploads", "S3 yüklemeleri", get_upload_stats)
+register_gauge_collector("targetly_hashtag_recommender", "Yerel hashtag öneri indeksi", get_hashtag_recommender_stats)
+register_gauge_collector("targetly_caption_index", "Benzer gönderi açıklama indeksi", get_caption_index_stats)
+
+def start_background_services(warm):
+    if PUBLISH_WORKERS_ENABLED:
+        publish_worker_pool.start()
+    if warm:
+        warm_up()
+
+def create_app(start_services=True):
     """
-    Dosya adını URL ve dosya sistemi için güvenli hale getirir.
-    Türkçe karakterleri ASCII karşılıklarına çevirir, boşlukları ve geçersiz karakterleri temizler.
+    Flask uygulamasını kurar. start_services=True ise yayın işçileri ve ısınma (APP_WARMUP) başlatılır; betikler ve
+    reloader'ın gözetmen süreci gibi istek sunmayan kullanımlar False verir.
     """
+    app = Flask(__name__)
+    CORS(app)
+    install_flask_metrics(app) # route bazında gecikme, SQL sayısı / süresi (/metrics)
+    for warning in settings.config_warnings():
+        print(f"⚠️ UYARI: {warning}")
+
+    from routes.auth_routes import auth_routes
+    from routes.user_routes import user_routes
+    from routes.dashboard_routes import dashboard_routes
+    from routes.report_routes import report_routes
+    from routes.account_info_routes import account_info_routes
+    from routes.profile_routes import profile_routes
+    from routes.account_manager_routes import account_manager_routes
+    from routes.content_creator_routes import content_creator_routes
+
+    app.register_blueprint(api_routes)
+    app.register_blueprint(auth_routes, url_prefix='/api/auth')
+    app.register_blueprint(user_routes, url_prefix='/api/users')
+    app.register_blueprint(dashboard_routes, url_prefix='/api/dashboard')
+    app.register_blueprint(report_routes, url_prefix='/api/reporting')
+    app.register_blueprint(account_info_routes, url_prefix='/api')
+    app.register_blueprint(profile_routes, url_prefix='/api/profile')
+    app.register_blueprint(account_manager_routes, url_prefix='/api/account-manager')
+    app.register_blueprint(content_creator_routes, url_prefix='/api/content-creator')
+
+    if not start_services:
+        return app
+    # İşçilerin DB kontrolü ve model/Gemini ısınması isteklere hazır olmayı geciktirmesin
+    if settings.app_warmup == "eager":
+        start_background_services(warm=True)
+    else:
+        threading.Thread(target=start_background_services, args=(settings.app_warmup != "off",),
+                         name="targetly-startup", daemon=True).start()
+    return app
+
+@api_routes.route('/api/optimal-posting-info', methods=['GET'])
+def get_optimal_posting_info_route():
+    # ?account_id= verilmezse ana hesap; ideal hashtag sayısı modelden değil hesabın gönderi verisinden gelir
+    from routes.report_routes import load_ideal_hashtag_count
+    optimal_info = get_model_grid_cache().get_grid()
+    if optimal_info is None:
+        return jsonify({"error": "Optimal posting info is unavailable.", "model_status_message": "ML Model not loaded."}), 503
+    account_id = request.args.get('account_id') or settings.ig_account_id
+    return jsonify(dict(optimal_info, ideal_hashtag_count=load_ideal_hashtag_count(account_id),
+                        model_status_message="ML Model loaded."))
+
+@api_routes.route('/api/predict-engagement', methods=['POST'])
+def predict_engagement_route():
+    # Body: {"posts": [{"caption": "...", "planned_time": <unix sn | ISO 8601>}, ...]}
+    from ml_scoring import score_candidates, CandidateValidationError, PREDICT_MAX_BATCH
+    current_model = get_ml_model()
+    if current_model is None: return jsonify({"error": "ML Model not loaded."}), 503
+    data = request.get_json(silent=True)
+    if not data or 'posts' not in data: return jsonify({"error": "'posts' list is required."}), 400
+    candidates = data['posts']
     try:
-        # Normalize Unicode characters (e.g., "ö" -> "o", "İ" -> "I")
-        normalized_name = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
-        # Replace spaces and unsupported characters with a hyphen or remove them
-        sanitized_name = re.sub(r'[^\w\.\-]', '', normalized_name) # Sadece harf, rakam, '.', '-' ve '_' kalsın
-        sanitized_name = re.sub(r'[-\s]+', '-', sanitized_name).strip('-_') # Birden fazla tire/boşluğu tek tire yap
-        if not sanitized_name: # Eğer isim tamamen boşaldıysa, rastgele bir isim ver
-            return "unnamed_file"
-        return sanitized_name
+        feature_matrix, predictions = score_candidates(current_model, candidates, settings.model_features_order)
+    except CandidateValidationError as e:
+        return jsonify({"error": str(e), "index": e.index, "max_batch": PREDICT_MAX_BATCH}), 400
     except Exception as e:
-        print(f"⚠️ Dosya adı sanitize edilirken hata: {e}. Orijinal ad kullanılacak: {filename}")
-        return filename # Hata durumunda orijinali döndür
-
-
-def upload_to_s3(file_obj, bucket_name, object_name=None):
-    if not all([AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, bucket_name, AWS_S3_REGION]):
-        print("❌ HATA: S3 için AWS konfigürasyonları eksik (.env dosyasını kontrol edin).")
-        return None
-
-    if object_name is None:
-        object_name = file_obj.filename
+        print(f"❌ Toplu tahmin hatası: {e}")
+        return jsonify({"error": "Prediction failed.", "details": str(e)}), 500
+    results = [
+        {"index": i, "features": dict(zip(settings.model_features_order, row)), "predicted_likes": round(score, 2)}
+        for i, (row, score) in enumerate(zip(feature_matrix.astype(int).tolist(), predictions.tolist()))
+    ]
+    return jsonify({"count": len(results), "predictions": results}), 200
 
-    s3_client = boto3.client(
-        's3',
-        aws_access_key_id=AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_S3_REGION
-    )
+@api_routes.route('/api/hashtag-recommendations', methods=['POST'])
+def hashtag_recommendations_route():
+    # Body: {"caption": "taslak açıklama #etiket", "hashtags": ["#etiket2"], "limit": 10}
+    # Bellekteki eş-geçiş indeksinden yanıtlanır (Gemini'ye gitmez); yaratıcı açıklamalar için generate-post-suggestions
+    from hashtag_recommender import RecommendationValidationError, parse_recommendation_request
+    try:
+        caption, hashtags, limit = parse_recommendation_request(request.get_json(silent=True))
+    except RecommendationValidationError as e:
+        return jsonify({"error": str(e)}), 400
     try:
-        s3_client.upload_fileobj(
-            file_obj,
-            bucket_name,
-            object_name,
-            ExtraArgs={'ACL': 'public-read', 'ContentType': file_obj.content_type}
-        )
-        file_url = f"https://{bucket_name}.s3.{AWS_S3_REGION}.amazonaws.com/{object_name}"
-        if AWS_S3_REGION == "us-east-1":
-            file_url = f"https://{bucket_name}.s3.amazonaws.com/{object_name}"
-        print(f"✅ Dosya başarıyla S3'e yüklendi: {file_url}")
-        return file_url
-    except NoCredentialsError:
-        print("❌ HATA: S3 için AWS kimlik bilgileri bulunamadı.")
-        return None
-    except PartialCredentialsError:
-        print("❌ HATA: S3 için eksik AWS kimlik bilgileri.")
-        return None
-    except ClientError as e:
-        error_code = e.response.get("Error", {}).get("Code")
-        if error_code == "AccessDenied":
-            print(f"❌ HATA: S3 bucket'ına erişim reddedildi ({bucket_name}). İzinleri kontrol edin.")
-        else:
-            print(f"❌ HATA: S3 yüklemesi sırasında ClientError: {e}")
-        return None
+        result = get_hashtag_recommender().recommend(caption, hashtags, limit)
     except Exception as e:
-        print(f"❌ HATA: S3 yüklemesi sırasında beklenmedik bir hata: {e}")
-        return None
-
-load_trained_ml_model()
-configure_gemini_model()
-
-from routes.auth_routes import auth_routes
-from routes.user_routes import user_routes
-from routes.dashboard_routes import dashboard_routes
-from routes.report_routes import report_routes
-from routes.account_info_routes import account_info_routes
-from routes.profile_routes import profile_routes
-from routes.account_manager_routes import account_manager_routes
-from routes.content_creator_routes import content_creator_routes
-
-app.register_blueprint(auth_routes, url_prefix='/api/auth')
-app.register_blueprint(user_routes, url_prefix='/api/users')
-app.register_blueprint(dashboard_routes, url_prefix='/api/dashboard')
-app.register_blueprint(report_routes, url_prefix='/api/reporting')
-app.register_blueprint(account_info_routes, url_prefix='/api')
-app.register_blueprint(profile_routes, url_prefix='/api/profile')
-app.register_blueprint(account_manager_routes, url_prefix='/api/account-manager')
-app.register_blueprint(content_creator_routes, url_prefix='/api/content-creator')
-
-@app.route('/api/optimal-posting-info', methods=['GET'])
-def get_optimal_posting_info_route():
-    optimal_info = {
-        "best_time_prediction": {"day_name": "Cumartesi", "hour": 16, "estimated_likes": 60.15 },
-        "best_caption_length_prediction": {"length": 23, "estimated_likes_at_best_time": 60.77 },
-        "ideal_hashtag_count": {"count": 2, "note": "Veri setindeki hashtag sayısı sabit."},
-        "most_important_features": [{"feature": "post_hour", "importance": 0.350878}, {"feature": "caption_length", "importance": 0.230093}],
-        "model_status_message": "ML Model loaded." if model else "ML Model not loaded."
-    }
-    return jsonify(optimal_info)
-
-@app.route('/api/generate-post-suggestions', methods=['POST'])
+        print(f"❌ Hashtag önerisi hatası: {e}")
+        return jsonify({"error": "Hashtag recommendations are unavailable.", "details": str(e)}), 503
+    return jsonify(result), 200
+
+@api_routes.route('/api/generate-post-suggestions', methods=['POST'])
 def generate_post_suggestions_route():
-    if not gemini_model: return jsonify({"error": "Gemini API is not configured."}), 503
+    if not get_gemini_model(): return jsonify({"error": "Gemini API is not configured."}), 503
     data = request.get_json()
     if not data or not data.get('subject'): return jsonify({"error": "Post subject is required."}), 400
     post_subject = data.get('subject')
     media_type = data.get('media_type', 'unknown')
     print(f"ℹ️ Gemini için konu: '{post_subject}', medya: '{media_type}'")
-    prompt_parts = [
-        "You are an expert social media content assistant for Instagram.",
-        f"Generate content for a post about: '{post_subject}'. Media type: {media_type}.",
-        "Provide 3 creative and engaging caption alternatives (100-150 chars).",
-        "Also, provide 5-7 relevant and popular hashtags.",
-        "Tone: friendly, inviting, engagement-focused.",
-        "Return STRICTLY JSON: {\"captions\": [\"c1\", \"c2\", \"c3\"], \"hashtags\": [\"#h1\", \"#h2\"]}"
-    ]
     try:
-        response = gemini_model.generate_content("\n".join(prompt_parts))
-        raw_text = response.text
-        match = re.search(r"```json\s*([\s\S]*?)\s*```", raw_text, re.DOTALL)
-        json_str = match.group(1).strip() if match else raw_text.strip()
-        suggestions = json.loads(json_str)
-        if not (isinstance(suggestions.get("captions"), list) and isinstance(suggestions.get("hashtags"), list)):
-            raise ValueError("Invalid JSON structure from Gemini.")
-        return jsonify(suggestions), 200
+        suggestions, cache_status = suggestion_service.generate(post_subject, media_type)
+        response = jsonify(suggestions)
+        response.headers["X-Cache"] = cache_status
+        return response, 200
     except Exception as e:
         print(f"❌ Gemini API hatası: {e}")
         return jsonify({"error": "AI suggestions failed.", "details": str(e)}), 503
 
-@app.route('/api/schedule-ig-post', methods=['POST'])
+@api_routes.route('/api/generate-post-suggestions/bulk', methods=['POST'])
+def generate_bulk_post_suggestions_route():
+    # Body: {"posts": [{"subject": "...", "media_type": "IMAGE"}, ...]}; sonuçlar girdi sırasıyla döner
+    if not get_gemini_model(): return jsonify({"error": "Gemini API is not configured."}), 503
+    data = request.get_json(silent=True)
+    if not data or 'posts' not in data: return jsonify({"error": "'posts' list is required."}), 400
+    try:
+        items = parse_bulk_request(data['posts'])
+    except SuggestionValidationError as e:
+        return jsonify({"error": str(e), "index": e.index}), 400
+    results = [
+        dict(result, index=i, subject=subject, media_type=media_type)
+        for i, ((subject, media_type), result) in enumerate(zip(items, suggestion_service.generate_bulk(items)))
+    ]
+    failed = sum(1 for result in results if "error" in result)
+    if failed == len(results):
+        return jsonify({"error": "AI suggestions failed.", "results": results}), 503
+    return jsonify({"count": len(results), "failed": failed, "results": results}), 200
+
+@api_routes.route('/api/schedule-ig-post', methods=['POST'])
 def schedule_ig_post_route_impl():
-    if 'media' not in request.files: return jsonify({"error": "Media file is required"}), 400
-    media_file = request.files['media']
-    if not media_file.filename: return jsonify({"error": "Media file name is empty"}), 400
-
-    caption = request.form.get('caption', '')
-    hashtags = request.form.get('hashtags', '')
-    ig_account_id = request.form.get('ig_account_id')
-    scheduled_publish_time_unix_str = request.form.get('scheduled_publish_time')
-    use_optimal_hour_str = request.form.get('use_optimal_hour', 'false')
-
-    if not ig_account_id: return jsonify({"error": "Instagram Account ID is required"}), 400
-    if not scheduled_publish_time_unix_str: return jsonify({"error": "Scheduled publish time is required"}), 400
-    if not IG_APP_ACCESS_TOKEN:
+    # Medya ya multipart 'media' dosyası ya da /api/media-uploads ile önceden yüklenmiş 'media_url' olarak gelir
+    media_file = request.files.get('media')
+    try:
+        form = parse_schedule_form(request.form, media_file)
+    except ScheduleRequestError as e:
+        return jsonify({"error": str(e)}), e.status
+    if not settings.ig_app_access_token:
         print("❌ HATA: IG_APP_ACCESS_TOKEN .env'de ayarlanmamış.")
         return jsonify({"error": "Server IG publishing config error."}), 500
 
-    final_caption = f"{caption} {hashtags}".strip()
-    scheduled_publish_time_unix = int(scheduled_publish_time_unix_str)
-    use_optimal_hour = use_optimal_hour_str.lower() == 'true'
-    final_publish_time_for_ig = scheduled_publish_time_unix
-
-    if use_optimal_hour:
+    media_url = form["media_url"]
+    ig_account_id = form["ig_account_id"]
+    final_publish_time_for_ig = form["scheduled_publish_time"]
+    if form["use_optimal_hour"]:
+        final_publish_time_for_ig = apply_optimal_hour(final_publish_time_for_ig)
+
+    media_path = s3_object_name = media_content_type = None
+    if not media_url:
+        original_filename = media_file.filename
+        s3_object_name = build_s3_object_name(original_filename)
+        media_content_type = media_file.content_type
+        print(f"ℹ️ Orijinal dosya adı: {original_filename}, S3 için sanitize edilmiş obje adı: {s3_object_name}")
+        # S3 yüklemesi ve Graph API çağrıları yayın işçilerinde çalışır; istek yalnızca medyayı spool'a yazar
         try:
-            optimal_info_resp = requests.get(f"{request.host_url.rstrip('/')}/api/optimal-posting-info")
-            optimal_info_resp.raise_for_status()
-            optimal_hour = optimal_info_resp.json()['best_time_prediction']['hour']
-            dt_object = datetime.fromtimestamp(scheduled_publish_time_unix, tz=timezone.utc)
-            dt_object_with_optimal_hour = dt_object.replace(hour=optimal_hour, minute=0, second=0, microsecond=0)
-            final_publish_time_for_ig = int(dt_object_with_optimal_hour.timestamp())
-            print(f"ℹ️ Optimal saat ({optimal_hour}) kullanıldı: {final_publish_time_for_ig}")
-        except Exception as e:
-            print(f"⚠️ Optimal saat alınamadı/işlenemedi: {e}. Manuel zaman kullanılacak.")
-
-    original_filename = media_file.filename
-    base_name, file_extension = os.path.splitext(original_filename)
-    sanitized_base_name = sanitize_filename(base_name) # Sanitize et
-    # Uzunluğu kontrol et ve kısalt, sonra uzantıyı ekle
-    max_base_len = 100 # S3 obje adı için makul bir uzunluk
-    if len(sanitized_base_name) > max_base_len:
-        sanitized_base_name = sanitized_base_name[:max_base_len]
-    
-    # Zaman damgası ve sanitize edilmiş adı birleştir
-    s3_object_name = f"instagram_uploads/{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')}_{sanitized_base_name}{file_extension}"
-    
-    print(f"ℹ️ Orijinal dosya adı: {original_filename}, S3 için sanitize edilmiş obje adı: {s3_object_name}")
-
-    image_url_on_s3 = upload_to_s3(media_file, AWS_S3_BUCKET_NAME, s3_object_name)
-    if not image_url_on_s3:
-        return jsonify({"error": "Failed to upload media to S3."}), 500
-
-    creation_url = f"https://graph.facebook.com/{GRAPH_API_VERSION}/{ig_account_id}/media"
-    creation_payload = {'image_url': image_url_on_s3, 'caption': final_caption, 'access_token': IG_APP_ACCESS_TOKEN}
-    print(f"➡️ IG Container Oluşturma: {creation_url}, Image: {image_url_on_s3}")
+            media_path = spool_media(media_file, os.path.splitext(original_filename)[1])
+        except OSError as e:
+            print(f"❌ Medya spool klasörüne yazılamadı: {e}")
+            return jsonify({"error": "Failed to store media for publishing."}), 500
+    conn = None
     try:
-        creation_r = requests.post(creation_url, data=creation_payload)
-        creation_r.raise_for_status()
-        container_id = creation_r.json().get('id')
-        if not container_id:
-            print(f"❌ IG Container oluşturulamadı: {creation_r.text}")
-            return jsonify({"error": "Failed to create IG container.", "details": creation_r.json()}), 500
-        print(f"✅ IG Container oluşturuldu: {container_id}")
-    except requests.exceptions.HTTPError as e:
-        print(f"❌ IG Container HTTP hatası: {e.response.status_code} - {e.response.text}")
-        return jsonify({"error": "Error creating IG container.", "details": e.response.json()}), e.response.status_code
+        conn = get_db_connection()
+        if conn is None:
+            if media_path: os.remove(media_path)
+            return jsonify({"error": "DB connection failed"}), 500
+        job_id = enqueue_publish_job(conn, ig_account_id, form["caption"], media_path, media_content_type,
+                                     s3_object_name, final_publish_time_for_ig, image_url=media_url)
     except Exception as e:
-        print(f"❌ IG Container genel hata: {e}")
-        return jsonify({"error": "Unexpected error creating IG container.", "details": str(e)}), 500
+        print(f"❌ Yayın işi kuyruğa eklenemedi: {e}")
+        if media_path: os.remove(media_path)
+        return jsonify({"error": "Failed to queue publish job.", "details": str(e)}), 500
+    finally:
+        if conn: conn.close()
+    publish_worker_pool.notify()
+    print(f"ℹ️ Yayın işi #{job_id} kuyruğa eklendi (hesap {ig_account_id}, zaman {final_publish_time_for_ig}).")
+    status_url = f"/api/publish-jobs/{job_id}"
+    response = jsonify({"message": "Post queued for publishing.", "job_id": job_id, "status": "queued",
+                        "scheduled_publish_time": final_publish_time_for_ig, "status_url": status_url})
+    response.headers["Location"] = status_url
+    return response, 202
+
+@api_routes.route('/api/media-uploads/<path:filename>', methods=['PUT'])
+def stream_media_upload_route(filename):
+    # Ham gövde (Content-Type: medya tipi) form ayrıştırması / spool olmadan parça parça S3'e aktarılır.
+    # Dönen url, /api/schedule-ig-post'a 'media_url' olarak verilebilir.
+    if not s3_configured(): return jsonify({"error": "S3 storage is not configured."}), 503
+    content_length = request.content_length
+    if content_length is None: return jsonify({"error": "Content-Length header is required"}), 411
+    if content_length == 0: return jsonify({"error": "Request body is empty"}), 400
+    if content_length > settings.media_upload_max_bytes:
+        return jsonify({"error": f"Media is larger than {settings.media_upload_max_bytes // (1024 * 1024)} MB"}), 413
+    s3_object_name = build_s3_object_name(os.path.basename(filename))
+    from botocore.exceptions import ClientError, BotoCoreError
+    try:
+        media_url = upload_stream(request.stream, s3_object_name, request.mimetype or None)
+    except (ClientError, BotoCoreError) as e:
+        print(f"❌ HATA: Akışlı S3 yüklemesi başarısız ({s3_object_name}): {e}")
+        return jsonify({"error": "Failed to upload media to S3.", "details": str(e)}), 502
+    return jsonify({"url": media_url, "object_name": s3_object_name, "bytes": content_length}), 201
+
+@api_routes.route('/api/publish-jobs/<int:job_id>', methods=['GET'])
+def get_publish_job_route(job_id):
+    conn = None
+    try:
+        conn = get_db_connection()
+        if conn is None: return jsonify({"error": "DB connection failed"}), 500
+        job = get_publish_job(conn, job_id)
+        if job is None: return jsonify({"error": "Publish job not found."}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        print(f"❌ Yayın işi durumu okunamadı (#{job_id}): {e}")
+        return jsonify({"error": "Failed to fetch publish job.", "details": str(e)}), 500
+    finally:
+        if conn: conn.close()
+
+@api_routes.route('/s3-upload-stats')
+def s3_upload_stats():
+    # Tamamlanan / süren S3 yüklemeleri, aktarılan bayt ve throughput (MB/sn)
+    return jsonify(get_upload_stats()), 200
 
-    publish_url = f"https://graph.facebook.com/{GRAPH_API_VERSION}/{ig_account_id}/media_publish"
-    publish_payload = {'creation_id': container_id, 'access_token': IG_APP_ACCESS_TOKEN, 'scheduled_publish_time': final_publish_time_for_ig}
-    print(f"➡️ IG Publish: Creation ID={container_id}, Schedule Time={final_publish_time_for_ig}")
+@api_routes.route('/publish-queue-stats')
+def publish_queue_stats():
+    # Kuyruktaki işlerin durum dağılımı ve bu süreçteki işçi sayaçları
+    conn = None
     try:
-        publish_r = requests.post(publish_url, data=publish_payload)
-        publish_r.raise_for_status()
-        published_media_id = publish_r.json().get('id')
-        print(f"✅ IG Post zamanlandı/yayınlandı: {publish_r.text}")
-        return jsonify({"message": "Post successfully scheduled!", "instagram_post_id": published_media_id}), 200
-    except requests.exceptions.HTTPError as e:
-        print(f"❌ IG Publish HTTP hatası: {e.response.status_code} - {e.response.text}")
-        return jsonify({"error": "Error publishing IG container.", "details": e.response.json()}), e.response.status_code
+        conn = get_db_connection()
+        if conn is None: return jsonify({"error": "DB connection failed"}), 500
+        return jsonify({"jobs_by_status": get_publish_queue_stats(conn), "workers": publish_worker_pool.stats()}), 200
     except Exception as e:
-        print(f"❌ IG Publish genel hata: {e}")
-        return jsonify({"error": "Unexpected error publishing IG container.", "details": str(e)}), 500
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if conn: conn.close()
+
+@api_routes.route('/metrics')
+def metrics_route():
+    # Prometheus scrape: istek / SQL / Graph-Gemini-S3 gecikme histogramları ve havuz / kuyruk gauge'ları
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
 
-@app.route('/')
+@api_routes.route('/')
 def index(): return "✅ Targetly backend is alive!"
 
-@app.route('/db-test')
+@api_routes.route('/db-test')
 def db_test():
     # ... (kod aynı)
     conn = None; cursor = None
@@ -307,8 +305,31 @@ def db_test():
         if cursor: cursor.close()
         if conn: conn.close()
 
+@api_routes.route('/db-pool-stats')
+def db_pool_stats():
+    # Havuz doluluğu ve bekleme süreleri (izleme/scrape için)
+    return jsonify(get_pool_stats()), 200
+
+@api_routes.route('/response-cache-stats')
+def response_cache_stats():
+    # Dashboard/rapor yanıt önbelleği isabet oranı
+    return jsonify(get_cache_stats()), 200
+
+@api_routes.route('/hashtag-recommender-stats')
+def hashtag_recommender_stats_route():
+    return jsonify(get_hashtag_recommender_stats()), 200
+
+@api_routes.route('/caption-index-stats')
+def caption_index_stats_route():
+    return jsonify(get_caption_index_stats()), 200
+
+@api_routes.route('/suggestion-cache-stats')
+def suggestion_cache_stats():
+    # Gemini öneri önbelleği: isabet / birleştirme oranı ve upstream çağrı sayıları
+    return jsonify(suggestion_service.stats()), 200
+
 
-@app.route('/login', methods=['POST'])
+@api_routes.route('/login', methods=['POST'])
 def login():
     # ... (kod aynı)
     data = request.get_json();
@@ -330,4 +351,6 @@ def login():
 
 if __name__ == '__main__':
     print("🚀 Targetly Flask Backend is preparing to launch...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # debug reloader bu dosyayı iki süreçte çalıştırır; işçiler yalnızca istekleri sunan alt süreçte (WERKZEUG_RUN_MAIN) başlar
+    app = create_app(start_services=os.environ.get("WERKZEUG_RUN_MAIN") == "true")
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,365 @@
+# targetly-backend/async_app.py
+# ASGI serving modu (Quart): dashboard, raporlama, yayın ve öneri endpoint'leri asyncpg havuzu (async_db.py) ve
+# paylaşılan bir httpx.AsyncClient (Graph API + Gemini REST) üzerinden çalışır; bir istek Postgres'i veya dış
+# API'yi beklerken işçi iş parçacığı tutmaz. SQL, payload üretimi, form doğrulama ve önbellek mantığı WSGI
+# modu (app.py) ile ortaktır; diğer endpoint'ler (auth, kullanıcılar, içerik...) WSGI modunda kalır.
+#   uvicorn async_app:app --host 0.0.0.0 --port 5001
+# Gemini: GEMINI_FAKE_MODEL=true -> FakeGeminiModel, aksi halde GEMINI_API_KEY ile REST generateContent.
+# boto3 senkron olduğu için S3 yüklemesi yayın işçisinde asyncio.to_thread ile yapılır.
+import asyncio
+import os
+
+from quart import Quart, jsonify, request
+from quart import make_response as quart_make_response
+
+import async_db
+import metrics
+import response_cache
+from ai_models import apply_optimal_hour, get_model_grid_cache
+from async_publish import AsyncPublishJobRunner, AsyncPublishWorkerPool
+from migrate import ensure_schema
+from publish_jobs import (ENQUEUE_JOB_QUERY, GET_JOB_QUERY, PUBLISH_MAX_ATTEMPTS,
+                          PUBLISH_WORKERS_ENABLED, QUEUE_STATS_QUERY, PublishJobRunner, ScheduleRequestError,
+                          _remove_spooled_media, new_spool_path, parse_schedule_form, public_job_dict)
+from routes import dashboard_routes as dashboard, report_routes as reporting
+from s3_storage import build_s3_object_name, upload_to_s3
+from settings import get_settings
+from suggestions import (FakeGeminiModel, GEMINI_HTTP_TIMEOUT_SECONDS, GeminiRestModel, SuggestionService)
+
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv("ASYNC_HTTP_MAX_CONNECTIONS", 100)) # Graph + Gemini ortak havuzu
+
+settings = get_settings()
+
+
+class AsyncServices:
+    """before_serving'de açılan, after_serving'de kapanan süreç geneli kaynaklar."""
+
+    def __init__(self):
+        self.http_client = None
+        self.gemini_model = None
+        self.publish_worker_pool = None
+        self.suggestion_service = SuggestionService(lambda: self.gemini_model)
+        self.warmup_task = None
+
+    async def start(self, warm):
+        import httpx
+
+        await async_db.open_pool()
+        self.http_client = httpx.AsyncClient(
+            timeout=GEMINI_HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=ASYNC_HTTP_MAX_CONNECTIONS, max_keepalive_connections=ASYNC_HTTP_MAX_CONNECTIONS),
+        )
+        if settings.gemini_fake_model:
+            self.gemini_model = FakeGeminiModel()
+            print("⚠️ INFO: GEMINI_FAKE_MODEL=true, öneriler sahte (çevrimdışı) modelden üretilecek.")
+        elif settings.gemini_api_key:
+            self.gemini_model = GeminiRestModel(self.http_client, settings.gemini_api_key)
+        if PUBLISH_WORKERS_ENABLED:
+            await asyncio.to_thread(ensure_schema) # migration'lar psycopg2 ile; event loop'u bloklamasın
+            runner = PublishJobRunner(
+                upload_media=lambda media, object_name, content_type: upload_to_s3(media, settings.aws_s3_bucket_name, object_name, content_type),
+                graph_base_url=settings.graph_api_base_url,
+                access_token=settings.ig_app_access_token,
+            )
+            self.publish_worker_pool = AsyncPublishWorkerPool(AsyncPublishJobRunner(runner, self.http_client))
+            self.publish_worker_pool.start()
+        if warm:
+            # Model + optimal tablo CPU işidir; event loop'u bloklamasın
+            self.warmup_task = asyncio.create_task(asyncio.to_thread(get_model_grid_cache().refresh, True))
+
+    async def stop(self):
+        if self.publish_worker_pool:
+            await self.publish_worker_pool.stop()
+        if self.http_client:
+            await self.http_client.aclose()
+        await async_db.close_pool()
+
+    def notify_publish_workers(self):
+        if self.publish_worker_pool:
+            self.publish_worker_pool.notify()
+
+
+services = AsyncServices()
+metrics.register_gauge_collector("targetly_db_pool", "asyncpg havuzu", async_db.get_async_pool_stats)
+metrics.register_gauge_collector("targetly_suggestion_cache", "Gemini öneri önbelleği", services.suggestion_service.stats)
+metrics.register_gauge_collector("targetly_response_cache", "Yanıt önbelleği", response_cache.get_cache_stats)
+metrics.register_gauge_collector("targetly_publish_workers", "Yayın işçisi sayaçları",
+                                 lambda: services.publish_worker_pool.stats() if services.publish_worker_pool else {})
+
+
+def async_cached_response(route_name, account_kwarg=None, account_id=None, ttl=None):
+    """response_cache.cached_response'un Quart karşılığı (aynı anahtarlar, aynı arka uç, aynı ETag)."""
+    def decorator(view):
+        async def wrapper(*args, **kwargs):
+            if not response_cache.RESPONSE_CACHE_ENABLED:
+                return await view(*args, **kwargs)
+            resolved_account = response_cache.resolve_cache_account(account_kwarg, account_id, kwargs)
+            try:
+                query = request.query_string.decode("utf-8", "replace")
+                backend, key, entry = response_cache.cache_lookup(route_name, resolved_account, query)
+            except Exception as e:
+                response_cache.cache_read_failed(route_name, e)
+                return await view(*args, **kwargs)
+            cache_status = "HIT"
+            if entry is None:
+                response = await quart_make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = response_cache.cache_store(backend, key, route_name, await response.get_data(),
+                                                   response.status_code, response.mimetype, ttl)
+                cache_status = "MISS"
+            if response_cache.etag_matches(request.headers.get("If-None-Match"), entry["etag"]):
+                response_cache.count_not_modified()
+                response = await quart_make_response("", 304)
+            else:
+                response = await quart_make_response(entry["body"], entry["status"])
+                response.mimetype = entry["mimetype"]
+            response.headers.update(response_cache.cache_headers(entry, cache_status))
+            return response
+        wrapper.__name__ = view.__name__
+        return wrapper
+    return decorator
+
+
+def create_async_app():
+    app = Quart(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = settings.media_upload_max_bytes # Quart varsayılanı 16 MB
+    for warning in settings.config_warnings():
+        print(f"⚠️ UYARI: {warning}")
+
+    @app.before_serving
+    async def start_services():
+        await services.start(warm=settings.app_warmup != "off")
+
+    @app.after_serving
+    async def stop_services():
+        await services.stop()
+
+    @app.after_request
+    async def add_cors_headers(response):
+        # flask_cors(app) varsayılanlarının karşılığı: tüm origin'lere izin
+        response.headers.setdefault("Access-Control-Allow-Origin", "*")
+        return response
+
+    if metrics.METRICS_ENABLED:
+        # metrics.install_flask_metrics'in karşılığı; kancalar async olmalı (senkron kancalar ayrı iş parçacığında
+        # çalışır ve istek bağlamını göremez)
+        @app.before_request
+        async def start_request_metrics():
+            request._metrics_token = metrics.begin_request(request.url_rule.rule if request.url_rule else "unmatched")
+
+        @app.after_request
+        async def finish_request_metrics(response):
+            token = getattr(request, "_metrics_token", None)
+            if token is not None:
+                request._metrics_token = None
+                metrics.end_request(token, request.method, response.status_code)
+            return response
+
+    # --- Dashboard ---
+    @app.route('/api/dashboard/summary')
+    @async_cached_response('dashboard.summary', account_id=dashboard.dashboard_account_id)
+    async def get_dashboard_summary():
+        account_id = dashboard.dashboard_account_id()
+        if not account_id:
+            return jsonify({"error": "Instagram Account ID is not configured for dashboard"}), 500
+        try:
+            async with async_db.acquire() as conn:
+                total_posts_row = await async_db.fetchrow(dashboard.TOTAL_POSTS_QUERY, (account_id,), conn)
+                followers_row = await async_db.fetchrow(dashboard.LATEST_FOLLOWERS_QUERY, (account_id,), conn)
+            return jsonify(dashboard.build_summary(total_posts_row, followers_row)), 200
+        except Exception as e:
+            print(f"❌ Dashboard summary error: {e}")
+            return jsonify({"error": f"Failed to fetch dashboard summary: {str(e)}"}), 500
+
+    @app.route('/api/dashboard/content-calendar')
+    async def get_content_calendar():
+        account_id = dashboard.dashboard_account_id()
+        if not account_id:
+            return jsonify({"error": "Instagram Account ID is not configured for dashboard"}), 500
+        try:
+            rows = await async_db.fetch(dashboard.CONTENT_CALENDAR_QUERY, (account_id,))
+            return jsonify(dashboard.build_content_calendar(rows)), 200
+        except Exception as e:
+            print(f"❌ Content calendar error: {e}")
+            return jsonify({"error": f"Failed to fetch content calendar: {str(e)}"}), 500
+
+    @app.route('/api/dashboard/insights-overview')
+    @async_cached_response('dashboard.insights_overview', account_id=dashboard.dashboard_account_id)
+    async def get_insights_overview():
+        account_id = dashboard.dashboard_account_id()
+        if not account_id:
+            return jsonify({"error": "Instagram Account ID is not configured for dashboard"}), 500
+        try:
+            async with async_db.acquire() as conn:
+                reach_impressions = await async_db.fetchrow(dashboard.REACH_IMPRESSIONS_QUERY, (account_id, dashboard.seven_days_ago()), conn)
+                post_stats = await async_db.fetchrow(dashboard.POST_TOTALS_QUERY, (account_id,), conn)
+                followers_row = await async_db.fetchrow(dashboard.CURRENT_FOLLOWERS_QUERY, (account_id,), conn)
+                top_post = await async_db.fetchrow(dashboard.TOP_POST_QUERY, (account_id,), conn)
+            return jsonify(dashboard.build_insights_overview(reach_impressions, post_stats, followers_row, top_post)), 200
+        except Exception as e:
+            print(f"❌ Insights overview error: {e}")
+            return jsonify({"error": f"Failed to fetch insights overview: {str(e)}"}), 500
+
+    # --- Raporlama ---
+    @app.route('/api/reporting/accounts')
+    async def get_managed_accounts():
+        return jsonify(reporting.build_managed_accounts(settings))
+
+    @app.route('/api/reporting/account-summary/<string:account_id>')
+    @async_cached_response('reporting.account_summary', account_kwarg='account_id')
+    async def get_account_summary(account_id):
+        if not reporting.valid_report_account(account_id):
+            return jsonify({"error": "Valid Instagram Account ID is required for summary"}), 400
+        try:
+            async with async_db.acquire() as conn:
+                followers_row = await async_db.fetchrow(reporting.LATEST_FOLLOWERS_QUERY, (account_id,), conn)
+                weekly_stats = await async_db.fetchrow(reporting.WEEKLY_STATS_QUERY, (account_id, dashboard.seven_days_ago()), conn)
+            return jsonify(reporting.build_account_summary(followers_row, weekly_stats)), 200
+        except Exception as e:
+            print(f"❌ Account summary error for {account_id}: {e}")
+            return jsonify({"error": f"Failed to fetch account summary: {str(e)}"}), 500
+
+    @app.route('/api/reporting/follower-demographics/<string:account_id>')
+    @async_cached_response('reporting.follower_demographics', account_kwarg='account_id')
+    async def get_follower_demographics(account_id):
+        if not reporting.valid_report_account(account_id):
+            return jsonify({"error": "Valid Instagram Account ID is required for demographics"}), 400
+        try:
+            demographics_data = {}
+            async with async_db.acquire() as conn:
+                for demo_type, metric_name in reporting.DEMOGRAPHIC_METRICS.items():
+                    rows = await async_db.fetch(reporting.DEMOGRAPHICS_QUERY, (account_id, metric_name), conn)
+                    demographics_data[demo_type] = reporting.build_demographic_list(rows)
+            return jsonify(demographics_data), 200
+        except Exception as e:
+            print(f"❌ Follower demographics error for {account_id}: {e}")
+            return jsonify({"error": f"Failed to fetch follower demographics: {str(e)}"}), 500
+
+    @app.route('/api/reporting/hashtags/<string:account_id>')
+    @async_cached_response('reporting.hashtags', account_kwarg='account_id')
+    async def get_hashtag_stats(account_id):
+        if not reporting.valid_report_account(account_id):
+            return jsonify({"error": "Valid Instagram Account ID is required for hashtag stats"}), 400
+        try:
+            sort, limit, min_posts = reporting.parse_hashtag_query(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            async with async_db.acquire() as conn:
+                rows = await async_db.fetch(reporting.HASHTAG_STATS_QUERY.format(order=reporting.HASHTAG_SORTS[sort]),
+                                            (account_id, min_posts, limit), conn)
+                baseline_row = await async_db.fetchrow(reporting.ACCOUNT_ENGAGEMENT_BASELINE_QUERY, (account_id,), conn)
+            return jsonify(reporting.build_hashtag_stats(rows, baseline_row, sort)), 200
+        except Exception as e:
+            print(f"❌ Hashtag stats error for {account_id}: {e}")
+            return jsonify({"error": f"Failed to fetch hashtag stats: {str(e)}"}), 500
+
+    # --- Yayın ---
+    @app.route('/api/schedule-ig-post', methods=['POST'])
+    async def schedule_ig_post():
+        form_data = await request.form
+        media_file = (await request.files).get('media')
+        try:
+            form = parse_schedule_form(form_data, media_file)
+        except ScheduleRequestError as e:
+            return jsonify({"error": str(e)}), e.status
+        if not settings.ig_app_access_token:
+            print("❌ HATA: IG_APP_ACCESS_TOKEN .env'de ayarlanmamış.")
+            return jsonify({"error": "Server IG publishing config error."}), 500
+
+        media_url = form["media_url"]
+        publish_time = form["scheduled_publish_time"]
+        if form["use_optimal_hour"]:
+            publish_time = await asyncio.to_thread(apply_optimal_hour, publish_time) # ilk çağrıda model yüklenebilir
+
+        media_path = s3_object_name = media_content_type = None
+        if not media_url:
+            s3_object_name = build_s3_object_name(media_file.filename)
+            media_content_type = media_file.content_type
+            try:
+                media_path = new_spool_path(os.path.splitext(media_file.filename)[1])
+                await media_file.save(media_path)
+            except OSError as e:
+                print(f"❌ Medya spool klasörüne yazılamadı: {e}")
+                return jsonify({"error": "Failed to store media for publishing."}), 500
+        try:
+            job_id = await async_db.fetchval(ENQUEUE_JOB_QUERY, (form["ig_account_id"], form["caption"], media_path, media_content_type,
+                                                                 s3_object_name, publish_time, PUBLISH_MAX_ATTEMPTS, media_url))
+        except Exception as e:
+            print(f"❌ Yayın işi kuyruğa eklenemedi: {e}")
+            _remove_spooled_media(media_path)
+            return jsonify({"error": "Failed to queue publish job.", "details": str(e)}), 500
+        services.notify_publish_workers()
+        print(f"ℹ️ Yayın işi #{job_id} kuyruğa eklendi (hesap {form['ig_account_id']}, zaman {publish_time}).")
+        status_url = f"/api/publish-jobs/{job_id}"
+        response = jsonify({"message": "Post queued for publishing.", "job_id": job_id, "status": "queued",
+                            "scheduled_publish_time": publish_time, "status_url": status_url})
+        response.headers["Location"] = status_url
+        return response, 202
+
+    @app.route('/api/publish-jobs/<int:job_id>')
+    async def get_publish_job(job_id):
+        try:
+            row = await async_db.fetchrow(GET_JOB_QUERY, (job_id,))
+        except Exception as e:
+            print(f"❌ Yayın işi durumu okunamadı (#{job_id}): {e}")
+            return jsonify({"error": "Failed to fetch publish job.", "details": str(e)}), 500
+        job = public_job_dict(tuple(row) if row else None)
+        if job is None: return jsonify({"error": "Publish job not found."}), 404
+        return jsonify(job), 200
+
+    @app.route('/publish-queue-stats')
+    async def publish_queue_stats():
+        try:
+            rows = await async_db.fetch(QUEUE_STATS_QUERY)
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+        workers = services.publish_worker_pool.stats() if services.publish_worker_pool else {}
+        return jsonify({"jobs_by_status": {row[0]: row[1] for row in rows}, "workers": workers}), 200
+
+    # --- Öneriler ---
+    @app.route('/api/generate-post-suggestions', methods=['POST'])
+    async def generate_post_suggestions():
+        if not services.gemini_model: return jsonify({"error": "Gemini API is not configured."}), 503
+        data = await request.get_json(silent=True)
+        if not data or not data.get('subject'): return jsonify({"error": "Post subject is required."}), 400
+        try:
+            suggestions, cache_status = await services.suggestion_service.generate_async(data['subject'], data.get('media_type', 'unknown'))
+        except Exception as e:
+            print(f"❌ Gemini API hatası: {e}")
+            return jsonify({"error": "AI suggestions failed.", "details": str(e)}), 503
+        response = jsonify(suggestions)
+        response.headers["X-Cache"] = cache_status
+        return response, 200
+
+    # --- İzleme ---
+    @app.route('/')
+    async def index(): return "✅ Targetly backend (ASGI) is alive!"
+
+    @app.route('/metrics')
+    async def metrics_route():
+        return metrics.render_metrics(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+    @app.route('/db-pool-stats')
+    async def db_pool_stats():
+        return jsonify(async_db.get_async_pool_stats()), 200
+
+    @app.route('/response-cache-stats')
+    async def response_cache_stats():
+        return jsonify(response_cache.get_cache_stats()), 200
+
+    @app.route('/suggestion-cache-stats')
+    async def suggestion_cache_stats():
+        return jsonify(services.suggestion_service.stats()), 200
+
+    return app
+
+
+app = create_async_app()
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🚀 Targetly ASGI Backend is preparing to launch...")
+    uvicorn.run("async_app:app", host='0.0.0.0', port=int(os.getenv("ASYNC_APP_PORT", 5001)))
@@ -0,0 +1,168 @@
+# targetly-backend/async_db.py
+# ASGI modu (async_app.py) için asyncpg bağlantı havuzu. Bağlantı bilgileri db.py ile aynı DB_* değişkenlerinden
+# okunur. Route'lar ve yayın kuyruğu psycopg2 biçimindeki (%s / %(ad)s) SQL sabitlerini kullandığı için sorgular
+# asyncpg'nin $1, $2... biçimine bir kez çevrilir ve önbelleklenir; aynı SQL iki sürücüde de ortak kalır.
+import json
+import os
+import re
+import time
+
+import metrics
+from settings import load_env_files
+
+load_env_files() # backend/.env + common/.env, süreç başına bir kez
+
+ASYNC_DB_POOL_MIN_SIZE = int(os.getenv("ASYNC_DB_POOL_MIN_SIZE", 2))
+ASYNC_DB_POOL_MAX_SIZE = int(os.getenv("ASYNC_DB_POOL_MAX_SIZE", 20))
+ASYNC_DB_COMMAND_TIMEOUT = float(os.getenv("ASYNC_DB_COMMAND_TIMEOUT", 30)) # saniye
+ASYNC_DB_CHECKOUT_TIMEOUT = float(os.getenv("ASYNC_DB_CHECKOUT_TIMEOUT", 5)) # saniye
+
+_PLACEHOLDER_PATTERN = re.compile(r"%%|%\((\w+)\)s|%s")
+
+_pool = None
+_converted = {} # psycopg2 SQL -> (asyncpg SQL, parametre adları veya None)
+_stats = {"queries": 0, "errors": 0, "total_query_seconds": 0.0}
+
+
+class AsyncPoolNotReadyError(RuntimeError):
+    """Havuz henüz açılmadı (before_serving çalışmadı) ya da kapatıldı."""
+
+
+def convert_query(query):
+    """
+    psycopg2 yer tutucularını asyncpg'ye çevirir: %s -> $n, %(ad)s -> $n (aynı ad tekrar ederse aynı $n), %% -> %.
+    (asyncpg SQL, adlar) döndürür; konumsal sorgularda adlar None'dır.
+    """
+    cached = _converted.get(query)
+    if cached is not None:
+        return cached
+    names = []
+    positional = 0
+
+    def replace(match):
+        nonlocal positional
+        token = match.group(0)
+        if token == "%%":
+            return "%"
+        name = match.group(1)
+        if name is None:
+            positional += 1
+            return f"${positional}"
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    converted = _PLACEHOLDER_PATTERN.sub(replace, query)
+    if positional and names:
+        raise ValueError("Sorguda konumsal (%s) ve adlandırılmış (%(ad)s) yer tutucular karışık kullanılamaz.")
+    _converted[query] = (converted, names or None)
+    return _converted[query]
+
+
+def _bind(query, params):
+    converted, names = convert_query(query)
+    if params is None:
+        return converted, []
+    if names is not None:
+        return converted, [params[name] for name in names]
+    return converted, list(params)
+
+
+async def _init_connection(conn):
+    # JSONB değerleri psycopg2'deki gibi Python nesnesi olarak okunur / yazılır
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def open_pool(min_size=ASYNC_DB_POOL_MIN_SIZE, max_size=ASYNC_DB_POOL_MAX_SIZE):
+    global _pool
+    if _pool is not None:
+        return _pool
+    import asyncpg
+
+    _pool = await asyncpg.create_pool(
+        host=os.getenv("DB_HOST"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        port=int(os.getenv("DB_PORT", 5432)),
+        min_size=min_size,
+        max_size=max_size,
+        command_timeout=ASYNC_DB_COMMAND_TIMEOUT,
+        init=_init_connection,
+    )
+    print(f"✅ INFO: asyncpg havuzu açıldı (min {min_size}, max {max_size}).")
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def get_async_pool():
+    if _pool is None:
+        raise AsyncPoolNotReadyError("asyncpg havuzu açık değil.")
+    return _pool
+
+
+def acquire():
+    """`async with acquire() as conn:` — havuzdan bağlantı (ASYNC_DB_CHECKOUT_TIMEOUT içinde) alır."""
+    return get_async_pool().acquire(timeout=ASYNC_DB_CHECKOUT_TIMEOUT)
+
+
+async def _run(method, query, params, conn):
+    converted, args = _bind(query, params)
+    started = time.perf_counter()
+    error = False
+    try:
+        if conn is not None:
+            return await getattr(conn, method)(converted, *args)
+        async with acquire() as pooled:
+            return await getattr(pooled, method)(converted, *args)
+    except Exception:
+        _stats["errors"] += 1
+        error = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _stats["queries"] += 1
+        _stats["total_query_seconds"] += elapsed
+        if metrics.METRICS_ENABLED:
+            metrics.record_query(query, elapsed, error) # psycopg2 biçimli SQL: sync modla aynı etiketler
+
+
+async def fetch(query, params=None, conn=None):
+    """Tüm satırlar (asyncpg Record; tuple gibi indekslenir ve dict() ile sözlüğe çevrilir)."""
+    return await _run("fetch", query, params, conn)
+
+
+async def fetchrow(query, params=None, conn=None):
+    return await _run("fetchrow", query, params, conn)
+
+
+async def fetchval(query, params=None, conn=None):
+    return await _run("fetchval", query, params, conn)
+
+
+async def execute(query, params=None, conn=None):
+    return await _run("execute", query, params, conn)
+
+
+def get_async_pool_stats():
+    stats = dict(_stats)
+    stats["total_query_seconds"] = round(stats["total_query_seconds"], 3)
+    stats["avg_query_ms"] = round(stats["total_query_seconds"] * 1000 / stats["queries"], 3) if stats["queries"] else 0.0
+    if _pool is None:
+        stats["open"] = False
+        return stats
+    stats.update({
+        "open": True,
+        "size": _pool.get_size(),
+        "idle": _pool.get_idle_size(),
+        "min_size": _pool.get_min_size(),
+        "max_size": _pool.get_max_size(),
+    })
+    return stats
@@ -0,0 +1,150 @@
+# targetly-backend/async_publish.py
+# ASGI modu için yayın işçileri: publish_jobs.py'deki kuyruk (aynı tablo, aynı SQL, aynı yeniden deneme kuralları)
+# asyncpg havuzu ve paylaşılan bir httpx.AsyncClient ile event loop üzerinde çalışır. Graph API çağrıları
+# beklerken iş parçacığı tutmaz; boto3 senkron olduğu için yalnızca upload_s3 adımı asyncio.to_thread ile çalışır.
+import asyncio
+import os
+import socket
+import time
+
+import async_db
+from metrics import time_dependency
+from publish_jobs import (CLAIM_JOB_QUERY, FAIL_STALE_JOBS_QUERY, FINISH_JOB_QUERY, PUBLISH_LOCK_TIMEOUT_SECONDS,
+                          PUBLISH_POLL_INTERVAL_SECONDS, PUBLISH_WORKER_COUNT, PublishStepError, _remove_spooled_media,
+                          fail_stale_jobs, graph_response_id, job_row_to_dict, lock_lost, save_step_query,
+                          step_failure_outcome, step_timing)
+
+
+async def _graph_post_async(http_client, url, payload, step_name):
+    import httpx
+
+    try:
+        with time_dependency("graph", step_name) as call:
+            response = await http_client.post(url, data=payload)
+            call.set_status(response.status_code)
+    except (httpx.TransportError, httpx.TimeoutException) as e:
+        raise PublishStepError(f"{step_name}: {e}", retryable=True)
+    return graph_response_id(response, step_name)
+
+
+class AsyncPublishJobRunner:
+    """PublishJobRunner'ın adımlarını async çalıştırır; istek URL/gövdeleri senkron runner'dan alınır."""
+
+    def __init__(self, runner, http_client):
+        self.runner = runner
+        self.http_client = http_client
+
+    def pending_steps(self, job):
+        return self.runner.pending_steps(job)
+
+    async def upload_s3(self, job):
+        return await asyncio.to_thread(self.runner.upload_s3, job)
+
+    async def create_container(self, job):
+        return {"container_id": await _graph_post_async(self.http_client, *self.runner.container_request(job), "create_container")}
+
+    async def media_publish(self, job):
+        return {"published_media_id": await _graph_post_async(self.http_client, *self.runner.publish_request(job), "media_publish")}
+
+
+async def claim_next_job_async(worker_name):
+    params = {"worker": worker_name, "lock_timeout": PUBLISH_LOCK_TIMEOUT_SECONDS}
+    async with async_db.acquire() as conn:
+        async with conn.transaction():
+            stale_rows = await async_db.fetch(FAIL_STALE_JOBS_QUERY, params, conn=conn)
+            row = await async_db.fetchrow(CLAIM_JOB_QUERY, params, conn=conn)
+    fail_stale_jobs([tuple(stale) for stale in stale_rows])
+    return job_row_to_dict(tuple(row)) if row else None
+
+
+async def _finish_job_async(job, status, error=None, retry_in_seconds=None, failed_step=None, elapsed_ms=None):
+    timing = step_timing(failed_step, elapsed_ms, job["attempts"], error) if failed_step else {}
+    await async_db.execute(FINISH_JOB_QUERY, {"status": status, "error": error, "retry": retry_in_seconds, "timing": timing,
+                                              "job_id": job["id"], "worker": job["locked_by"]})
+
+
+async def run_publish_job_async(runner, job):
+    """run_publish_job'ın async karşılığı; işin son durumunu döndürür."""
+    for step_name in runner.pending_steps(job):
+        started = time.perf_counter()
+        try:
+            result = await getattr(runner, step_name)(job)
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            status, error, delay = step_failure_outcome(job, step_name, e)
+            await _finish_job_async(job, status, error, delay, step_name, elapsed_ms)
+            if status == "failed":
+                _remove_spooled_media(job["media_path"])
+            return status
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        still_owned = await async_db.fetchval(save_step_query(result), dict(result, job_id=job["id"], worker=job["locked_by"],
+                                                                             timing=step_timing(step_name, elapsed_ms, job["attempts"])))
+        if still_owned is None:
+            return lock_lost(job, step_name)
+        job.update(result)
+    await _finish_job_async(job, "succeeded")
+    _remove_spooled_media(job["media_path"])
+    print(f"✅ Yayın işi #{job['id']} tamamlandı: IG media {job.get('published_media_id')}")
+    return "succeeded"
+
+
+class AsyncPublishWorkerPool:
+    """Event loop üzerinde çalışan yayın işçisi görevleri; notify() beklemedeki işçileri hemen uyandırır."""
+
+    def __init__(self, runner, worker_count=PUBLISH_WORKER_COUNT, poll_interval=PUBLISH_POLL_INTERVAL_SECONDS):
+        self.runner = runner
+        self.worker_count = worker_count
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._stats = {"claimed": 0, "succeeded": 0, "failed": 0, "requeued": 0, "lock_lost": 0, "worker_errors": 0}
+
+    def start(self):
+        if self._tasks:
+            return
+        prefix = f"{socket.gethostname()}:{os.getpid()}:async"
+        self._tasks = [asyncio.create_task(self._work_loop(f"{prefix}:{i}"), name=f"publish-worker-{i}")
+                       for i in range(self.worker_count)]
+        print(f"✅ INFO: {self.worker_count} async yayın işçisi başlatıldı.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["workers"] = len(self._tasks)
+        return stats
+
+    async def run_once(self, worker_name="manual"):
+        """Bir iş sahiplenip çalıştırır; iş yoksa None, varsa son durumu döndürür."""
+        job = await claim_next_job_async(worker_name)
+        if job is None:
+            return None
+        self._stats["claimed"] += 1
+        outcome = await run_publish_job_async(self.runner, job)
+        self._stats["requeued" if outcome == "queued" else outcome] += 1
+        return outcome
+
+    async def _work_loop(self, worker_name):
+        while True:
+            try:
+                outcome = await self.run_once(worker_name)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["worker_errors"] += 1
+                print(f"❌ Yayın işçisi {worker_name} hatası: {e}")
+                outcome = None
+            if outcome is None:
+                # İş yok (veya hata): yeni iş bildirimi ya da poll aralığı kadar bekle
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
@@ -0,0 +1,423 @@
+# targetly-backend/caption_index.py
+# Benzer geçmiş gönderi araması: instagram_posts.caption_cleaned için hesap bazında diske yazılan vektör indeksi.
+# Her açıklama hashing trick ile 2^CAPTION_INDEX_HASH_BITS boyutlu seyrek bir vektöre çevrilir (kelime -> crc32,
+# ağırlık 1 + ln(tf), L2 normalize) ve hesabın dizinine CSR parçaları olarak eklenir (yalnızca sona ekleme).
+# Sorguda IDF hesabın güncel belge frekanslarından (df) hesaplanıp yalnızca sorgu vektörüne uygulanır; böylece
+# yeni gönderiler eklendikçe eski satırların yeniden yazılması gerekmez. Skorlama hesabın tüm satırları üzerinde
+# kaba kuvvet seyrek matris x vektör çarpımı + argpartition ile yapılır (parça parça, ek bellek sınırlı).
+#
+# Dosyalar np.memmap ile salt okunur eşlenir: aynı makinedeki tüm işçi süreçleri işletim sisteminin sayfa
+# önbelleğini paylaşır, indeks süreç başına kopyalanmaz. Yazar (veri alımı) önce dizileri uzatır, sonra meta.json'ı
+# atomik olarak değiştirir; okuyucular meta.json değiştiğinde dizileri yeni uzunluklarla yeniden eşler.
+#
+# Güncelleme: save_posts_to_db / post_importer commit'ten sonra sync_account_index() çağırır; hesabın watermark'ından
+# (indeksteki en büyük instagram_posts.id) büyük gönderiler eklenir. Gönderisi olmayan hesaplar için dizin açılmaz.
+# İndeksi olmayan bir hesap aranırsa (veri alımı henüz çalışmamış) istek beklemez: CaptionIndex.schedule_build()
+# kurulumu arka planda başlatır. Açıklaması değişen / silinen gönderiler yeniden kurulumla yansır (silinenler
+# sonuçlarda zaten elenir):
+#   python caption_index.py --sync [--account <instagram_user_id>] [--rebuild]
+import argparse
+import fcntl
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+from scipy import sparse
+
+CAPTION_INDEX_DIR = os.getenv("CAPTION_INDEX_DIR",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "caption_index"))
+CAPTION_INDEX_HASH_BITS = int(os.getenv("CAPTION_INDEX_HASH_BITS", 18)) # değiştirilirse indeksler yeniden kurulur
+CAPTION_INDEX_BATCH_SIZE = int(os.getenv("CAPTION_INDEX_BATCH_SIZE", 5000))
+CAPTION_INDEX_SCORE_CHUNK_ROWS = int(os.getenv("CAPTION_INDEX_SCORE_CHUNK_ROWS", 65536)) # skorlama parça boyutu
+
+WORD_PATTERN = re.compile(r"[^\W\d_]{2,}") # hashtag'lerin metni de kelime sayılır
+
+ACCOUNT_POSTS_AFTER_QUERY = """
+    SELECT id, caption_cleaned
+    FROM instagram_posts
+    WHERE instagram_user_id = %s AND id > %s
+    ORDER BY id
+"""
+INDEXED_ACCOUNTS_QUERY = "SELECT DISTINCT instagram_user_id FROM instagram_posts"
+ACCOUNT_HAS_POSTS_QUERY = "SELECT 1 FROM instagram_posts WHERE instagram_user_id = %s LIMIT 1"
+
+# ad -> dtype; indptr satır sayısı + 1 uzunluğundadır (ilk değer 0)
+_ARRAY_DTYPES = {"post_ids": np.int64, "indptr": np.int64, "indices": np.int32, "weights": np.float32}
+_META_FILE = "meta.json"
+_DF_FILE = "df.bin"
+
+
+def caption_features(text, hash_bits=CAPTION_INDEX_HASH_BITS):
+    """Açıklama -> {özellik indeksi: tekrar sayısı}."""
+    if not text:
+        return {}
+    mask = (1 << hash_bits) - 1
+    return Counter(zlib.crc32(word.encode("utf-8")) & mask for word in WORD_PATTERN.findall(text.lower()))
+
+
+def document_vector(text, hash_bits=CAPTION_INDEX_HASH_BITS):
+    """Saklanan belge vektörü: (sıralı özellikler int32, L2 normalize 1 + ln(tf) ağırlıkları float32)."""
+    counts = caption_features(text, hash_bits)
+    if not counts:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+    features = np.fromiter(sorted(counts), dtype=np.int32, count=len(counts))
+    weights = 1.0 + np.log(np.fromiter((counts[f] for f in features.tolist()), dtype=np.float64, count=len(counts)))
+    weights /= math.sqrt(float(weights @ weights))
+    return features, weights.astype(np.float32)
+
+
+def _account_dir(root, instagram_user_id):
+    return os.path.join(root, re.sub(r"[^\w.-]", "_", str(instagram_user_id)))
+
+
+def _array_path(path, name):
+    return os.path.join(path, f"{name}.bin")
+
+
+def _read_meta(path):
+    try:
+        with open(os.path.join(path, _META_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_meta(path, meta):
+    temp_path = os.path.join(path, f"{_META_FILE}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(temp_path, os.path.join(path, _META_FILE)) # okuyucular ya eski ya yeni meta'yı görür
+
+
+@contextmanager
+def _account_lock(path):
+    """Aynı hesabın indeksine aynı anda tek yazar (farklı süreçler dahil)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _create_segment(path, instagram_user_id):
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    for name in _ARRAY_DTYPES:
+        open(_array_path(path, name), "wb").close()
+    np.zeros(1, dtype=np.int64).tofile(_array_path(path, "indptr"))
+    np.zeros(1 << CAPTION_INDEX_HASH_BITS, dtype=np.int32).tofile(os.path.join(path, _DF_FILE))
+    meta = {"account_id": str(instagram_user_id), "hash_bits": CAPTION_INDEX_HASH_BITS, "rows": 0, "nnz": 0,
+            "watermark": 0, "created_at": time.time(), "updated_at": time.time()}
+    _write_meta(path, meta)
+    return meta
+
+
+def _append_array(path, name, committed_length, values):
+    dtype = _ARRAY_DTYPES[name]
+    with open(_array_path(path, name), "r+b") as f:
+        f.truncate(committed_length * np.dtype(dtype).itemsize) # yarıda kalmış bir önceki eklemenin artıklarını at
+        f.seek(0, os.SEEK_END)
+        np.asarray(values, dtype=dtype).tofile(f)
+
+
+def _append_batch(path, meta, rows):
+    """rows: artan id sırasında (post_table_id, caption_cleaned). Dizileri uzatır ve meta'yı günceller."""
+    post_ids, indptr, features, weights = [], [], [], []
+    nnz = meta["nnz"]
+    for post_table_id, caption in rows:
+        doc_features, doc_weights = document_vector(caption, meta["hash_bits"])
+        nnz += len(doc_features)
+        post_ids.append(post_table_id)
+        indptr.append(nnz)
+        features.append(doc_features)
+        weights.append(doc_weights)
+    features = np.concatenate(features)
+    _append_array(path, "post_ids", meta["rows"], post_ids)
+    _append_array(path, "indptr", meta["rows"] + 1, indptr)
+    _append_array(path, "indices", meta["nnz"], features)
+    _append_array(path, "weights", meta["nnz"], np.concatenate(weights))
+    if len(features):
+        df = np.memmap(os.path.join(path, _DF_FILE), dtype=np.int32, mode="r+", shape=(1 << meta["hash_bits"],))
+        df += np.bincount(features, minlength=len(df)).astype(np.int32) # özellikler belge içinde tekil
+        df.flush()
+        del df
+    meta.update(rows=meta["rows"] + len(post_ids), nnz=nnz, watermark=post_ids[-1], updated_at=time.time())
+    _write_meta(path, meta)
+
+
+def _append_from_db(conn, path, meta, instagram_user_id):
+    added = 0
+    cursor = None
+    try:
+        cursor = conn.cursor(name="caption_index_posts")
+        cursor.itersize = CAPTION_INDEX_BATCH_SIZE
+        cursor.execute(ACCOUNT_POSTS_AFTER_QUERY, (instagram_user_id, meta["watermark"]))
+        while True:
+            rows = cursor.fetchmany(CAPTION_INDEX_BATCH_SIZE)
+            if not rows:
+                break
+            _append_batch(path, meta, rows)
+            added += len(rows)
+    finally:
+        if cursor: cursor.close()
+    conn.commit() # salt okunur transaction'ı bitir
+    return added
+
+
+def account_has_posts(conn, instagram_user_id):
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(ACCOUNT_HAS_POSTS_QUERY, (instagram_user_id,))
+        found = cursor.fetchone() is not None
+    finally:
+        if cursor: cursor.close()
+    conn.commit() # salt okunur transaction'ı bitir
+    return found
+
+
+def sync_account_index(conn, instagram_user_id, root=CAPTION_INDEX_DIR):
+    """
+    Hesabın indeksine watermark'tan sonraki gönderileri ekler (indeks yoksa kurar); eklenen gönderi sayısı.
+    Gönderisi olmayan hesap için segment (ve kilit dosyası) oluşturulmaz.
+    """
+    path = _account_dir(root, instagram_user_id)
+    if _read_meta(path) is None and not account_has_posts(conn, instagram_user_id):
+        return 0
+    with _account_lock(path):
+        meta = _read_meta(path)
+        if meta is None or meta.get("hash_bits") != CAPTION_INDEX_HASH_BITS:
+            meta = _create_segment(path, instagram_user_id)
+        return _append_from_db(conn, path, meta, instagram_user_id)
+
+
+def rebuild_account_index(conn, instagram_user_id, root=CAPTION_INDEX_DIR):
+    """İndeksi ayrı bir dizinde sıfırdan kurup yerine koyar; eşlenmiş eski dosyalar okuyucularda geçerli kalır."""
+    if not account_has_posts(conn, instagram_user_id):
+        remove_account_index(instagram_user_id, root)
+        return 0
+    path = _account_dir(root, instagram_user_id)
+    with _account_lock(path):
+        staging_path, old_path = f"{path}.rebuild", f"{path}.old"
+        meta = _create_segment(staging_path, instagram_user_id)
+        added = _append_from_db(conn, staging_path, meta, instagram_user_id)
+        shutil.rmtree(old_path, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(staging_path, path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        return added
+
+
+def remove_account_index(instagram_user_id, root=CAPTION_INDEX_DIR):
+    path = _account_dir(root, instagram_user_id)
+    with _account_lock(path):
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.remove(f"{path}.lock")
+    except FileNotFoundError:
+        pass
+
+
+def remove_account_indexes(prefix, root=CAPTION_INDEX_DIR):
+    """Hesap kimliği prefix ile başlayan tüm indeksleri siler (benchmark / test tohum verisi temizliği)."""
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        if name.startswith(prefix) and os.path.isdir(os.path.join(root, name)) and "." not in name[len(prefix):]:
+            remove_account_index(name, root)
+
+
+def _map_array(path, name, length):
+    dtype = _ARRAY_DTYPES[name]
+    if length == 0:
+        return np.zeros(0, dtype=dtype) # sıfır uzunluklu dosya eşlenemez
+    return np.memmap(_array_path(path, name), dtype=dtype, mode="r", shape=(length,))
+
+
+class _MappedSegment:
+    """Bir hesabın indeksinin meta.json'daki uzunluklarla eşlenmiş, salt okunur görünümü."""
+
+    def __init__(self, path, meta):
+        self.meta = meta
+        self.rows = meta["rows"]
+        self.dimension = 1 << meta["hash_bits"]
+        self.post_ids = _map_array(path, "post_ids", self.rows)
+        self.indptr = _map_array(path, "indptr", self.rows + 1)
+        self.indices = _map_array(path, "indices", meta["nnz"])
+        self.weights = _map_array(path, "weights", meta["nnz"])
+        self.df = np.memmap(os.path.join(path, _DF_FILE), dtype=np.int32, mode="r", shape=(self.dimension,))
+
+    def query_vector(self, caption):
+        counts = caption_features(caption, self.meta["hash_bits"])
+        if not counts:
+            return None
+        features = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        idf = np.log((1.0 + self.rows) / (1.0 + self.df[features])) + 1.0
+        weights = tf * idf
+        query = np.zeros(self.dimension, dtype=np.float32)
+        query[features] = weights / math.sqrt(float(weights @ weights))
+        return query
+
+    def top_k(self, query, limit, exclude_post_ids=()):
+        """En yüksek skorlu en fazla limit adet (post_table_id, skor); skoru 0 olanlar dönmez."""
+        excluded = np.asarray(list(exclude_post_ids), dtype=np.int64)
+        candidate_ids, candidate_scores = [], []
+        for start in range(0, self.rows, CAPTION_INDEX_SCORE_CHUNK_ROWS):
+            stop = min(start + CAPTION_INDEX_SCORE_CHUNK_ROWS, self.rows)
+            first, last = int(self.indptr[start]), int(self.indptr[stop])
+            local_indptr = (self.indptr[start:stop + 1] - first).astype(np.int32)
+            chunk = sparse.csr_matrix((self.weights[first:last], self.indices[first:last], local_indptr),
+                                      shape=(stop - start, self.dimension))
+            scores = chunk @ query
+            if len(excluded):
+                scores[np.isin(self.post_ids[start:stop], excluded)] = 0
+            if len(scores) > limit:
+                best = np.argpartition(scores, -limit)[-limit:]
+            else:
+                best = np.arange(len(scores))
+            candidate_ids.append(self.post_ids[start:stop][best])
+            candidate_scores.append(scores[best])
+        if not candidate_ids:
+            return []
+        post_ids, scores = np.concatenate(candidate_ids), np.concatenate(candidate_scores)
+        order = np.argsort(-scores, kind="stable")[:limit]
+        return [(int(post_ids[i]), float(scores[i])) for i in order if scores[i] > 0]
+
+
+class CaptionIndex:
+    """
+    Sunucu tarafı okuyucu: hesap başına eşlenmiş segmentleri tutar, meta.json değiştiğinde (yeni gönderiler,
+    yeniden kurulum) yeniden eşler. Yazma veri alımı süreçlerinde sync_account_index() ile yapılır; indeksi hiç
+    kurulmamış hesaplar için schedule_build() aynı işi arka planda yapar.
+    connect: havuzdan bağlantı döndüren fonksiyon (db.get_db_connection); None ise arka plan kurulumu yapılmaz.
+    """
+
+    def __init__(self, root=CAPTION_INDEX_DIR, connect=None):
+        self.root = root
+        self.connect = connect
+        self._segments = {} # instagram_user_id -> (meta.json (inode, mtime_ns, size), _MappedSegment)
+        self._building = set()
+        self._build_lock = threading.Lock()
+        self.searches = 0
+        self.remaps = 0
+        self.builds = 0
+        self.build_errors = 0
+
+    def segment(self, instagram_user_id):
+        path = _account_dir(self.root, instagram_user_id)
+        try:
+            stat = os.stat(os.path.join(path, _META_FILE))
+        except FileNotFoundError:
+            self._segments.pop(instagram_user_id, None)
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._segments.get(instagram_user_id)
+        if cached and cached[0] == key:
+            return cached[1]
+        meta = _read_meta(path)
+        if meta is None or meta.get("hash_bits") != CAPTION_INDEX_HASH_BITS:
+            return None
+        segment = _MappedSegment(path, meta)
+        self._segments[instagram_user_id] = (key, segment) # eşzamanlı iki yeniden eşleme zararsız
+        self.remaps += 1
+        return segment
+
+    def search(self, instagram_user_id, caption, limit, exclude_post_ids=()):
+        """[(post_table_id, skor)]; hesabın indeksi yoksa None."""
+        segment = self.segment(instagram_user_id)
+        if segment is None:
+            return None
+        self.searches += 1
+        query = segment.query_vector(caption)
+        if query is None:
+            return []
+        return segment.top_k(query, limit, exclude_post_ids)
+
+    def _background_build(self, instagram_user_id):
+        started = time.perf_counter()
+        conn = None
+        try:
+            conn = self.connect()
+            added = sync_account_index(conn, instagram_user_id, self.root)
+            self.builds += 1
+            print(f"✅ INFO: {instagram_user_id} açıklama indeksi kuruldu: {added} gönderi "
+                  f"({time.perf_counter() - started:.2f} sn).")
+        except Exception as e:
+            self.build_errors += 1
+            print(f"❌ Açıklama indeksi kurulamadı ({instagram_user_id}): {e}")
+        finally:
+            if conn: conn.close()
+            with self._build_lock:
+                self._building.discard(instagram_user_id)
+
+    def schedule_build(self, instagram_user_id):
+        """Hesabın indeksini arka planda kurar; hesap başına aynı anda tek kurulum. Başlatıldıysa True."""
+        if self.connect is None:
+            return False
+        with self._build_lock:
+            if instagram_user_id in self._building:
+                return False
+            self._building.add(instagram_user_id)
+        threading.Thread(target=self._background_build, args=(instagram_user_id,), name="caption-index-build",
+                         daemon=True).start()
+        return True
+
+    def stats(self):
+        segments = [segment for _, segment in list(self._segments.values())]
+        return {
+            "accounts_mapped": len(segments),
+            "posts_mapped": sum(segment.rows for segment in segments),
+            "mapped_bytes": sum(segment.indices.nbytes + segment.weights.nbytes + segment.post_ids.nbytes
+                                + segment.indptr.nbytes + segment.df.nbytes for segment in segments),
+            "searches": self.searches,
+            "remaps": self.remaps,
+            "builds": self.builds,
+            "builds_running": len(self._building),
+            "build_errors": self.build_errors,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Açıklama benzerlik indeksi (caption_cleaned)")
+    parser.add_argument("--sync", action="store_true", help="Yeni gönderileri indekse ekle (indeks yoksa kur)")
+    parser.add_argument("--rebuild", action="store_true", help="İndeksi sıfırdan yeniden kur")
+    parser.add_argument("--account", help="Yalnızca bu instagram_user_id için (varsayılan: tüm hesaplar)")
+    args = parser.parse_args()
+    if not (args.sync or args.rebuild):
+        parser.print_help()
+        sys.exit(0)
+
+    from db import get_db_connection
+
+    connection = get_db_connection()
+    if connection is None:
+        print("❌ DB bağlantısı kurulamadı (db.py). Durduruldu.")
+        sys.exit(1)
+    try:
+        if args.account:
+            accounts = [args.account]
+        else:
+            cursor = connection.cursor()
+            cursor.execute(INDEXED_ACCOUNTS_QUERY)
+            accounts = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            connection.commit()
+        for account in accounts:
+            started = time.perf_counter()
+            added = (rebuild_account_index if args.rebuild else sync_account_index)(connection, account)
+            print(f"✅ {account}: {added} gönderi indekslendi ({time.perf_counter() - started:.2f} sn) -> {_account_dir(CAPTION_INDEX_DIR, account)}")
+    finally:
+        connection.close()
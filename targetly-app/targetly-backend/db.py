@@ -1,19 +1,307 @@
 import psycopg2
 import os
-from dotenv import load_dotenv
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from psycopg2 import extensions
+
+import metrics
+from settings import load_env_files
+
+load_env_files() # backend/.env + common/.env, süreç başına bir kez
+
+# --- Bağlantı Havuzu Ayarları ---
+# Her istek için yeni TCP/auth handshake yerine süreç genelinde tek bir havuz kullanılır.
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", 5))  # saniye
+DB_POOL_MAX_USES = int(os.getenv("DB_POOL_MAX_USES", 500))  # bu kadar kullanımdan sonra bağlantı yenilenir
+DB_POOL_HEALTH_CHECK = os.getenv("DB_POOL_HEALTH_CHECK", "true").lower() == "true"
+
+
+class InstrumentedCursor(extensions.cursor):
+    """
+    Her SQL ifadesinin süresini metrics.record_query'ye bildirir (istek bazında sorgu sayısı / süresi, yavaş
+    sorgu logu). Bağlantıların varsayılan cursor_factory'sidir; named (server-side) cursor'lar da bu sınıftandır.
+    """
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        error = False
+        try:
+            return super().execute(query, vars)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.record_query(query, time.perf_counter() - started, error)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        error = False
+        try:
+            return super().executemany(query, vars_list)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.record_query(query, time.perf_counter() - started, error)
+
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        error = False
+        try:
+            return super().copy_expert(sql, file, size)
+        except Exception:
+            error = True
+            raise
+        finally:
+            metrics.record_query(sql, time.perf_counter() - started, error)
+
+
+def _connect():
+    return psycopg2.connect(
+        host=os.getenv("DB_HOST"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        port=os.getenv("DB_PORT", 5432),
+        cursor_factory=InstrumentedCursor if metrics.METRICS_ENABLED else None,
+    )
+
+
+class PoolTimeoutError(psycopg2.OperationalError):
+    """Havuzdan belirtilen süre içinde bağlantı alınamadığında fırlatılır."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe PostgreSQL bağlantı havuzu.
+    min/max boyut, checkout timeout, checkout sırasında sağlık kontrolü ve
+    N kullanımdan sonra bağlantının yenilenmesini (recycle) destekler.
+    """
+
+    def __init__(self, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT, max_uses=DB_POOL_MAX_USES,
+                 health_check=DB_POOL_HEALTH_CHECK, connect=_connect):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("Geçersiz havuz boyutu: min_size <= max_size ve max_size >= 1 olmalı.")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.max_uses = max_uses
+        self.health_check = health_check
+        self._connect = connect
+        self._idle = deque()  # (raw_conn, use_count)
+        self._in_use = {}     # id(raw_conn) -> use_count
+        self._size = 0        # açık bağlantı sayısı (idle + in_use)
+        self._cond = threading.Condition()
+        self._closed = False
+        # İstatistikler
+        self._checkouts = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._failed_health_checks = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def _open_new(self):
+        return self._connect()
+
+    def _discard(self, raw_conn):
+        try:
+            raw_conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, raw_conn):
+        if raw_conn.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            with raw_conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            raw_conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def warm_up(self):
+        """min_size kadar bağlantıyı önceden açar."""
+        with self._cond:
+            while self._size < self.min_size:
+                self._idle.append((self._open_new(), 0))
+                self._size += 1
+
+    def getconn(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("Bağlantı havuzu kapatıldı.")
+                if self._idle:
+                    raw_conn, use_count = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Yeni bağlantı açılırken kilidi tutmamak için yer ayır
+                    self._size += 1
+                    raw_conn, use_count = None, 0
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"{timeout} saniye içinde havuzdan bağlantı alınamadı (max_size={self.max_size})."
+                    )
+                self._cond.wait(remaining)
+
+        if raw_conn is not None and not self._is_healthy(raw_conn):
+            with self._cond:
+                self._failed_health_checks += 1
+            self._discard(raw_conn)
+            raw_conn, use_count = None, 0
+        if raw_conn is None:
+            try:
+                raw_conn = self._open_new()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._in_use[id(raw_conn)] = use_count + 1
+            self._checkouts += 1
+            self._total_wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+        return raw_conn
+
+    def putconn(self, raw_conn):
+        with self._cond:
+            use_count = self._in_use.pop(id(raw_conn), None)
+        if use_count is None:
+            return  # bu havuza ait değil veya zaten iade edilmiş
+        keep = not self._closed and not raw_conn.closed
+        if keep and raw_conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            # Açık kalan transaction'lar sonraki kullanıcıya sızmasın
+            try:
+                raw_conn.rollback()
+            except psycopg2.Error:
+                keep = False
+        if keep and self.max_uses and use_count >= self.max_uses:
+            keep = False
+            with self._cond:
+                self._recycled += 1
+        if not keep:
+            self._discard(raw_conn)
+        with self._cond:
+            if keep:
+                self._idle.append((raw_conn, use_count))
+            else:
+                self._size -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "failed_health_checks": self._failed_health_checks,
+                "avg_wait_ms": round(self._total_wait_seconds / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait_seconds * 1000, 3),
+            }
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                raw_conn, _ = self._idle.pop()
+                self._discard(raw_conn)
+                self._size -= 1
+            self._cond.notify_all()
+
+
+class PooledConnection:
+    """
+    Havuzdan alınan bağlantı için ince sarmalayıcı.
+    close() bağlantıyı kapatmak yerine havuza iade eder; böylece mevcut
+    `conn.close()` çağrıları değişmeden havuzla çalışır.
+    """
+
+    def __init__(self, pool, raw_conn):
+        self._pool = pool
+        self._raw_conn = raw_conn
+
+    def __getattr__(self, name):
+        raw_conn = self.__dict__.get("_raw_conn")
+        if raw_conn is None:
+            raise psycopg2.InterfaceError("Bağlantı havuza iade edildi.")
+        return getattr(raw_conn, name)
+
+    @property
+    def closed(self):
+        return 1 if self._raw_conn is None else self._raw_conn.closed
+
+    def close(self):
+        if self._raw_conn is not None:
+            raw_conn, self._raw_conn = self._raw_conn, None
+            self._pool.putconn(raw_conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool()
+                try:
+                    pool.warm_up()
+                except psycopg2.Error as e:
+                    print("⚠️ Havuz ön ısıtması başarısız, bağlantılar ihtiyaç anında açılacak:", e)
+                _pool = pool
+    return _pool
+
+
+def get_pool_stats():
+    return get_pool().stats()
 
-load_dotenv()
 
 def get_db_connection():
     try:
-        conn = psycopg2.connect(
-            host=os.getenv("DB_HOST"),
-            database=os.getenv("DB_NAME"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            port=os.getenv("DB_PORT", 5432)
-        )
-        return conn
+        pool = get_pool()
+        return PooledConnection(pool, pool.getconn())
     except psycopg2.Error as e:
         print("❌ Database connection error:", e)
         return None
+
+
+@contextmanager
+def db_connection():
+    """
+    Havuzdan bir bağlantı alır ve blok bitince (hata olsa bile) havuza iade eder.
+
+        with db_connection() as conn:
+            ...
+    """
+    conn = get_db_connection()
+    if conn is None:
+        raise psycopg2.OperationalError("Database connection could not be established")
+    try:
+        yield conn
+    finally:
+        conn.close()
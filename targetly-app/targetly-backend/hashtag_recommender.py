@@ -0,0 +1,343 @@
+# targetly-backend/hashtag_recommender.py
+# Yerel hashtag önerisi: post_hashtags + caption_cleaned'den etkileşim ağırlıklı seyrek eş-geçiş matrisleri
+# (hashtag x hashtag, kelime x hashtag) kurulur ve bellekte SciPy CSR olarak tutulur. "Bu taslak açıklama ve bu
+# hashtag'ler için N hashtag daha öner" sorusu birkaç seyrek satırın toplanması + argpartition ile milisaniyenin
+# altında yanıtlanır; Gemini'ye gitmez.
+#
+# Ağırlık: gönderi başına w = 1 + ln(1 + beğeni + yorum). C = X_tᵀ·diag(w)·X_t (köşegeni hashtag'in ağırlıklı
+# kullanım sayısı f), W = X_kᵀ·diag(w)·X_t. Skorlama kosinüs benzeri normalize edilmiş matrislerle yapılır:
+# C[i,j] / sqrt(f_i·f_j) ve W[k,j] / sqrt(g_k·f_j); böylece her yerde geçen popüler hashtag'ler öne çıkmaz.
+#
+# Güncelleme: veri alımı ayrı süreçte çalıştığı için sunucu en fazla CHECK_INTERVAL'de bir
+# max(instagram_posts.id)'yi kontrol eder; yeni gönderiler (id > watermark) arka planda matrislere eklenir.
+# Mevcut gönderilerin beğeni / açıklama değişiklikleri ve silinen gönderiler FULL_REBUILD aralığındaki tam
+# yeniden kurulumla yansır. Sorgular değişmez bir anlık görüntü (snapshot) üzerinden kilitsiz okunur.
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+HASHTAG_RECOMMENDER_CHECK_INTERVAL_SECONDS = float(os.getenv("HASHTAG_RECOMMENDER_CHECK_INTERVAL_SECONDS", 30))
+HASHTAG_RECOMMENDER_FULL_REBUILD_SECONDS = float(os.getenv("HASHTAG_RECOMMENDER_FULL_REBUILD_SECONDS", 6 * 3600))
+HASHTAG_RECOMMENDER_MIN_TAG_POSTS = int(os.getenv("HASHTAG_RECOMMENDER_MIN_TAG_POSTS", 3)) # daha az gönderide geçen hashtag önerilmez
+HASHTAG_RECOMMENDER_CAPTION_WEIGHT = float(os.getenv("HASHTAG_RECOMMENDER_CAPTION_WEIGHT", 0.5)) # kelime sinyali / hashtag sinyali
+HASHTAG_RECOMMENDER_BATCH_SIZE = int(os.getenv("HASHTAG_RECOMMENDER_BATCH_SIZE", 20000))
+RECOMMEND_DEFAULT_LIMIT = 10
+RECOMMEND_MAX_LIMIT = 50
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)") # common/text_cleaner.HASHTAG_PATTERN ile aynı
+WORD_PATTERN = re.compile(r"(?<![#\w])[^\W\d_]{3,}") # hashtag olmayan, en az 3 harfli kelimeler
+
+# Hashtag'i olmayan gönderiler sinyal taşımadığı için alınmaz. Hashtag'ler normalize_hashtag ile aynı biçimde
+# (küçük harf, tekil) veritabanında hazırlanır. Sunucu taraflı cursor ile gruplar halinde okunur.
+RECOMMENDER_POSTS_QUERY = """
+    SELECT p.id, COALESCE(p.like_count, 0) + COALESCE(p.comments_count, 0), p.caption_cleaned,
+           ARRAY(SELECT DISTINCT lower(h.hashtag) FROM post_hashtags h WHERE h.post_table_id = p.id)
+    FROM instagram_posts p
+    WHERE p.id > %s AND p.id <= %s AND EXISTS (SELECT 1 FROM post_hashtags h WHERE h.post_table_id = p.id)
+    ORDER BY p.id
+"""
+MAX_POST_ID_QUERY = "SELECT MAX(id) FROM instagram_posts"
+
+
+class RecommendationValidationError(ValueError):
+    """İstek gövdesi geçersiz olduğunda fırlatılır."""
+
+
+def normalize_hashtag(value):
+    return value.strip().lstrip("#").lower()
+
+
+def caption_words(text):
+    return set(WORD_PATTERN.findall(text.lower())) if text else set()
+
+
+def parse_recommendation_request(data):
+    """{"caption": "...", "hashtags": ["#a", "b"], "limit": 10} -> (caption, hashtags, limit)."""
+    if not isinstance(data, dict):
+        raise RecommendationValidationError("JSON body is required.")
+    caption = data.get("caption") or ""
+    hashtags = data.get("hashtags") or []
+    if not isinstance(caption, str):
+        raise RecommendationValidationError("'caption' must be a string.")
+    if not isinstance(hashtags, list) or not all(isinstance(tag, str) for tag in hashtags):
+        raise RecommendationValidationError("'hashtags' must be a list of strings.")
+    try:
+        limit = int(data.get("limit", RECOMMEND_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise RecommendationValidationError("'limit' must be an integer.")
+    if not 1 <= limit <= RECOMMEND_MAX_LIMIT:
+        raise RecommendationValidationError(f"'limit' must be between 1 and {RECOMMEND_MAX_LIMIT}.")
+    if not caption.strip() and not hashtags:
+        raise RecommendationValidationError("'caption' or 'hashtags' is required.")
+    return caption, hashtags, limit
+
+
+class _Vocabulary:
+    """str -> ardışık indeks; yalnızca büyür (eski anlık görüntüler kendi boyutlarının altındaki indeksleri kullanır)."""
+
+    def __init__(self):
+        self.ids = {}
+        self.items = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item):
+        index = self.ids.setdefault(item, len(self.items))
+        if index == len(self.items):
+            self.items.append(item)
+        return index
+
+
+class _IndexState:
+    """Ham (normalize edilmemiş) toplamlar; yalnızca derleme kilidi altında değiştirilir."""
+
+    def __init__(self):
+        self.tags = _Vocabulary()
+        self.words = _Vocabulary()
+        self.cooccurrence = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self.word_tag = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self.tag_posts = np.zeros(0, dtype=np.int64)
+        self.word_weight = np.zeros(0, dtype=np.float64)
+        self.watermark = 0
+        self.posts = 0
+        self.built_at = time.monotonic()
+
+    def add_batch(self, rows):
+        """rows: RECOMMENDER_POSTS_QUERY satırları (hashtag'ler normalize ve tekil)."""
+        tag_indices, tag_indptr, word_indices, word_indptr, weights = [], [0], [], [0], []
+        add_tag, add_word = self.tags.add, self.words.add # sıcak döngü: gönderi başına ~20 sözlük işlemi
+        for _, engagement, caption, hashtags in rows:
+            tag_indices.extend(map(add_tag, hashtags))
+            if caption:
+                word_indices.extend(map(add_word, set(WORD_PATTERN.findall(caption.lower()))))
+            tag_indptr.append(len(tag_indices))
+            word_indptr.append(len(word_indices))
+            weights.append(1.0 + math.log1p(max(engagement, 0)))
+        if not weights:
+            return
+        self.watermark = rows[-1][0] # satırlar id sırasıyla gelir; yarıda kalan güncelleme tekrar eklemez
+        n_tags, n_words = len(self.tags), len(self.words)
+        x_tags = sparse.csr_matrix((np.ones(len(tag_indices)), tag_indices, tag_indptr), shape=(len(weights), n_tags))
+        x_words = sparse.csr_matrix((np.ones(len(word_indices)), word_indices, word_indptr), shape=(len(weights), n_words))
+        weighted_tags = sparse.diags(np.asarray(weights)) @ x_tags
+        self.cooccurrence = _grow(self.cooccurrence, (n_tags, n_tags)) + (x_tags.T @ weighted_tags).tocsr()
+        self.word_tag = _grow(self.word_tag, (n_words, n_tags)) + (x_words.T @ weighted_tags).tocsr()
+        self.tag_posts = _grow_vector(self.tag_posts, n_tags) + np.asarray(x_tags.sum(axis=0)).ravel().astype(np.int64)
+        self.word_weight = _grow_vector(self.word_weight, n_words) + x_words.T @ np.asarray(weights)
+        self.posts += len(weights)
+
+    def snapshot(self):
+        return _IndexSnapshot(self)
+
+
+def _grow(matrix, shape):
+    if matrix.shape != shape:
+        matrix.resize(shape) # ham matrisleri anlık görüntüler paylaşmaz; yerinde büyütmek güvenli
+    return matrix
+
+
+def _grow_vector(vector, size):
+    return np.concatenate([vector, np.zeros(size - len(vector), dtype=vector.dtype)]) if len(vector) < size else vector
+
+
+def _inverse_sqrt(values):
+    result = np.zeros(len(values), dtype=np.float64)
+    positive = values > 0
+    result[positive] = 1.0 / np.sqrt(values[positive])
+    return result
+
+
+class _IndexSnapshot:
+    """Skorlamada kullanılan normalize matrisler; oluşturulduktan sonra değişmez."""
+
+    def __init__(self, state):
+        self.tags = state.tags
+        self.words = state.words
+        self.n_tags, self.n_words = len(state.tags), len(state.words)
+        self.posts = state.posts
+        self.watermark = state.watermark
+        tag_weight = state.cooccurrence.diagonal()
+        inverse_tag = sparse.diags(_inverse_sqrt(tag_weight))
+        cooccurrence = (inverse_tag @ state.cooccurrence @ inverse_tag).tocsr()
+        cooccurrence.setdiag(0)
+        cooccurrence.eliminate_zeros()
+        self.cooccurrence = cooccurrence.astype(np.float32)
+        self.word_tag = (sparse.diags(_inverse_sqrt(state.word_weight)) @ state.word_tag @ inverse_tag).tocsr().astype(np.float32)
+        self.eligible = state.tag_posts >= HASHTAG_RECOMMENDER_MIN_TAG_POSTS
+        # Girdi tanınmadığında ve eşit skorlarda popüler hashtag'ler öne geçer
+        self.prior = (tag_weight / tag_weight.max() * 1e-6).astype(np.float32) if self.n_tags else np.zeros(0, np.float32)
+        self.nnz = self.cooccurrence.nnz + self.word_tag.nnz
+
+    def _index(self, vocabulary, item, size):
+        index = vocabulary.ids.get(item)
+        return index if index is not None and index < size else None
+
+    def _known(self, vocabulary, items, size):
+        return [index for index in (self._index(vocabulary, item, size) for item in items) if index is not None]
+
+    def recommend(self, caption, hashtags, limit):
+        input_tags = {normalize_hashtag(tag) for tag in hashtags} | {tag.lower() for tag in HASHTAG_PATTERN.findall(caption)}
+        input_tags.discard("")
+        tag_ids = self._known(self.tags, sorted(input_tags), self.n_tags)
+        word_ids = self._known(self.words, sorted(caption_words(caption)), self.n_words)
+
+        scores = self.prior.copy()
+        if tag_ids:
+            scores += np.asarray(self.cooccurrence[tag_ids].sum(axis=0)).ravel()
+        if word_ids:
+            scores += HASHTAG_RECOMMENDER_CAPTION_WEIGHT * np.asarray(self.word_tag[word_ids].sum(axis=0)).ravel()
+        scores[~self.eligible] = -np.inf
+        scores[tag_ids] = -np.inf # girdideki hashtag'ler tekrar önerilmez
+        candidates = min(limit, int(np.isfinite(scores).sum()))
+        top = np.argpartition(-scores, candidates - 1)[:candidates] if candidates else np.array([], dtype=np.int64)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return {
+            "hashtags": [{"hashtag": f"#{self.tags.items[i]}", "score": round(float(scores[i]), 4)} for i in top],
+            "matched_hashtags": [f"#{self.tags.items[i]}" for i in tag_ids],
+            "unknown_hashtags": sorted(f"#{tag}" for tag in input_tags if self._index(self.tags, tag, self.n_tags) is None),
+            "matched_words": len(word_ids),
+            "source": "local",
+        }
+
+
+class HashtagRecommender:
+    """
+    Eş-geçiş indeksini kurar, yeni gönderilerle artımlı günceller ve önerileri anlık görüntüden yanıtlar.
+    connect: havuzdan bağlantı döndüren fonksiyon (db.get_db_connection).
+    """
+
+    def __init__(self, connect, check_interval=HASHTAG_RECOMMENDER_CHECK_INTERVAL_SECONDS,
+                 full_rebuild_interval=HASHTAG_RECOMMENDER_FULL_REBUILD_SECONDS, batch_size=HASHTAG_RECOMMENDER_BATCH_SIZE):
+        self.connect = connect
+        self.check_interval = check_interval
+        self.full_rebuild_interval = full_rebuild_interval
+        self.batch_size = batch_size
+        self._build_lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self._state = None
+        self._snapshot = None
+        self._last_check = 0.0
+        self._refreshing = False
+        self._stats = {"full_builds": 0, "incremental_updates": 0, "refresh_errors": 0, "requests": 0,
+                       "last_build_ms": 0.0, "last_update_ms": 0.0}
+
+    def _load_posts(self, state, conn, max_post_id):
+        """(watermark, max_post_id] aralığındaki gönderileri ekler; eklenen gönderi sayısını döndürür."""
+        cursor = None
+        posts_before = state.posts
+        try:
+            cursor = conn.cursor(name="hashtag_recommender_posts")
+            cursor.itersize = self.batch_size
+            cursor.execute(RECOMMENDER_POSTS_QUERY, (state.watermark, max_post_id))
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                state.add_batch(rows)
+        finally: # okuma transaction'ı bağlantı havuza dönerken geri alınır
+            if cursor: cursor.close()
+        state.watermark = max(state.watermark, max_post_id) # hashtag'siz gönderiler bir daha taranmaz
+        return state.posts - posts_before
+
+    def _max_post_id(self, conn):
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(MAX_POST_ID_QUERY)
+            return cursor.fetchone()[0] or 0
+        finally:
+            if cursor: cursor.close()
+
+    def refresh(self, force=False):
+        """
+        Gerekirse indeksi günceller: ilk çağrıda / force=True / tam kurulum süresi dolduysa sıfırdan,
+        aksi halde yalnızca watermark'tan sonraki gönderiler eklenir. "full", "incremental" veya None döndürür.
+        """
+        with self._build_lock:
+            started = time.perf_counter()
+            conn = None
+            try:
+                conn = self.connect()
+                max_post_id = self._max_post_id(conn)
+                full = (force or self._state is None
+                        or time.monotonic() - self._state.built_at >= self.full_rebuild_interval)
+                if full:
+                    state = _IndexState()
+                elif max_post_id > self._state.watermark:
+                    state = self._state
+                else:
+                    return None
+                if not self._load_posts(state, conn, max_post_id) and not full:
+                    return None
+            except Exception as e:
+                self._stats["refresh_errors"] += 1
+                print(f"❌ Hashtag öneri indeksi güncellenemedi: {e}")
+                raise
+            finally:
+                if conn: conn.close()
+            self._state = state
+            self._snapshot = state.snapshot()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if full:
+                self._stats["full_builds"] += 1
+                self._stats["last_build_ms"] = round(elapsed_ms, 1)
+                print(f"✅ INFO: Hashtag öneri indeksi kuruldu: {state.posts} gönderi, {len(state.tags)} hashtag, "
+                      f"{len(state.words)} kelime ({elapsed_ms / 1000:.2f} sn).")
+            else:
+                self._stats["incremental_updates"] += 1
+                self._stats["last_update_ms"] = round(elapsed_ms, 1)
+            return "full" if full else "incremental"
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            pass # refresh hatayı loglar ve sayar; mevcut anlık görüntü kullanılmaya devam eder
+        finally:
+            self._refreshing = False
+
+    def _schedule_refresh(self):
+        now = time.monotonic()
+        if self._refreshing or now - self._last_check < self.check_interval:
+            return
+        with self._check_lock:
+            if self._refreshing or now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, name="hashtag-recommender-refresh", daemon=True).start()
+
+    def get_snapshot(self):
+        """Anlık görüntüyü döndürür; henüz kurulmadıysa bu çağrıda kurar (ısınma kapalıysa ilk istek bekler)."""
+        if self._snapshot is None:
+            self.refresh()
+            self._last_check = time.monotonic()
+        else:
+            self._schedule_refresh()
+        return self._snapshot
+
+    def recommend(self, caption, hashtags, limit=RECOMMEND_DEFAULT_LIMIT):
+        snapshot = self.get_snapshot()
+        self._stats["requests"] += 1
+        result = snapshot.recommend(caption, hashtags, limit)
+        result["index"] = {"posts": snapshot.posts, "hashtags": snapshot.n_tags, "words": snapshot.n_words}
+        return result
+
+    def stats(self):
+        snapshot = self._snapshot
+        result = dict(self._stats)
+        result.update({
+            "ready": 1 if snapshot else 0,
+            "posts": snapshot.posts if snapshot else 0,
+            "hashtags": snapshot.n_tags if snapshot else 0,
+            "words": snapshot.n_words if snapshot else 0,
+            "nonzero_entries": snapshot.nnz if snapshot else 0,
+            "watermark_post_id": snapshot.watermark if snapshot else 0,
+        })
+        return result
@@ -0,0 +1,310 @@
+# targetly-backend/metrics.py
+# İstek / SQL / dış bağımlılık ölçümleri ve Prometheus metin formatında /metrics çıktısı.
+#   - Her istek için route (URL kuralı, ör. /api/users/users/<int:user_id>) bazında gecikme histogramı, istekteki
+#     SQL sayısı ve SQL'de geçen süre. Aynı SQL'in bir istekte N_PLUS_ONE_WARN_THRESHOLD kez ve üzeri çalışması
+#     (N+1 deseni) loglanır ve sayılır.
+#   - SQL süreleri db.py'deki InstrumentedCursor (psycopg2 cursor_factory) ve async_db._run üzerinden gelir;
+#     SLOW_QUERY_THRESHOLD_MS üzerindeki sorgular (parametreler olmadan) loglanır.
+#   - Graph API, Gemini ve S3 çağrıları time_dependency() ile bağımlılık + işlem + sonuç bazında ölçülür.
+# Ayrı bir prometheus_client bağımlılığı yoktur; sayaçlar süreç içidir (çok süreçli dağıtımda her süreç ayrı
+# scrape edilir). METRICS_ENABLED=false ile cursor ve istek ölçümü kapatılır.
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from settings import load_env_files
+
+load_env_files() # backend/.env + common/.env, süreç başına bir kez
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+SLOW_QUERY_LOG_MAX_CHARS = int(os.getenv("SLOW_QUERY_LOG_MAX_CHARS", 500))
+N_PLUS_ONE_WARN_THRESHOLD = int(os.getenv("N_PLUS_ONE_WARN_THRESHOLD", 10)) # aynı SQL'in bir istekteki tekrar sayısı
+METRICS_PREFIX = "targetly"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_STATEMENT_KEY_CHARS = 300 # N+1 tespiti için SQL'in karşılaştırılan baş kısmı
+_request_state = contextvars.ContextVar("targetly_request_metrics", default=None)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Sabit kovalı histogram; kova sayaçları kümülatif olmadan tutulur, render sırasında toplanır."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {} # label değerleri -> [kova sayaçları (+Inf dahil), toplam, adet]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, **labels):
+        """(adet, toplam) — bench / kontrol scriptleri için."""
+        with self._lock:
+            series = self._series.get(tuple(labels.get(name, "") for name in self.labelnames))
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(series[0]), series[1], series[2])) for key, series in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+_registry = []
+_gauge_collectors = [] # (ad öneki, açıklama, stats fonksiyonu)
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def register_gauge_collector(prefix, help_text, stats_func):
+    """
+    Mevcut *-stats fonksiyonlarını (db havuzu, yayın kuyruğu...) scrape anında gauge olarak yayınlar: sözlükteki
+    her sayısal değer `<prefix>_<anahtar>` olur; iç içe değerler atlanır.
+    """
+    _gauge_collectors.append((prefix, help_text, stats_func))
+
+
+http_requests_total = _register(Counter(
+    f"{METRICS_PREFIX}_http_requests_total", "HTTP istekleri (route, metot, durum kodu).", ("route", "method", "status")))
+http_request_duration = _register(Histogram(
+    f"{METRICS_PREFIX}_http_request_duration_seconds", "İstek süresi.", ("route", "method")))
+http_request_queries = _register(Histogram(
+    f"{METRICS_PREFIX}_http_request_db_queries", "Bir istekte çalışan SQL sayısı.", ("route",), QUERY_COUNT_BUCKETS))
+http_request_db_time = _register(Histogram(
+    f"{METRICS_PREFIX}_http_request_db_seconds", "Bir istekte SQL'de geçen toplam süre.", ("route",)))
+http_repeated_query_requests = _register(Counter(
+    f"{METRICS_PREFIX}_http_repeated_query_requests_total",
+    "Aynı SQL'i N_PLUS_ONE_WARN_THRESHOLD kez ve üzeri çalıştıran istekler (N+1 şüphesi).", ("route",)))
+db_query_duration = _register(Histogram(
+    f"{METRICS_PREFIX}_db_query_duration_seconds", "Tek SQL ifadesinin süresi (route: istek dışı için 'background').",
+    ("route", "operation")))
+db_query_errors = _register(Counter(
+    f"{METRICS_PREFIX}_db_query_errors_total", "Hata ile biten SQL ifadeleri.", ("route", "operation")))
+db_slow_queries = _register(Counter(
+    f"{METRICS_PREFIX}_db_slow_queries_total", "SLOW_QUERY_THRESHOLD_MS üzerindeki SQL ifadeleri.", ("route", "operation")))
+dependency_duration = _register(Histogram(
+    f"{METRICS_PREFIX}_dependency_duration_seconds", "Dış çağrı süresi (graph, gemini, s3).",
+    ("dependency", "operation", "outcome")))
+
+
+class _RequestState:
+    __slots__ = ("route", "queries", "query_seconds", "statements")
+
+    def __init__(self, route):
+        self.route = route
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements = {}
+
+
+def statement_text(statement, limit):
+    """SQL'in ilk `limit` karakteri (bytes ise yalnızca o kısım çözülür; execute_values gövdeleri büyüktür)."""
+    if isinstance(statement, (bytes, bytearray, memoryview)):
+        return bytes(statement[:limit]).decode("utf-8", "replace")
+    return str(statement)[:limit]
+
+
+def statement_operation(text):
+    words = text.lstrip(" (\n\t").split(None, 1)
+    return words[0].upper() if words else "UNKNOWN"
+
+
+def current_route():
+    state = _request_state.get()
+    return state.route if state is not None else "background"
+
+
+def begin_request(route):
+    """İstek başında çağrılır; dönen token end_request()'e verilir."""
+    return _request_state.set(_RequestState(route)), time.perf_counter()
+
+
+def end_request(token, method, status):
+    context_token, started = token
+    state = _request_state.get()
+    _request_state.reset(context_token)
+    if state is None:
+        return
+    elapsed = time.perf_counter() - started
+    http_requests_total.inc(route=state.route, method=method, status=str(status))
+    http_request_duration.observe(elapsed, route=state.route, method=method)
+    http_request_queries.observe(state.queries, route=state.route)
+    http_request_db_time.observe(state.query_seconds, route=state.route)
+    if state.statements:
+        statement, repeats = max(state.statements.items(), key=lambda item: item[1])
+        if repeats >= N_PLUS_ONE_WARN_THRESHOLD:
+            http_repeated_query_requests.inc(route=state.route)
+            print(f"⚠️ N+1 şüphesi: {method} {state.route} aynı SQL'i {repeats} kez çalıştırdı "
+                  f"(toplam {state.queries} sorgu, {state.query_seconds * 1000:.1f} ms): {' '.join(statement.split())[:200]}")
+
+
+def record_query(statement, seconds, error=False):
+    """Bir SQL ifadesinin süresini kaydeder; eşik üzerindeyse ifadeyi (parametresiz) loglar."""
+    text = statement_text(statement, max(SLOW_QUERY_LOG_MAX_CHARS, _STATEMENT_KEY_CHARS))
+    operation = statement_operation(text)
+    state = _request_state.get()
+    route = state.route if state is not None else "background"
+    db_query_duration.observe(seconds, route=route, operation=operation)
+    if error:
+        db_query_errors.inc(route=route, operation=operation)
+    if state is not None:
+        state.queries += 1
+        state.query_seconds += seconds
+        key = text[:_STATEMENT_KEY_CHARS]
+        state.statements[key] = state.statements.get(key, 0) + 1
+    if seconds * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+        db_slow_queries.inc(route=route, operation=operation)
+        print(f"⚠️ Yavaş sorgu ({seconds * 1000:.1f} ms, {route}): {' '.join(text.split())[:SLOW_QUERY_LOG_MAX_CHARS]}")
+
+
+class DependencyCall:
+    """time_dependency() bloğunda sonucu belirtmek için: set_status(HTTP kodu) -> '2xx' / '4xx' / '5xx'."""
+
+    def __init__(self):
+        self.outcome = "ok"
+
+    def set_status(self, status_code):
+        self.outcome = f"{status_code // 100}xx"
+
+
+@contextmanager
+def time_dependency(dependency, operation):
+    """
+        with time_dependency("graph", "media") as call:
+            response = session.get(...); call.set_status(response.status_code)
+    Blok hata fırlatırsa sonuç 'error' olarak kaydedilir ve hata iletilir.
+    """
+    call = DependencyCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.outcome = "error"
+        raise
+    finally:
+        dependency_duration.observe(time.perf_counter() - started, dependency=dependency, operation=operation,
+                                    outcome=call.outcome)
+
+
+def _render_gauges():
+    lines = []
+    for prefix, help_text, stats_func in _gauge_collectors:
+        try:
+            stats = stats_func()
+        except Exception as e:
+            print(f"⚠️ Metrik toplayıcı hatası ({prefix}): {e}")
+            continue
+        for key, value in sorted(stats.items()):
+            if isinstance(value, bool):
+                value = int(value)
+            if not isinstance(value, (int, float)):
+                continue
+            name = f"{prefix}_{key}"
+            lines += [f"# HELP {name} {help_text} ({key})", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"]
+    return lines
+
+
+def render_metrics():
+    """Tüm metrikler Prometheus metin formatında (CONTENT_TYPE ile sunulur)."""
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    lines += _render_gauges()
+    return "\n".join(lines) + "\n"
+
+
+def install_flask_metrics(app):
+    """Flask uygulamasına istek ölçümü ekler (route etiketi: eşleşen URL kuralı; eşleşmeyenler 'unmatched')."""
+    if not METRICS_ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_metrics():
+        g._metrics_token = begin_request(request.url_rule.rule if request.url_rule else "unmatched")
+
+    @app.after_request
+    def _finish_request_metrics(response):
+        token = g.pop("_metrics_token", None)
+        if token is not None:
+            end_request(token, request.method, response.status_code)
+        return response
+
+    @app.teardown_request
+    def _abort_request_metrics(error=None):
+        # after_request çalışmadıysa (yakalanmayan hata) istek 500 olarak kaydedilir ve bağlam temizlenir
+        token = g.pop("_metrics_token", None)
+        if token is not None:
+            end_request(token, request.method, 500)
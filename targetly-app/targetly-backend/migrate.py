@@ -0,0 +1,153 @@
+# targetly-backend/migrate.py
+# migrations/ klasöründeki sürümlü SQL dosyalarını (NNNN_açıklama.sql) sırayla uygular.
+# Uygulanan sürümler schema_migrations tablosunda tutulur; her dosya kendi transaction'ında çalışır.
+# Şemanın tek kaynağı bu klasördür: API, yayın işçileri ve veri alımı tablolara dokunmadan önce ensure_schema() çağırır.
+#   python migrate.py            -> bekleyen migration'ları uygula
+#   python migrate.py --status   -> uygulanmış / bekleyen sürümleri listele
+import argparse
+import hashlib
+import os
+import re
+import sys
+import threading
+
+from db import get_db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_([a-z0-9_]+)\.sql$")
+
+SCHEMA_MIGRATIONS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    checksum CHAR(64) NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+# Aynı anda açılan süreçler (API + işçi + run_pipeline) migration'ları sırayla uygulasın diye oturum kilidi
+MIGRATIONS_ADVISORY_LOCK_KEY = 7_180_001
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def discover_migrations(migrations_dir=MIGRATIONS_DIR):
+    """[(version, name, path, checksum), ...] sürüme göre sıralı döndürür."""
+    migrations = []
+    for file_name in sorted(os.listdir(migrations_dir)):
+        match = MIGRATION_FILE_PATTERN.match(file_name)
+        if not match:
+            continue
+        path = os.path.join(migrations_dir, file_name)
+        with open(path, "rb") as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        migrations.append((int(match.group(1)), match.group(2), path, checksum))
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Aynı sürüm numarasına sahip birden fazla migration var: {migrations_dir}")
+    return migrations
+
+
+def _applied_migrations(cursor):
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR):
+    """Bekleyen migration'ları uygular; uygulanan sürüm numaralarının listesini döndürür."""
+    cursor = None
+    locked = False
+    applied_now = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATIONS_ADVISORY_LOCK_KEY,))
+        locked = True
+        cursor.execute(SCHEMA_MIGRATIONS_TABLE_DDL)
+        conn.commit()
+        applied = _applied_migrations(cursor)
+        for version, name, path, checksum in discover_migrations(migrations_dir):
+            if version in applied:
+                if applied[version].strip() != checksum:
+                    print(f"⚠️ Migration {version:04d}_{name} uygulandıktan sonra değiştirilmiş (checksum farklı). "
+                          f"Değişiklikler için yeni bir migration dosyası ekleyin.")
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                cursor.execute(f.read())
+            cursor.execute("INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                           (version, name, checksum))
+            conn.commit()
+            applied_now.append(version)
+            print(f"✅ Migration uygulandı: {version:04d}_{name}")
+        return applied_now
+    except Exception as e:
+        if conn: conn.rollback()
+        print(f"❌ Migration hatası: {e}")
+        raise
+    finally:
+        if cursor:
+            if locked:
+                try:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATIONS_ADVISORY_LOCK_KEY,))
+                    conn.commit()
+                except Exception as e: # bağlantı koptuysa kilit oturumla birlikte bırakılır
+                    print(f"⚠️ Migration kilidi bırakılamadı: {e}")
+            cursor.close()
+
+
+def ensure_schema(conn=None):
+    """
+    Bekleyen migration'ları süreç başına bir kez uygular (tablo oluşturan tek yol). conn verilmezse havuzdan
+    bir bağlantı alınıp geri bırakılır.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        own_conn = conn is None
+        if own_conn:
+            conn = get_db_connection()
+            if conn is None:
+                raise RuntimeError("Migration'lar uygulanamadı: DB bağlantısı yok.")
+        try:
+            apply_migrations(conn)
+            _schema_ready = True
+        finally:
+            if own_conn: conn.close()
+
+
+def migration_status(conn, migrations_dir=MIGRATIONS_DIR):
+    """[(version, name, applied_at veya None), ...]"""
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SCHEMA_MIGRATIONS_TABLE_DDL)
+        conn.commit()
+        cursor.execute("SELECT version, applied_at FROM schema_migrations")
+        applied = dict(cursor.fetchall())
+        return [(version, name, applied.get(version)) for version, name, _, _ in discover_migrations(migrations_dir)]
+    finally:
+        if cursor: cursor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sürümlü SQL şema migration'ları")
+    parser.add_argument("--status", action="store_true", help="Uygulanmış / bekleyen migration'ları listele")
+    args = parser.parse_args()
+
+    connection = get_db_connection()
+    if connection is None:
+        print("❌ DB bağlantısı kurulamadı (targetly-backend/.env veya DB_* değişkenlerini kontrol edin).")
+        sys.exit(1)
+    try:
+        if args.status:
+            for version, name, applied_at in migration_status(connection):
+                state = f"uygulandı {applied_at.isoformat()}" if applied_at else "bekliyor"
+                print(f"{version:04d}_{name:<32} {state}")
+        else:
+            applied_versions = apply_migrations(connection)
+            if not applied_versions:
+                print("ℹ️ Şema güncel, bekleyen migration yok.")
+    finally:
+        connection.close()
@@ -0,0 +1,53 @@
+-- targetly-backend/migrations/0001_core_tables.sql
+-- Uygulamanın ve veri alım akışının kullandığı temel tablolar.
+-- IF NOT EXISTS: elle kurulmuş mevcut veritabanları bu sürümü sorunsuz "benimser".
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    full_name VARCHAR(255),
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password VARCHAR(255) NOT NULL,
+    role VARCHAR(50) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS instagram_posts (
+    id SERIAL PRIMARY KEY,
+    instagram_user_id VARCHAR(64) NOT NULL,
+    instagram_post_id VARCHAR(64) NOT NULL UNIQUE,
+    caption_original TEXT,
+    caption_cleaned TEXT,
+    media_type VARCHAR(32),
+    timestamp TIMESTAMPTZ,
+    like_count INTEGER DEFAULT 0,
+    comments_count INTEGER DEFAULT 0,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS post_hashtags (
+    id SERIAL PRIMARY KEY,
+    post_table_id INTEGER NOT NULL REFERENCES instagram_posts(id) ON DELETE CASCADE,
+    hashtag VARCHAR(255) NOT NULL,
+    UNIQUE (post_table_id, hashtag)
+);
+
+CREATE TABLE IF NOT EXISTS daily_insights (
+    id SERIAL PRIMARY KEY,
+    instagram_user_id VARCHAR(64) NOT NULL,
+    metric_name VARCHAR(100) NOT NULL,
+    date DATE NOT NULL,
+    value NUMERIC,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (instagram_user_id, metric_name, date)
+);
+
+CREATE TABLE IF NOT EXISTS follower_insights (
+    id SERIAL PRIMARY KEY,
+    instagram_user_id VARCHAR(64) NOT NULL,
+    metric_name VARCHAR(100) NOT NULL,
+    dimension_key VARCHAR(255),
+    value NUMERIC,
+    period VARCHAR(32),
+    data_date DATE,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (instagram_user_id, metric_name, dimension_key, period, data_date)
+);
@@ -0,0 +1,35 @@
+-- targetly-backend/migrations/0002_ingestion_tables.sql
+-- Çoklu hesap alımı, senkronizasyon durumu ve günlük özet tabloları
+-- (common/instagram_data_fetcher.py, common/sync_state.py, common/daily_rollups.py ile aynı tanımlar).
+
+CREATE TABLE IF NOT EXISTS instagram_accounts (
+    id SERIAL PRIMARY KEY,
+    ig_user_id VARCHAR(64) NOT NULL UNIQUE,
+    account_display_name VARCHAR(255),
+    access_token TEXT NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ingestion_sync_state (
+    instagram_user_id VARCHAR(64) NOT NULL,
+    metric_name VARCHAR(100) NOT NULL,
+    last_post_timestamp TIMESTAMPTZ,
+    last_insight_end_time TIMESTAMPTZ,
+    last_synced_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (instagram_user_id, metric_name)
+);
+
+CREATE TABLE IF NOT EXISTS account_daily_stats (
+    instagram_user_id VARCHAR(64) NOT NULL,
+    stat_date DATE NOT NULL,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    like_sum INTEGER NOT NULL DEFAULT 0,
+    comment_sum INTEGER NOT NULL DEFAULT 0,
+    reach NUMERIC,
+    impressions NUMERIC,
+    accounts_engaged NUMERIC,
+    profile_views NUMERIC,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (instagram_user_id, stat_date)
+);
@@ -0,0 +1,33 @@
+-- targetly-backend/migrations/0003_hot_path_indexes.sql
+-- Route sorgularının erişim yollarına göre bileşik / kapsayan (INCLUDE, PostgreSQL 11+) indeksler.
+-- Büyük tablolarda kesintisiz kurulum gerekiyorsa bu ifadeler elle CREATE INDEX CONCURRENTLY ile
+-- çalıştırılabilir; IF NOT EXISTS sayesinde migration daha sonra bunları atlar.
+
+-- Hesabın gönderileri zamana göre: son gönderiler, içerik takvimi, keyset sayfalama (timestamp, id),
+-- günlük özet yenileme (timestamp aralığı)
+CREATE INDEX IF NOT EXISTS idx_instagram_posts_user_timestamp
+    ON instagram_posts (instagram_user_id, timestamp DESC, id DESC)
+    INCLUDE (instagram_post_id, media_type, like_count, comments_count);
+
+-- En çok beğenilen gönderi (ORDER BY like_count DESC LIMIT 1)
+CREATE INDEX IF NOT EXISTS idx_instagram_posts_user_likes
+    ON instagram_posts (instagram_user_id, like_count DESC)
+    INCLUDE (instagram_post_id);
+
+-- Günlük insight aralıkları; value dahil edildiği için SUM/AVG yalnızca indeksten okunabilir
+CREATE INDEX IF NOT EXISTS idx_daily_insights_user_metric_date
+    ON daily_insights (instagram_user_id, metric_name, date)
+    INCLUDE (value);
+
+-- Demografiler: period = 'lifetime' ORDER BY value DESC
+CREATE INDEX IF NOT EXISTS idx_follower_insights_user_metric_period_value
+    ON follower_insights (instagram_user_id, metric_name, period, value DESC)
+    INCLUDE (dimension_key);
+
+-- En güncel takipçi sayısı: ORDER BY data_date DESC, fetched_at DESC LIMIT 1
+CREATE INDEX IF NOT EXISTS idx_follower_insights_user_metric_latest
+    ON follower_insights (instagram_user_id, metric_name, data_date DESC, fetched_at DESC)
+    INCLUDE (value);
+
+-- Rol bazlı kullanıcı aramaları (hesap bilgisi kartları, kullanıcı listesi)
+CREATE INDEX IF NOT EXISTS idx_users_role_id ON users (role, id);
@@ -0,0 +1,28 @@
+-- targetly-backend/migrations/0004_publish_jobs.sql
+-- /api/schedule-ig-post iş kuyruğu (targetly-backend/publish_jobs.py ile aynı tanım).
+
+CREATE TABLE IF NOT EXISTS publish_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    ig_account_id VARCHAR(64) NOT NULL,
+    caption TEXT NOT NULL DEFAULT '',
+    media_path TEXT NOT NULL,
+    media_content_type VARCHAR(255),
+    s3_object_name TEXT NOT NULL,
+    scheduled_publish_time BIGINT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_by VARCHAR(128),
+    locked_at TIMESTAMPTZ,
+    image_url TEXT,
+    container_id VARCHAR(64),
+    published_media_id VARCHAR(64),
+    step_timings JSONB NOT NULL DEFAULT '{}'::jsonb,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS idx_publish_jobs_queued ON publish_jobs (next_attempt_at, id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_publish_jobs_running ON publish_jobs (locked_at) WHERE status = 'running';
@@ -0,0 +1,5 @@
+-- targetly-backend/migrations/0005_publish_jobs_preuploaded_media.sql
+-- /api/media-uploads ile önceden yüklenen medya için işler spool dosyası / obje adı olmadan (image_url hazır) oluşturulur.
+
+ALTER TABLE publish_jobs ALTER COLUMN media_path DROP NOT NULL;
+ALTER TABLE publish_jobs ALTER COLUMN s3_object_name DROP NOT NULL;
@@ -0,0 +1,32 @@
+-- targetly-backend/migrations/0006_account_hashtag_stats.sql
+-- Hesap + hashtag bazında özet tablo (common/hashtag_stats.py ile aynı tanım) ve top-N sıralamaları için indeksler.
+-- Mevcut veriden doldurmak için: python common/hashtag_stats.py --backfill
+
+CREATE TABLE IF NOT EXISTS account_hashtag_stats (
+    instagram_user_id VARCHAR(64) NOT NULL,
+    hashtag VARCHAR(255) NOT NULL,
+    post_count INTEGER NOT NULL,
+    like_sum BIGINT NOT NULL DEFAULT 0,
+    comment_sum BIGINT NOT NULL DEFAULT 0,
+    avg_engagement DOUBLE PRECISION NOT NULL DEFAULT 0,
+    median_likes DOUBLE PRECISION,
+    median_comments DOUBLE PRECISION,
+    first_used_at TIMESTAMPTZ,
+    last_used_at TIMESTAMPTZ,
+    recency_uses DOUBLE PRECISION NOT NULL DEFAULT 0,
+    recency_engagement DOUBLE PRECISION NOT NULL DEFAULT 0,
+    trend_key DOUBLE PRECISION,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (instagram_user_id, hashtag)
+);
+
+-- ?sort=usage | engagement | trend
+CREATE INDEX IF NOT EXISTS idx_account_hashtag_stats_usage
+    ON account_hashtag_stats (instagram_user_id, post_count DESC, hashtag);
+CREATE INDEX IF NOT EXISTS idx_account_hashtag_stats_engagement
+    ON account_hashtag_stats (instagram_user_id, avg_engagement DESC, hashtag);
+CREATE INDEX IF NOT EXISTS idx_account_hashtag_stats_trend
+    ON account_hashtag_stats (instagram_user_id, trend_key DESC NULLS LAST, hashtag);
+
+-- Alım sırasında dokunulan hashtag'lerin gönderilerini bulmak için (post_hashtags yalnızca post_table_id'ye göre indeksliydi)
+CREATE INDEX IF NOT EXISTS idx_post_hashtags_hashtag ON post_hashtags (hashtag, post_table_id);
@@ -0,0 +1,14 @@
+-- targetly-backend/migrations/0007_account_hashtag_count_stats.sql
+-- Hesap + gönderi başına hashtag sayısı bazında özet tablo (common/hashtag_stats.py ile aynı tanım).
+-- /api/optimal-posting-info ideal hashtag sayısını buradan okur.
+-- Mevcut veriden doldurmak için: python common/hashtag_stats.py --backfill
+
+CREATE TABLE IF NOT EXISTS account_hashtag_count_stats (
+    instagram_user_id VARCHAR(64) NOT NULL,
+    hashtag_count INTEGER NOT NULL,
+    post_count INTEGER NOT NULL,
+    engagement_sum BIGINT NOT NULL DEFAULT 0,
+    avg_engagement DOUBLE PRECISION NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (instagram_user_id, hashtag_count)
+);
@@ -0,0 +1,34 @@
+-- targetly-backend/migrations/0008_backfill_account_daily_stats.sql
+-- 0002 account_daily_stats tablosunu boş oluşturuyordu; mevcut kurulumlarda dashboard'lar
+-- `daily_rollups.py --backfill` elle çalıştırılana kadar sıfır gösteriyordu. Tablo burada ham verilerden
+-- doldurulur (common/daily_rollups.py --backfill ile aynı sonuç). Zaman damgası olmayan gönderiler hesabın
+-- stat_date = '-infinity' satırında toplanır; tüm zamanlar toplamları COUNT(*) ile aynı kalır.
+
+INSERT INTO account_daily_stats (instagram_user_id, stat_date, post_count, like_sum, comment_sum,
+                                 reach, impressions, accounts_engaged, profile_views)
+WITH post_days AS (
+    SELECT instagram_user_id, COALESCE(timestamp::date, '-infinity'::date) AS stat_date,
+           COUNT(*) AS post_count, COALESCE(SUM(like_count), 0) AS like_sum, COALESCE(SUM(comments_count), 0) AS comment_sum
+    FROM instagram_posts
+    GROUP BY 1, 2
+),
+insight_days AS (
+    SELECT instagram_user_id, date AS stat_date,
+           SUM(value) FILTER (WHERE metric_name = 'reach') AS reach,
+           SUM(value) FILTER (WHERE metric_name = 'impressions') AS impressions,
+           SUM(value) FILTER (WHERE metric_name = 'accounts_engaged') AS accounts_engaged,
+           SUM(value) FILTER (WHERE metric_name = 'profile_views') AS profile_views
+    FROM daily_insights
+    WHERE metric_name IN ('reach', 'impressions', 'accounts_engaged', 'profile_views')
+    GROUP BY 1, 2
+)
+SELECT COALESCE(p.instagram_user_id, i.instagram_user_id), COALESCE(p.stat_date, i.stat_date),
+       COALESCE(p.post_count, 0), COALESCE(p.like_sum, 0), COALESCE(p.comment_sum, 0),
+       i.reach, i.impressions, i.accounts_engaged, i.profile_views
+FROM post_days p
+FULL OUTER JOIN insight_days i ON i.instagram_user_id = p.instagram_user_id AND i.stat_date = p.stat_date
+ON CONFLICT (instagram_user_id, stat_date) DO UPDATE SET
+    post_count = EXCLUDED.post_count, like_sum = EXCLUDED.like_sum, comment_sum = EXCLUDED.comment_sum,
+    reach = EXCLUDED.reach, impressions = EXCLUDED.impressions,
+    accounts_engaged = EXCLUDED.accounts_engaged, profile_views = EXCLUDED.profile_views,
+    updated_at = CURRENT_TIMESTAMP;
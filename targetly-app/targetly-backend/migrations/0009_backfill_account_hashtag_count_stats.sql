@@ -0,0 +1,16 @@
+-- targetly-backend/migrations/0009_backfill_account_hashtag_count_stats.sql
+-- 0007 account_hashtag_count_stats tablosunu boş oluşturuyordu; ideal hashtag sayısı ve hashtag kaldıracının
+-- tabanı bu tablodan okunduğu için mevcut kurulumlarda tablo burada ham verilerden doldurulur
+-- (common/hashtag_stats.py --backfill ile aynı gruplar).
+
+INSERT INTO account_hashtag_count_stats (instagram_user_id, hashtag_count, post_count, engagement_sum, avg_engagement)
+SELECT instagram_user_id, hashtag_count, COUNT(*), SUM(engagement), SUM(engagement)::float8 / COUNT(*)
+FROM (
+    SELECT p.instagram_user_id, COALESCE(p.like_count, 0) + COALESCE(p.comments_count, 0) AS engagement,
+           (SELECT COUNT(*) FROM post_hashtags h WHERE h.post_table_id = p.id) AS hashtag_count
+    FROM instagram_posts p
+) posts
+GROUP BY 1, 2
+ON CONFLICT (instagram_user_id, hashtag_count) DO UPDATE SET
+    post_count = EXCLUDED.post_count, engagement_sum = EXCLUDED.engagement_sum,
+    avg_engagement = EXCLUDED.avg_engagement, updated_at = CURRENT_TIMESTAMP;
@@ -0,0 +1,9 @@
+-- targetly-backend/migrations/0010_response_cache_generations.sql
+-- Yanıt önbelleğinin hesap nesil sayaçları (response_cache.py, memory arka ucu). Ayrı süreçte çalışan
+-- run_pipeline / içe aktarma invalidate_account() ile sayacı artırır, API süreçleri aramada okur.
+
+CREATE TABLE IF NOT EXISTS response_cache_generations (
+    counter_key VARCHAR(128) PRIMARY KEY,
+    generation BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,291 @@
+# targetly-backend/ml_scoring.py
+# GradientBoosting modeli için toplu (batch) özellik çıkarımı ve tahmin.
+# Aday gönderilerin tamamı tek bir NumPy matrisine dönüştürülür ve tek bir model.predict çağrısıyla skorlanır.
+# Optimal paylaşım tablosu (7 gün x 24 saat x açıklama uzunlukları) model dosyasının mtime + hash'ine göre önbelleklenir.
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+PREDICT_MAX_BATCH = int(os.getenv("PREDICT_MAX_BATCH", 5000)) # tek istekte skorlanabilecek en fazla aday
+
+DEFAULT_FEATURES_ORDER = ['caption_length', 'post_hour', 'post_dayofweek', 'Month', 'Year']
+
+GRID_CAPTION_LENGTH_MIN = int(os.getenv("OPTIMAL_GRID_CAPTION_LENGTH_MIN", 0))
+GRID_CAPTION_LENGTH_MAX = int(os.getenv("OPTIMAL_GRID_CAPTION_LENGTH_MAX", 300))
+GRID_CAPTION_LENGTH_STEP = int(os.getenv("OPTIMAL_GRID_CAPTION_LENGTH_STEP", 5))
+PLANNED_TIME_MIN_YEAR = int(os.getenv("PLANNED_TIME_MIN_YEAR", 2000)) # planned_time kabul aralığı (yıllar dahil)
+PLANNED_TIME_MAX_YEAR = int(os.getenv("PLANNED_TIME_MAX_YEAR", 2100))
+MODEL_CHECK_INTERVAL_SECONDS = float(os.getenv("MODEL_CHECK_INTERVAL_SECONDS", 5)) # model dosyası en fazla bu sıklıkta stat edilir
+
+DAY_NAMES_TR = ["Pazartesi", "Salı", "Çarşamba", "Perşembe", "Cuma", "Cumartesi", "Pazar"] # dayofweek sırası
+
+_SECONDS_PER_DAY = 86400
+_EPOCH_WEEKDAY = 3 # 1970-01-01 Perşembe (pandas dt.dayofweek: Pazartesi=0)
+_PLANNED_TIME_MIN_UNIX = int(datetime(PLANNED_TIME_MIN_YEAR, 1, 1, tzinfo=timezone.utc).timestamp())
+_PLANNED_TIME_END_UNIX = int(datetime(PLANNED_TIME_MAX_YEAR + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+
+
+class CandidateValidationError(ValueError):
+    """Aday gönderi listesi geçersiz olduğunda fırlatılır; index hatalı adayı gösterir."""
+
+    def __init__(self, message, index=None):
+        super().__init__(message)
+        self.index = index
+
+
+def _check_planned_unix(value):
+    # NaN karşılaştırmaları False döner, aralık dışı sayılır; büyük değerler int'e / int64'e çevrilmeden reddedilir
+    if _PLANNED_TIME_MIN_UNIX <= value < _PLANNED_TIME_END_UNIX:
+        return int(value)
+    if _PLANNED_TIME_MIN_UNIX * 1000 <= value < _PLANNED_TIME_END_UNIX * 1000:
+        raise ValueError("planned_time milisaniye gibi görünüyor; unix saniye gönderin (Date.now() / 1000).")
+    raise ValueError(f"planned_time {PLANNED_TIME_MIN_YEAR}-{PLANNED_TIME_MAX_YEAR} yılları arasında olmalı.")
+
+
+def parse_planned_time(value):
+    """
+    Unix zaman damgası (sn) veya ISO 8601 metni -> UTC unix saniye (int).
+    PLANNED_TIME_MIN_YEAR-PLANNED_TIME_MAX_YEAR dışındaki zamanlar ValueError ile reddedilir.
+    """
+    if isinstance(value, bool):
+        raise ValueError("planned_time boolean olamaz")
+    if isinstance(value, (int, float)):
+        return _check_planned_unix(value)
+    if isinstance(value, str) and value.strip():
+        text = value.strip()
+        if text.lstrip("-").isdigit():
+            return _check_planned_unix(int(text))
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"Geçersiz planned_time: {value!r} (unix saniye veya ISO 8601 bekleniyor)")
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return _check_planned_unix(parsed.timestamp())
+    raise ValueError(f"Geçersiz planned_time: {value!r}")
+
+
+def parse_candidates(candidates, max_batch=PREDICT_MAX_BATCH):
+    """
+    [{"caption": "...", "planned_time": 1718000000 | "2024-06-10T16:00:00Z"}, ...] listesini
+    (caption_lengths, planned_unix) NumPy dizilerine çevirir.
+    """
+    if not isinstance(candidates, list) or not candidates:
+        raise CandidateValidationError("posts boş olmayan bir liste olmalı.")
+    if len(candidates) > max_batch:
+        raise CandidateValidationError(f"Tek istekte en fazla {max_batch} aday skorlanabilir.")
+    caption_lengths = np.empty(len(candidates), dtype=np.int64)
+    planned_unix = np.empty(len(candidates), dtype=np.int64)
+    for index, candidate in enumerate(candidates):
+        if not isinstance(candidate, dict):
+            raise CandidateValidationError("Her aday bir nesne olmalı.", index)
+        caption = candidate.get("caption") or ""
+        if not isinstance(caption, str):
+            raise CandidateValidationError("caption metin olmalı.", index)
+        if candidate.get("planned_time") is None:
+            raise CandidateValidationError("planned_time zorunlu.", index)
+        try:
+            planned_unix[index] = parse_planned_time(candidate["planned_time"])
+        except (ValueError, OverflowError) as e:
+            raise CandidateValidationError(str(e), index)
+        caption_lengths[index] = len(caption)
+    return caption_lengths, planned_unix
+
+
+def _stack_columns(columns, features_order):
+    missing = [name for name in features_order if name not in columns]
+    if missing:
+        raise KeyError(f"Bilinmeyen özellik(ler): {missing}")
+    return np.column_stack([columns[name] for name in features_order]).astype(np.float64)
+
+
+def build_feature_matrix(caption_lengths, planned_unix, features_order=DEFAULT_FEATURES_ORDER):
+    """
+    Özellik matrisini satır satır değil, sütun bazında vektörel olarak kurar (UTC).
+    Sütun sırası features_order'a göredir; modelin eğitimdeki sırasıyla aynı olmalıdır.
+    """
+    caption_lengths = np.asarray(caption_lengths, dtype=np.int64)
+    planned_unix = np.asarray(planned_unix, dtype=np.int64)
+    days = np.floor_divide(planned_unix, _SECONDS_PER_DAY)
+    stamps = planned_unix.astype("datetime64[s]")
+    months = stamps.astype("datetime64[M]").astype(np.int64)  # 1970-01'den bu yana ay
+    columns = {
+        "caption_length": caption_lengths,
+        "post_hour": np.floor_divide(np.mod(planned_unix, _SECONDS_PER_DAY), 3600),
+        "post_dayofweek": np.mod(days + _EPOCH_WEEKDAY, 7),
+        "Month": np.mod(months, 12) + 1,
+        "Year": np.floor_divide(months, 12) + 1970,
+    }
+    return _stack_columns(columns, features_order)
+
+
+def predict_matrix(model, feature_matrix, features_order=DEFAULT_FEATURES_ORDER):
+    """Tüm matrisi tek bir predict çağrısıyla skorlar."""
+    model_input = feature_matrix
+    if getattr(model, "feature_names_in_", None) is not None:
+        # Model DataFrame ile eğitildiyse sütun adları korunur (uyarı/yanlış sıra olmasın)
+        import pandas as pd
+        model_input = pd.DataFrame(feature_matrix, columns=list(features_order))
+    return np.asarray(model.predict(model_input), dtype=np.float64)
+
+
+def score_candidates(model, candidates, features_order=DEFAULT_FEATURES_ORDER, max_batch=PREDICT_MAX_BATCH):
+    """Aday listesini doğrular, özellik matrisini kurar ve skorlar; (matrix, predictions) döndürür."""
+    caption_lengths, planned_unix = parse_candidates(candidates, max_batch)
+    feature_matrix = build_feature_matrix(caption_lengths, planned_unix, features_order)
+    return feature_matrix, predict_matrix(model, feature_matrix, features_order)
+
+
+def grid_caption_lengths():
+    return np.arange(GRID_CAPTION_LENGTH_MIN, GRID_CAPTION_LENGTH_MAX + 1, max(1, GRID_CAPTION_LENGTH_STEP), dtype=np.int64)
+
+
+def build_grid_matrix(caption_lengths, month, year, features_order=DEFAULT_FEATURES_ORDER):
+    """
+    (gün, saat, açıklama uzunluğu) kartezyen çarpımı için özellik matrisi.
+    Satırlar gün -> saat -> uzunluk sırasındadır; tahminler (7, 24, len(caption_lengths)) şekline getirilebilir.
+    """
+    caption_lengths = np.asarray(caption_lengths, dtype=np.int64)
+    days, hours, lengths = np.meshgrid(np.arange(7), np.arange(24), caption_lengths, indexing="ij")
+    size = days.size
+    columns = {
+        "caption_length": lengths.ravel(),
+        "post_hour": hours.ravel(),
+        "post_dayofweek": days.ravel(),
+        "Month": np.full(size, month, dtype=np.int64),
+        "Year": np.full(size, year, dtype=np.int64),
+    }
+    return _stack_columns(columns, features_order)
+
+
+def _feature_importances(model, features_order):
+    importances = getattr(model, "feature_importances_", None)
+    if importances is None:
+        return []
+    ranked = sorted(zip(features_order, np.asarray(importances, dtype=float).tolist()), key=lambda item: item[1], reverse=True)
+    return [{"feature": name, "importance": round(value, 6)} for name, value in ranked]
+
+
+def compute_optimal_posting_grid(model, features_order=DEFAULT_FEATURES_ORDER, caption_lengths=None, reference_time=None):
+    """
+    Tüm gün/saat/uzunluk tablosunu tek bir predict çağrısıyla skorlar ve özetler.
+    En iyi gün/saat, uzunluklar üzerinden ortalama tahmine göre; en iyi uzunluk o gün/saatte seçilir.
+    """
+    caption_lengths = grid_caption_lengths() if caption_lengths is None else np.asarray(caption_lengths, dtype=np.int64)
+    reference_time = reference_time or datetime.now(timezone.utc)
+    grid_matrix = build_grid_matrix(caption_lengths, reference_time.month, reference_time.year, features_order)
+    predictions = predict_matrix(model, grid_matrix, features_order).reshape(7, 24, len(caption_lengths))
+
+    by_day_hour = predictions.mean(axis=2)
+    best_day, best_hour = np.unravel_index(np.argmax(by_day_hour), by_day_hour.shape)
+    best_length_index = int(np.argmax(predictions[best_day, best_hour]))
+    return {
+        "best_time_prediction": {
+            "day_name": DAY_NAMES_TR[best_day],
+            "dayofweek": int(best_day),
+            "hour": int(best_hour),
+            "estimated_likes": round(float(by_day_hour[best_day, best_hour]), 2),
+        },
+        "best_caption_length_prediction": {
+            "length": int(caption_lengths[best_length_index]),
+            "estimated_likes_at_best_time": round(float(predictions[best_day, best_hour, best_length_index]), 2),
+        },
+        "most_important_features": _feature_importances(model, features_order),
+        "hourly_grid": {
+            "day_names": DAY_NAMES_TR,
+            "hours": list(range(24)),
+            "estimated_likes": np.round(by_day_hour, 2).tolist(),
+        },
+        "caption_lengths": {"min": int(caption_lengths[0]), "max": int(caption_lengths[-1]), "count": int(len(caption_lengths))},
+        "reference_month": f"{reference_time.year:04d}-{reference_time.month:02d}",
+        "computed_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelGridCache:
+    """
+    Yüklü modeli ve ondan hesaplanan optimal paylaşım tablosunu birlikte tutar.
+    Model dosyası (mtime, boyut) değişince hash'i yeniden hesaplanır; hash farklıysa model
+    loader ile yeniden yüklenir ve tablo önceden hesaplanır. Yeni bir joblib dağıtıldığında
+    yeniden başlatma gerekmez. Tablo ayrıca takvim ayı değiştiğinde (Month/Year özellikleri) yenilenir.
+    """
+
+    def __init__(self, model_path, loader, features_order=DEFAULT_FEATURES_ORDER, check_interval=MODEL_CHECK_INTERVAL_SECONDS):
+        self.model_path = model_path
+        self.loader = loader
+        self.features_order = features_order
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._model = None
+        self._stat_key = None
+        self._sha256 = None
+        self._grid = None
+        self._grid_month = None
+        self._last_check = 0.0
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.model_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def refresh(self, force=False):
+        """Model dosyası değiştiyse yeniden yükler; model yeniden yüklendiyse True döndürür."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._stat_key is not None and now - self._last_check < self.check_interval:
+                return False
+            self._last_check = now
+            stat_key = self._stat()
+            if not force and stat_key == self._stat_key:
+                return False
+            sha256 = file_sha256(self.model_path) if stat_key else None
+            self._stat_key = stat_key
+            if not force and sha256 == self._sha256:
+                return False # yalnızca dokunulmuş (touch), içerik aynı
+            self._sha256 = sha256
+            self._model = self.loader() if stat_key else None
+            self._grid, self._grid_month = None, None
+            if self._model is not None:
+                self._compute_grid()
+            return True
+
+    def _compute_grid(self):
+        started = time.perf_counter()
+        try:
+            self._grid = compute_optimal_posting_grid(self._model, self.features_order)
+        except Exception as e:
+            print(f"❌ HATA: Optimal paylaşım tablosu hesaplanamadı: {e}")
+            self._grid = None
+            return
+        self._grid_month = self._grid["reference_month"]
+        self._grid["model_fingerprint"] = {"sha256": self._sha256, "mtime_ns": self._stat_key[0]}
+        print(f"✅ INFO: Optimal paylaşım tablosu {time.perf_counter() - started:.3f} sn'de hesaplandı ({self._grid_month}).")
+
+    def get_model(self):
+        self.refresh()
+        return self._model
+
+    def get_grid(self):
+        """Önbellekteki tabloyu döndürür; model yoksa None."""
+        self.refresh()
+        with self._lock:
+            if self._model is None:
+                return None
+            current_month = datetime.now(timezone.utc).strftime("%Y-%m")
+            if self._grid is None or self._grid_month != current_month:
+                self._compute_grid()
+            return self._grid
@@ -0,0 +1,484 @@
+# targetly-backend/publish_jobs.py
+# Instagram gönderi zamanlama işleri için Postgres tabanlı iş kuyruğu.
+# /api/schedule-ig-post medyayı yerel bir spool klasörüne yazar, publish_jobs tablosuna bir iş ekler ve
+# hemen 202 döner. Arka plan işçileri işleri FOR UPDATE SKIP LOCKED ile sahiplenir ve adımları sırayla çalıştırır:
+#   upload_s3 -> create_container -> media_publish
+# Her adımın sonucu (image_url, container_id, published_media_id) iş satırına yazıldığı için yeniden deneme
+# tamamlanmış adımları atlar. Geçici hatalar (ağ, zaman aşımı, 5xx/429) üstel geri çekilmeyle yeniden denenir.
+# Sahiplik: her adım sonucu locked_by = bu işçi koşuluyla yazılır ve locked_at'i tazeler. Kilit süresi dolup iş başka
+# bir işçiye geçtiyse eski işçi bir sonraki yazımda bunu görür ve kalan adımları çalıştırmadan bırakır. Deneme hakkı
+# bitmiş ve kilidi dolmuş işler (her seferinde işçiyi çökerten iş) yeniden sahiplenilmez, 'failed' olur.
+import json
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import uuid
+
+from psycopg2.extras import Json
+
+from db import get_db_connection
+from metrics import time_dependency
+from migrate import ensure_schema # publish_jobs tablosu migrations/0004-0005 ile oluşturulur
+
+PUBLISH_WORKERS_ENABLED = os.getenv("PUBLISH_WORKERS_ENABLED", "true").lower() == "true"
+PUBLISH_WORKER_COUNT = int(os.getenv("PUBLISH_WORKER_COUNT", 2))
+PUBLISH_POLL_INTERVAL_SECONDS = float(os.getenv("PUBLISH_POLL_INTERVAL_SECONDS", 2))
+PUBLISH_MAX_ATTEMPTS = int(os.getenv("PUBLISH_MAX_ATTEMPTS", 5))
+PUBLISH_RETRY_BASE_SECONDS = float(os.getenv("PUBLISH_RETRY_BASE_SECONDS", 5))
+PUBLISH_RETRY_MAX_SECONDS = float(os.getenv("PUBLISH_RETRY_MAX_SECONDS", 300))
+PUBLISH_HTTP_TIMEOUT_SECONDS = float(os.getenv("PUBLISH_HTTP_TIMEOUT_SECONDS", 30))
+# Bu süreyi aşan "running" işler (çöken işçi) yeniden sahiplenilir. Kilit her adımdan sonra tazelendiği için süre tek
+# bir adımın en uzun süresinden büyük olmalı; Graph adımları HTTP zaman aşımının birkaç katından kısa sürmez diye
+# varsayılmaz, alt sınır 4 x PUBLISH_HTTP_TIMEOUT_SECONDS'tır. Büyük S3 yüklemeleri için ortamdan artırılabilir.
+PUBLISH_LOCK_TIMEOUT_SECONDS = max(int(os.getenv("PUBLISH_LOCK_TIMEOUT_SECONDS", 600)), int(4 * PUBLISH_HTTP_TIMEOUT_SECONDS))
+PUBLISH_SPOOL_DIR = os.getenv("PUBLISH_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "targetly_publish_spool")) # API ve işçiler aynı makinede olmalı
+
+PUBLISH_STEPS = ["upload_s3", "create_container", "media_publish"]
+
+_JOB_COLUMNS = ["id", "ig_account_id", "caption", "media_path", "media_content_type", "s3_object_name",
+                "scheduled_publish_time", "status", "attempts", "max_attempts", "next_attempt_at",
+                "image_url", "container_id", "published_media_id", "step_timings", "last_error",
+                "created_at", "updated_at", "finished_at", "locked_by"]
+_INTERNAL_JOB_COLUMNS = ("media_path", "locked_by") # durum endpoint'inde gösterilmez
+
+CLAIM_JOB_QUERY = f"""
+    UPDATE publish_jobs SET status = 'running', attempts = attempts + 1, locked_by = %(worker)s,
+                            locked_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+    WHERE id = (
+        SELECT id FROM publish_jobs
+        WHERE (status = 'queued' AND next_attempt_at <= CURRENT_TIMESTAMP)
+           OR (status = 'running' AND locked_at < CURRENT_TIMESTAMP - make_interval(secs => %(lock_timeout)s)
+               AND attempts < max_attempts)
+        ORDER BY next_attempt_at, id
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING {", ".join(_JOB_COLUMNS)}
+"""
+# Kilidi dolmuş ve deneme hakkı kalmamış işler: işçi her denemede ölmüş (OOM, süreç çökmesi); yeniden sahiplenilmez
+FAIL_STALE_JOBS_QUERY = """
+    UPDATE publish_jobs SET status = 'failed', locked_by = NULL, locked_at = NULL, finished_at = CURRENT_TIMESTAMP,
+           updated_at = CURRENT_TIMESTAMP,
+           last_error = 'İşçi işi bitiremedi (kilit süresi aşıldı), deneme hakkı kalmadı. ' || COALESCE(last_error, '')
+    WHERE status = 'running' AND attempts >= max_attempts
+      AND locked_at < CURRENT_TIMESTAMP - make_interval(secs => %(lock_timeout)s)
+    RETURNING id, media_path
+"""
+
+
+ENQUEUE_JOB_QUERY = """
+    INSERT INTO publish_jobs (ig_account_id, caption, media_path, media_content_type, s3_object_name,
+                              scheduled_publish_time, max_attempts, image_url)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
+"""
+GET_JOB_QUERY = f"SELECT {', '.join(_JOB_COLUMNS)} FROM publish_jobs WHERE id = %s"
+QUEUE_STATS_QUERY = "SELECT status, COUNT(*) FROM publish_jobs GROUP BY status"
+FINISH_JOB_QUERY = """
+    UPDATE publish_jobs SET status = %(status)s::varchar, last_error = %(error)s, locked_by = NULL, locked_at = NULL,
+           next_attempt_at = CASE WHEN %(retry)s::float8 IS NULL THEN next_attempt_at
+                                  ELSE CURRENT_TIMESTAMP + make_interval(secs => %(retry)s::float8) END,
+           finished_at = CASE WHEN %(status)s::varchar IN ('succeeded', 'failed') THEN CURRENT_TIMESTAMP END,
+           step_timings = step_timings || %(timing)s, updated_at = CURRENT_TIMESTAMP
+    WHERE id = %(job_id)s AND locked_by = %(worker)s
+"""
+
+
+class ScheduleRequestError(ValueError):
+    """Zamanlama isteği geçersiz; status istemciye dönecek HTTP kodudur."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class PublishStepError(Exception):
+    """Bir yayın adımı başarısız oldu; retryable=False ise iş yeniden denenmeden 'failed' olur."""
+
+    def __init__(self, message, retryable=True, details=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.details = details
+
+
+def parse_schedule_form(form, media_file):
+    """
+    /api/schedule-ig-post form alanlarını doğrular (WSGI ve ASGI modları ortak). Medya ya 'media' dosyası ya da
+    önceden yüklenmiş 'media_url' olarak gelir. Geçersiz istekte ScheduleRequestError fırlatır.
+    """
+    media_url = form.get('media_url')
+    if not media_url:
+        if media_file is None: raise ScheduleRequestError("Media file is required")
+        if not media_file.filename: raise ScheduleRequestError("Media file name is empty")
+    elif not media_url.startswith(("https://", "http://")):
+        raise ScheduleRequestError("media_url must be an http(s) URL")
+
+    ig_account_id = form.get('ig_account_id')
+    scheduled_publish_time_unix_str = form.get('scheduled_publish_time')
+    if not ig_account_id: raise ScheduleRequestError("Instagram Account ID is required")
+    if not scheduled_publish_time_unix_str: raise ScheduleRequestError("Scheduled publish time is required")
+    try:
+        scheduled_publish_time_unix = int(scheduled_publish_time_unix_str)
+    except ValueError:
+        raise ScheduleRequestError("Scheduled publish time must be a unix timestamp")
+    return {
+        "ig_account_id": ig_account_id,
+        "caption": f"{form.get('caption', '')} {form.get('hashtags', '')}".strip(),
+        "scheduled_publish_time": scheduled_publish_time_unix,
+        "use_optimal_hour": form.get('use_optimal_hour', 'false').lower() == 'true',
+        "media_url": media_url,
+    }
+
+
+def new_spool_path(suffix=""):
+    os.makedirs(PUBLISH_SPOOL_DIR, exist_ok=True)
+    return os.path.join(PUBLISH_SPOOL_DIR, f"{uuid.uuid4().hex}{suffix}")
+
+
+def spool_media(file_obj, suffix=""):
+    """Yüklenen dosyayı işçinin okuyacağı spool klasörüne yazar; dosya yolunu döndürür."""
+    path = new_spool_path(suffix)
+    file_obj.save(path)
+    return path
+
+
+def _remove_spooled_media(path):
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"⚠️ Spool dosyası silinemedi ({path}): {e}")
+
+
+def job_row_to_dict(row):
+    job = dict(zip(_JOB_COLUMNS, row))
+    for key in ("next_attempt_at", "created_at", "updated_at", "finished_at"):
+        if job.get(key) is not None:
+            job[key] = job[key].isoformat()
+    return job
+
+
+def public_job_dict(row):
+    """Durum endpoint'i için iş sözlüğü (yoksa None). Dahili alanlar (media_path) dışarıda bırakılır."""
+    if row is None:
+        return None
+    job = job_row_to_dict(row)
+    for column in _INTERNAL_JOB_COLUMNS:
+        job.pop(column, None)
+    return job
+
+
+def enqueue_publish_job(conn, ig_account_id, caption, media_path, media_content_type, s3_object_name,
+                        scheduled_publish_time, max_attempts=PUBLISH_MAX_ATTEMPTS, image_url=None):
+    """image_url verilirse (medya /api/media-uploads ile zaten S3'te) upload_s3 adımı atlanır."""
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(ENQUEUE_JOB_QUERY, (ig_account_id, caption, media_path, media_content_type, s3_object_name, scheduled_publish_time, max_attempts, image_url))
+        job_id = cursor.fetchone()[0]
+        conn.commit()
+        return job_id
+    except Exception:
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+
+
+def get_publish_job(conn, job_id):
+    """İşin durumunu sözlük olarak döndürür (yoksa None). Dahili alanlar (media_path) dışarıda bırakılır."""
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(GET_JOB_QUERY, (job_id,))
+        return public_job_dict(cursor.fetchone())
+    finally:
+        if cursor: cursor.close()
+
+
+def get_publish_queue_stats(conn):
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(QUEUE_STATS_QUERY)
+        return dict(cursor.fetchall())
+    finally:
+        if cursor: cursor.close()
+
+
+def retry_delay_seconds(attempt):
+    """Üstel geri çekilme (+%20 jitter): base * 2^(attempt-1), PUBLISH_RETRY_MAX_SECONDS ile sınırlı."""
+    delay = min(PUBLISH_RETRY_BASE_SECONDS * (2 ** max(0, attempt - 1)), PUBLISH_RETRY_MAX_SECONDS)
+    return delay * random.uniform(1.0, 1.2)
+
+
+def _graph_post(url, payload, step_name):
+    import requests  # yalnızca işçi iş parçacıklarında gerekir; app importunu yavaşlatmasın
+
+    try:
+        with time_dependency("graph", step_name) as call:
+            response = requests.post(url, data=payload, timeout=PUBLISH_HTTP_TIMEOUT_SECONDS)
+            call.set_status(response.status_code)
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        raise PublishStepError(f"{step_name}: {e}", retryable=True)
+    return graph_response_id(response, step_name)
+
+
+def graph_response_id(response, step_name):
+    """Graph API yanıtından oluşturulan nesnenin id'si (requests veya httpx yanıtı); hata ise PublishStepError."""
+    try:
+        body = response.json()
+    except ValueError:
+        body = {"raw": response.text[:500]}
+    if response.status_code >= 400:
+        # 5xx ve 429 geçicidir; diğer 4xx (geçersiz token, bozuk medya...) tekrar denense de düzelmez
+        retryable = response.status_code >= 500 or response.status_code == 429
+        raise PublishStepError(f"{step_name}: HTTP {response.status_code}", retryable=retryable, details=body)
+    if not body.get("id"):
+        raise PublishStepError(f"{step_name}: yanıtta id yok", retryable=True, details=body)
+    return body["id"]
+
+
+class PublishJobRunner:
+    """
+    Tek bir işin adımlarını çalıştırır. upload_media(file_obj, object_name, content_type) -> URL veya None;
+    app.py'deki S3 yükleyicisi verilir (böylece bu modül AWS yapılandırmasını bilmez).
+    """
+
+    def __init__(self, upload_media, graph_base_url, access_token):
+        self.upload_media = upload_media
+        self.graph_base_url = graph_base_url.rstrip("/")
+        self.access_token = access_token
+
+    def upload_s3(self, job):
+        with open(job["media_path"], "rb") as media:
+            image_url = self.upload_media(media, job["s3_object_name"], job["media_content_type"])
+        if not image_url:
+            raise PublishStepError("upload_s3: S3 yüklemesi başarısız", retryable=True)
+        return {"image_url": image_url}
+
+    def container_request(self, job):
+        if not self.access_token:
+            raise PublishStepError("create_container: IG_APP_ACCESS_TOKEN ayarlanmamış", retryable=False)
+        return (f"{self.graph_base_url}/{job['ig_account_id']}/media",
+                {"image_url": job["image_url"], "caption": job["caption"], "access_token": self.access_token})
+
+    def publish_request(self, job):
+        return (f"{self.graph_base_url}/{job['ig_account_id']}/media_publish",
+                {"creation_id": job["container_id"], "access_token": self.access_token,
+                 "scheduled_publish_time": job["scheduled_publish_time"]})
+
+    def create_container(self, job):
+        return {"container_id": _graph_post(*self.container_request(job), "create_container")}
+
+    def media_publish(self, job):
+        return {"published_media_id": _graph_post(*self.publish_request(job), "media_publish")}
+
+    def pending_steps(self, job):
+        done = {"upload_s3": job.get("image_url"), "create_container": job.get("container_id"),
+                "media_publish": job.get("published_media_id")}
+        return [step for step in PUBLISH_STEPS if not done[step]]
+
+
+def save_step_query(result):
+    """Adım sonucunu yazar ve kilidi tazeler; iş artık bu işçide değilse satır dönmez."""
+    assignments = ", ".join(f"{column} = %({column})s" for column in result)
+    return f"""
+        UPDATE publish_jobs SET {assignments}, locked_at = CURRENT_TIMESTAMP,
+               step_timings = step_timings || %(timing)s, updated_at = CURRENT_TIMESTAMP
+        WHERE id = %(job_id)s AND locked_by = %(worker)s
+        RETURNING id
+    """
+
+
+def step_timing(step_name, elapsed_ms, attempt, error=None):
+    timing = {"ms": round(elapsed_ms, 1), "attempt": attempt}
+    if error is not None:
+        timing["error"] = error
+    return {step_name: timing}
+
+
+def _save_step_result(conn, job, step_name, result, elapsed_ms):
+    """Kilit hâlâ bu işçideyse True."""
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(save_step_query(result), dict(result, job_id=job["id"], worker=job["locked_by"],
+                                                      timing=Json(step_timing(step_name, elapsed_ms, job["attempts"]))))
+        still_owned = cursor.fetchone() is not None
+        conn.commit()
+        return still_owned
+    except Exception:
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+
+
+def _finish_job(conn, job, status, error=None, retry_in_seconds=None, failed_step=None, elapsed_ms=None):
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        timing = step_timing(failed_step, elapsed_ms, job["attempts"], error) if failed_step else {}
+        cursor.execute(FINISH_JOB_QUERY, {"status": status, "error": error, "retry": retry_in_seconds, "timing": Json(timing),
+                                          "job_id": job["id"], "worker": job["locked_by"]})
+        conn.commit()
+    except Exception:
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+
+
+def fail_stale_jobs(stale_rows):
+    for job_id, media_path in stale_rows:
+        print(f"❌ Yayın işi #{job_id} başarısız: işçi {PUBLISH_LOCK_TIMEOUT_SECONDS} sn içinde bitiremedi, deneme hakkı kalmadı.")
+        _remove_spooled_media(media_path)
+
+
+def claim_next_job(conn, worker_name):
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        params = {"worker": worker_name, "lock_timeout": PUBLISH_LOCK_TIMEOUT_SECONDS}
+        cursor.execute(FAIL_STALE_JOBS_QUERY, params)
+        stale_rows = cursor.fetchall()
+        cursor.execute(CLAIM_JOB_QUERY, params)
+        row = cursor.fetchone()
+        conn.commit()
+        fail_stale_jobs(stale_rows)
+        return job_row_to_dict(row) if row else None
+    except Exception:
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+
+
+def step_failure_outcome(job, step_name, e):
+    """Başarısız adım için (durum, hata metni, tekrar deneme gecikmesi): geçici hatalar deneme hakkı varsa kuyruğa döner."""
+    retryable = e.retryable if isinstance(e, PublishStepError) else not isinstance(e, (OSError, ValueError))
+    details = getattr(e, "details", None)
+    error = f"{e} {json.dumps(details, ensure_ascii=False)[:500]}" if details else str(e)
+    if retryable and job["attempts"] < job["max_attempts"]:
+        delay = retry_delay_seconds(job["attempts"])
+        print(f"⚠️ Yayın işi #{job['id']} {step_name} adımında hata (deneme {job['attempts']}/{job['max_attempts']}), "
+              f"{delay:.0f} sn sonra tekrar denenecek: {error}")
+        return "queued", error, delay
+    print(f"❌ Yayın işi #{job['id']} başarısız ({step_name}): {error}")
+    return "failed", error, None
+
+
+def lock_lost(job, step_name):
+    print(f"⚠️ Yayın işi #{job['id']} {step_name} adımından sonra başka bir işçiye geçmiş (kilit süresi aşıldı); "
+          f"kalan adımlar o işçiye bırakıldı.")
+    return "lock_lost"
+
+
+def run_publish_job(conn, runner, job):
+    """Sahiplenilmiş işin bekleyen adımlarını çalıştırır; işin son durumunu döndürür."""
+    for step_name in runner.pending_steps(job):
+        started = time.perf_counter()
+        try:
+            result = getattr(runner, step_name)(job)
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            status, error, delay = step_failure_outcome(job, step_name, e)
+            _finish_job(conn, job, status, error, delay, step_name, elapsed_ms)
+            if status == "failed":
+                _remove_spooled_media(job["media_path"])
+            return status
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if not _save_step_result(conn, job, step_name, result, elapsed_ms):
+            return lock_lost(job, step_name)
+        job.update(result)
+    _finish_job(conn, job, "succeeded")
+    _remove_spooled_media(job["media_path"])
+    print(f"✅ Yayın işi #{job['id']} tamamlandı: IG media {job.get('published_media_id')}")
+    return "succeeded"
+
+
+class PublishWorkerPool:
+    """Arka plan işçi iş parçacıkları. notify() yeni iş eklendiğinde beklemedeki işçileri hemen uyandırır."""
+
+    def __init__(self, runner, worker_count=PUBLISH_WORKER_COUNT, poll_interval=PUBLISH_POLL_INTERVAL_SECONDS):
+        self.runner = runner
+        self.worker_count = worker_count
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._stats = {"claimed": 0, "succeeded": 0, "failed": 0, "requeued": 0, "lock_lost": 0, "worker_errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        if self._threads:
+            return
+        conn = get_db_connection()
+        if conn is None:
+            print("❌ Yayın işçileri başlatılamadı: DB bağlantısı yok.")
+            return
+        try:
+            ensure_schema(conn)
+        finally:
+            conn.close()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        for i in range(self.worker_count):
+            thread = threading.Thread(target=self._work_loop, args=(f"{prefix}:{i}",), name=f"publish-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"✅ INFO: {self.worker_count} yayın işçisi başlatıldı.")
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["workers"] = len(self._threads)
+        return stats
+
+    def run_once(self, worker_name="manual"):
+        """Bir iş sahiplenip çalıştırır; iş yoksa None, varsa son durumu döndürür."""
+        conn = get_db_connection()
+        if conn is None:
+            raise RuntimeError("DB bağlantısı kurulamadı.")
+        try:
+            job = claim_next_job(conn, worker_name)
+            if job is None:
+                return None
+            self._count("claimed")
+            outcome = run_publish_job(conn, self.runner, job)
+            self._count("requeued" if outcome == "queued" else outcome)
+            return outcome
+        finally:
+            conn.close()
+
+    def _work_loop(self, worker_name):
+        while not self._stopping.is_set():
+            try:
+                outcome = self.run_once(worker_name)
+            except Exception as e:
+                self._count("worker_errors")
+                print(f"❌ Yayın işçisi {worker_name} hatası: {e}")
+                outcome = None
+            if outcome is None:
+                # İş yok (veya hata): yeni iş bildirimi ya da poll aralığı kadar bekle
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
@@ -0,0 +1,350 @@
+# targetly-backend/response_cache.py
+# Dashboard ve raporlama endpoint'leri için TTL + LRU yanıt önbelleği (ETag / If-None-Match destekli).
+# Alttaki tablolar yalnızca veri alım akışı (run_pipeline) çalıştığında değiştiği için yanıtlar
+# route + hesap bazında saklanır; run_pipeline commit ettikten sonra invalidate_account() çağırır.
+#
+# Arka uçlar:
+#   RESPONSE_CACHE_BACKEND=memory  -> girişler süreç içi OrderedDict'te, hesap nesil sayaçları Postgres'te
+#                                     (response_cache_generations; varsayılan)
+#   RESPONSE_CACHE_BACKEND=redis   -> RESPONSE_CACHE_REDIS_URL (redis-py ile konuşan her sunucu; yerelde common/redis_stub_server.py)
+# İki arka uçta da ayrı süreçte çalışan run_pipeline / içe aktarma / işçinin invalidate_account() çağrısı API
+# süreçlerinde görülür. memory arka ucunda sayaç en fazla RESPONSE_CACHE_GENERATION_CHECK_SECONDS süre süreç içinde
+# tutulur; geçersiz kılmanın diğer süreçlere yansıma gecikmesi bu süreyle sınırlıdır.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import make_response, request
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 300))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000))
+RESPONSE_CACHE_KEY_PREFIX = os.getenv("RESPONSE_CACHE_KEY_PREFIX", "targetly:resp:")
+RESPONSE_CACHE_GENERATION_CHECK_SECONDS = float(os.getenv("RESPONSE_CACHE_GENERATION_CHECK_SECONDS", 1))
+
+GENERATION_SELECT_QUERY = "SELECT generation FROM response_cache_generations WHERE counter_key = %s"
+GENERATION_INCR_QUERY = """
+    INSERT INTO response_cache_generations (counter_key, generation) VALUES (%s, 1)
+    ON CONFLICT (counter_key) DO UPDATE SET
+        generation = response_cache_generations.generation + 1, updated_at = CURRENT_TIMESTAMP
+    RETURNING generation
+"""
+
+
+class InProcessBackend:
+    """Thread-safe TTL + LRU sözlük. En eski kullanılan giriş max_entries aşılınca atılır."""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SharedGenerationBackend(InProcessBackend):
+    """
+    Girişler süreç içinde (InProcessBackend), nesil sayaçları Postgres'te tutulur; böylece başka bir süreçteki
+    invalidate_account() da eski girişleri okunmaz yapar. Okunan sayaç check_seconds boyunca yeniden sorgulanmaz.
+    connect: havuzdan bağlantı veren fonksiyon (db.get_db_connection); bağlantı yoksa hata fırlatılır ve çağıran
+    önbelleği atlar.
+    """
+
+    def __init__(self, connect, check_seconds=RESPONSE_CACHE_GENERATION_CHECK_SECONDS, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        super().__init__(max_entries)
+        self.connect = connect
+        self.check_seconds = check_seconds
+        self._checked = {}  # key -> (generation, checked_at)
+
+    def _execute(self, query, key):
+        conn = self.connect()
+        if conn is None:
+            raise RuntimeError("DB bağlantısı yok; nesil sayacı okunamadı.")
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, (key,))
+            row = cursor.fetchone()
+            conn.commit()
+            return int(row[0]) if row else 0
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if cursor: cursor.close()
+            conn.close()
+
+    def get_counter(self, key):
+        now = time.monotonic()
+        with self._lock:
+            checked = self._checked.get(key)
+        if checked and now - checked[1] < self.check_seconds:
+            return checked[0]
+        generation = self._execute(GENERATION_SELECT_QUERY, key)
+        with self._lock:
+            self._checked[key] = (generation, now)
+        return generation
+
+    def incr(self, key):
+        generation = self._execute(GENERATION_INCR_QUERY, key)
+        with self._lock:
+            self._checked[key] = (generation, time.monotonic())
+        return generation
+
+    def clear(self):
+        # Postgres'teki sayaçlar sıfırlanmaz: diğer süreçlerde eski nesille saklanmış girişler yeniden okunabilirdi
+        with self._lock:
+            self._entries.clear()
+            self._checked.clear()
+
+
+class RedisBackend:
+    """
+    redis-py uyumlu bir istemci (get / set(ex=) / incr / delete) üzerinden çalışır.
+    LRU tahliyesi sunucuya bırakılır (maxmemory-policy allkeys-lru); TTL her girişte EX ile verilir.
+    """
+
+    def __init__(self, client, prefix=RESPONSE_CACHE_KEY_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url=RESPONSE_CACHE_REDIS_URL, prefix=RESPONSE_CACHE_KEY_PREFIX):
+        import redis  # yalnızca redis arka ucu seçildiğinde gerekir
+        # protocol=2 (RESP2): Redis-uyumlu sunucuların ve yerel stub'ın ortak paydası
+        return cls(redis.Redis.from_url(url, protocol=2, socket_timeout=1, socket_connect_timeout=1), prefix)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl or None)
+
+    def get_counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def size(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "entry:*"))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0, "stores": 0, "invalidations": 0, "backend_errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if RESPONSE_CACHE_BACKEND == "redis":
+                    _backend = RedisBackend.from_url()
+                    print(f"✅ INFO: Yanıt önbelleği redis arka ucunu kullanıyor: {RESPONSE_CACHE_REDIS_URL}")
+                else:
+                    from db import get_db_connection  # sayaçlar response_cache_generations'ta (migrations/0010)
+
+                    _backend = SharedGenerationBackend(get_db_connection)
+    return _backend
+
+
+def set_backend(backend):
+    """Arka ucu değiştirir (ör. hazır bir redis istemcisi ile RedisBackend)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _generation_key(account_id):
+    return f"gen:{account_id}"
+
+
+def invalidate_account(account_id):
+    """Hesabın nesil sayacını artırır; eski nesille anahtarlanmış tüm girişler artık okunmaz (TTL ile düşer)."""
+    if not RESPONSE_CACHE_ENABLED or not account_id:
+        return
+    try:
+        get_backend().incr(_generation_key(account_id))
+        _count("invalidations")
+    except Exception as e:
+        _count("backend_errors")
+        print(f"⚠️ Yanıt önbelleği geçersiz kılınamadı ({account_id}): {e}")
+
+
+def clear_cache():
+    get_backend().clear()
+
+
+def get_cache_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["enabled"] = RESPONSE_CACHE_ENABLED
+    stats["ttl_seconds"] = RESPONSE_CACHE_TTL_SECONDS
+    try:
+        backend = get_backend()
+        stats["backend"] = type(backend).__name__
+        stats["entries"] = backend.size()
+    except Exception:
+        stats["entries"] = None
+    lookups = stats["hits"] + stats["misses"]  # not_modified, isabetlerin 304 ile dönen alt kümesidir
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cache_headers(entry, cache_status):
+    return {
+        "ETag": entry["etag"],
+        "Cache-Control": "private, no-cache",  # istemci her seferinde ETag ile doğrulasın
+        "X-Cache": cache_status,
+    }
+
+
+def _build_response(entry, cache_status):
+    if etag_matches(request.headers.get("If-None-Match"), entry["etag"]):
+        _count("not_modified")
+        response = make_response("", 304)
+    else:
+        response = make_response(entry["body"], entry["status"])
+        response.mimetype = entry["mimetype"]
+    response.headers.update(cache_headers(entry, cache_status))
+    return response
+
+
+def resolve_cache_account(account_kwarg, account_id, kwargs):
+    if account_kwarg:
+        return kwargs.get(account_kwarg)
+    return account_id() if callable(account_id) else account_id
+
+
+def cache_lookup(route_name, resolved_account, query):
+    """
+    (backend, anahtar, giriş) döndürür; giriş yoksa None. Flask (cached_response) ve ASGI (async_app.py) modları
+    ortak kullanır; arka uç hataları çağırana iletilir.
+    """
+    backend = get_backend()
+    generation = backend.get_counter(_generation_key(resolved_account))
+    key = f"entry:{route_name}:{resolved_account}:{generation}:{query}"
+    entry = backend.get(key)
+    _count("hits" if entry is not None else "misses")
+    return backend, key, entry
+
+
+def cache_store(backend, key, route_name, body, status, mimetype, ttl=None):
+    """200 yanıt gövdesini (bytes) ETag ile saklar ve girişi döndürür; yazma hatası yanıtı engellemez."""
+    entry = {
+        "body": body.decode("utf-8"),
+        "status": status,
+        "mimetype": mimetype,
+        "etag": '"' + hashlib.sha1(body).hexdigest() + '"',
+    }
+    try:
+        backend.set(key, entry, ttl or RESPONSE_CACHE_TTL_SECONDS)
+        _count("stores")
+    except Exception as e:
+        _count("backend_errors")
+        print(f"⚠️ Yanıt önbelleğe yazılamadı ({route_name}): {e}")
+    return entry
+
+
+def cache_read_failed(route_name, e):
+    _count("backend_errors")
+    print(f"⚠️ Yanıt önbelleği okunamadı ({route_name}): {e}")
+
+
+def count_not_modified():
+    _count("not_modified")
+
+
+def cached_response(route_name, account_kwarg=None, account_id=None, ttl=None):
+    """
+    Flask view'ları için dekoratör. Anahtar: route_name + hesap ID + hesabın nesli + query string.
+    account_kwarg URL parametresinin adıdır (ör. "account_id"); sabit hesaplı route'larda account_id verilir
+    (ayar istek anında okunacaksa hesap ID'sini döndüren bir fonksiyon da olabilir).
+    Yalnızca 200 yanıtları saklanır; hata yanıtları her seferinde yeniden hesaplanır.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not RESPONSE_CACHE_ENABLED:
+                return view(*args, **kwargs)
+            resolved_account = resolve_cache_account(account_kwarg, account_id, kwargs)
+            try:
+                query = request.query_string.decode("utf-8", "replace")
+                backend, key, entry = cache_lookup(route_name, resolved_account, query)
+            except Exception as e:
+                cache_read_failed(route_name, e)
+                return view(*args, **kwargs)
+            if entry is not None:
+                return _build_response(entry, "HIT")
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            entry = cache_store(backend, key, route_name, response.get_data(), response.status_code, response.mimetype, ttl)
+            return _build_response(entry, "MISS")
+        return wrapper
+    return decorator
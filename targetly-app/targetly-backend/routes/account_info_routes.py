@@ -1,45 +1,22 @@
 # targetly-backend/routes/account_info_routes.py
-import os
 from flask import Blueprint, jsonify
 from db import get_db_connection
-from dotenv import load_dotenv
+from settings import get_settings
 
 # --- Blueprint Tanımı ---
 account_info_routes = Blueprint('account_info_routes', __name__, url_prefix='/api')
 # --- ---
 
-# --- Ortam Değişkenlerini Yükleme ---
-# Bu dosyanın (account_info_routes.py) bulunduğu yerden (routes) göreli yol ile common/.env'e ulaşım
-CURRENT_FILE_DIR = os.path.dirname(os.path.abspath(__file__))
-BACKEND_DIR = os.path.dirname(CURRENT_FILE_DIR)
-TARGETLY_APP_DIR = os.path.dirname(BACKEND_DIR) # Bu sizin yapınıza göre .../targetly-app
-PROJECT_ROOT_DIR = os.path.dirname(TARGETLY_APP_DIR) # Bu sizin yapınıza göre .../SOCIALAI-OPTIMIZER
-common_env_path = os.path.join(PROJECT_ROOT_DIR, 'common', '.env')
-
-MAIN_IG_ACCOUNT_ID = None # Instagram User ID'si için
-MAIN_IG_ACCOUNT_DISPLAY_NAME = "TCS Yazılım (Ana Hesap)" # Varsayılan veya .env'den okunacak isim
-
-if os.path.exists(common_env_path):
-    print(f"Account Info için common/.env yükleniyor: {common_env_path}")
-    load_dotenv(dotenv_path=common_env_path)
-    MAIN_IG_ACCOUNT_ID = os.getenv("IG_ACCOUNT_ID")
-    # İsterseniz hesap adını da .env'den alabilirsiniz:
-    # MAIN_IG_ACCOUNT_DISPLAY_NAME = os.getenv("IG_DISPLAY_NAME", "TCS Yazılım (Ana Hesap)")
-else:
-    print(f"Uyarı: Account Info için {common_env_path} bulunamadı. Lütfen common/.env dosyasını kontrol edin.")
-
-if not MAIN_IG_ACCOUNT_ID:
-    print("UYARI: Account Info için ana IG_ACCOUNT_ID common/.env dosyasından okunamadı! Fallback kullanılacak.")
-    MAIN_IG_ACCOUNT_ID = "YOUR_FALLBACK_IG_USER_ID_HERE" # Bu ID'nin geçerli bir formatta olması önemli
-    # MAIN_IG_ACCOUNT_DISPLAY_NAME = "Ana Hesap (Yapılandırma Eksik)"
+# Ana hesap ID'si ve görünen adı settings.py'den (common/.env) istek anında okunur
 
 
 @account_info_routes.route('/managed-instagram-accounts', methods=['GET'])
 def get_main_instagram_account_info(): # Fonksiyon adını daha spesifik yaptım
     conn = None
     cursor = None
+    settings = get_settings()
     try:
-        if not MAIN_IG_ACCOUNT_ID or MAIN_IG_ACCOUNT_ID == "YOUR_FALLBACK_IG_USER_ID_HERE":
+        if not settings.ig_account_id:
             print("Hata: Ana Instagram Hesap ID'si doğru şekilde yapılandırılmamış.")
             return jsonify({"error": "Main Instagram Account ID is not properly configured"}), 500
 
@@ -66,11 +43,11 @@ def get_main_instagram_account_info(): # Fonksiyon adını daha spesifik yaptım
             creator_name = creator_tuple[0]
         
         account_info = {
-            "id": MAIN_IG_ACCOUNT_ID, # Frontend'in keyExtractor için kullandığı 'id'
-            "name": MAIN_IG_ACCOUNT_DISPLAY_NAME,
+            "id": settings.ig_account_id, # Frontend'in keyExtractor için kullandığı 'id'
+            "name": settings.main_account_display_name,
             "managerName": manager_name,
             "creatorName": creator_name,
-            "instagramUserId": MAIN_IG_ACCOUNT_ID # Frontend'in ayrıca göstermek istediği IG User ID
+            "instagramUserId": settings.ig_account_id # Frontend'in ayrıca göstermek istediği IG User ID
         }
         
         # Frontend bir liste beklediği için (önceki kodda FlatList vardı, şimdi tek kart olsa da yapı aynı kalabilir)
@@ -1,132 +1,313 @@
 # targetly-backend/routes/content_creator_routes.py
+import base64
+import binascii
+import json
 import os
-from flask import Blueprint, jsonify # request'e şimdilik gerek yok bu endpoint'te
-from db import get_db_connection
-from dotenv import load_dotenv
+from flask import Blueprint, jsonify, request
+from psycopg2 import sql
+from db import db_connection
+from response_cache import cached_response
+from settings import get_settings
 from datetime import datetime, timedelta
 
 content_creator_routes = Blueprint('content_creator_routes', __name__, url_prefix='/api/content-creator')
 
-# common/.env dosyasından IG_DISPLAY_NAME'i okumak için (opsiyonel)
-CURRENT_FILE_DIR = os.path.dirname(os.path.abspath(__file__))
-BACKEND_DIR = os.path.dirname(CURRENT_FILE_DIR)
-TARGETLY_APP_DIR = os.path.dirname(BACKEND_DIR)
-PROJECT_ROOT_DIR = os.path.dirname(TARGETLY_APP_DIR)
-common_env_path = os.path.join(PROJECT_ROOT_DIR, 'common', '.env')
+# --- Gönderi listesi: keyset sayfalama + alan seçimi (fields=) ---
+# Yanıt alan adı -> instagram_posts sütunu. fields= yalnızca bu beyaz listeden seçebilir.
+POST_FIELD_COLUMNS = {
+    "id": "instagram_post_id",
+    "caption_cleaned": "caption_cleaned",
+    "timestamp": "timestamp",
+    "media_type": "media_type",
+    "like_count": "like_count",
+    "comments_count": "comments_count",
+}
+CC_POSTS_DEFAULT_PAGE_SIZE = int(os.getenv("CC_POSTS_DEFAULT_PAGE_SIZE", 20))
+CC_POSTS_MAX_PAGE_SIZE = int(os.getenv("CC_POSTS_MAX_PAGE_SIZE", 100))
 
-IG_ACCOUNT_DISPLAY_NAME_FROM_ENV = None
-if os.path.exists(common_env_path):
-    print(f"Content Creator routes için common/.env yükleniyor: {common_env_path}")
-    load_dotenv(dotenv_path=common_env_path)
-    IG_ACCOUNT_DISPLAY_NAME_FROM_ENV = os.getenv("IG_DISPLAY_NAME") # .env dosyanızda bu anahtar olmalı
+# --- Benzer geçmiş gönderiler (caption_index.py) ---
+CC_SIMILAR_POSTS_DEFAULT_LIMIT = int(os.getenv("CC_SIMILAR_POSTS_DEFAULT_LIMIT", 10))
+CC_SIMILAR_POSTS_MAX_LIMIT = int(os.getenv("CC_SIMILAR_POSTS_MAX_LIMIT", 50))
+SIMILAR_SOURCE_POST_QUERY = """
+    SELECT id, caption_cleaned FROM instagram_posts
+    WHERE instagram_post_id = %s AND instagram_user_id = %s
+"""
+SIMILAR_ACCOUNT_EXISTS_QUERY = "SELECT 1 FROM instagram_posts WHERE instagram_user_id = %s LIMIT 1"
+SIMILAR_POSTS_DETAILS_QUERY = """
+    SELECT id, instagram_post_id, caption_cleaned, timestamp, media_type, like_count, comments_count
+    FROM instagram_posts
+    WHERE id = ANY(%s) AND instagram_user_id = %s
+"""
 
-if not IG_ACCOUNT_DISPLAY_NAME_FROM_ENV:
-    print("UYARI: IG_DISPLAY_NAME common/.env dosyasından okunamadı! Varsayılan kullanılacak.")
+
+def encode_posts_cursor(timestamp_value, row_id):
+    """(timestamp, id) -> istemci için opak, URL güvenli imleç. Zaman damgası olmayan satırlarda timestamp None'dır."""
+    raw = json.dumps([timestamp_value.isoformat() if timestamp_value else None, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_posts_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        timestamp_text, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return (datetime.fromisoformat(timestamp_text) if timestamp_text is not None else None), int(row_id)
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def parse_posts_page_args(args):
+    """?limit=&cursor=&fields= -> (fields, limit, after). Geçersiz değerlerde ValueError."""
+    fields_param = args.get("fields")
+    if fields_param:
+        fields = [field.strip() for field in fields_param.split(",") if field.strip()]
+        unknown = [field for field in fields if field not in POST_FIELD_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(POST_FIELD_COLUMNS)}")
+        if "id" not in fields:
+            fields.insert(0, "id") # istemci listeyi id ile anahtarlar
+    else:
+        fields = list(POST_FIELD_COLUMNS)
+    try:
+        limit = int(args.get("limit", CC_POSTS_DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer.")
+    limit = max(1, min(limit, CC_POSTS_MAX_PAGE_SIZE))
+    after = decode_posts_cursor(args["cursor"]) if args.get("cursor") else None
+    return fields, limit, after
+
+
+def fetch_posts_page(cursor, instagram_account_id, fields, limit, after=None):
+    """
+    (timestamp DESC NULLS LAST, id DESC) sırasında bir sayfa gönderi döndürür: (posts, next_cursor).
+    OFFSET yerine son görülen (timestamp, id) çiftinden devam edilir; hangi sayfada olunursa olsun
+    maliyet sayfa boyutuyla sınırlıdır ve eşzamanlı eklemelerde kayma/tekrar olmaz.
+    Zaman damgası olmayan gönderiler (ör. içe aktarmada boş gelen) tarihli olanlardan sonra id sırasıyla listelenir:
+    tarihli ve tarihsiz dallar ayrı ayrı en fazla limit + 1 satır okur (ikisi de idx_instagram_posts_user_timestamp
+    üzerinde aralık taraması), sonuç bu sırayla birleştirilir.
+    """
+    select_list = sql.SQL(", ").join(
+        sql.SQL("{} AS {}").format(sql.Identifier(POST_FIELD_COLUMNS[field]), sql.Identifier(field)) for field in fields
+    )
+    branch = sql.SQL("""
+        (SELECT {select_list}, timestamp AS _cursor_timestamp, id AS _cursor_id
+         FROM instagram_posts
+         WHERE instagram_user_id = %s AND {condition}
+         ORDER BY _cursor_timestamp DESC, _cursor_id DESC -- "id" çıktı adı instagram_post_id'ye karşılık gelir
+         LIMIT %s)
+    """)
+    dated_condition, dated_params = sql.SQL("timestamp IS NOT NULL"), []
+    undated_condition, undated_params = sql.SQL("timestamp IS NULL"), []
+    if after and after[0] is not None:
+        dated_condition, dated_params = sql.SQL("(timestamp, id) < (%s, %s)"), list(after)
+    elif after:
+        undated_condition, undated_params = sql.SQL("timestamp IS NULL AND id < %s"), [after[1]]
+    branches, params = [], []
+    if not after or after[0] is not None:
+        branches.append(branch.format(select_list=select_list, condition=dated_condition))
+        params += [instagram_account_id] + dated_params + [limit + 1]
+    branches.append(branch.format(select_list=select_list, condition=undated_condition))
+    params += [instagram_account_id] + undated_params + [limit + 1]
+    query = sql.SQL("SELECT * FROM ({}) page ORDER BY _cursor_timestamp DESC NULLS LAST, _cursor_id DESC LIMIT %s").format(
+        sql.SQL(" UNION ALL ").join(branches))
+    cursor.execute(query, params + [limit + 1]) # bir fazlası: sonraki sayfa var mı?
+    rows = cursor.fetchall()
+
+    posts = []
+    for row in rows[:limit]:
+        post = dict(zip(fields, row))
+        if isinstance(post.get('timestamp'), datetime):
+            post['timestamp'] = post['timestamp'].isoformat()
+        posts.append(post)
+    next_cursor = encode_posts_cursor(rows[limit - 1][-2], rows[limit - 1][-1]) if len(rows) > limit else None
+    return posts, next_cursor
+
+
+def parse_similar_posts_request(data):
+    """{"caption": "..."} veya {"post_id": "<instagram_post_id>"} + isteğe bağlı "limit" -> (caption, post_id, limit)."""
+    if not isinstance(data, dict):
+        raise ValueError("JSON body is required.")
+    caption, post_id = data.get("caption"), data.get("post_id")
+    if caption is not None and not isinstance(caption, str):
+        raise ValueError("'caption' must be a string.")
+    if post_id is not None and not isinstance(post_id, str):
+        raise ValueError("'post_id' must be a string.")
+    if not (caption or "").strip() and not post_id:
+        raise ValueError("'caption' or 'post_id' is required.")
+    try:
+        limit = int(data.get("limit", CC_SIMILAR_POSTS_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError("'limit' must be an integer.")
+    if not 1 <= limit <= CC_SIMILAR_POSTS_MAX_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {CC_SIMILAR_POSTS_MAX_LIMIT}.")
+    return caption, post_id, limit
+
+
+@content_creator_routes.route('/posts/<string:instagram_account_id>', methods=['GET'])
+@cached_response('content_creator.posts', account_kwarg='instagram_account_id')
+def get_cc_posts_page(instagram_account_id):
+    # Dashboard'daki allPostsPage.nextCursor ile sonraki sayfalar buradan çekilir
+    cursor = None
+    try:
+        fields, limit, after = parse_posts_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            posts, next_cursor = fetch_posts_page(cursor, instagram_account_id, fields, limit, after)
+            return jsonify({"posts": posts, "nextCursor": next_cursor, "hasMore": next_cursor is not None, "limit": limit})
+    except Exception as e:
+        print(f"❌ Content Creator posts page error for {instagram_account_id}: {e}")
+        return jsonify({"error": f"Failed to fetch posts: {str(e)}"}), 500
+    finally:
+        if cursor: cursor.close()
 
 
 @content_creator_routes.route('/dashboard-data/<string:instagram_account_id>', methods=['GET'])
+@cached_response('content_creator.dashboard', account_kwarg='instagram_account_id')
 def get_cc_dashboard_data(instagram_account_id):
-    conn = None
     cursor = None
     if not instagram_account_id:
         return jsonify({"error": "Instagram Account ID is required"}), 400
     try:
-        conn = get_db_connection()
-        if conn is None:
-            return jsonify({"error": "Database connection could not be established"}), 500
-        cursor = conn.cursor()
-
-        # Hesap Adı
-        account_name = IG_ACCOUNT_DISPLAY_NAME_FROM_ENV if IG_ACCOUNT_DISPLAY_NAME_FROM_ENV else f"Account ID: {instagram_account_id[:7]}..."
-        # Veya eğer birden fazla IG hesabı yönetiyorsanız ve bir 'instagram_accounts' tablonuz varsa:
-        # cursor.execute("SELECT account_display_name FROM instagram_accounts WHERE ig_user_id = %s", (instagram_account_id,))
-        # acc_name_tuple = cursor.fetchone()
-        # account_name = acc_name_tuple[0] if acc_name_tuple else f"Account ID: {instagram_account_id[:7]}..."
-
-
-        # Toplam Takipçi
-        cursor.execute("SELECT value FROM follower_insights WHERE instagram_user_id = %s AND metric_name = 'followers_count' ORDER BY data_date DESC, fetched_at DESC LIMIT 1", (instagram_account_id,))
-        tf_tuple = cursor.fetchone()
-        total_followers = tf_tuple[0] if tf_tuple and tf_tuple[0] is not None else 0
-
-        # Son 30 Günlük Genel İstatistikler
-        thirty_days_ago = (datetime.now() - timedelta(days=30)).date()
-
-        cursor.execute("SELECT COUNT(*) FROM instagram_posts WHERE instagram_user_id = %s AND DATE(timestamp) >= %s", (instagram_account_id, thirty_days_ago))
-        rps_tuple = cursor.fetchone()
-        total_posts_last_30_days = rps_tuple[0] if rps_tuple and rps_tuple[0] is not None else 0
-
-        cursor.execute("SELECT SUM(like_count), SUM(comments_count) FROM instagram_posts WHERE instagram_user_id = %s AND DATE(timestamp) >= %s", (instagram_account_id, thirty_days_ago))
-        interactions = cursor.fetchone()
-        total_likes_30d = interactions[0] if interactions and interactions[0] is not None else 0
-        total_comments_30d = interactions[1] if interactions and interactions[1] is not None else 0
-        
-        avg_likes_per_post = (total_likes_30d / total_posts_last_30_days) if total_posts_last_30_days > 0 else 0
-        avg_comments_per_post = (total_comments_30d / total_posts_last_30_days) if total_posts_last_30_days > 0 else 0
-
-        # Tüm Gönderiler
-        cursor.execute("""
-            SELECT instagram_post_id as id, caption_cleaned, timestamp, media_type, 
-                   like_count, comments_count
-                   -- İleride bu sorguya daily_insights'tan reach, impressions gibi veriler de joinlenebilir
-            FROM instagram_posts 
-            WHERE instagram_user_id = %s 
-            ORDER BY timestamp DESC
-        """, (instagram_account_id,)) # LIMIT kaldırıldı
-        
-        cols_posts = [col[0] for col in cursor.description]
-        all_posts_data = [dict(zip(cols_posts, row)) for row in cursor.fetchall()]
+        fields, limit, after = parse_posts_page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+
+            # Hesap Adı
+            # common/.env'deki IG_DISPLAY_NAME (opsiyonel)
+            account_name = get_settings().ig_display_name or f"Account ID: {instagram_account_id[:7]}..."
+            # Veya eğer birden fazla IG hesabı yönetiyorsanız ve bir 'instagram_accounts' tablonuz varsa:
+            # cursor.execute("SELECT account_display_name FROM instagram_accounts WHERE ig_user_id = %s", (instagram_account_id,))
+            # acc_name_tuple = cursor.fetchone()
+            # account_name = acc_name_tuple[0] if acc_name_tuple else f"Account ID: {instagram_account_id[:7]}..."
+
+
+            # Toplam Takipçi
+            cursor.execute("SELECT value FROM follower_insights WHERE instagram_user_id = %s AND metric_name = 'followers_count' ORDER BY data_date DESC, fetched_at DESC LIMIT 1", (instagram_account_id,))
+            tf_tuple = cursor.fetchone()
+            total_followers = tf_tuple[0] if tf_tuple and tf_tuple[0] is not None else 0
+
+            # Son 30 Günlük Genel İstatistikler
+            thirty_days_ago = (datetime.now() - timedelta(days=30)).date()
+
+            # Günlük özet tablosundan (en fazla 30 satır) tek sorguda
+            cursor.execute("""
+                SELECT SUM(post_count), SUM(like_sum), SUM(comment_sum) FROM account_daily_stats
+                WHERE instagram_user_id = %s AND stat_date >= %s
+            """, (instagram_account_id, thirty_days_ago))
+            monthly_stats = cursor.fetchone()
+            total_posts_last_30_days = monthly_stats[0] if monthly_stats and monthly_stats[0] is not None else 0
+            total_likes_30d = monthly_stats[1] if monthly_stats and monthly_stats[1] is not None else 0
+            total_comments_30d = monthly_stats[2] if monthly_stats and monthly_stats[2] is not None else 0
         
-        all_posts_list = []
-        for post in all_posts_data:
-            if isinstance(post.get('timestamp'), datetime):
-                post['timestamp'] = post['timestamp'].isoformat()
-            # Gönderi başına reach, impressions, engagement_rate gibi değerleri de burada hesaplayabilir veya
-            # ayrı bir sorguyla çekip ekleyebilirsiniz. Şimdilik PostDetail tipine göre temel alanlar.
-            all_posts_list.append(post)
-
-        # En iyi performans gösteren gönderi (örnek: en çok beğeni alan)
-        top_performing_post_data = None
-        if all_posts_list: # Eğer gönderi varsa
-            # Bu sadece listedeki en çok beğeniyi alır, tüm zamanlar için ayrı sorgu gerekebilir
-            # Veya instagram_posts tablosundan doğrudan ORDER BY like_count DESC LIMIT 1 ile çekilebilir
-            # Şimdilik all_posts_list içinden bulalım:
-            # top_performing_post_data = max(all_posts_list, key=lambda x: x.get('like_count', 0), default=None)
+            avg_likes_per_post = (total_likes_30d / total_posts_last_30_days) if total_posts_last_30_days > 0 else 0
+            avg_comments_per_post = (total_comments_30d / total_posts_last_30_days) if total_posts_last_30_days > 0 else 0
+
+            # Gönderiler: tüm geçmiş yerine ilk sayfa (keyset); devamı /posts/<id>?cursor=... ile
+            all_posts_list, next_cursor = fetch_posts_page(cursor, instagram_account_id, fields, limit, after)
+
+            # En iyi performans gösteren gönderi (örnek: en çok beğeni alan)
+            top_performing_post_data = None
+            if all_posts_list: # Eğer gönderi varsa
+                # Bu sadece listedeki en çok beğeniyi alır, tüm zamanlar için ayrı sorgu gerekebilir
+                # Veya instagram_posts tablosundan doğrudan ORDER BY like_count DESC LIMIT 1 ile çekilebilir
+                # Şimdilik all_posts_list içinden bulalım:
+                # top_performing_post_data = max(all_posts_list, key=lambda x: x.get('like_count', 0), default=None)
             
-            # Daha doğru bir yaklaşım: Veritabanından en çok beğeni alanı çekmek
-            cursor.execute("""
-                SELECT instagram_post_id as id, caption_cleaned, timestamp, media_type, like_count, comments_count
-                FROM instagram_posts
-                WHERE instagram_user_id = %s
-                ORDER BY like_count DESC
-                LIMIT 1
-            """, (instagram_account_id,))
-            top_post_tuple = cursor.fetchone()
-            if top_post_tuple:
-                top_cols = [col[0] for col in cursor.description]
-                top_performing_post_data = dict(zip(top_cols, top_post_tuple))
-                if isinstance(top_performing_post_data.get('timestamp'), datetime):
-                    top_performing_post_data['timestamp'] = top_performing_post_data['timestamp'].isoformat()
-
-
-        dashboard_payload = {
-            "accountName": account_name,
-            "totalFollowers": total_followers,
-            "allPosts": all_posts_list, # "recentPosts" yerine "allPosts"
-            "overallStats": {
-                "totalPostsLast30Days": total_posts_last_30_days,
-                "avgLikesPerPost": round(avg_likes_per_post, 1),
-                "avgCommentsPerPost": round(avg_comments_per_post, 1),
-                # "avgEngagementRateOverall": ... // Bu da hesaplanabilir
-            },
-            "topPerformingPost": top_performing_post_data,
-            # "demographics": {} // Content creator için şimdilik demografi yoktu, istenirse eklenebilir
-        }
-        return jsonify(dashboard_payload)
+                # Daha doğru bir yaklaşım: Veritabanından en çok beğeni alanı çekmek
+                cursor.execute("""
+                    SELECT instagram_post_id as id, caption_cleaned, timestamp, media_type, like_count, comments_count
+                    FROM instagram_posts
+                    WHERE instagram_user_id = %s
+                    ORDER BY like_count DESC
+                    LIMIT 1
+                """, (instagram_account_id,))
+                top_post_tuple = cursor.fetchone()
+                if top_post_tuple:
+                    top_cols = [col[0] for col in cursor.description]
+                    top_performing_post_data = dict(zip(top_cols, top_post_tuple))
+                    if isinstance(top_performing_post_data.get('timestamp'), datetime):
+                        top_performing_post_data['timestamp'] = top_performing_post_data['timestamp'].isoformat()
+
+
+            dashboard_payload = {
+                "accountName": account_name,
+                "totalFollowers": total_followers,
+                "allPosts": all_posts_list, # "recentPosts" yerine "allPosts" (artık sayfalı)
+                "allPostsPage": {"nextCursor": next_cursor, "hasMore": next_cursor is not None, "limit": limit},
+                "overallStats": {
+                    "totalPostsLast30Days": total_posts_last_30_days,
+                    "avgLikesPerPost": round(avg_likes_per_post, 1),
+                    "avgCommentsPerPost": round(avg_comments_per_post, 1),
+                    # "avgEngagementRateOverall": ... // Bu da hesaplanabilir
+                },
+                "topPerformingPost": top_performing_post_data,
+                # "demographics": {} // Content creator için şimdilik demografi yoktu, istenirse eklenebilir
+            }
+            return jsonify(dashboard_payload)
 
     except Exception as e:
         print(f"❌ Content Creator Dashboard data error for {instagram_account_id}: {e}")
         return jsonify({"error": f"Failed to fetch CC dashboard data: {str(e)}"}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
\ No newline at end of file
+
+
+@content_creator_routes.route('/similar-posts/<string:instagram_account_id>', methods=['POST'])
+def get_cc_similar_posts(instagram_account_id):
+    # Taslak açıklamaya (veya mevcut bir gönderiye) en çok benzeyen geçmiş gönderiler ve aldıkları beğeni / yorumlar
+    cursor = None
+    try:
+        caption, post_id, limit = parse_similar_posts_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        from ai_models import get_caption_index # numpy/scipy yalnızca bu endpoint kullanılınca yüklenir
+
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            exclude_post_ids = []
+            if post_id:
+                cursor.execute(SIMILAR_SOURCE_POST_QUERY, (post_id, instagram_account_id))
+                source = cursor.fetchone()
+                if source is None:
+                    return jsonify({"error": "Post not found for this account."}), 404
+                exclude_post_ids.append(source[0])
+                caption = caption or source[1] or ""
+            index = get_caption_index()
+            matches = index.search(instagram_account_id, caption, limit, exclude_post_ids)
+            if matches is None:
+                # Hesabın indeksi henüz yok (veri alımı çalışmamış / yeni kurulum). Kurulum istekte yapılmaz: gönderisi
+                # olan hesaplar için arka planda başlatılır, bilinmeyen hesaplar için diske hiçbir şey yazılmaz
+                if not post_id: # post_id verildiyse hesabın gönderisi yukarıda bulundu
+                    cursor.execute(SIMILAR_ACCOUNT_EXISTS_QUERY, (instagram_account_id,))
+                    if cursor.fetchone() is None:
+                        return jsonify({"error": "Account not found."}), 404
+                index.schedule_build(instagram_account_id)
+                return jsonify({"posts": [], "limit": limit, "sourcePostId": post_id, "status": "building"})
+
+            posts = []
+            if matches:
+                cursor.execute(SIMILAR_POSTS_DETAILS_QUERY, ([post_table_id for post_table_id, _ in matches], instagram_account_id))
+                columns = [col[0] for col in cursor.description]
+                details = {row[0]: dict(zip(columns, row)) for row in cursor.fetchall()}
+                for post_table_id, score in matches:
+                    post = details.get(post_table_id) # indeksten sonra silinmiş gönderiler atlanır
+                    if post is None:
+                        continue
+                    post.pop("id")
+                    post["id"] = post.pop("instagram_post_id")
+                    if isinstance(post.get('timestamp'), datetime):
+                        post['timestamp'] = post['timestamp'].isoformat()
+                    post["similarity"] = round(score, 4)
+                    posts.append(post)
+            return jsonify({"posts": posts, "limit": limit, "sourcePostId": post_id, "status": "ready"})
+    except Exception as e:
+        print(f"❌ Content Creator similar posts error for {instagram_account_id}: {e}")
+        return jsonify({"error": f"Failed to find similar posts: {str(e)}"}), 500
+    finally:
+        if cursor: cursor.close()
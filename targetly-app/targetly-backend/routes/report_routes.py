@@ -1,98 +1,315 @@
 # targetly-backend/routes/report_routes.py
+import csv
+import io
+import json
+import math
 import os
-from flask import Blueprint, jsonify, request
+import re
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from flask import Blueprint, Response, jsonify, request
 from db import get_db_connection
-from dotenv import load_dotenv
-from datetime import datetime, timedelta
-
-# common/.env dosyasındaki IG_ACCOUNT_ID'yi okumak için
-CURRENT_FILE_DIR = os.path.dirname(os.path.abspath(__file__)) # .../routes
-BACKEND_DIR = os.path.dirname(CURRENT_FILE_DIR) # .../targetly-backend
-TARGETLY_APP_DIR = os.path.dirname(BACKEND_DIR) # .../targetly-app
-PROJECT_ROOT_DIR = os.path.dirname(TARGETLY_APP_DIR) # .../SOCIALAI-OPTIMIZER
-common_env_path = os.path.join(PROJECT_ROOT_DIR, 'common', '.env')
-
-MAIN_ACCOUNT_ID_FROM_ENV = None
-if os.path.exists(common_env_path):
-    print(f"Raporlar için common/.env yükleniyor: {common_env_path}")
-    load_dotenv(dotenv_path=common_env_path)
-    MAIN_ACCOUNT_ID_FROM_ENV = os.getenv("IG_ACCOUNT_ID")
-else:
-    print(f"Uyarı: Raporlar için {common_env_path} bulunamadı.")
-
-if not MAIN_ACCOUNT_ID_FROM_ENV:
-    print("UYARI: Raporlar için ana IG_ACCOUNT_ID common/.env dosyasından okunamadı!")
-    MAIN_ACCOUNT_ID_FROM_ENV = "YOUR_MAIN_IG_ACCOUNT_ID_FALLBACK" # Fallback
+from response_cache import cached_response
+from settings import get_settings
 
 report_routes = Blueprint('report_routes', __name__, url_prefix='/api/reporting')
 
-# Yönetilen Instagram Hesaplarını Listeleme
-@report_routes.route('/accounts', methods=['GET'])
-def get_managed_accounts():
+# SQL sabitleri ve build_* fonksiyonları ASGI modunda (async_app.py, asyncpg) da aynen kullanılır.
+LATEST_FOLLOWERS_QUERY = """
+    SELECT value FROM follower_insights
+    WHERE instagram_user_id = %s AND metric_name = 'followers_count'
+    ORDER BY data_date DESC, fetched_at DESC
+    LIMIT 1
+"""
+# Active Followers Estimate: 'accounts_engaged' metriğinin son 7 günlük ortalaması (NULL günler AVG'ye girmez).
+# Haftalık etkileşimle birlikte günlük özet tablosundan tek sorguda okunur.
+WEEKLY_STATS_QUERY = """
+    SELECT SUM(like_sum + comment_sum), AVG(accounts_engaged)
+    FROM account_daily_stats
+    WHERE instagram_user_id = %s AND stat_date >= %s
+"""
+DEMOGRAPHICS_QUERY = """
+    SELECT dimension_key, value FROM follower_insights
+    WHERE instagram_user_id = %s AND metric_name = %s AND period = 'lifetime'
+    ORDER BY value DESC
+"""
+DEMOGRAPHIC_METRICS = {
+    "country": "follower_demographics_country",
+    "gender": "follower_demographics_gender",
+    "age": "follower_demographics_age"
+}
+
+# Hashtag analitiği: common/hashtag_stats.py'nin veri alımında güncellediği account_hashtag_stats tablosundan
+# okunur; her sıralama için (hesap, sıralama anahtarı) indeksi vardır, LIMIT'li sorgu yalnızca N satır gezer.
+# Yarı ömür common/hashtag_stats.py ile aynı ortam değişkeninden okunmalı (trend_key bu değerle hesaplanır).
+HASHTAG_TREND_HALF_LIFE_DAYS = float(os.getenv("HASHTAG_TREND_HALF_LIFE_DAYS", 30))
+HASHTAG_DEFAULT_LIMIT = 20
+HASHTAG_MAX_LIMIT = 200
+HASHTAG_DEFAULT_MIN_POSTS = 3 # tek gönderilik hashtag'ler ortalama / kaldıraç sıralamasını domine etmesin
+HASHTAG_SORTS = {
+    "usage": "post_count DESC, hashtag",
+    "engagement": "avg_engagement DESC, hashtag",
+    "trend": "trend_key DESC NULLS LAST, hashtag",
+}
+HASHTAG_STATS_QUERY = """
+    SELECT hashtag, post_count, like_sum, comment_sum, avg_engagement, median_likes, median_comments,
+           first_used_at, last_used_at, recency_uses, recency_engagement, trend_key
+    FROM account_hashtag_stats
+    WHERE instagram_user_id = %s AND post_count >= %s
+    ORDER BY {order}
+    LIMIT %s
+"""
+# Hesabın gönderi başına ortalama etkileşimi (kaldıraç için taban); hashtag istatistikleriyle aynı gönderi kümesi
+# (account_hashtag_count_stats), hesap başına en fazla ~30 satır okunur
+ACCOUNT_ENGAGEMENT_BASELINE_QUERY = """
+    SELECT SUM(post_count), SUM(engagement_sum)
+    FROM account_hashtag_count_stats
+    WHERE instagram_user_id = %s
+"""
+# İdeal hashtag sayısı: gönderi başına hashtag sayısı grupları (account_hashtag_count_stats, veri alımında
+# common/hashtag_stats.py günceller); hesap başına en fazla ~30 satır birincil anahtardan okunur
+IDEAL_HASHTAG_COUNT_QUERY = """
+    SELECT hashtag_count, post_count, avg_engagement
+    FROM account_hashtag_count_stats
+    WHERE instagram_user_id = %s
+    ORDER BY hashtag_count
+"""
+IDEAL_HASHTAG_MIN_POSTS = int(os.getenv("IDEAL_HASHTAG_MIN_POSTS", HASHTAG_DEFAULT_MIN_POSTS))
+
+# Tam geçmiş dışa aktarımı: sorgular sunucu taraflı (adlandırılmış) cursor ile çalışır ve satırlar sabit boyutlu
+# gruplar halinde çekilip yanıta yazılır; bellek kullanımı hesabın satır sayısından bağımsızdır.
+# Sıralamalar idx_instagram_posts_user_timestamp / idx_daily_insights_user_metric_date indeks sırasıyla aynıdır,
+# böylece plan Sort düğümü içermez ve ilk grup hemen akmaya başlar.
+EXPORT_BATCH_SIZE = int(os.getenv("REPORT_EXPORT_BATCH_SIZE", "2000"))
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_FILENAME_UNSAFE = re.compile(r"[^\w.-]", re.ASCII) # Content-Disposition'a ham hesap ID'si yazılmaz
+EXPORT_DATASETS = {
+    "posts": (
+        ("instagram_post_id", "timestamp", "media_type", "like_count", "comments_count", "caption_original", "hashtags"),
+        """
+        SELECT p.instagram_post_id, p.timestamp, p.media_type, p.like_count, p.comments_count, p.caption_original,
+               (SELECT string_agg(h.hashtag, ' ' ORDER BY h.hashtag) FROM post_hashtags h WHERE h.post_table_id = p.id)
+        FROM instagram_posts p
+        WHERE p.instagram_user_id = %s
+        ORDER BY p.timestamp DESC, p.id DESC
+        """,
+    ),
+    "daily_insights": (
+        ("metric_name", "date", "value"),
+        """
+        SELECT metric_name, date, value FROM daily_insights
+        WHERE instagram_user_id = %s
+        ORDER BY metric_name, date
+        """,
+    ),
+}
+
+
+def valid_report_account(account_id):
+    return bool(account_id) and account_id != "YOUR_MAIN_IG_ACCOUNT_ID_FALLBACK" # Fallback ID kontrolü
+
+
+def build_managed_accounts(settings):
     # Şimdilik .env'den okuduğumuz ana hesabı ve birkaç sahte hesabı döndürelim
     # İleride bu liste veritabanından veya başka bir konfigürasyon dosyasından gelebilir
     accounts_list = []
-    if MAIN_ACCOUNT_ID_FROM_ENV and MAIN_ACCOUNT_ID_FROM_ENV != "YOUR_MAIN_IG_ACCOUNT_ID_FALLBACK":
-        accounts_list.append({"id": MAIN_ACCOUNT_ID_FROM_ENV, "name": "TCS Yazılım (Ana Hesap)"})
-    
+    if settings.ig_account_id:
+        accounts_list.append({"id": settings.ig_account_id, "name": settings.main_account_display_name})
+
     # Gösterimlik sahte hesaplar
     accounts_list.extend([
         {"id": "dummy_ig_id_1", "name": "Everest Media"},
         {"id": "dummy_ig_id_2", "name": "Beach Vibes Co"},
         {"id": "dummy_ig_id_3", "name": "Urban Stylez"},
     ])
+    return accounts_list
+
+
+def build_account_summary(followers_row, weekly_stats):
+    total_followers = followers_row[0] if followers_row and followers_row[0] is not None else 0
+    # Weekly Engagement Rate (Basit bir örnek, detaylandırılmalı)
+    # Son 7 gündeki toplam etkileşim (beğeni + yorum) / takipçi sayısı
+    # Bu metrik Instagram API'sinden daha doğru alınabilirse o tercih edilmeli.
+    total_interactions = weekly_stats[0] if weekly_stats and weekly_stats[0] is not None else 0
+    active_followers_estimate = int(weekly_stats[1]) if weekly_stats and weekly_stats[1] is not None else 0
+
+    weekly_engagement_rate_value = (total_interactions / total_followers * 100) if total_followers > 0 else 0
+    return {
+        "totalFollowers": total_followers,
+        "weeklyEngagementRate": f"{weekly_engagement_rate_value:.2f}%",
+        "activeFollowersEstimate": active_followers_estimate
+    }
+
+
+def build_demographic_list(rows):
+    return [{"dimension": row[0], "value": row[1]} for row in rows]
+
+
+def parse_hashtag_query(args):
+    """?sort=usage|engagement|trend&limit=N&min_posts=N; geçersiz değerde ValueError."""
+    sort = args.get('sort', 'usage')
+    if sort not in HASHTAG_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(HASHTAG_SORTS)}")
+    try:
+        limit = int(args.get('limit', HASHTAG_DEFAULT_LIMIT))
+        min_posts = int(args.get('min_posts', HASHTAG_DEFAULT_MIN_POSTS))
+    except (TypeError, ValueError):
+        raise ValueError("limit and min_posts must be integers")
+    if not 1 <= limit <= HASHTAG_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {HASHTAG_MAX_LIMIT}")
+    return sort, limit, max(min_posts, 1)
+
+
+def build_hashtag_stats(rows, baseline_row, sort, now=None):
+    """
+    engagementLift: hashtag'in gönderi başına ortalama etkileşimi / hesabın ortalaması.
+    recentUses: yarı ömürle ağırlıklandırılmış kullanım sayısı (bugüne göre). engagementTrend: zaman ağırlıklı
+    ortalama etkileşim / tüm zamanlar ortalaması (>1 son gönderiler daha iyi performans gösteriyor).
+    """
+    now = now or datetime.now(timezone.utc)
+    decay = math.log(2) / (HASHTAG_TREND_HALF_LIFE_DAYS * 86400)
+    baseline_posts, baseline_engagement = baseline_row if baseline_row else (None, None)
+    baseline = float(baseline_engagement) / baseline_posts if baseline_posts else None
+    hashtags = []
+    for (hashtag, post_count, like_sum, comment_sum, avg_engagement, median_likes, median_comments,
+         first_used_at, last_used_at, recency_uses, recency_engagement, trend_key) in rows:
+        recent_avg = recency_engagement / recency_uses if recency_uses else None
+        hashtags.append({
+            "hashtag": hashtag,
+            "postCount": post_count,
+            "avgLikes": round(like_sum / post_count, 2),
+            "avgComments": round(comment_sum / post_count, 2),
+            "medianLikes": median_likes,
+            "medianComments": median_comments,
+            "avgEngagement": round(avg_engagement, 2),
+            "engagementLift": round(avg_engagement / baseline, 3) if baseline else None,
+            "recentUses": round(math.exp(trend_key - decay * now.timestamp()), 3) if trend_key is not None else 0.0,
+            "recentAvgEngagement": round(recent_avg, 2) if recent_avg is not None else None,
+            "engagementTrend": round(recent_avg / avg_engagement, 3) if recent_avg is not None and avg_engagement else None,
+            "firstUsedAt": first_used_at.isoformat() if first_used_at else None,
+            "lastUsedAt": last_used_at.isoformat() if last_used_at else None,
+        })
+    return {
+        "sort": sort,
+        "baselineEngagement": round(baseline, 2) if baseline is not None else None,
+        "halfLifeDays": HASHTAG_TREND_HALF_LIFE_DAYS,
+        "hashtags": hashtags,
+    }
+
+
+def build_ideal_hashtag_count(rows, min_posts=IDEAL_HASHTAG_MIN_POSTS):
+    """
+    En yüksek ortalama etkileşimli hashtag sayısı grubu. En az min_posts gönderisi olan gruplar arasından seçilir
+    (hiçbiri yoksa tüm gruplardan); count None ise hesabın gönderi verisi yoktur.
+    """
+    bands = [{"hashtag_count": count, "post_count": posts, "avg_engagement": round(avg, 2)} for count, posts, avg in rows]
+    if not bands:
+        return {"count": None, "bands": [], "note": "Hesap için gönderi / hashtag verisi yok."}
+    eligible = [band for band in bands if band["post_count"] >= min_posts] or bands
+    best = max(eligible, key=lambda band: (band["avg_engagement"], band["post_count"]))
+    total_posts = sum(band["post_count"] for band in bands)
+    baseline = sum(band["post_count"] * band["avg_engagement"] for band in bands) / total_posts
+    return {
+        "count": best["hashtag_count"],
+        "avg_engagement": best["avg_engagement"],
+        "post_count": best["post_count"],
+        "baseline_engagement": round(baseline, 2),
+        "bands": bands,
+        "note": f"{best['post_count']} gönderide ort. etkileşim {best['avg_engagement']:.0f} (hesap ortalaması {baseline:.0f}).",
+    }
+
+
+def load_ideal_hashtag_count(account_id):
+    """Hesabın ideal hashtag sayısı; hesap geçersizse veya okuma başarısızsa count None döner."""
+    if not valid_report_account(account_id):
+        return {"count": None, "bands": [], "note": "Hashtag sayısı için geçerli bir Instagram hesabı gerekli."}
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(IDEAL_HASHTAG_COUNT_QUERY, (account_id,))
+        return build_ideal_hashtag_count(cursor.fetchall())
+    except Exception as e:
+        print(f"❌ Ideal hashtag count error for {account_id}: {e}")
+        return {"count": None, "bands": [], "note": "Hashtag sayısı verisi okunamadı."}
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+
+def export_json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def encode_csv_rows(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(
+        [value.isoformat() if isinstance(value, (datetime, date)) else value for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def encode_ndjson_rows(columns, rows):
+    return "".join(json.dumps({column: export_json_value(value) for column, value in zip(columns, row)},
+                              ensure_ascii=False) + "\n" for row in rows)
+
+
+def export_filename(account_id, dataset, export_format):
+    return EXPORT_FILENAME_UNSAFE.sub("_", f"{account_id}_{dataset}_{datetime.now().strftime('%Y%m%d')}.{export_format}")
+
+
+def stream_export_rows(conn, cursor, columns, export_format):
+    """
+    Açık adlandırılmış cursor'dan EXPORT_BATCH_SIZE'lık gruplar çekip kodlanmış parçalar üretir. Bağlantı yanıt
+    bitene (veya istemci bağlantıyı kesene) kadar tutulur ve finally bloğunda havuza geri verilir.
+    """
+    try:
+        if export_format == "csv":
+            yield encode_csv_rows([columns])
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            yield encode_csv_rows(rows) if export_format == "csv" else encode_ndjson_rows(columns, rows)
+    except Exception as e:
+        # Başlıklar gönderildiği için durum kodu artık değiştirilemez; yanıt yarıda kesilir
+        print(f"❌ Report export stream error: {e}")
+        raise
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+# Yönetilen Instagram Hesaplarını Listeleme
+@report_routes.route('/accounts', methods=['GET'])
+def get_managed_accounts():
+    accounts_list = build_managed_accounts(get_settings())
     return jsonify(accounts_list)
 
 # Belirli Bir Hesap İçin Özet Rapor Verileri
 @report_routes.route('/account-summary/<string:account_id>', methods=['GET'])
+@cached_response('reporting.account_summary', account_kwarg='account_id')
 def get_account_summary(account_id):
     conn = None
     cursor = None
-    if not account_id or account_id == "YOUR_MAIN_IG_ACCOUNT_ID_FALLBACK": # Fallback ID kontrolü
+    if not valid_report_account(account_id):
         return jsonify({"error": "Valid Instagram Account ID is required for summary"}), 400
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Total Followers
-        cursor.execute("""
-            SELECT value FROM follower_insights
-            WHERE instagram_user_id = %s AND metric_name = 'followers_count'
-            ORDER BY data_date DESC, fetched_at DESC
-            LIMIT 1
-        """, (account_id,))
-        total_followers_tuple = cursor.fetchone()
-        total_followers = total_followers_tuple[0] if total_followers_tuple and total_followers_tuple[0] is not None else 0
-
-        # Weekly Engagement Rate (Basit bir örnek, detaylandırılmalı)
-        # Son 7 gündeki toplam etkileşim (beğeni + yorum) / takipçi sayısı
-        # Bu metrik Instagram API'sinden daha doğru alınabilirse o tercih edilmeli.
+        cursor.execute(LATEST_FOLLOWERS_QUERY, (account_id,))
+        followers_row = cursor.fetchone()
         seven_days_ago = (datetime.now() - timedelta(days=7)).date()
-        cursor.execute("""
-            SELECT SUM(p.like_count + p.comments_count)
-            FROM instagram_posts p
-            WHERE p.instagram_user_id = %s AND DATE(p.timestamp) >= %s
-        """, (account_id, seven_days_ago))
-        total_interactions_tuple = cursor.fetchone()
-        total_interactions = total_interactions_tuple[0] if total_interactions_tuple and total_interactions_tuple[0] is not None else 0
-        
-        weekly_engagement_rate_value = (total_interactions / total_followers * 100) if total_followers > 0 else 0
-        weekly_engagement_rate_str = f"{weekly_engagement_rate_value:.2f}%"
-
-        # Active Followers Estimate (Bu metrik için daha iyi bir kaynak veya hesaplama gerekebilir)
-        # Şimdilik 'accounts_engaged' metriğinin son 7 günlük ortalamasını alabiliriz.
-        cursor.execute("""
-            SELECT AVG(value) FROM daily_insights
-            WHERE instagram_user_id = %s AND metric_name = 'accounts_engaged' AND date >= %s
-        """, (account_id, seven_days_ago))
-        active_followers_tuple = cursor.fetchone()
-        active_followers_estimate = int(active_followers_tuple[0]) if active_followers_tuple and active_followers_tuple[0] is not None else 0
-        
-        summary = {
-            "totalFollowers": total_followers,
-            "weeklyEngagementRate": weekly_engagement_rate_str,
-            "activeFollowersEstimate": active_followers_estimate
-        }
+        cursor.execute(WEEKLY_STATS_QUERY, (account_id, seven_days_ago))
+        summary = build_account_summary(followers_row, cursor.fetchone())
         return jsonify(summary), 200
     except Exception as e:
         print(f"❌ Account summary error for {account_id}: {e}")
@@ -103,38 +320,91 @@ def get_account_summary(account_id):
 
 # Belirli Bir Hesap İçin Takipçi Demografileri
 @report_routes.route('/follower-demographics/<string:account_id>', methods=['GET'])
+@cached_response('reporting.follower_demographics', account_kwarg='account_id')
 def get_follower_demographics(account_id):
     conn = None
     cursor = None
-    if not account_id or account_id == "YOUR_MAIN_IG_ACCOUNT_ID_FALLBACK":
+    if not valid_report_account(account_id):
         return jsonify({"error": "Valid Instagram Account ID is required for demographics"}), 400
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        
         demographics_data = {}
-        metric_map = {
-            "country": "follower_demographics_country",
-            "gender": "follower_demographics_gender",
-            "age": "follower_demographics_age"
-        }
-
-        for demo_type, metric_name in metric_map.items():
-            cursor.execute("""
-                SELECT dimension_key, value FROM follower_insights
-                WHERE instagram_user_id = %s AND metric_name = %s AND period = 'lifetime'
-                ORDER BY value DESC
-            """, (account_id, metric_name))
-            
-            data_list = []
-            for row in cursor.fetchall():
-                data_list.append({"dimension": row[0], "value": row[1]})
-            demographics_data[demo_type] = data_list
-            
+        for demo_type, metric_name in DEMOGRAPHIC_METRICS.items():
+            cursor.execute(DEMOGRAPHICS_QUERY, (account_id, metric_name))
+            demographics_data[demo_type] = build_demographic_list(cursor.fetchall())
         return jsonify(demographics_data), 200
     except Exception as e:
         print(f"❌ Follower demographics error for {account_id}: {e}")
         return jsonify({"error": f"Failed to fetch follower demographics: {str(e)}"}), 500
     finally:
         if cursor: cursor.close()
-        if conn: conn.close()
\ No newline at end of file
+        if conn: conn.close()
+# Hesabın hashtag'leri için top-N: kullanım, ortalama etkileşim (kaldıraç) veya zaman ağırlıklı trend sırasıyla
+# GET /api/reporting/hashtags/<account_id>?sort=usage|engagement|trend&limit=20&min_posts=3
+@report_routes.route('/hashtags/<string:account_id>', methods=['GET'])
+@cached_response('reporting.hashtags', account_kwarg='account_id')
+def get_hashtag_stats(account_id):
+    conn = None
+    cursor = None
+    if not valid_report_account(account_id):
+        return jsonify({"error": "Valid Instagram Account ID is required for hashtag stats"}), 400
+    try:
+        sort, limit, min_posts = parse_hashtag_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(HASHTAG_STATS_QUERY.format(order=HASHTAG_SORTS[sort]), (account_id, min_posts, limit))
+        rows = cursor.fetchall()
+        cursor.execute(ACCOUNT_ENGAGEMENT_BASELINE_QUERY, (account_id,))
+        return jsonify(build_hashtag_stats(rows, cursor.fetchone(), sort)), 200
+    except Exception as e:
+        print(f"❌ Hashtag stats error for {account_id}: {e}")
+        return jsonify({"error": f"Failed to fetch hashtag stats: {str(e)}"}), 500
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+# Hesabın tüm gönderi / günlük insight geçmişini CSV veya NDJSON olarak akış halinde dışa aktarır
+# GET /api/reporting/export/<account_id>?dataset=posts|daily_insights&format=csv|ndjson
+@report_routes.route('/export/<string:account_id>', methods=['GET'])
+def export_account_report(account_id):
+    dataset = request.args.get('dataset', 'posts')
+    export_format = request.args.get('format', 'csv').lower()
+    if not valid_report_account(account_id):
+        return jsonify({"error": "Valid Instagram Account ID is required for export"}), 400
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({"error": f"dataset must be one of: {', '.join(EXPORT_DATASETS)}"}), 400
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    columns, query = EXPORT_DATASETS[dataset]
+    # Başlıklar bağlantı alınmadan kurulur; Content-Length verilmediği için yanıt chunked transfer encoding ile gönderilir
+    headers = {"Content-Disposition": f'attachment; filename="{export_filename(account_id, dataset, export_format)}"',
+               "Cache-Control": "no-store"}
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        # Adlandırılmış cursor: execute sunucuda DECLARE çalıştırır, satırlar fetchmany ile grup grup gelir.
+        # Sorgu hatası burada yakalanır ve akış başlamadan 500 döner.
+        cursor = conn.cursor(name=f"report_export_{dataset}")
+        cursor.itersize = EXPORT_BATCH_SIZE
+        cursor.execute(query, (account_id,))
+    except Exception as e:
+        print(f"❌ Report export error for {account_id}: {e}")
+        if cursor: cursor.close()
+        if conn: conn.close()
+        return jsonify({"error": f"Failed to export report: {str(e)}"}), 500
+
+    try:
+        return Response(stream_export_rows(conn, cursor, columns, export_format),
+                        mimetype=EXPORT_FORMATS[export_format], headers=headers)
+    except Exception as e:
+        # Üreteç hiç başlamadıysa finally bloğu çalışmaz; bağlantı burada havuza verilir
+        print(f"❌ Report export error for {account_id}: {e}")
+        cursor.close()
+        conn.close()
+        return jsonify({"error": f"Failed to export report: {str(e)}"}), 500
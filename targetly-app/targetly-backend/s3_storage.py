@@ -0,0 +1,224 @@
+# targetly-backend/s3_storage.py
+# Medya yüklemeleri için süreç genelinde tek bir S3 istemcisi ve çok parçalı (multipart) aktarım ayarları.
+# boto3 istemcisi thread-safe'tir; her yüklemede yeniden oluşturmak (kimlik zinciri + endpoint çözümü) yerine
+# bir kez kurulur. upload_stream() dosya benzeri bir nesneyi (ör. request.stream) parça parça okuyup yükler;
+# dosyanın tamamı belleğe alınmaz (aranamayan akışlarda bellekte en fazla ~max_concurrency x chunk tutulur).
+# Yükleme ilerlemesi ve throughput get_upload_stats() ile izlenir.
+#   S3_ENDPOINT_URL=http://127.0.0.1:5005  -> MinIO / moto gibi S3 uyumlu yerel bir sunucu
+# boto3 (~250 ms import) ilk yüklemede içe aktarılır; uygulamanın soğuk başlangıcını yavaşlatmaz.
+import os
+import re
+import threading
+import time
+import unicodedata
+import uuid
+from datetime import datetime, timezone
+
+from metrics import time_dependency
+from settings import get_settings
+
+settings = get_settings()
+S3_OBJECT_ACL = os.getenv("S3_OBJECT_ACL", "public-read") # IG container'ı image_url'i herkese açık okuyabilmeli
+
+S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", 8))
+S3_MULTIPART_CHUNK_MB = int(os.getenv("S3_MULTIPART_CHUNK_MB", 8))
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", 8)) # bir yüklemedeki eşzamanlı parça sayısı
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", 32)) # tüm yüklemelerin paylaştığı HTTP havuzu
+
+_MB = 1024 * 1024
+
+_client = None
+_transfer_config = None
+_client_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {"uploads": 0, "failed_uploads": 0, "bytes": 0, "seconds": 0.0, "last_throughput_mbps": 0.0}
+_in_progress = {} # upload id -> {"key", "bytes", "started_at"}
+
+
+def s3_configured():
+    return settings.s3_configured()
+
+
+def get_s3_client():
+    """Süreç genelinde paylaşılan S3 istemcisi (ilk çağrıda oluşturulur)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import boto3
+                from botocore.config import Config
+
+                _client = boto3.client(
+                    's3',
+                    aws_access_key_id=settings.aws_access_key_id,
+                    aws_secret_access_key=settings.aws_secret_access_key,
+                    region_name=settings.aws_s3_region,
+                    endpoint_url=settings.s3_endpoint_url,
+                    config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS, retries={"max_attempts": 5, "mode": "adaptive"}),
+                )
+    return _client
+
+
+def get_transfer_config():
+    """multipart eşiği / parça boyutu / eşzamanlılık ayarları (boto3 TransferConfig, ilk çağrıda oluşturulur)."""
+    global _transfer_config
+    if _transfer_config is None:
+        from boto3.s3.transfer import TransferConfig
+
+        _transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD_MB * _MB,
+            multipart_chunksize=S3_MULTIPART_CHUNK_MB * _MB,
+            max_concurrency=S3_MAX_CONCURRENCY,
+            use_threads=True,
+        )
+    return _transfer_config
+
+
+def set_s3_client(client):
+    """İstemciyi değiştirir (ör. yerel S3 uyumlu sunucuya bağlı bir istemci)."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def public_url(bucket_name, object_name):
+    if settings.s3_public_base_url:
+        return f"{settings.s3_public_base_url.rstrip('/')}/{object_name}"
+    if settings.s3_endpoint_url:
+        return f"{settings.s3_endpoint_url.rstrip('/')}/{bucket_name}/{object_name}"
+    if settings.aws_s3_region == "us-east-1":
+        return f"https://{bucket_name}.s3.amazonaws.com/{object_name}"
+    return f"https://{bucket_name}.s3.{settings.aws_s3_region}.amazonaws.com/{object_name}"
+
+
+class _ProgressTracker:
+    """boto3 Callback'i: aktarılan baytları (parçalar paralel geldiği için kilitle) toplar."""
+
+    def __init__(self, upload_id):
+        self.upload_id = upload_id
+
+    def __call__(self, bytes_amount):
+        with _stats_lock:
+            entry = _in_progress.get(self.upload_id)
+            if entry is not None:
+                entry["bytes"] += bytes_amount
+
+
+def upload_stream(fileobj, object_name, content_type=None, bucket_name=None):
+    """
+    Dosya benzeri nesneyi S3'e yükler ve herkese açık URL'yi döndürür. multipart_threshold'u aşan
+    içerik get_transfer_config() ayarlarıyla parçalara bölünür ve paralel gönderilir; okuma parça boyutunda yapılır.
+    Hatalar (ClientError / BotoCoreError) çağırana iletilir.
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    bucket_name = bucket_name or settings.aws_s3_bucket_name
+    upload_id = uuid.uuid4().hex
+    started = time.perf_counter()
+    with _stats_lock:
+        _in_progress[upload_id] = {"key": object_name, "bytes": 0, "started_at": time.time()}
+    extra_args = {}
+    if S3_OBJECT_ACL:
+        extra_args["ACL"] = S3_OBJECT_ACL
+    if content_type:
+        extra_args["ContentType"] = content_type
+    try:
+        with time_dependency("s3", "upload"):
+            get_s3_client().upload_fileobj(fileobj, bucket_name, object_name, ExtraArgs=extra_args,
+                                           Config=get_transfer_config(), Callback=_ProgressTracker(upload_id))
+    except (ClientError, BotoCoreError):
+        with _stats_lock:
+            _stats["failed_uploads"] += 1
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        with _stats_lock:
+            entry = _in_progress.pop(upload_id)
+    transferred = entry["bytes"]
+    with _stats_lock:
+        _stats["uploads"] += 1
+        _stats["bytes"] += transferred
+        _stats["seconds"] += elapsed
+        _stats["last_throughput_mbps"] = round(transferred / _MB / elapsed, 3) if elapsed > 0 else 0.0
+    print(f"✅ S3'e yüklendi: {object_name} ({transferred / _MB:.2f} MB, {elapsed:.2f} sn)")
+    return public_url(bucket_name, object_name)
+
+
+def get_upload_stats():
+    now = time.time()
+    with _stats_lock:
+        stats = dict(_stats)
+        in_progress = [
+            {"key": entry["key"], "bytes": entry["bytes"], "elapsed_seconds": round(now - entry["started_at"], 3)}
+            for entry in _in_progress.values()
+        ]
+    stats["seconds"] = round(stats["seconds"], 3)
+    stats["avg_throughput_mbps"] = round(stats["bytes"] / _MB / stats["seconds"], 3) if stats["seconds"] else 0.0
+    stats["in_progress"] = in_progress
+    stats["transfer_config"] = {
+        "multipart_threshold_mb": S3_MULTIPART_THRESHOLD_MB,
+        "multipart_chunk_mb": S3_MULTIPART_CHUNK_MB,
+        "max_concurrency": S3_MAX_CONCURRENCY,
+    }
+    return stats
+
+
+def sanitize_filename(filename):
+    """
+    Dosya adını URL ve dosya sistemi için güvenli hale getirir.
+    Türkçe karakterleri ASCII karşılıklarına çevirir, boşlukları ve geçersiz karakterleri temizler.
+    """
+    try:
+        # Normalize Unicode characters (e.g., "ö" -> "o", "İ" -> "I")
+        normalized_name = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        # Replace spaces and unsupported characters with a hyphen or remove them
+        sanitized_name = re.sub(r'[^\w\.\-]', '', normalized_name) # Sadece harf, rakam, '.', '-' ve '_' kalsın
+        sanitized_name = re.sub(r'[-\s]+', '-', sanitized_name).strip('-_') # Birden fazla tire/boşluğu tek tire yap
+        if not sanitized_name: # Eğer isim tamamen boşaldıysa, rastgele bir isim ver
+            return "unnamed_file"
+        return sanitized_name
+    except Exception as e:
+        print(f"⚠️ Dosya adı sanitize edilirken hata: {e}. Orijinal ad kullanılacak: {filename}")
+        return filename # Hata durumunda orijinali döndür
+
+
+def upload_to_s3(file_obj, bucket_name, object_name=None, content_type=None):
+    # Paylaşılan S3 istemcisi + multipart TransferConfig; file_obj parça parça okunur
+    if not bucket_name or not s3_configured():
+        print("❌ HATA: S3 için AWS konfigürasyonları eksik (.env dosyasını kontrol edin).")
+        return None
+
+    if object_name is None:
+        object_name = file_obj.filename
+
+    from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError # boto3 hataları için
+    try:
+        return upload_stream(file_obj, object_name, content_type or getattr(file_obj, 'content_type', None), bucket_name)
+    except NoCredentialsError:
+        print("❌ HATA: S3 için AWS kimlik bilgileri bulunamadı.")
+        return None
+    except PartialCredentialsError:
+        print("❌ HATA: S3 için eksik AWS kimlik bilgileri.")
+        return None
+    except ClientError as e:
+        error_code = e.response.get("Error", {}).get("Code")
+        if error_code == "AccessDenied":
+            print(f"❌ HATA: S3 bucket'ına erişim reddedildi ({bucket_name}). İzinleri kontrol edin.")
+        else:
+            print(f"❌ HATA: S3 yüklemesi sırasında ClientError: {e}")
+        return None
+    except Exception as e:
+        print(f"❌ HATA: S3 yüklemesi sırasında beklenmedik bir hata: {e}")
+        return None
+
+
+def build_s3_object_name(original_filename):
+    base_name, file_extension = os.path.splitext(original_filename)
+    sanitized_base_name = sanitize_filename(base_name) # Sanitize et
+    # Uzunluğu kontrol et ve kısalt, sonra uzantıyı ekle
+    max_base_len = 100 # S3 obje adı için makul bir uzunluk
+    if len(sanitized_base_name) > max_base_len:
+        sanitized_base_name = sanitized_base_name[:max_base_len]
+    # Zaman damgası ve sanitize edilmiş adı birleştir
+    return f"instagram_uploads/{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')}_{sanitized_base_name}{file_extension}"
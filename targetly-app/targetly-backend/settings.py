@@ -0,0 +1,106 @@
+# targetly-backend/settings.py
+# Backend yapılandırması tek yerde: targetly-backend/.env ve common/.env süreç başına bir kez yüklenir,
+# ortam değişkenleri bir kez okunup paylaşılan Settings nesnesine yazılır. Route modülleri import
+# sırasında load_dotenv / print çalıştırmaz; değerleri istek anında get_settings() üzerinden okur.
+# Eksik yapılandırma uyarıları create_app() tarafından başlangıçta bir kez yazdırılır.
+import os
+import threading
+
+from dotenv import load_dotenv
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT_DIR = os.path.dirname(os.path.dirname(BASE_DIR)) # .../SOCIALAI-OPTIMIZER
+BACKEND_ENV_PATH = os.path.join(BASE_DIR, '.env')
+COMMON_ENV_PATH = os.path.join(PROJECT_ROOT_DIR, 'common', '.env')
+
+MODEL_FILENAME = 'best_instagram_model_gradientboosting.joblib'
+DEFAULT_MAIN_ACCOUNT_DISPLAY_NAME = "TCS Yazılım (Ana Hesap)"
+APP_WARMUP_MODES = ("background", "eager", "off")
+
+_env_loaded = False
+_settings = None
+_lock = threading.Lock()
+
+
+def load_env_files():
+    """
+    .env dosyalarını (varsa) bir kez yükler. Önce backend/.env, sonra common/.env okunur;
+    load_dotenv mevcut değişkenleri ezmediği için ortamda verilen değerler ve backend/.env önceliklidir.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    with _lock:
+        if not _env_loaded:
+            for path in (BACKEND_ENV_PATH, COMMON_ENV_PATH):
+                if os.path.exists(path):
+                    load_dotenv(dotenv_path=path)
+            _env_loaded = True
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() == "true"
+
+
+class Settings:
+    """Ortam değişkenlerinden bir kez okunan backend ayarları."""
+
+    def __init__(self):
+        self.model_path = os.path.join(BASE_DIR, MODEL_FILENAME)
+        self.model_features_order = ['caption_length', 'post_hour', 'post_dayofweek', 'Month', 'Year']
+
+        self.gemini_api_key = os.getenv("GEMINI_API_KEY")
+        self.gemini_fake_model = _env_flag("GEMINI_FAKE_MODEL", "false")
+
+        self.aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
+        self.aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
+        self.aws_s3_bucket_name = os.getenv("AWS_S3_BUCKET_NAME")
+        self.aws_s3_region = os.getenv("AWS_S3_REGION")
+        self.s3_endpoint_url = os.getenv("S3_ENDPOINT_URL") # boşsa AWS
+        self.s3_public_base_url = os.getenv("S3_PUBLIC_BASE_URL") # boşsa bucket + bölgeden türetilir
+
+        self.ig_app_access_token = os.getenv("IG_APP_ACCESS_TOKEN")
+        self.graph_api_version = os.getenv("REACT_APP_GRAPH_API_VERSION", "v20.0")
+        self.graph_api_base_url = os.getenv("IG_GRAPH_URL", f"https://graph.facebook.com/{self.graph_api_version}") # yerel stub için http://127.0.0.1:8765
+        self.media_upload_max_bytes = int(os.getenv("MEDIA_UPLOAD_MAX_MB", 1024)) * 1024 * 1024 # IG reels üst sınırına yakın
+
+        # Dashboard / rapor / hesap listesi route'larının gösterdiği ana hesap (common/.env)
+        self.ig_account_id = os.getenv("IG_ACCOUNT_ID")
+        self.ig_display_name = os.getenv("IG_DISPLAY_NAME")
+        self.main_account_display_name = DEFAULT_MAIN_ACCOUNT_DISPLAY_NAME
+
+        # background: port açıldıktan sonra model + Gemini arka planda ısıtılır; eager: create_app içinde;
+        # off: ilk istekte yüklenir
+        self.app_warmup = os.getenv("APP_WARMUP", "background").lower()
+
+    def s3_configured(self):
+        return bool(self.aws_s3_bucket_name and (self.s3_endpoint_url or all(
+            [self.aws_access_key_id, self.aws_secret_access_key, self.aws_s3_region])))
+
+    def config_warnings(self):
+        """Eksik / hatalı yapılandırma için uyarı metinleri (başlangıçta bir kez yazdırılır)."""
+        warnings = []
+        if not self.ig_account_id:
+            warnings.append("IG_ACCOUNT_ID okunamadı (common/.env); dashboard ve rapor route'ları hata döndürecek.")
+        if not self.ig_display_name:
+            warnings.append("IG_DISPLAY_NAME okunamadı (common/.env); hesap adı yerine ID gösterilecek.")
+        if not self.gemini_api_key and not self.gemini_fake_model:
+            warnings.append("GEMINI_API_KEY bulunamadı; öneri endpoint'i çalışmayacak.")
+        if not self.ig_app_access_token:
+            warnings.append("IG_APP_ACCESS_TOKEN ayarlanmamış; gönderi zamanlama çalışmayacak.")
+        if not self.s3_configured():
+            warnings.append("S3 için AWS konfigürasyonları eksik; medya yüklemeleri çalışmayacak.")
+        if self.app_warmup not in APP_WARMUP_MODES:
+            warnings.append(f"APP_WARMUP='{self.app_warmup}' geçersiz ({', '.join(APP_WARMUP_MODES)}); 'background' kullanılacak.")
+        return warnings
+
+
+def get_settings():
+    """Süreç genelinde paylaşılan Settings nesnesi (ilk çağrıda .env yüklenip oluşturulur)."""
+    global _settings
+    if _settings is None:
+        load_env_files()
+        with _lock:
+            if _settings is None:
+                _settings = Settings()
+    return _settings
@@ -0,0 +1,436 @@
+# targetly-backend/suggestions.py
+# Gemini gönderi önerileri (açıklama + hashtag) için önbellek, istek birleştirme ve toplu üretim.
+# - Sonuçlar normalize edilmiş konu + medya tipine göre TTL + LRU önbellekte tutulur.
+# - Aynı anahtar için eşzamanlı istekler tek bir Gemini çağrısını bekler (single-flight).
+# - Toplu istekte önbellekte olmayan konular tek prompt'ta üretilir ve JSON konu bazında geri dağıtılır.
+# GEMINI_FAKE_MODEL=true ile gerçek API yerine FakeGeminiModel kullanılır (çevrimdışı geliştirme / yük testi).
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from metrics import time_dependency
+from response_cache import InProcessBackend
+
+SUGGESTION_CACHE_ENABLED = os.getenv("SUGGESTION_CACHE_ENABLED", "true").lower() == "true"
+SUGGESTION_CACHE_TTL_SECONDS = int(os.getenv("SUGGESTION_CACHE_TTL_SECONDS", 3600))
+SUGGESTION_CACHE_MAX_ENTRIES = int(os.getenv("SUGGESTION_CACHE_MAX_ENTRIES", 500))
+SUGGESTION_BULK_MAX_SUBJECTS = int(os.getenv("SUGGESTION_BULK_MAX_SUBJECTS", 50)) # tek istekte en fazla konu
+SUGGESTION_BULK_CHUNK_SIZE = int(os.getenv("SUGGESTION_BULK_CHUNK_SIZE", 8)) # bir prompt'taki konu sayısı (max_output_tokens sınırı)
+GEMINI_FAKE_LATENCY_MS = float(os.getenv("GEMINI_FAKE_LATENCY_MS", 0))
+GEMINI_HTTP_TIMEOUT_SECONDS = float(os.getenv("GEMINI_HTTP_TIMEOUT_SECONDS", 60))
+
+# google.generativeai (WSGI) ve REST istemcisi (ASGI) aynı model ayarlarını kullanır
+GEMINI_MODEL_NAME = "gemini-1.5-flash-latest"
+GEMINI_GENERATION_CONFIG = {"temperature": 0.7, "top_p": 1, "top_k": 1, "max_output_tokens": 2048}
+GEMINI_SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+GEMINI_OPERATIONS = {"upstream_calls": "generate", "bulk_upstream_calls": "generate_bulk"} # /metrics işlem etiketi
+GEMINI_REST_URL = os.getenv("GEMINI_REST_URL", "https://generativelanguage.googleapis.com/v1beta")
+
+_PROMPT_HEADER = [
+    "You are an expert social media content assistant for Instagram.",
+]
+_PROMPT_GUIDELINES = [
+    "Provide 3 creative and engaging caption alternatives (100-150 chars).",
+    "Also, provide 5-7 relevant and popular hashtags.",
+    "Tone: friendly, inviting, engagement-focused.",
+]
+_BULK_ITEMS_MARKER = "POSTS:"
+
+
+class SuggestionValidationError(ValueError):
+    """İstek gövdesi geçersiz olduğunda fırlatılır; index hatalı öğeyi gösterir."""
+
+    def __init__(self, message, index=None):
+        super().__init__(message)
+        self.index = index
+
+
+def normalize_subject(subject):
+    """Önbellek anahtarı için: Unicode NFKC, büyük/küçük harf duyarsız, tek boşluk."""
+    return " ".join(unicodedata.normalize("NFKC", subject).casefold().split())
+
+
+def suggestion_cache_key(subject, media_type):
+    normalized = f"{normalize_subject(subject)}\x1f{normalize_subject(media_type or 'unknown')}"
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def build_suggestion_prompt(subject, media_type):
+    return "\n".join(_PROMPT_HEADER + [
+        f"Generate content for a post about: '{subject}'. Media type: {media_type}.",
+    ] + _PROMPT_GUIDELINES + [
+        "Return STRICTLY JSON: {\"captions\": [\"c1\", \"c2\", \"c3\"], \"hashtags\": [\"#h1\", \"#h2\"]}",
+    ])
+
+
+def build_bulk_prompt(items):
+    """items: [(id, subject, media_type), ...] -> tek prompt; yanıt id ile konulara geri eşlenir."""
+    posts_json = json.dumps([{"id": item_id, "subject": subject, "media_type": media_type}
+                             for item_id, subject, media_type in items], ensure_ascii=False)
+    return "\n".join(_PROMPT_HEADER + [
+        "Generate content for EACH of the following posts, independently of each other.",
+        f"{_BULK_ITEMS_MARKER} {posts_json}",
+    ] + _PROMPT_GUIDELINES + [
+        "Return STRICTLY JSON with one entry per post id: "
+        "{\"results\": [{\"id\": 0, \"captions\": [\"c1\", \"c2\", \"c3\"], \"hashtags\": [\"#h1\", \"#h2\"]}]}",
+    ])
+
+
+def parse_model_json(raw_text):
+    """Gemini yanıtındaki ```json ... ``` bloğunu (yoksa tüm metni) JSON olarak çözer."""
+    match = re.search(r"```json\s*([\s\S]*?)\s*```", raw_text, re.DOTALL)
+    json_str = match.group(1).strip() if match else raw_text.strip()
+    return json.loads(json_str)
+
+
+def validate_suggestions(suggestions):
+    if not (isinstance(suggestions, dict) and isinstance(suggestions.get("captions"), list)
+            and isinstance(suggestions.get("hashtags"), list)):
+        raise ValueError("Invalid JSON structure from Gemini.")
+    return {"captions": suggestions["captions"], "hashtags": suggestions["hashtags"]}
+
+
+def split_bulk_response(parsed, expected_ids):
+    """{"results": [{"id": .., "captions": [..], "hashtags": [..]}]} -> {id: suggestions}; bozuk girişler atlanır."""
+    results = parsed.get("results") if isinstance(parsed, dict) else parsed
+    if not isinstance(results, list):
+        raise ValueError("Invalid bulk JSON structure from Gemini.")
+    by_id = {}
+    for entry in results:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            entry_id = int(entry.get("id"))
+            suggestions = validate_suggestions(entry)
+        except (TypeError, ValueError):
+            continue
+        if entry_id in expected_ids:
+            by_id[entry_id] = suggestions
+    return by_id
+
+
+def parse_bulk_request(posts, max_subjects=SUGGESTION_BULK_MAX_SUBJECTS):
+    """[{"subject": "...", "media_type": "..."}, ...] -> [(subject, media_type), ...]"""
+    if not isinstance(posts, list) or not posts:
+        raise SuggestionValidationError("posts boş olmayan bir liste olmalı.")
+    if len(posts) > max_subjects:
+        raise SuggestionValidationError(f"Tek istekte en fazla {max_subjects} konu gönderilebilir.")
+    parsed = []
+    for index, post in enumerate(posts):
+        subject = post.get("subject") if isinstance(post, dict) else None
+        if not isinstance(subject, str) or not subject.strip():
+            raise SuggestionValidationError(f"posts[{index}].subject zorunlu.", index)
+        parsed.append((subject.strip(), post.get("media_type") or "unknown"))
+    return parsed
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Aynı anahtar için aynı anda yalnızca bir çağrı çalışır; diğerleri onun sonucunu (veya hatasını) paylaşır."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """(sonuç, paylaşıldı_mı) döndürür."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _InFlightCall()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = func()
+            return call.result, False
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """SingleFlight'ın asyncio karşılığı: aynı anahtar için bekleyen coroutine'ler liderin Future'ını paylaşır."""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, coro_func):
+        """(sonuç, paylaşıldı_mı) döndürür."""
+        future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await coro_func()
+            future.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception() # bekleyen yoksa "exception never retrieved" uyarısı çıkmasın
+            raise
+        finally:
+            del self._calls[key]
+
+
+class SuggestionService:
+    """
+    model_getter o anki Gemini modelini (veya None) döndürür; böylece app.py'deki
+    configure_gemini_model() sonradan çağrılsa da servis güncel modeli kullanır.
+    """
+
+    def __init__(self, model_getter, ttl=SUGGESTION_CACHE_TTL_SECONDS, max_entries=SUGGESTION_CACHE_MAX_ENTRIES,
+                 cache_enabled=SUGGESTION_CACHE_ENABLED):
+        self._model_getter = model_getter
+        self.ttl = ttl
+        self.cache_enabled = cache_enabled
+        self._cache = InProcessBackend(max_entries=max_entries)
+        self._single_flight = SingleFlight()
+        self._async_single_flight = AsyncSingleFlight()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "upstream_calls": 0, "bulk_upstream_calls": 0,
+                       "upstream_errors": 0, "upstream_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _call_model(self, prompt, stat_name):
+        model = self._model_getter()
+        if model is None:
+            raise RuntimeError("Gemini API is not configured.")
+        started = time.perf_counter()
+        try:
+            with time_dependency("gemini", GEMINI_OPERATIONS[stat_name]):
+                return model.generate_content(prompt).text
+        except Exception:
+            self._count("upstream_errors")
+            raise
+        finally:
+            self._count(stat_name)
+            self._count("upstream_seconds", time.perf_counter() - started)
+
+    async def _call_model_async(self, prompt, stat_name):
+        model = self._model_getter()
+        if model is None:
+            raise RuntimeError("Gemini API is not configured.")
+        started = time.perf_counter()
+        try:
+            with time_dependency("gemini", GEMINI_OPERATIONS[stat_name]):
+                return (await model.generate_content_async(prompt)).text
+        except Exception:
+            self._count("upstream_errors")
+            raise
+        finally:
+            self._count(stat_name)
+            self._count("upstream_seconds", time.perf_counter() - started)
+
+    def _cache_get(self, key):
+        return self._cache.get(key) if self.cache_enabled else None
+
+    def _cache_set(self, key, suggestions):
+        if self.cache_enabled:
+            self._cache.set(key, suggestions, self.ttl)
+
+    def generate(self, subject, media_type):
+        """(suggestions, kaynak) döndürür; kaynak: "HIT" | "MISS" | "COALESCED"."""
+        key = suggestion_cache_key(subject, media_type)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached, "HIT"
+
+        def fetch():
+            # Lider beklerken başka bir istek sonucu yazmış olabilir
+            cached_again = self._cache_get(key)
+            if cached_again is not None:
+                return cached_again
+            raw_text = self._call_model(build_suggestion_prompt(subject, media_type), "upstream_calls")
+            suggestions = validate_suggestions(parse_model_json(raw_text))
+            self._cache_set(key, suggestions)
+            return suggestions
+
+        suggestions, shared = self._single_flight.do(key, fetch)
+        self._count("coalesced" if shared else "misses")
+        return suggestions, "COALESCED" if shared else "MISS"
+
+    async def generate_async(self, subject, media_type):
+        """generate()'in ASGI modu karşılığı; model generate_content_async sağlamalıdır."""
+        key = suggestion_cache_key(subject, media_type)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._count("hits")
+            return cached, "HIT"
+
+        async def fetch():
+            raw_text = await self._call_model_async(build_suggestion_prompt(subject, media_type), "upstream_calls")
+            suggestions = validate_suggestions(parse_model_json(raw_text))
+            self._cache_set(key, suggestions)
+            return suggestions
+
+        suggestions, shared = await self._async_single_flight.do(key, fetch)
+        self._count("coalesced" if shared else "misses")
+        return suggestions, "COALESCED" if shared else "MISS"
+
+    def generate_bulk(self, items, chunk_size=SUGGESTION_BULK_CHUNK_SIZE):
+        """
+        items: [(subject, media_type), ...]. Her öğe için {"captions", "hashtags", "source"} veya {"error"} döner
+        (girdi sırasıyla). Önbellekte olmayan benzersiz konular chunk_size'lık prompt'larla üretilir.
+        """
+        results = [None] * len(items)
+        pending = {}  # cache key -> [öğe indeksleri]
+        for index, (subject, media_type) in enumerate(items):
+            key = suggestion_cache_key(subject, media_type)
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._count("hits")
+                results[index] = dict(cached, source="HIT")
+            else:
+                pending.setdefault(key, []).append(index)
+
+        pending_keys = list(pending)
+        for start in range(0, len(pending_keys), max(1, chunk_size)):
+            chunk_keys = pending_keys[start:start + max(1, chunk_size)]
+            prompt_items = [(item_id, items[pending[key][0]][0], items[pending[key][0]][1])
+                            for item_id, key in enumerate(chunk_keys)]
+            try:
+                raw_text = self._call_model(build_bulk_prompt(prompt_items), "bulk_upstream_calls")
+                by_id = split_bulk_response(parse_model_json(raw_text), set(range(len(chunk_keys))))
+                chunk_error = None
+            except Exception as e:
+                print(f"❌ Gemini toplu öneri hatası: {e}")
+                by_id, chunk_error = {}, str(e)
+            for item_id, key in enumerate(chunk_keys):
+                suggestions = by_id.get(item_id)
+                if suggestions is not None:
+                    self._cache_set(key, suggestions)
+                for position, index in enumerate(pending[key]):
+                    if suggestions is None:
+                        results[index] = {"error": chunk_error or "No suggestions returned for this subject."}
+                    else:
+                        self._count("misses" if position == 0 else "hits")
+                        results[index] = dict(suggestions, source="MISS" if position == 0 else "HIT")
+        return results
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["upstream_seconds"] = round(stats["upstream_seconds"], 3)
+        stats["enabled"] = self.cache_enabled
+        stats["ttl_seconds"] = self.ttl
+        stats["entries"] = self._cache.size()
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["upstream_saved_ratio"] = round((stats["hits"] + stats["coalesced"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+class _TextResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    genai.GenerativeModel yerine geçen deterministik model: prompt'taki konu(lar)dan sahte açıklama ve
+    hashtag üretir. latency_ms her çağrıya gecikme ekler (birleştirme / önbellek etkisini ölçmek için).
+    """
+
+    model_name = "fake-gemini"
+
+    def __init__(self, latency_ms=GEMINI_FAKE_LATENCY_MS):
+        self.latency_seconds = latency_ms / 1000.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _suggestions_for(subject, media_type):
+        words = [w for w in re.split(r"\W+", normalize_subject(subject)) if w] or ["post"]
+        return {
+            "captions": [f"{subject} ✨ ({media_type}) - fikir {i}" for i in range(1, 4)],
+            "hashtags": [f"#{w}" for w in words[:5]] + ["#targetly", "#instagood"],
+        }
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._respond(prompt)
+
+    async def generate_content_async(self, prompt):
+        with self._lock:
+            self.calls += 1
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._respond(prompt)
+
+    def _respond(self, prompt):
+        for line in prompt.splitlines():
+            if line.startswith(_BULK_ITEMS_MARKER):
+                posts = json.loads(line[len(_BULK_ITEMS_MARKER):])
+                results = [dict(self._suggestions_for(p["subject"], p["media_type"]), id=p["id"]) for p in posts]
+                return _TextResponse("```json\n" + json.dumps({"results": results}, ensure_ascii=False) + "\n```")
+        match = re.search(r"post about: '(.*)'\. Media type: (.*)\.", prompt)
+        subject, media_type = (match.group(1), match.group(2)) if match else ("post", "unknown")
+        return _TextResponse(json.dumps(self._suggestions_for(subject, media_type), ensure_ascii=False))
+
+
+class GeminiRestModel:
+    """
+    ASGI modu için Gemini istemcisi: generateContent REST uç noktasını paylaşılan bir httpx.AsyncClient ile
+    çağırır (google.generativeai'nin senkron istemcisi olay döngüsünü bloklardı).
+    """
+
+    def __init__(self, http_client, api_key, model_name=GEMINI_MODEL_NAME, base_url=GEMINI_REST_URL):
+        self.http_client = http_client
+        self.api_key = api_key
+        self.model_name = model_name
+        self.url = f"{base_url.rstrip('/')}/models/{model_name}:generateContent"
+
+    async def generate_content_async(self, prompt):
+        response = await self.http_client.post(
+            self.url, params={"key": self.api_key}, timeout=GEMINI_HTTP_TIMEOUT_SECONDS,
+            json={
+                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+                "generationConfig": {"temperature": GEMINI_GENERATION_CONFIG["temperature"],
+                                     "topP": GEMINI_GENERATION_CONFIG["top_p"],
+                                     "topK": GEMINI_GENERATION_CONFIG["top_k"],
+                                     "maxOutputTokens": GEMINI_GENERATION_CONFIG["max_output_tokens"]},
+                "safetySettings": GEMINI_SAFETY_SETTINGS,
+            })
+        if response.status_code >= 400:
+            raise RuntimeError(f"Gemini HTTP {response.status_code}: {response.text[:300]}")
+        candidates = response.json().get("candidates") or []
+        parts = candidates[0].get("content", {}).get("parts", []) if candidates else []
+        if not parts:
+            raise ValueError("Gemini yanıtında metin yok (güvenlik filtresi veya boş aday).")
+        return _TextResponse("".join(part.get("text", "") for part in parts))
@@ -0,0 +1,6 @@
+# targetly-backend/wsgi.py
+# WSGI sunucuları için giriş noktası; uygulama (ve yayın işçileri / ısınma) burada bir kez oluşturulur.
+#   gunicorn wsgi:app --bind 0.0.0.0:5000
+from app import create_app
+
+app = create_app()